@@ -0,0 +1,118 @@
+/**
+ * 搜索页：把查询交给 docs_search_worker.js，在后台按需加载分片索引，
+ * 再逐条抓取结果页面生成摘要，与 Sphinx 自带搜索的展示方式保持一致。
+ */
+(function() {
+    'use strict';
+
+    var SUMMARY_RADIUS = 80;
+    var script = document.currentScript;
+    var results = document.getElementById('search-results');
+    if (!results || !script) return;
+
+    var progress = document.getElementById('search-progress');
+    var messages = results.dataset;
+
+    function setProgress(text) {
+        if (progress) progress.textContent = text || '';
+    }
+
+    function articleText(html) {
+        var page = new DOMParser().parseFromString(html, 'text/html');
+        var article = page.querySelector('[itemprop="articleBody"]') ||
+            page.querySelector('[role="main"]') || page.body;
+        article.querySelectorAll('script, style, .headerlink').forEach(function(node) {
+            node.remove();
+        });
+        return (article.textContent || '').replace(/\s+/g, ' ').trim();
+    }
+
+    function makeSummary(text, terms) {
+        var lower = text.toLowerCase();
+        var position = -1;
+        terms.forEach(function(term) {
+            var found = lower.indexOf(term);
+            if (found !== -1 && (position === -1 || found < position)) position = found;
+        });
+        var start = Math.max(position - SUMMARY_RADIUS, 0);
+        var end = Math.min(start + SUMMARY_RADIUS * 2, text.length);
+        return (start > 0 ? '...' : '') + text.slice(start, end) +
+            (end < text.length ? '...' : '');
+    }
+
+    // 依次抓取结果页面生成摘要，避免同时发起大量请求。
+    function addSummaries(items, terms) {
+        return items.reduce(function(previous, item) {
+            return previous.then(function() {
+                return fetch(item.url).then(function(response) {
+                    return response.ok ? response.text() : '';
+                }).then(function(html) {
+                    if (!html) return;
+                    var summary = document.createElement('p');
+                    summary.className = 'context';
+                    summary.textContent = makeSummary(articleText(html), terms);
+                    item.element.appendChild(summary);
+                }).catch(function() {});
+            });
+        }, Promise.resolve());
+    }
+
+    function render(response, query) {
+        results.textContent = '';
+        if (response.error) {
+            setProgress(messages.failed);
+            return;
+        }
+        var heading = document.createElement('h2');
+        heading.textContent = messages.heading;
+        results.appendChild(heading);
+        var summary = document.createElement('p');
+        summary.className = 'search-summary';
+        summary.textContent = response.results.length ?
+            messages.found.replace('{count}', response.results.length) :
+            messages.empty;
+        results.appendChild(summary);
+        setProgress('');
+
+        var list = document.createElement('ul');
+        list.className = 'search';
+        var items = response.results.map(function(result) {
+            var url = new URL(result.url);
+            url.searchParams.set('highlight', query);
+            var element = document.createElement('li');
+            var link = document.createElement('a');
+            link.href = url.href;
+            link.textContent = result.title || result.url;
+            element.appendChild(link);
+            list.appendChild(element);
+            return { url: result.url, element: element };
+        });
+        results.appendChild(list);
+        addSummaries(items, response.terms);
+    }
+
+    var query = (new URLSearchParams(window.location.search).get('q') || '').trim();
+    var input = document.querySelector('#search-documentation ~ form input[name="q"]');
+    if (input) input.value = query;
+    if (!query) return;
+
+    var worker;
+    try {
+        worker = new Worker(new URL('docs_search_worker.js', script.src).href);
+    } catch (e) {
+        setProgress(messages.failed);
+        return;
+    }
+    worker.onmessage = function(event) {
+        render(event.data, query);
+    };
+    worker.onerror = function() {
+        setProgress(messages.failed);
+    };
+    setProgress(messages.searching);
+    worker.postMessage({
+        id: 1,
+        manifest: new URL(messages.index, window.location.href).href,
+        query: query
+    });
+})();
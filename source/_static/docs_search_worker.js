@@ -0,0 +1,191 @@
+/**
+ * 分片搜索索引查询 Worker
+ *
+ * 读取 utils/search_index.py 生成的 _search/<语言>/manifest.json，只下载查询词
+ * （或其前缀）所在的分片，在主线程之外完成匹配与排序。分词规则必须与
+ * utils/search_index.py 保持一致：拉丁字母按词切分，中日韩文字按相邻二字切分。
+ */
+'use strict';
+
+var TOKEN_PATTERN = /([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+)|([0-9a-z_\u00c0-\u024f]+)/g;
+var MIN_WORD_LENGTH = 2;
+var MAX_TERM_LENGTH = 32;
+var PREFIX_MATCH_FACTOR = 0.5;
+var LAST_CHARACTER = '\uffff';
+
+var requests = {};
+
+function fetchJson(url) {
+    if (!requests[url]) {
+        requests[url] = fetch(url).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status + ' ' + url);
+            }
+            return response.json();
+        }).catch(function (error) {
+            delete requests[url];
+            throw error;
+        });
+    }
+    return requests[url];
+}
+
+/**
+ * 将查询拆分为索引词；单个汉字与拉丁词按前缀匹配，汉字二元组精确匹配。
+ */
+function tokenize(text, stopwords) {
+    var tokens = [];
+    var seen = {};
+    var normalized = text.normalize('NFKC').toLowerCase();
+    var match;
+
+    function add(term, prefix) {
+        if (!seen[term]) {
+            seen[term] = true;
+            tokens.push({ term: term, prefix: prefix });
+        }
+    }
+
+    TOKEN_PATTERN.lastIndex = 0;
+    while ((match = TOKEN_PATTERN.exec(normalized)) !== null) {
+        var cjk = match[1];
+        var word = match[2];
+        if (cjk) {
+            if (cjk.length === 1) {
+                add(cjk, true);
+            }
+            for (var index = 0; index < cjk.length - 1; index++) {
+                add(cjk.slice(index, index + 2), false);
+            }
+        } else if (word.length >= MIN_WORD_LENGTH && stopwords.indexOf(word) === -1) {
+            add(word.slice(0, MAX_TERM_LENGTH), true);
+        }
+    }
+    return tokens;
+}
+
+/**
+ * 返回可能包含 [low, high] 范围内词语的分片下标。
+ */
+function shardRange(shards, low, high) {
+    var first = -1;
+    var last = -1;
+    for (var index = 0; index < shards.length; index++) {
+        if (shards[index][0] <= low) {
+            first = index;
+        }
+        if (shards[index][0] <= high) {
+            last = index;
+        }
+    }
+    var indexes = [];
+    for (var current = Math.max(first, 0); current <= last; current++) {
+        indexes.push(current);
+    }
+    return indexes;
+}
+
+function tokenScores(token, shardIndexes, shardData) {
+    var scores = new Map();
+
+    function collect(postings, factor) {
+        for (var index = 0; index < postings.length; index += 2) {
+            var score = postings[index + 1] * factor;
+            if (score > (scores.get(postings[index]) || 0)) {
+                scores.set(postings[index], score);
+            }
+        }
+    }
+
+    shardIndexes.forEach(function (shardIndex) {
+        var data = shardData[shardIndex];
+        if (!token.prefix) {
+            if (Object.prototype.hasOwnProperty.call(data, token.term)) {
+                collect(data[token.term], 1);
+            }
+            return;
+        }
+        Object.keys(data).forEach(function (term) {
+            if (term.lastIndexOf(token.term, 0) === 0) {
+                collect(data[term], term === token.term ? 1 : PREFIX_MATCH_FACTOR);
+            }
+        });
+    });
+    return scores;
+}
+
+function search(manifestUrl, query) {
+    return fetchJson(manifestUrl).then(function (manifest) {
+        var tokens = tokenize(query, manifest.stopwords || []);
+        var ranges = tokens.map(function (token) {
+            var high = token.prefix ? token.term + LAST_CHARACTER : token.term;
+            return shardRange(manifest.shards, token.term, high);
+        });
+        var needed = {};
+        ranges.forEach(function (indexes) {
+            indexes.forEach(function (index) { needed[index] = true; });
+        });
+        var shardIndexes = Object.keys(needed).map(Number);
+        var loads = shardIndexes.map(function (index) {
+            return fetchJson(new URL(manifest.shards[index][1], manifestUrl).href);
+        });
+        if (tokens.length) {
+            loads.push(fetchJson(new URL(manifest.documents, manifestUrl).href));
+        }
+        return Promise.all(loads).then(function (loaded) {
+            if (!tokens.length) {
+                return { results: [], terms: [] };
+            }
+            var documents = loaded.pop();
+            var shardData = {};
+            shardIndexes.forEach(function (index, position) {
+                shardData[index] = loaded[position];
+            });
+
+            // 多个词之间取交集：页面必须包含全部查询词。
+            var totals = null;
+            tokens.forEach(function (token, position) {
+                var scores = tokenScores(token, ranges[position], shardData);
+                if (totals === null) {
+                    totals = scores;
+                    return;
+                }
+                var combined = new Map();
+                totals.forEach(function (score, documentIndex) {
+                    if (scores.has(documentIndex)) {
+                        combined.set(documentIndex, score + scores.get(documentIndex));
+                    }
+                });
+                totals = combined;
+            });
+
+            var root = new URL(manifest.root || '../../', manifestUrl);
+            var results = [];
+            totals.forEach(function (score, documentIndex) {
+                var document = documents[documentIndex];
+                results.push({
+                    url: new URL(document[0], root).href,
+                    title: document[1],
+                    score: score
+                });
+            });
+            results.sort(function (left, right) {
+                return right.score - left.score || left.title.localeCompare(right.title);
+            });
+            return {
+                results: results,
+                terms: tokens.map(function (token) { return token.term; })
+            };
+        });
+    });
+}
+
+self.onmessage = function (event) {
+    var request = event.data || {};
+    search(request.manifest, request.query || '').then(function (response) {
+        response.id = request.id;
+        self.postMessage(response);
+    }).catch(function (error) {
+        self.postMessage({ id: request.id, error: String(error && error.message || error) });
+    });
+};
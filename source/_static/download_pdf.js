@@ -21,6 +21,10 @@
           return base + '_static/';
         }
       }
+      // 打包后的 docs.<hash>.js 会记录自身所在的 _static 目录
+      if (window.DOCS_STATIC_URL) {
+        return window.DOCS_STATIC_URL.replace(/_static(?:_[a-z]{2})?\/$/i, '') + '_static/';
+      }
     } catch (e) {}
     // 兜底：相对当前页面（可能在子目录下，路径可能不正确）
     return '_static/';
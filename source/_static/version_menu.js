@@ -8,9 +8,10 @@
         versions: {}
     };
 
-    // The build-time embed script replaces this with the repository config.
+    // 构建后写入的 version_config.js 提供 window.DOCS_VERSION_CONFIG，
+    // 用于 file:// 等无法读取 JSON 的场景；打包后的脚本本身不再被改写。
     function getEmbeddedVersionConfig() {
-        return null;
+        return window.DOCS_VERSION_CONFIG || null;
     }
     
     function getVersionConfigUrl() {
@@ -20,6 +21,10 @@
         if (script && script.src) {
             return new URL('version_config.json', script.src).href;
         }
+        // 打包后的 docs.<hash>.js 会记录自身所在的 _static 目录
+        if (window.DOCS_STATIC_URL) {
+            return new URL('version_config.json', window.DOCS_STATIC_URL).href;
+        }
         return new URL('_static/version_config.json', document.baseURI).href;
     }
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark the legacy zh/en HTML language fixer.
+
+Generates a synthetic legacy site and compares the original
+one-``re.sub``-per-rule rewrite with the single-scan fixer, serially and
+with a process pool.  Every variant must produce byte-identical trees.
+
+    python benchmarks/bench_html_language_fixer.py --pages 2000 --jobs 4
+"""
+
+import argparse
+import filecmp
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.html_language_fixer import (  # noqa: E402
+    CROSS_LANGUAGE_LINK_MARKER,
+    _target_html_name,
+    fix_html_tree,
+)
+
+
+def legacy_fix_html_language(content: str, language: str) -> str:
+    """The original rewrite: one full-content ``re.sub`` per rule."""
+    protected_links = {}
+    marked_link_pattern = re.compile(
+        r'(?P<prefix><a\s+[^>]*?href=")(?P<url>[^"]+)"'
+        r'(?P<suffix>[^>]*>.*?</a>)\s*'
+        + re.escape(CROSS_LANGUAGE_LINK_MARKER),
+        re.IGNORECASE,
+    )
+
+    def protect_link(match):
+        token = f'__DOCS_MARKED_LINK_{len(protected_links)}__'
+        protected_links[token] = match.group('url')
+        return f'{match.group("prefix")}{token}"{match.group("suffix")}'
+
+    content = marked_link_pattern.sub(protect_link, content)
+    if language == 'en':
+        content = re.sub(r'lang="zh-CN"', 'lang="en"', content)
+        content = re.sub(r'placeholder="搜索文档"', 'placeholder="Search documentation"', content)
+        content = re.sub(r'aria-label="搜索文档"', 'aria-label="Search documentation"', content)
+        content = re.sub(r'aria-label="导航菜单"', 'aria-label="Navigation menu"', content)
+        content = re.sub(r'aria-label="移动版导航菜单"', 'aria-label="Mobile navigation menu"', content)
+        content = re.sub(r'aria-label="页面导航"', 'aria-label="Page navigation"', content)
+        content = re.sub(r'aria-label="页脚"', 'aria-label="Footer"', content)
+        content = re.sub(r'href="([^"]*)_zh\.html"', r'href="\1.html"', content)
+        content = re.sub(r'href="([^"]*)/index_zh\.html"', r'href="\1/index.html"', content)
+        content = re.sub(r'href="([^"]*)_zh\.html#', r'href="\1.html#', content)
+    else:
+        content = re.sub(r'lang="en"', 'lang="zh-CN"', content)
+        content = re.sub(r'href="([^"]*)(?<!_zh)\.html"', r'href="\1_zh.html"', content)
+        content = re.sub(r'href="([^"]*)/index\.html"', r'href="\1/index_zh.html"', content)
+        content = re.sub(r'placeholder="Search documentation"', 'placeholder="搜索文档"', content)
+        content = re.sub(r'aria-label="Search documentation"', 'aria-label="搜索文档"', content)
+        content = re.sub(r'aria-label="Navigation menu"', 'aria-label="导航菜单"', content)
+        content = re.sub(r'aria-label="Mobile navigation menu"', 'aria-label="移动版导航菜单"', content)
+        content = re.sub(r'aria-label="Page navigation"', 'aria-label="页面导航"', content)
+        content = re.sub(r'aria-label="Footer"', 'aria-label="页脚"', content)
+    for token, url in protected_links.items():
+        content = content.replace(f'href="{token}"', f'href="{url}"')
+    return content.replace(CROSS_LANGUAGE_LINK_MARKER, '')
+
+
+def legacy_fix_html_tree(source_dir: Path, target_dir: Path, language: str) -> None:
+    for source_file in sorted(Path(source_dir).rglob("*")):
+        relative = source_file.relative_to(source_dir)
+        if any(part.startswith(".") for part in relative.parts[:-1]):
+            continue
+        if source_file.is_dir():
+            if not source_file.name.startswith("."):
+                (target_dir / relative).mkdir(parents=True, exist_ok=True)
+            continue
+        destination = target_dir / relative.parent
+        destination.mkdir(parents=True, exist_ok=True)
+        if source_file.suffix == ".html":
+            content = source_file.read_text(encoding="utf-8")
+            (destination / _target_html_name(source_file.name, language)).write_text(
+                legacy_fix_html_language(content, language), encoding="utf-8"
+            )
+        else:
+            shutil.copy2(source_file, destination / source_file.name)
+
+
+def sample_page(index: int, language: str, paragraphs: int = 40) -> str:
+    """Return one Sphinx-like page with navigation, links and body text."""
+    suffix = "_zh" if language == "zh" else ""
+    html_lang = "zh-CN" if language == "zh" else "en"
+    links = "\n".join(
+        f'<li><a href="../section_{item}/page_{item}{suffix}.html#anchor">'
+        f'Page {item}</a></li>'
+        for item in range(index, index + 20)
+    )
+    # Cross-language links are rare; only every tenth page carries one.
+    marker = CROSS_LANGUAGE_LINK_MARKER if index % 10 == 0 else ""
+    body = "\n".join(
+        f"<p>Paragraph {item} with <code>code</code> and "
+        f'<a href="page_{item}{suffix}.html">a link</a>.</p>'
+        for item in range(paragraphs)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="{html_lang}"><head><title>Page {index}</title>
+<link rel="stylesheet" href="../_static/theme.css" /></head><body>
+<nav aria-label="Navigation menu"><ul>{links}</ul></nav>
+<input type="text" placeholder="Search documentation" aria-label="Search documentation" />
+<a href="../index{suffix}.html">Home</a>
+<a href="../guide/start.html">Other</a>{marker}
+<main>{body}</main>
+<footer aria-label="Footer"></footer>
+</body></html>
+"""
+
+
+def generate_site(root: Path, language: str, pages: int) -> None:
+    for index in range(pages):
+        section = root / f"section_{index % 25}"
+        section.mkdir(parents=True, exist_ok=True)
+        (section / f"page_{index}.html").write_text(
+            sample_page(index, language), encoding="utf-8"
+        )
+    (root / "_static").mkdir(parents=True, exist_ok=True)
+    (root / "_static" / "theme.css").write_text("body {}", encoding="utf-8")
+    (root / ".doctrees").mkdir(exist_ok=True)
+    (root / ".doctrees" / "environment.pickle").write_bytes(b"\0")
+
+
+def trees_match(left: Path, right: Path) -> bool:
+    comparison = filecmp.dircmp(left, right)
+    if comparison.left_only or comparison.right_only or comparison.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(
+        left, right, comparison.common_files, shallow=False
+    )
+    if mismatch or errors:
+        return False
+    return all(
+        trees_match(left / name, right / name) for name in comparison.common_dirs
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="HTML 语言修复性能基准")
+    parser.add_argument("--pages", type=int, default=1000, help="每种语言的页面数")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数 (默认: CPU 数)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        results = {}
+        for language in ("zh", "en"):
+            source = root / f"raw_{language}"
+            generate_site(source, language, args.pages)
+            variants = {
+                "legacy": lambda target: legacy_fix_html_tree(source, target, language),
+                "single-scan": lambda target: fix_html_tree(source, target, language, jobs=1),
+                "parallel": lambda target: fix_html_tree(source, target, language, jobs=args.jobs),
+            }
+            for name, run in variants.items():
+                target = root / f"{name}_{language}"
+                started = time.perf_counter()
+                run(target)
+                results.setdefault(name, 0.0)
+                results[name] += time.perf_counter() - started
+            for name in ("single-scan", "parallel"):
+                if not trees_match(root / f"legacy_{language}", root / f"{name}_{language}"):
+                    print(f"[ERROR] {name} 输出与原实现不一致 ({language})")
+                    return 1
+
+    baseline = results["legacy"]
+    print(f"页面数: {args.pages * 2}")
+    for name, seconds in results.items():
+        print(f"  {name:<12} {seconds:8.3f}s  x{baseline / seconds:5.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ import sys
 import argparse
 from pathlib import Path
 from utils.dependency_manager import ensure_dependencies
+from utils.static_server import DEFAULT_CACHE_MAX_AGE, serve_site
 
 
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -21,12 +22,32 @@ def main():
     parser.add_argument('--clean', action='store_true', help='清理构建目录')
     parser.add_argument('--serve', action='store_true', help='启动本地服务器')
     parser.add_argument('--port', type=int, default=8000, help='服务器端口 (默认: 8000)')
+    parser.add_argument(
+        '--cache-max-age', type=int, default=DEFAULT_CACHE_MAX_AGE,
+        help='本地服务器中带内容哈希资源的缓存秒数，0 表示总是重新验证'
+    )
     parser.add_argument('--validate', action='store_true', help='验证版本配置')
     parser.add_argument('--list-versions', action='store_true', help='列出所有版本')
     parser.add_argument(
         '--no-auto-install', action='store_true',
         help='缺少依赖时不自动安装'
     )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='忽略版本构建缓存，全部重新构建'
+    )
+    parser.add_argument(
+        '--sparse-worktrees', action='store_true',
+        help='worktree 只检出 source 与 projects 目录'
+    )
+    parser.add_argument(
+        '--prune-worktrees', action='store_true',
+        help='删除 worktree 池后退出'
+    )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help='并行构建的版本数上限 (默认: 1，即顺序构建)'
+    )
     
     args = parser.parse_args()
 
@@ -53,6 +74,10 @@ def main():
             success = validate_versions_config()
             sys.exit(0 if success else 1)
         
+        elif args.prune_worktrees:
+            manager.prune_worktrees()
+            return
+        
         elif args.list_versions:
             from utils.version_utils import get_version_configs
             versions = get_version_configs()
@@ -62,7 +87,12 @@ def main():
             return
         
         # 构建所有版本
-        success = manager.build_all_versions(clean=args.clean)
+        success = manager.build_all_versions(
+            clean=args.clean,
+            use_cache=not args.no_cache,
+            sparse_worktrees=args.sparse_worktrees,
+            jobs=args.jobs,
+        )
         
         if success:
             print("\n[OK] 所有版本构建成功!")
@@ -70,11 +100,11 @@ def main():
             
             if args.serve:
                 print(f"\n[SERVER] 启动本地服务器 (http://localhost:{args.port})...")
-                import subprocess
                 try:
-                    subprocess.run([
-                        sys.executable, '-m', 'http.server', str(args.port)
-                    ], cwd=str(manager.versions_dir))
+                    serve_site(
+                        manager.versions_dir, args.port,
+                        cache_max_age=args.cache_max_age,
+                    )
                 except KeyboardInterrupt:
                     print("\n服务器已停止")
         else:
@@ -5,12 +5,14 @@
 用于快速构建和预览文档
 """
 
+import os
 import sys
 import subprocess
 import argparse
 import json
 from pathlib import Path
 from typing import List
+from utils.build_report import reset_build_report, stage, write_build_report
 from utils.dependency_manager import ensure_dependencies
 from utils.document_catalog import DocumentCatalog
 from utils.language_support import (
@@ -19,13 +21,26 @@ from utils.language_support import (
 )
 from utils.html_builder import build_html_site, write_site_entry
 from utils.pdf_builder import build_detected_pdfs
-from utils.embed_version_config import embed_config_to_js
+from utils.pdf_result_cache import RESULT_CACHE_DIRECTORY_NAME as PDF_RESULT_CACHE_DIRECTORY_NAME
+from utils.precompress import precompress_tree
+from utils.site_watcher import (
+    languages_for_sync,
+    plan_rebuild,
+    serve_in_background,
+    watch_changes,
+)
+from utils.embed_version_config import version_config_script
+from utils.static_server import DEFAULT_CACHE_MAX_AGE, serve_site
 from utils.version_utils import load_versions_config
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 REQUIREMENTS_PATH = SCRIPT_DIR / "requirements.txt"
 BUILD_ROOT = SCRIPT_DIR / "_build"
+DOCTREE_CACHE_DIR = BUILD_ROOT / "doctrees"
+LANGUAGE_OUTPUT_DIR = BUILD_ROOT / "languages"
 GENERATED_MANIFEST_NAME = ".doc_generator_manifest.json"
+# 清理同步源文件后保留清单，下次同步据此恢复未变文件的 mtime。
+MANIFEST_BACKUP_PATH = BUILD_ROOT / GENERATED_MANIFEST_NAME
 
 
 def write_local_version_config(build_dir: Path, project_root: Path = None):
@@ -39,49 +54,34 @@ def write_local_version_config(build_dir: Path, project_root: Path = None):
     config = load_versions_config(project_root)
     serialized = json.dumps(config, ensure_ascii=False, indent=2) + "\n"
 
-    (build_dir / "version_config.json").write_text(
-        serialized, encoding="utf-8"
-    )
-    static_dir = build_dir / "_static"
-    static_dir.mkdir(parents=True, exist_ok=True)
-    (static_dir / "version_config.json").write_text(
-        serialized, encoding="utf-8"
-    )
-
-    # File URLs cannot fetch JSON, so replace the in-IIFE fallback function in
-    # the copied asset.  Appending a global function would not affect the
-    # function lookup inside the existing IIFE.
-    embedded = embed_config_to_js(config).strip()
-    for menu_js in build_dir.rglob("version_menu.js"):
-        menu_content = menu_js.read_text(encoding="utf-8").rstrip()
-        function_signature = "function getEmbeddedVersionConfig()"
-        signature_index = menu_content.find(function_signature)
-        if signature_index == -1:
-            continue
-        brace_start = menu_content.find("{", signature_index)
-        if brace_start == -1:
-            continue
-        depth = 0
-        end_index = None
-        for index in range(brace_start, len(menu_content)):
-            if menu_content[index] == "{":
-                depth += 1
-            elif menu_content[index] == "}":
-                depth -= 1
-                if depth == 0:
-                    end_index = index + 1
-                    break
-        if end_index is None:
-            continue
-        menu_content = (
-            menu_content[:signature_index]
-            + embedded
-            + menu_content[end_index:]
-        )
-        menu_js.write_text(menu_content + "\n", encoding="utf-8")
+    # File URLs cannot fetch JSON, so every language's static directory also
+    # gets version_config.js, which version_menu.js reads.  Content-hashed
+    # bundles are never edited after they were named.
+    script = version_config_script(config)
+    static_dirs = [
+        path for path in build_dir.glob("_static*") if path.is_dir()
+    ] or [build_dir / "_static"]
+    outputs = {build_dir / "version_config.json": serialized}
+    for static_dir in static_dirs:
+        static_dir.mkdir(parents=True, exist_ok=True)
+        outputs[static_dir / "version_config.json"] = serialized
+        outputs[static_dir / "version_config.js"] = script
+    for path, text in outputs.items():
+        # Merged files may be hardlinked from the published site.
+        path.unlink(missing_ok=True)
+        path.write_text(text, encoding="utf-8")
     return config
 
 
+def resolve_projects_dir(site_config) -> Path:
+    """Return the projects directory configured for source synchronization."""
+    repository = site_config.get("repository", {}) or {}
+    projects_root = Path(repository.get("projects_dir", "../projects"))
+    if not projects_root.is_absolute():
+        projects_root = SCRIPT_DIR / projects_root
+    return projects_root.resolve()
+
+
 def detect_build_languages(site_config):
     """Detect languages from the same catalog used for source synchronization."""
     generation = site_config.get("generation", {}) or {}
@@ -90,12 +90,8 @@ def detect_build_languages(site_config):
     if discovery_mode != "project_catalog" and generation.get("mode") != "project_catalog":
         return detect_languages(SCRIPT_DIR, generation)
 
-    repository = site_config.get("repository", {}) or {}
-    projects_root = Path(repository.get("projects_dir", "../projects"))
-    if not projects_root.is_absolute():
-        projects_root = SCRIPT_DIR / projects_root
     catalog = DocumentCatalog.build(
-        projects_root,
+        resolve_projects_dir(site_config),
         site_config.get("categories", {}) or {},
         generation,
     )
@@ -128,8 +124,15 @@ def cleanup_temporary_build_files(build_root: Path = BUILD_ROOT) -> List[Path]:
     return removed
 
 
-def cleanup_generated_source_files(source_root: Path = SCRIPT_DIR) -> List[Path]:
-    """Remove files copied from projects after a successful documentation build."""
+def cleanup_generated_source_files(
+    source_root: Path = SCRIPT_DIR, manifest_backup: Path = None
+) -> List[Path]:
+    """Remove files copied from projects after a successful documentation build.
+
+    When *manifest_backup* is given the sync manifest is moved there instead of
+    being deleted, so the next sync can restore unchanged files with their
+    recorded mtimes and Sphinx only rereads documents that really changed.
+    """
     source_root = Path(source_root).resolve()
     manifest_path = source_root / GENERATED_MANIFEST_NAME
     if not manifest_path.is_file():
@@ -181,13 +184,261 @@ def cleanup_generated_source_files(source_root: Path = SCRIPT_DIR) -> List[Path]
         except OSError:
             pass
 
-    manifest_path.unlink(missing_ok=True)
+    if manifest_backup is not None:
+        manifest_backup = Path(manifest_backup)
+        manifest_backup.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(manifest_path, manifest_backup)
+    else:
+        manifest_path.unlink(missing_ok=True)
     removed.append(manifest_path)
     return removed
 
 
+def restore_sync_manifest(
+    source_root: Path = SCRIPT_DIR, manifest_backup: Path = None
+) -> bool:
+    """Move a manifest saved by cleanup back into *source_root* before syncing."""
+    manifest_backup = Path(manifest_backup or MANIFEST_BACKUP_PATH)
+    manifest_path = Path(source_root) / GENERATED_MANIFEST_NAME
+    if manifest_path.is_file() or not manifest_backup.is_file():
+        return False
+    os.replace(manifest_backup, manifest_path)
+    return True
+
+
+def build_html_output(
+    build_dir: Path,
+    site_config,
+    jobs=1,
+    language_output_root: Path = None,
+    rebuild_languages=None,
+    pdf_languages=None,
+    auto_install=True,
+):
+    """构建并发布站点，返回语言列表与 PDF 是否生成成功。
+
+    版本配置、网站入口、PDF 与预压缩文件都在发布前写入暂存目录，
+    运行中的服务器不会看到只更新了一半的站点。
+    ``pdf_languages`` 为 None 时不生成 PDF。
+    """
+    generation = site_config.get("generation", {}) or {}
+    available_languages = detect_build_languages(site_config)
+    default_language = select_default_language(
+        available_languages, generation
+    )
+    pdf_success = True
+
+    def finish_site(staging_dir, language_roots):
+        nonlocal pdf_success
+        write_local_version_config(staging_dir)
+        # 创建根目录重定向页面（本地构建时重定向到当前文档）
+        create_root_redirect_local(
+            staging_dir,
+            target_docname=language_roots[default_language],
+        )
+        if pdf_languages is not None:
+            pdf_success = build_local_pdfs(
+                staging_dir,
+                site_config,
+                [
+                    language
+                    for language in available_languages
+                    if language in pdf_languages
+                ],
+                auto_install=auto_install,
+            )
+        precompress_site(staging_dir)
+
+    with stage("html", languages=",".join(available_languages)):
+        build_html_site(
+            SCRIPT_DIR,
+            build_dir,
+            site_config,
+            available_languages,
+            default_language,
+            jobs=jobs,
+            doctree_dir=DOCTREE_CACHE_DIR,
+            language_output_root=language_output_root,
+            rebuild_languages=rebuild_languages,
+            post_build=finish_site,
+        )
+    print(f"[OK] 文档构建完成: {build_dir.absolute()}")
+    return available_languages, pdf_success
+
+
+def build_local_pdfs(build_dir: Path, site_config, languages, auto_install=True):
+    """为指定语言生成 PDF，返回是否成功。"""
+    with stage("pdfs", languages=",".join(languages)):
+        pdf_success, pdf_files = build_detected_pdfs(
+            build_dir,
+            SCRIPT_DIR,
+            site_config,
+            languages=languages,
+            auto_install=auto_install,
+            result_cache_dir=BUILD_ROOT / PDF_RESULT_CACHE_DIRECTORY_NAME,
+        )
+    for pdf_file in pdf_files:
+        # build_dir 可能是发布前的暂存目录，只显示站点内的相对路径
+        print(f"[OK] PDF文档: {Path(pdf_file).relative_to(build_dir)}")
+    return pdf_success
+
+
+def precompress_site(build_dir: Path):
+    """为站点中的可压缩文件生成 .gz/.br 旁路文件，跳过已是最新的文件。"""
+    with stage("compress"):
+        stats = precompress_tree(build_dir)
+    print(
+        f"[OK] 预压缩: {stats['files']} 个文件，新压缩 {stats['written']} 份，"
+        f"复用 {stats['linked'] + stats['up_to_date']} 份"
+    )
+    return stats
+
+
+def sync_documents():
+    """在当前进程中增量同步文档，返回记录了写入和删除路径的文件处理器。"""
+    from doc_generator import DocGenerator
+
+    with stage("sync"):
+        generator = DocGenerator(str(SCRIPT_DIR / "config.yaml"))
+        if not generator.run():
+            return None
+    return generator.file_processor
+
+
+def remove_language_outputs(file_processor, languages):
+    """删除包含已删除文档的语言输出，避免旧页面残留在站点中。"""
+    import shutil
+
+    for language in languages_for_sync((), file_processor.removed_paths, languages):
+        for output_dir in LANGUAGE_OUTPUT_DIR.glob(f"{language}-*"):
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def rebuild_for_changes(
+    plan, build_dir: Path, site_config, languages, jobs=1,
+    build_pdf=False, auto_install=True,
+):
+    """按变更计划执行最少的构建阶段，返回新的站点配置和语言列表。"""
+    import shutil
+
+    reset_build_report()
+    if plan.full:
+        site_config = load_site_config()
+    rebuild_languages = None
+    if plan.full or plan.sync:
+        file_processor = sync_documents()
+        if file_processor is None:
+            raise RuntimeError("文档同步失败")
+        current_languages = detect_build_languages(site_config)
+        if not (plan.full or plan.theme):
+            rebuild_languages = languages_for_sync(
+                file_processor.written_paths,
+                file_processor.removed_paths,
+                current_languages,
+            )
+            if not rebuild_languages:
+                print("[INFO] 同步结果没有变化，跳过构建")
+                return site_config, languages
+        remove_language_outputs(file_processor, current_languages)
+    else:
+        current_languages = detect_build_languages(site_config)
+
+    if plan.full or list(current_languages) != list(languages):
+        # 语言集合或站点配置变化会影响所有页面的语言切换与主题。
+        shutil.rmtree(LANGUAGE_OUTPUT_DIR, ignore_errors=True)
+        rebuild_languages = None
+
+    described = (
+        "全部语言"
+        if rebuild_languages is None
+        else ", ".join(sorted(rebuild_languages))
+    )
+    print(f"[INFO] 重新构建 HTML: {described}")
+    pdf_languages = None
+    if build_pdf:
+        pdf_languages = (
+            current_languages if rebuild_languages is None else rebuild_languages
+        )
+    languages, pdf_success = build_html_output(
+        build_dir,
+        site_config,
+        jobs=jobs,
+        language_output_root=LANGUAGE_OUTPUT_DIR,
+        rebuild_languages=rebuild_languages,
+        pdf_languages=pdf_languages,
+        auto_install=auto_install,
+    )
+    if not pdf_success:
+        print("[WARN] PDF 生成失败，HTML 已更新")
+    write_timing_report(mode="watch", rebuilt=described)
+    return site_config, languages
+
+
+def watch_docs(
+    build_dir: Path, site_config, languages, port=8000, jobs=1,
+    build_pdf=False, auto_install=True, cache_max_age=DEFAULT_CACHE_MAX_AGE,
+):
+    """监听源文件变化并增量重建，期间持续提供上一份完整站点。"""
+    projects_dir = resolve_projects_dir(site_config)
+    server = serve_in_background(build_dir, port, cache_max_age)
+    print(f"[INFO] 本地服务器: http://localhost:{port}")
+    print(f"[INFO] 正在监听 {projects_dir} 与 {SCRIPT_DIR}，按 Ctrl+C 停止")
+    try:
+        for changed_paths in watch_changes(SCRIPT_DIR, projects_dir):
+            plan = plan_rebuild(changed_paths, SCRIPT_DIR, projects_dir)
+            if plan.empty:
+                continue
+            print(f"\n[INFO] 检测到变化: {', '.join(plan.changes)}")
+            try:
+                site_config, languages = rebuild_for_changes(
+                    plan,
+                    build_dir,
+                    site_config,
+                    languages,
+                    jobs=jobs,
+                    build_pdf=build_pdf,
+                    auto_install=auto_install,
+                )
+                projects_dir = resolve_projects_dir(site_config)
+            except Exception as exc:
+                print(f"[ERROR] 增量构建失败，继续提供上一版站点: {exc}")
+    except KeyboardInterrupt:
+        print("\n监听已停止")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def cleanup_build_intermediates():
+    """删除同步副本与中间构建文件，并打印清理结果。"""
+    removed_source_paths = cleanup_generated_source_files(
+        manifest_backup=MANIFEST_BACKUP_PATH
+    )
+    if removed_source_paths:
+        print(
+            f"[OK] 已清理同步源文件: "
+            f"{len(removed_source_paths)} 个文件或空目录"
+        )
+
+    removed_paths = cleanup_temporary_build_files()
+    if removed_paths:
+        print("[OK] 已清理临时构建文件:")
+        for path in removed_paths:
+            print(f"      {path}")
+
+
+def write_timing_report(**metadata):
+    """写入 _build/build_report.json 与 Chrome trace 文件。"""
+    written = write_build_report(BUILD_ROOT, **metadata)
+    if written:
+        report_path, trace_path = written
+        print(f"[OK] 构建耗时报告: {report_path}")
+        print(f"[OK] Chrome trace: {trace_path}")
+
+
 def build_docs(
-    clean=False, serve=False, port=8000, auto_install=True, build_pdf=True
+    clean=False, serve=False, port=8000, auto_install=True, build_pdf=True,
+    jobs=1, watch=False, cache_max_age=DEFAULT_CACHE_MAX_AGE,
 ):
     """构建文档"""
     print("开始构建文档...")
@@ -196,79 +447,72 @@ def build_docs(
     if not check_dependencies(auto_install=auto_install):
         return False
     
+    reset_build_report()
     try:
         # 1. 生成文档结构
         print("1. 生成文档结构...")
-        subprocess.run([
-            sys.executable, 'doc_generator.py'
-        ], cwd=str(SCRIPT_DIR), check=True)
-        
-        # 2. 构建HTML文档
-        print("2. 构建HTML文档...")
         build_dir = SCRIPT_DIR / "_build" / "html"
-        if clean and build_dir.exists():
-            import shutil
-            shutil.rmtree(build_dir)
-            print("已清理构建目录")
-        
+        import shutil
+        if clean:
+            if build_dir.exists():
+                shutil.rmtree(build_dir)
+                print("已清理构建目录")
+            if DOCTREE_CACHE_DIR.exists():
+                shutil.rmtree(DOCTREE_CACHE_DIR)
+                print("已清理 doctree 缓存")
+            if LANGUAGE_OUTPUT_DIR.exists():
+                shutil.rmtree(LANGUAGE_OUTPUT_DIR)
+                print("已清理各语言输出缓存")
+            MANIFEST_BACKUP_PATH.unlink(missing_ok=True)
+        restore_sync_manifest()
+        file_processor = sync_documents()
+        if file_processor is None:
+            print("[ERROR] 文档同步失败")
+            return False
+
+        # 2. 构建HTML与PDF文档
+        print("2. 构建HTML与PDF文档..." if build_pdf else "2. 构建HTML文档...")
         site_config = load_site_config()
-        generation = site_config.get("generation", {}) or {}
-        available_languages = detect_build_languages(site_config)
-        default_language = select_default_language(
-            available_languages, generation
-        )
-        language_roots = build_html_site(
-            SCRIPT_DIR,
+        # 各语言的原始输出按配置哈希保留在 _build/languages 中，
+        # Sphinx 只重写变化的页面；含已删除文档的语言重新生成。
+        remove_language_outputs(file_processor, detect_build_languages(site_config))
+        available_languages, pdf_success = build_html_output(
             build_dir,
             site_config,
-            available_languages,
-            default_language,
-        )
-        write_local_version_config(build_dir)
-        
-        print(f"[OK] 文档构建完成: {build_dir.absolute()}")
-        
-        # 创建根目录重定向页面（本地构建时重定向到当前文档）
-        create_root_redirect_local(
-            build_dir,
-            target_docname=language_roots[default_language],
+            jobs=jobs,
+            language_output_root=LANGUAGE_OUTPUT_DIR,
+            pdf_languages=detect_build_languages(site_config) if build_pdf else None,
+            auto_install=auto_install,
         )
+        if not pdf_success:
+            return False
 
-        if build_pdf:
-            print("3. 生成PDF文档...")
-            pdf_success, pdf_files = build_detected_pdfs(
-                build_dir,
-                SCRIPT_DIR,
-                site_config,
-                languages=available_languages,
-                auto_install=auto_install,
-            )
-            if not pdf_success:
-                return False
-            for pdf_file in pdf_files:
-                print(f"[OK] PDF文档: {pdf_file}")
-
-        removed_source_paths = cleanup_generated_source_files()
-        if removed_source_paths:
-            print(
-                f"[OK] 已清理同步源文件: "
-                f"{len(removed_source_paths)} 个文件或空目录"
-            )
+        if not watch:
+            with stage("cleanup"):
+                cleanup_build_intermediates()
+        write_timing_report(mode="local", jobs=jobs, pdf=build_pdf)
 
-        removed_paths = cleanup_temporary_build_files()
-        if removed_paths:
-            print("[OK] 已清理临时构建文件:")
-            for path in removed_paths:
-                print(f"      {path}")
+        if watch:
+            print("3. 启动监听模式...")
+            try:
+                watch_docs(
+                    build_dir,
+                    site_config,
+                    available_languages,
+                    port=port,
+                    jobs=jobs,
+                    build_pdf=build_pdf,
+                    auto_install=auto_install,
+                    cache_max_age=cache_max_age,
+                )
+            finally:
+                cleanup_build_intermediates()
         
         # 启动本地服务器（如果需要）
-        if serve:
-            step = 4 if build_pdf else 3
-            print(f"{step}. 启动本地服务器 (http://localhost:{port})...")
+        if serve and not watch:
+            print(f"3. 启动本地服务器 (http://localhost:{port})...")
             try:
-                subprocess.run([
-                    sys.executable, '-m', 'http.server', str(port)
-                ], cwd=str(build_dir))
+                serve_site(build_dir, port, cache_max_age=cache_max_age)
             except KeyboardInterrupt:
                 print("\n服务器已停止")
         
@@ -329,6 +573,10 @@ def main():
     parser.add_argument('--serve', action='store_true', help='启动本地服务器')
     parser.add_argument('--port', type=int, default=8000, help='服务器端口 (默认: 8000)')
     parser.add_argument('--check', action='store_true', help='仅检查依赖')
+    parser.add_argument(
+        '--cache-max-age', type=int, default=DEFAULT_CACHE_MAX_AGE,
+        help='本地服务器中带内容哈希资源的缓存秒数，0 表示总是重新验证'
+    )
     parser.add_argument(
         '--no-auto-install', action='store_true',
         help='缺少依赖时不自动安装'
@@ -337,6 +585,18 @@ def main():
         '--no-pdf', action='store_true',
         help='跳过 PDF 生成，仅构建 HTML'
     )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help='并行构建的语言数上限 (默认: 1，即顺序构建)'
+    )
+    parser.add_argument(
+        '--watch', action='store_true',
+        help='监听源文件变化并增量重建，同时启动本地服务器'
+    )
+    parser.add_argument(
+        '--watch-pdf', action='store_true',
+        help='监听模式下同时重新生成受影响语言的 PDF'
+    )
     parser.add_argument('--check-branch', action='store_true', help='检查分支版本映射')
     parser.add_argument('--all-versions', action='store_true', help='构建所有版本（需要 --all 参数）')
     
@@ -382,12 +642,17 @@ def main():
         serve=args.serve,
         port=args.port,
         auto_install=auto_install,
-        build_pdf=not args.no_pdf,
+        build_pdf=(
+            args.watch_pdf if args.watch else not args.no_pdf
+        ),
+        jobs=args.jobs,
+        watch=args.watch,
+        cache_max_age=args.cache_max_age,
     )
     
     if success:
         print("\n[OK] 构建成功!")
-        if not args.serve:
+        if not (args.serve or args.watch):
             print(f"[PATH] 文档位置: {SCRIPT_DIR / '_build' / 'html'}")
             print("[TIP] 提示: 使用 --serve 参数启动本地服务器预览")
     else:
@@ -12,12 +12,24 @@ import json
 import shutil
 import subprocess
 import argparse
-import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union
 import yaml
 from utils.i18n_config import I18nConfigManager
+from utils.asset_dedup import deduplicate_assets
+from utils.build_report import (
+    adopt_spans,
+    reset_build_report,
+    stage,
+    traced_call,
+    write_build_report,
+)
 from utils.html_builder import build_html_site, write_site_entry
+from utils.embed_version_config import version_config_script
+from utils.html_language_fixer import fix_html_file, fix_html_tree
+from utils.sphinx_runner import run_sphinx
 from utils.language_support import (
     configured_language_paths,
     detect_languages,
@@ -26,6 +38,22 @@ from utils.language_support import (
 )
 from utils.pdf_builder import build_detected_pdfs
 from utils.pdf_environment import ensure_pdf_environment
+from utils.latex_format import FORMAT_CACHE_DIRECTORY_NAME as PDF_FORMAT_CACHE_DIRECTORY_NAME
+from utils.pdf_images import CACHE_DIRECTORY_NAME as PDF_IMAGE_CACHE_DIRECTORY_NAME
+from utils.pdf_result_cache import RESULT_CACHE_DIRECTORY_NAME as PDF_RESULT_CACHE_DIRECTORY_NAME
+from utils.precompress import (
+    CACHE_DIRECTORY_NAME as COMPRESS_CACHE_DIRECTORY_NAME,
+    precompress_tree,
+)
+from utils.version_cache import (
+    CACHE_DIRECTORY_NAME,
+    HASHED_TREES,
+    VersionBuildCache,
+    builder_fingerprint,
+    version_cache_key,
+    working_tree_matches_head,
+)
+from utils.worktree_pool import WorktreePool, resolve_revision
 
 class VersionConfig:
     """版本配置类"""
@@ -47,6 +75,14 @@ class BuildManager:
         self.build_root = self.docs_source / 'source_build'
         self.worktrees_dir = self.build_root / 'worktrees'
         self.versions_dir = self.build_root / 'html'
+        # 按内容寻址的版本构建缓存，--clean 时保留
+        self.version_cache = VersionBuildCache(self.build_root / CACHE_DIRECTORY_NAME)
+        # 各版本的 worktree 常驻在池中，构建间原地切换提交
+        self.worktree_pool = WorktreePool(self.project_root, self.worktrees_dir)
+        self._builder_fingerprint = None
+        # 版本内 HTML 改写、搜索索引与 PDF（语言与图片预处理）的进程数：
+        # None 不限制；并行构建版本时各工作进程内串行，避免进程池嵌套
+        self.inner_jobs: Optional[int] = None
         
         # 初始化国际化配置管理器
         config_path = self.docs_source / 'config.yaml'
@@ -146,39 +182,44 @@ class BuildManager:
         )
         return environment
     
-    def create_worktree(self, version_config: VersionConfig) -> Path:
-        """为指定版本创建 Git worktree"""
-        worktree_path = self.worktrees_dir / version_config.name
-        
+    def create_worktree(self, version_config: VersionConfig) -> Optional[Path]:
+        """为指定版本准备 Git worktree：复用池中的目录并原地切换到目标提交"""
         # 获取当前分支
         current_branch = subprocess.run(
             ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+            cwd=str(self.project_root),
             capture_output=True, text=True, check=True
         ).stdout.strip()
         
         # 如果目标分支就是当前分支，直接使用当前目录
         if version_config.branch == current_branch:
             print(f"目标分支 {version_config.branch} 就是当前分支，使用当前目录")
-            return Path.cwd()
+            return self.project_root
         
-        # 清理已存在的 worktree
-        if worktree_path.exists():
-            print(f"清理已存在的 worktree: {worktree_path}")
-            try:
-                subprocess.run(['git', 'worktree', 'remove', str(worktree_path)], 
-                             check=True, capture_output=True)
-            except subprocess.CalledProcessError:
-                # 如果 worktree remove 失败，手动删除
-                shutil.rmtree(worktree_path, ignore_errors=True)
-        
-        # 创建新的 worktree
-        print(f"创建 worktree: {version_config.branch} -> {worktree_path}")
-        subprocess.run([
-            'git', 'worktree', 'add', 
-            str(worktree_path), version_config.branch
-        ], check=True)
-        
-        return worktree_path
+        revision = resolve_revision(self.project_root, version_config.branch)
+        if revision is None:
+            print(f"[ERROR] 找不到分支 {version_config.branch}（也没有 origin/{version_config.branch}）")
+            return None
+        try:
+            return self.worktree_pool.checkout(version_config.name, revision)
+        except subprocess.CalledProcessError as e:
+            print(f"[ERROR] 准备 worktree 失败: {(e.stderr or '').strip() or e}")
+            return None
+
+    def _sparse_checkout_paths(self) -> List[str]:
+        """稀疏检出时保留的仓库目录：source、配置的 projects_dir 与版本配置。"""
+        paths = ['source', '.github']
+        try:
+            with open(self.docs_source / 'config.yaml', 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+            configured = (config.get('repository', {}) or {}).get('projects_dir', '../projects')
+            projects_dir = (self.docs_source / str(configured or '../projects')).resolve()
+            relative = projects_dir.relative_to(self.project_root.resolve()).as_posix()
+        except (OSError, ValueError, yaml.YAMLError):
+            relative = 'projects'
+        if relative not in ('', '.') and not relative.startswith('source/'):
+            paths.append(relative)
+        return paths
 
     def _build_directory_tree_html(
         self, docs_source: Path, version_config: VersionConfig, config: Dict
@@ -197,13 +238,16 @@ class BuildManager:
             f"构建目录树文档: {output_dir} "
             f"(语言: {detected_label}; 默认: {default_language})"
         )
-        language_roots = build_html_site(
-            docs_source,
-            output_dir,
-            config,
-            available_languages,
-            default_language,
-        )
+        with stage("html", version=version_config.name):
+            language_roots = build_html_site(
+                docs_source,
+                output_dir,
+                config,
+                available_languages,
+                default_language,
+                doctree_dir=self.build_root / 'doctrees' / version_config.url_path,
+                jobs=self.inner_jobs,
+            )
         project_title = project_config.get(
             'title', project_config.get('name', 'SDK 文档')
         )
@@ -214,13 +258,19 @@ class BuildManager:
             default_language,
         )
 
-        pdf_success, pdf_files = build_detected_pdfs(
-            output_dir,
-            docs_source,
-            config,
-            languages=available_languages,
-            auto_install=True,
-        )
+        with stage("pdfs", version=version_config.name):
+            pdf_success, pdf_files = build_detected_pdfs(
+                output_dir,
+                docs_source,
+                config,
+                languages=available_languages,
+                auto_install=True,
+                scratch_dir=self._version_scratch_dir(version_config),
+                image_cache_dir=self.build_root / PDF_IMAGE_CACHE_DIRECTORY_NAME,
+                format_cache_dir=self.build_root / PDF_FORMAT_CACHE_DIRECTORY_NAME,
+                result_cache_dir=self.build_root / PDF_RESULT_CACHE_DIRECTORY_NAME,
+                jobs=self.inner_jobs,
+            )
         if not pdf_success:
             print(f"[ERROR] 版本 {version_config.display_name} 的 PDF 生成失败")
             return False
@@ -254,7 +304,7 @@ class BuildManager:
         print(f"在 worktree 中构建文档: {worktree_path}")
         
         # 检查 source 目录是否存在
-        if worktree_path == Path.cwd():
+        if worktree_path == self.project_root:
             # 如果是当前分支，使用主分支的 source 目录
             docs_source_in_worktree = self.docs_source
         else:
@@ -270,10 +320,7 @@ class BuildManager:
                     print(f"[ERROR] 错误: 主分支也没有 source 目录")
                     return False
         
-        # 切换到 worktree 目录（如果不是当前分支）
-        if worktree_path != Path.cwd():
-            os.chdir(worktree_path)
-        
+        # 所有命令都显式指定 cwd，不切换进程工作目录，以便多个版本并行构建
         try:
             # 读取项目名称用于 PDF 命名
             project_name = 'SDK_Docs'
@@ -299,8 +346,9 @@ class BuildManager:
             doc_generator = docs_source_in_worktree / 'doc_generator.py'
             if doc_generator.exists():
                 print(f"运行文档生成脚本: {doc_generator}")
-                subprocess.run([sys.executable, str(doc_generator)], 
-                             cwd=str(docs_source_in_worktree), check=True)
+                with stage("sync", version=version_config.name):
+                    subprocess.run([sys.executable, str(doc_generator)], 
+                                 cwd=str(docs_source_in_worktree), check=True)
             
             # 嵌入版本配置
             embed_script = docs_source_in_worktree / 'utils' / 'embed_version_config.py'
@@ -391,7 +439,7 @@ class BuildManager:
                 '-D', 'master_doc=' + zh_master_doc,
                 str(docs_source_in_worktree),
                 str(zh_output_dir)
-            ], check=True, env=zh_env)
+            ], check=True, env=zh_env, cwd=str(docs_source_in_worktree))
             
             # 恢复临时移动的英文版文件
             for original_file, temp_file in moved_files:
@@ -481,7 +529,7 @@ class BuildManager:
                 '-D', 'language=en',
                 str(docs_source_in_worktree),
                 str(en_output_dir)
-            ], check=True, env=en_env)
+            ], check=True, env=en_env, cwd=str(docs_source_in_worktree))
             
             # 恢复临时移动的中文版文件
             for original_file, temp_file in moved_files_en:
@@ -627,10 +675,6 @@ class BuildManager:
         except subprocess.CalledProcessError as e:
             print(f"[ERROR] 构建失败: {e}")
             return False
-        finally:
-            # 恢复到原始目录（如果不是当前分支）
-            if worktree_path != Path.cwd():
-                os.chdir(self.project_root)
     
     def _generate_version_config(self, output_dir: Path, version_config: VersionConfig, projects_dir_web: str = '', copy_files: list = None):
         """生成版本切换配置文件
@@ -674,6 +718,10 @@ class BuildManager:
         static_config_file = static_dir / 'version_config.json'
         with open(static_config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        # file:// 打开时版本菜单读取不带内容哈希的 version_config.js
+        (static_dir / 'version_config.js').write_text(
+            version_config_script(config), encoding='utf-8'
+        )
         # 生成可直接加载的 JS，提供 window.versionInfo（含当前版本信息）
         version_info_js = static_dir / 'version_info.js'
         version_info_obj = {
@@ -753,129 +801,12 @@ class BuildManager:
         print(f"  - 英文版文件：保持原名（如 index.html, README.html）")
     
     def _copy_docs_with_html_fix(self, source_dir: Path, target_dir: Path, language: str):
-        """复制文档并修复HTML文件的语言配置"""
-        import shutil
-        
-        # 确保目标目录存在
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        for item in source_dir.iterdir():
-            if item.is_file():
-                if item.name.endswith('.html'):
-                    # HTML文件需要修复语言配置
-                    if language == 'zh':
-                        # 中文版文件添加_zh后缀
-                        if item.stem.endswith('_zh'):
-                            new_name = item.name
-                        else:
-                            new_name = item.stem + '_zh.html'
-                        target_file = target_dir / new_name
-                        self._fix_html_language(item, target_file, 'zh')
-                    else:
-                        # 英文版文件保持原名
-                        target_file = target_dir / item.name
-                        self._fix_html_language(item, target_file, 'en')
-                else:
-                    # 非HTML文件直接复制
-                    shutil.copy2(item, target_dir / item.name)
-            elif item.is_dir() and not item.name.startswith('.'):
-                # 只处理非隐藏目录，跳过 .doctrees 等Sphinx内部目录
-                target_subdir = target_dir / item.name
-                target_subdir.mkdir(exist_ok=True)
-                for subitem in item.iterdir():
-                    if subitem.is_file():
-                        if subitem.name.endswith('.html'):
-                            # HTML文件需要修复语言配置
-                            if language == 'zh':
-                                # 中文版文件添加_zh后缀
-                                if subitem.stem.endswith('_zh'):
-                                    new_name = subitem.name
-                                else:
-                                    new_name = subitem.stem + '_zh.html'
-                                target_file = target_subdir / new_name
-                                self._fix_html_language(subitem, target_file, 'zh')
-                            else:
-                                # 英文版文件保持原名
-                                target_file = target_subdir / subitem.name
-                                self._fix_html_language(subitem, target_file, 'en')
-                        else:
-                            # 非HTML文件直接复制
-                            shutil.copy2(subitem, target_subdir / subitem.name)
-                    elif subitem.is_dir() and not subitem.name.startswith('.'):
-                        # 递归处理子目录，跳过隐藏目录
-                        self._copy_docs_with_html_fix(subitem, target_subdir / subitem.name, language)
+        """复制文档并修复HTML文件的语言配置（多进程单遍扫描）"""
+        fix_html_tree(source_dir, target_dir, language, jobs=self.inner_jobs)
     
     def _fix_html_language(self, source_file: Path, target_file: Path, language: str):
         """修复HTML文件的语言配置"""
-        try:
-            with open(source_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Preserve links converted from Markdown cross-language targets.
-            # The marker is emitted by FileProcessor and is independent of the
-            # document filename (README is only one possible source name).
-            protected_links = {}
-            link_marker = '<!-- docs-cross-language-link -->'
-            marked_link_pattern = re.compile(
-                r'(?P<prefix><a\s+[^>]*?href=")(?P<url>[^"]+)"'
-                r'(?P<suffix>[^>]*>.*?</a>)\s*'
-                + re.escape(link_marker),
-                re.IGNORECASE,
-            )
-
-            def protect_link(match):
-                token = f'__DOCS_MARKED_LINK_{len(protected_links)}__'
-                protected_links[token] = match.group('url')
-                return f'{match.group("prefix")}{token}"{match.group("suffix")}'
-
-            content = marked_link_pattern.sub(protect_link, content)
-
-            # 修复语言属性
-            if language == 'en':
-                # 英文版修复
-                content = re.sub(r'lang="zh-CN"', 'lang="en"', content)
-                content = re.sub(r'placeholder="搜索文档"', 'placeholder="Search documentation"', content)
-                content = re.sub(r'aria-label="搜索文档"', 'aria-label="Search documentation"', content)
-                content = re.sub(r'aria-label="导航菜单"', 'aria-label="Navigation menu"', content)
-                content = re.sub(r'aria-label="移动版导航菜单"', 'aria-label="Mobile navigation menu"', content)
-                content = re.sub(r'aria-label="页面导航"', 'aria-label="Page navigation"', content)
-                content = re.sub(r'aria-label="页脚"', 'aria-label="Footer"', content)
-                
-                # 修复链接指向
-                content = re.sub(r'href="([^"]*)_zh\.html"', r'href="\1.html"', content)
-                content = re.sub(r'href="([^"]*)/index_zh\.html"', r'href="\1/index.html"', content)
-                
-                # 修复目录结构中的链接
-                content = re.sub(r'href="([^"]*)_zh\.html#', r'href="\1.html#', content)
-                
-            else:
-                # 中文版保持原样，但确保语言属性正确
-                content = re.sub(r'lang="en"', 'lang="zh-CN"', content)
-                # 确保中文版链接指向中文版文件
-                content = re.sub(r'href="([^"]*)(?<!_zh)\.html"', r'href="\1_zh.html"', content)
-                content = re.sub(r'href="([^"]*)/index\.html"', r'href="\1/index_zh.html"', content)
-                # 修复搜索框文本
-                content = re.sub(r'placeholder="Search documentation"', 'placeholder="搜索文档"', content)
-                content = re.sub(r'aria-label="Search documentation"', 'aria-label="搜索文档"', content)
-                content = re.sub(r'aria-label="Navigation menu"', 'aria-label="导航菜单"', content)
-                content = re.sub(r'aria-label="Mobile navigation menu"', 'aria-label="移动版导航菜单"', content)
-                content = re.sub(r'aria-label="Page navigation"', 'aria-label="页面导航"', content)
-                content = re.sub(r'aria-label="Footer"', 'aria-label="页脚"', content)
-            
-            # 写入修复后的文件
-            for token, url in protected_links.items():
-                content = content.replace(
-                    f'href="{token}"', f'href="{url}"'
-                )
-            content = content.replace(link_marker, '')
-
-            with open(target_file, 'w', encoding='utf-8') as f:
-                f.write(content)
-                
-        except Exception as e:
-            print(f"[WARN]  修复HTML文件语言配置失败: {e}")
-            # 如果修复失败，直接复制原文件
-            shutil.copy2(source_file, target_file)
+        fix_html_file(source_file, target_file, language)
     
     def copy_build_result(self, worktree_path: Path, version_config: VersionConfig):
         """就地构建后无需复制，保持接口以兼容调用方"""
@@ -899,12 +830,10 @@ class BuildManager:
             sphinx_env = self._sphinx_environment(
                 os.environ.copy(), docs_source_in_worktree
             )
-            subprocess.run([
-                sys.executable, '-m', 'sphinx.cmd.build',
-                '-b', 'latexpdf',
-                str(docs_source_in_worktree),
-                str(latexpdf_dir)
-            ], check=True, env=sphinx_env)
+            run_sphinx(
+                docs_source_in_worktree, latexpdf_dir, 'latexpdf',
+                env=sphinx_env,
+            )
 
             # 预期输出：conf.py 设定主文档名 sdk-docs.tex -> sdk-docs.pdf
             candidate = latexpdf_dir / 'sdk-docs.pdf'
@@ -919,12 +848,9 @@ class BuildManager:
             # 回退到 latex + 编译链
             latex_dir = self.build_root / 'latex' / version_config.url_path
             print(f"latexpdf 失败，回退到 LaTeX 构建: {latex_dir}")
-            subprocess.run([
-                sys.executable, '-m', 'sphinx.cmd.build',
-                '-b', 'latex',
-                str(docs_source_in_worktree),
-                str(latex_dir)
-            ], check=True, env=sphinx_env)
+            run_sphinx(
+                docs_source_in_worktree, latex_dir, 'latex', env=sphinx_env
+            )
 
             try:
                 tex_files = list(latex_dir.glob('*.tex'))
@@ -981,46 +907,191 @@ class BuildManager:
         return ensure_pdf_environment(config, auto_install=True)
     
     def cleanup_worktree(self, worktree_path: Path):
-        """清理 worktree：仅对 source_build/worktrees 下的有效 worktree 执行删除"""
-        if not worktree_path.exists():
-            return
+        """清理 worktree：仅对 source_build/worktrees 下的池目录执行删除"""
+        if self.worktree_pool.remove(worktree_path):
+            print(f"[OK] 清理 worktree: {worktree_path}")
 
-        # 仅在我们的临时 worktrees 根目录下才允许删除
+    def prune_worktrees(self) -> List[Path]:
+        """删除 worktree 池中的全部目录并清理失效的 git worktree 登记"""
+        removed = self.worktree_pool.prune()
+        for worktree_path in removed:
+            print(f"[OK] 清理 worktree: {worktree_path}")
+        if not removed:
+            print("[OK] worktree 池为空")
+        return removed
+    
+    def _version_cache_key(self, version_config: VersionConfig) -> Optional[str]:
+        """计算版本的构建缓存键；无法可靠判定内容时返回 None。"""
         try:
-            worktree_root = self.worktrees_dir.resolve()
-            candidate = worktree_path.resolve()
-            is_under_root = str(candidate).startswith(str(worktree_root))
-        except Exception:
-            is_under_root = False
+            current_branch = subprocess.run(
+                ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+                cwd=str(self.project_root),
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+            if version_config.branch == current_branch and not working_tree_matches_head(
+                self.project_root, HASHED_TREES
+            ):
+                print(f"[INFO] 当前分支 {current_branch} 有未提交的文档改动，不使用构建缓存")
+                return None
+            revision = resolve_revision(self.project_root, version_config.branch)
+            if revision is None:
+                return None
+            if self._builder_fingerprint is None:
+                self._builder_fingerprint = builder_fingerprint()
+            return version_cache_key(
+                self.project_root,
+                revision,
+                {
+                    'name': version_config.name,
+                    'display_name': version_config.display_name,
+                    'branch': version_config.branch,
+                    'url_path': version_config.url_path,
+                    'description': version_config.description,
+                },
+                self.versions_file.read_bytes(),
+                self._builder_fingerprint,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"[WARN]  无法计算构建缓存键，将完整构建: {e}")
+            return None
 
-        if not is_under_root:
-            # 避免误删非临时目录（例如当前仓库根或任意外部路径）
-            return
+    def _version_scratch_dir(self, version_config: VersionConfig) -> Path:
+        """每个版本私有的临时目录（LaTeX 工作文件、并行构建日志）"""
+        return self.build_root / 'scratch' / version_config.url_path
 
-        # 在删除之前确认它是一个已登记的 git worktree
-        is_git_worktree = False
-        try:
-            listed = subprocess.run(['git', 'worktree', 'list'], capture_output=True, text=True, check=True).stdout
-            is_git_worktree = str(candidate) in listed
-        except Exception:
-            pass
+    def _prepare_version(
+        self, version_config: VersionConfig, use_cache: bool = True
+    ) -> Tuple[str, Optional[Path], Optional[str]]:
+        """恢复缓存或准备 worktree，返回 (状态, worktree, 缓存键)。
 
-        if is_git_worktree:
-            # 尝试优先用 git worktree remove --force
-            for args in (["git", "worktree", "remove", "--force", str(candidate)],
-                         ["git", "worktree", "remove", str(candidate)]):
-                try:
-                    subprocess.run(args, check=True, capture_output=True)
-                    print(f"[OK] 清理 worktree: {worktree_path}")
-                    return
-                except subprocess.CalledProcessError:
-                    continue
+        状态为 "cached"（已从缓存恢复）、"build"（待构建）或 "failed"。
+        """
+        target_dir = self.versions_dir / version_config.url_path
+        cache_key = self._version_cache_key(version_config) if use_cache else None
+        if cache_key:
+            with stage("cache.restore", version=version_config.name):
+                restored = self.version_cache.restore(
+                    version_config.url_path, cache_key, target_dir
+                )
+            if restored:
+                print(f"[OK] 版本 {version_config.display_name} 命中构建缓存 ({cache_key[:12]})，跳过 worktree 与构建")
+                return "cached", None, cache_key
 
-        # 兜底：非登记 worktree 或命令失败，做文件系统级别删除
-        shutil.rmtree(candidate, ignore_errors=True)
-    
-    def build_all_versions(self, clean=False):
-        """构建所有版本"""
+        # 创建或获取 worktree
+        with stage("worktree.create", version=version_config.name):
+            worktree_path = self.create_worktree(version_config)
+        if not worktree_path:
+            print(f"[ERROR] 无法为版本 {version_config.display_name} 创建 worktree")
+            return "failed", None, cache_key
+        return "build", worktree_path, cache_key
+
+    def _build_prepared_version(
+        self,
+        version_config: VersionConfig,
+        worktree_path: Path,
+        cache_key: Optional[str] = None,
+    ) -> bool:
+        """在已准备好的 worktree 中构建并复制一个版本，返回是否成功。"""
+        # worktree 保留在池中供下次构建复用，使用 --prune-worktrees 清理
+        with stage("version.build", version=version_config.name):
+            built = self.build_docs_in_worktree(worktree_path, version_config)
+        if not built:
+            print(f"[ERROR] 版本 {version_config.display_name} 构建失败")
+            return False
+        # 复制构建结果
+        with stage("version.copy", version=version_config.name):
+            copied = self.copy_build_result(worktree_path, version_config)
+        if not copied:
+            print(f"[ERROR] 版本 {version_config.display_name} 复制失败")
+            return False
+        print(f"[OK] 版本 {version_config.display_name} 构建成功")
+        if cache_key:
+            with stage("cache.store", version=version_config.name):
+                self.version_cache.store(
+                    version_config.url_path,
+                    cache_key,
+                    self.versions_dir / version_config.url_path,
+                )
+        return True
+
+    def _build_version(self, version_config: VersionConfig, use_cache: bool = True) -> bool:
+        """在独立 worktree 中构建并复制一个版本，返回是否成功。"""
+        with stage("version", version=version_config.name, branch=version_config.branch):
+            state, worktree_path, cache_key = self._prepare_version(
+                version_config, use_cache
+            )
+            if state != "build":
+                return state == "cached"
+            return self._build_prepared_version(
+                version_config, worktree_path, cache_key
+            )
+
+    def _build_versions_parallel(
+        self, versions: List[VersionConfig], use_cache: bool, jobs: int
+    ) -> int:
+        """在进程池中并行构建多个版本，返回成功数量。
+
+        缓存恢复与 worktree 准备在主进程中依次完成（git 元数据不宜并发修改）；
+        共用同一源目录的版本放在同一任务中顺序构建。每个任务的输出写入
+        版本私有目录下的日志，结束后按版本前缀统一打印。
+        """
+        success_count = 0
+        groups: Dict[Path, List[Tuple[VersionConfig, Optional[str]]]] = {}
+        for version_config in versions:
+            with stage("version.prepare", version=version_config.name):
+                state, worktree_path, cache_key = self._prepare_version(
+                    version_config, use_cache
+                )
+            if state == "cached":
+                success_count += 1
+            elif state == "build":
+                groups.setdefault(worktree_path, []).append((version_config, cache_key))
+        if not groups:
+            return success_count
+
+        workers = min(max(1, int(jobs)), len(groups))
+        print(f"\n并行构建 {sum(len(group) for group in groups.values())} 个版本（进程数: {workers}）")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                worktree_path: executor.submit(
+                    traced_call,
+                    "version.group",
+                    {"versions": ",".join(item[0].name for item in group)},
+                    _build_version_group,
+                    self,
+                    worktree_path,
+                    group,
+                )
+                for worktree_path, group in groups.items()
+            }
+        for worktree_path, future in futures.items():
+            try:
+                results, spans = future.result()
+            except Exception as e:
+                for version_config, _cache_key in groups[worktree_path]:
+                    print(f"[ERROR] 版本 {version_config.display_name} 构建进程失败: {e}")
+                continue
+            adopt_spans(spans)
+            for version_config, success, log in results:
+                print("\n" + "=" * 40)
+                print(f"版本: {version_config.display_name} ({version_config.branch})")
+                print("=" * 40)
+                for line in log.splitlines():
+                    print(f"  [{version_config.name}] {line}")
+                if success:
+                    success_count += 1
+        return success_count
+
+    def build_all_versions(
+        self, clean=False, use_cache=True, sparse_worktrees=False, jobs=1
+    ):
+        """构建所有版本
+
+        源文件树、构建器与版本配置均未变化的版本直接从构建缓存恢复，
+        不创建 worktree；use_cache=False 时强制重新构建。
+        sparse_worktrees=True 时池中的 worktree 只检出 source 与 projects_dir。
+        jobs 大于 1 时在独立进程中并行构建多个版本。
+        """
         print("=" * 60)
         print("开始构建所有版本")
         print("=" * 60)
@@ -1028,11 +1099,30 @@ class BuildManager:
         if clean:
             print("清理构建目录...")
             if self.build_root.exists():
-                shutil.rmtree(self.build_root)
+                # 缓存按内容寻址、worktree 池原地更新，清理输出时均保留
+                preserved = {
+                    self.version_cache.cache_root,
+                    self.worktrees_dir,
+                    self.build_root / COMPRESS_CACHE_DIRECTORY_NAME,
+                    self.build_root / PDF_IMAGE_CACHE_DIRECTORY_NAME,
+                    self.build_root / PDF_FORMAT_CACHE_DIRECTORY_NAME,
+                    self.build_root / PDF_RESULT_CACHE_DIRECTORY_NAME,
+                }
+                for child in self.build_root.iterdir():
+                    if child in preserved:
+                        continue
+                    if child.is_dir() and not child.is_symlink():
+                        shutil.rmtree(child)
+                    else:
+                        child.unlink()
         
         # 确保构建目录存在
         self.build_root.mkdir(parents=True, exist_ok=True)
         self.versions_dir.mkdir(parents=True, exist_ok=True)
+        reset_build_report()
+        self.worktree_pool.sparse_paths = (
+            self._sparse_checkout_paths() if sparse_worktrees else None
+        )
         
         # 加载版本配置
         versions = self.get_version_configs()
@@ -1041,40 +1131,54 @@ class BuildManager:
         success_count = 0
         total_count = len(versions)
         
-        for version_config in versions:
-            print("\n" + "=" * 40)
-            print(f"构建版本: {version_config.display_name} ({version_config.branch})")
-            print("=" * 40)
-            
-            # 创建或获取 worktree
-            worktree_path = self.create_worktree(version_config)
-            if not worktree_path:
-                print(f"[ERROR] 无法为版本 {version_config.display_name} 创建 worktree")
-                continue
-            
-            try:
-                # 构建文档
-                if self.build_docs_in_worktree(worktree_path, version_config):
-                    # 复制构建结果
-                    if self.copy_build_result(worktree_path, version_config):
-                        success_count += 1
-                        print(f"[OK] 版本 {version_config.display_name} 构建成功")
-                    else:
-                        print(f"[ERROR] 版本 {version_config.display_name} 复制失败")
-                else:
-                    print(f"[ERROR] 版本 {version_config.display_name} 构建失败")
-            finally:
-                # 清理 worktree
-                self.cleanup_worktree(worktree_path)
+        if jobs > 1 and total_count > 1:
+            success_count = self._build_versions_parallel(versions, use_cache, jobs)
+        else:
+            for version_config in versions:
+                print("\n" + "=" * 40)
+                print(f"构建版本: {version_config.display_name} ({version_config.branch})")
+                print("=" * 40)
+                
+                if self._build_version(version_config, use_cache=use_cache):
+                    success_count += 1
         
-        # 创建统一入口页面，指向新的根目录结构
-        self.create_unified_index()
-        # 在 html 根目录下创建 index.html 指向默认版本
-        self.create_versions_root_index()
+        with stage("index"):
+            # 创建统一入口页面，指向新的根目录结构
+            self.create_unified_index()
+            # 在 html 根目录下创建 index.html 指向默认版本
+            self.create_versions_root_index()
+
+        with stage("assets.dedup"):
+            # 各语言、各版本中相同的静态文件只在 /_assets/ 下保存一份
+            assets = deduplicate_assets(self.versions_dir)
+        print(
+            f"[OK] 静态资源去重: {assets['shared']} 份共享文件，"
+            f"改写 {assets['pages']} 个页面，节省 {assets['bytes_saved']} 字节"
+        )
+        with stage("assets.compress"):
+            # 为可压缩文件生成 .gz/.br 旁路文件，静态服务器可直接发送
+            compressed = precompress_tree(
+                self.versions_dir,
+                cache_dir=self.build_root / COMPRESS_CACHE_DIRECTORY_NAME,
+            )
+        print(
+            f"[OK] 预压缩: {compressed['files']} 个文件，新压缩 {compressed['written']} 份，"
+            f"复用 {compressed['linked'] + compressed['up_to_date']} 份"
+        )
         
         print("\n" + "=" * 60)
         print(f"构建完成: {success_count}/{total_count} 个版本成功")
         print("=" * 60)
+        report = write_build_report(
+            self.build_root,
+            mode="versions",
+            versions=[version.name for version in versions],
+            succeeded=success_count,
+            assets=assets,
+            compressed=compressed,
+        )
+        if report:
+            print(f"[OK] 构建耗时报告: {report[0]}")
         
         return success_count == total_count
     
@@ -1248,12 +1352,62 @@ class BuildManager:
         
         print(f"[OK] 创建versions目录根页面: {versions_index_file}")
 
+def _build_version_group(
+    manager: BuildManager,
+    worktree_path: Path,
+    group: List[Tuple[VersionConfig, Optional[str]]],
+) -> List[Tuple[VersionConfig, bool, str]]:
+    """在工作进程中顺序构建共用一个源目录的版本，返回 (版本, 是否成功, 日志)。
+
+    标准输出与错误在文件描述符层面重定向到版本私有日志，
+    因此 Sphinx、xelatex 等子进程的输出也不会与其他版本交错。
+    工作进程已按 --jobs 并行，进程内的 HTML 改写、搜索索引与 PDF 不再另开进程池。
+    """
+    manager.inner_jobs = 1
+    results = []
+    for version_config, cache_key in group:
+        scratch_dir = manager._version_scratch_dir(version_config)
+        scratch_dir.mkdir(parents=True, exist_ok=True)
+        log_path = scratch_dir / 'build.log'
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = (os.dup(1), os.dup(2))
+        success = False
+        try:
+            # 行缓冲：Python 输出与子进程直接写入的内容保持先后顺序
+            with open(log_path, 'w', encoding='utf-8', buffering=1) as log_file, \
+                    redirect_stdout(log_file), redirect_stderr(log_file):
+                os.dup2(log_file.fileno(), 1)
+                os.dup2(log_file.fileno(), 2)
+                try:
+                    with stage("version", version=version_config.name, branch=version_config.branch):
+                        success = manager._build_prepared_version(
+                            version_config, worktree_path, cache_key
+                        )
+                except Exception as e:
+                    print(f"[ERROR] 版本 {version_config.display_name} 构建异常: {e}")
+                finally:
+                    log_file.flush()
+        finally:
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for descriptor in saved_fds:
+                os.close(descriptor)
+        log = log_path.read_text(encoding='utf-8', errors='replace')
+        results.append((version_config, success, log))
+    return results
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="中央构建管理器")
     parser.add_argument('--clean', action='store_true', help='清理构建目录')
     parser.add_argument('--list-versions', action='store_true', help='列出所有版本')
     parser.add_argument('--check-config', action='store_true', help='检查版本配置')
+    parser.add_argument('--no-cache', action='store_true', help='忽略版本构建缓存，全部重新构建')
+    parser.add_argument('--sparse-worktrees', action='store_true', help='worktree 只检出 source 与 projects 目录')
+    parser.add_argument('--prune-worktrees', action='store_true', help='删除 worktree 池后退出')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行构建的版本数上限 (默认: 1)')
     
     args = parser.parse_args()
     
@@ -1267,6 +1421,10 @@ def main():
                 print(f"  - {version.display_name} ({version.name}) -> {version.branch}")
             return
         
+        if args.prune_worktrees:
+            manager.prune_worktrees()
+            return
+        
         if args.check_config:
             config = manager.load_versions_config()
             print("版本配置检查:")
@@ -1276,7 +1434,12 @@ def main():
             return
         
         # 构建所有版本
-        success = manager.build_all_versions(clean=args.clean)
+        success = manager.build_all_versions(
+            clean=args.clean,
+            use_cache=not args.no_cache,
+            sparse_worktrees=args.sparse_worktrees,
+            jobs=args.jobs,
+        )
         
         if success:
             print("\n[OK] 所有版本构建成功!")
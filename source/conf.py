@@ -16,10 +16,13 @@ import yaml
 from datetime import datetime
 from pathlib import Path
 
+from sphinx.util import logging as sphinx_logging
+
 # Sphinx may be launched from the repository root (or another working
 # directory), so resolve local helper modules relative to this file.
 source_dir = Path(__file__).resolve().parent
-sys.path.insert(0, str(source_dir))
+if str(source_dir) not in sys.path:
+    sys.path.insert(0, str(source_dir))
 
 from utils.language_support import (
     alternate_docname,
@@ -31,8 +34,13 @@ from utils.language_support import (
     relative_doc_url,
     select_default_language,
 )
+from utils.language_assets import register_language_assets
+from utils.search_index import register_search_page
+from utils.static_bundle import register_static_bundles
 from utils.pdf_formatting import normalize_latex_heading_numbers
 
+logger = sphinx_logging.getLogger(__name__)
+
 # 加载配置文件
 def load_config():
     """加载配置文件"""
@@ -109,9 +117,6 @@ templates_path = ['_templates']
 # 优先使用环境变量，然后使用配置文件，最后使用默认值
 default_sphinx_language = 'zh_CN' if default_language == 'zh' else 'en'
 language = os.environ.get('SPHINX_LANGUAGE', default_sphinx_language)
-active_build_language = (
-    'zh' if str(language).lower().startswith('zh') else 'en'
-)
 
 # List of patterns, relative to source directory, that match files and
 # directories to ignore when looking for source files.
@@ -137,11 +142,6 @@ if 'SPHINX_EXCLUDE_PATTERNS' in os.environ:
     env_exclude_patterns = [pattern.strip() for pattern in env_exclude_patterns if pattern.strip()]
     exclude_patterns.extend(env_exclude_patterns)
 
-# 调试信息
-print(f"DEBUG: master_doc = {master_doc}")
-print(f"DEBUG: language = {language}")
-print(f"DEBUG: exclude_patterns = {exclude_patterns}")
-
 # -- Options for HTML output -------------------------------------------------
 
 # The theme to use for HTML and HTML Help pages.  See the documentation
@@ -187,7 +187,8 @@ myst_url_schemes = ('http', 'https', 'mailto', 'ftp')
 # 图片路径配置
 html_extra_path = []
 html_css_files = ['version_menu.css', 'custom.css', 'pdf_button.css', 'edit_button.css', 'language_switch.css', 'dark_mode.css']
-html_js_files = ['version_menu.js', 'download_pdf.js', 'version_info.js', 'edit_on_github.js', 'language_switch.js']
+# version_info.js 与 version_config.js 在构建后写入，不参与打包
+html_js_files = ['version_config.js', 'version_menu.js', 'download_pdf.js', 'version_info.js', 'edit_on_github.js', 'language_switch.js']
 
 # 配置图片路径处理
 html_favicon = None
@@ -299,32 +300,40 @@ def _language_root_doc(language_code):
     )
 
 
+def _build_language(language_code):
+    return 'zh' if str(language_code).lower().startswith('zh') else 'en'
+
+
 def add_language_page_context(app, pagename, templatename, context, doctree):
     """Expose an exact per-page language target to the frontend switcher."""
-    del app, templatename, doctree
-    if not language_switch_enabled(available_languages):
+    del templatename, doctree
+    page_languages = tuple(app.config.docs_available_languages)
+    page_default_language = select_default_language(
+        page_languages, generation_config
+    )
+    if not language_switch_enabled(page_languages):
         context['docs_language'] = {
             'enabled': False,
-            'available': list(available_languages),
-            'current': default_language,
+            'available': list(page_languages),
+            'current': page_default_language,
         }
         return
 
     current_language = (
         document_language(Path(pagename))
         if _source_doc_exists(pagename)
-        else active_build_language
+        else _build_language(app.config.language)
     )
     target_language = 'en' if current_language == 'zh' else 'zh'
     target_docname = alternate_docname(pagename, target_language)
     if not _source_doc_exists(target_docname):
         target_docname = _language_root_doc(target_language)
     target_output_docname = language_output_docname(
-        target_docname, target_language, default_language
+        target_docname, target_language, page_default_language
     )
     context['docs_language'] = {
         'enabled': True,
-        'available': list(available_languages),
+        'available': list(page_languages),
         'current': current_language,
         'target_language': target_language,
         'target_docname': target_docname,
@@ -332,7 +341,40 @@ def add_language_page_context(app, pagename, templatename, context, doctree):
     }
 
 
+def apply_build_overrides(app, config):
+    """Recompute language-derived settings once confoverrides are applied.
+
+    In-process builds pass language, root_doc and exclude_patterns as Sphinx
+    confoverrides, which conf.py cannot see while it executes.  The base
+    exclude patterns are merged back in and the LaTeX settings are rebuilt
+    for the effective language and root document.
+    """
+    del app
+    config.exclude_patterns = list(
+        dict.fromkeys([*base_exclude_patterns, *config.exclude_patterns])
+    )
+    if (config.language, config.root_doc) != (language, master_doc):
+        config.latex_documents, config.latex_elements = build_latex_settings(
+            config.language, config.root_doc
+        )
+
+    # 调试信息，仅在 sphinx-build -vv 时输出
+    logger.debug("master_doc = %s", config.root_doc)
+    logger.debug("language = %s", config.language)
+    logger.debug("exclude_patterns = %s", config.exclude_patterns)
+
+
 def setup(app):
+    app.add_config_value(
+        'docs_available_languages', list(available_languages), 'env'
+    )
+    # 非默认语言直接输出 _static_<lang>、search_<lang>.html 等隔离资源。
+    register_language_assets(app, os.environ.get('DOCS_ASSET_LANGUAGE', ''))
+    app.connect('config-inited', apply_build_overrides)
+    # 自有 _static 样式与脚本合并压缩为 docs.<hash>.css/js，由 layout.html 引用。
+    register_static_bundles(app)
+    # 搜索页改用 _search/<语言>/ 下的分片索引，由 _templates/search.html 按需加载。
+    register_search_page(app)
     app.connect('html-page-context', add_language_page_context)
     app.connect('doctree-resolved', normalize_latex_heading_numbers)
 """
@@ -360,7 +402,6 @@ def _latex_escape(value):
     return ''.join(replacements.get(char, char) for char in str(value or ''))
 
 
-pdf_is_chinese = str(language).lower().startswith('zh')
 pdf_style = os.environ.get(
     'PDF_STYLE', generation_config.get('pdf_style', 'web')
 ).strip().lower()
@@ -369,20 +410,7 @@ pdf_cover_title = os.environ.get(
     'PDF_COVER_TITLE', str(project).replace('_', ' ')
 )
 pdf_header_title = str(project).replace('_', ' ')
-pdf_cover_type = os.environ.get(
-    'PDF_COVER_TYPE',
-    '开发文档' if pdf_is_chinese else 'Technical Documentation',
-)
-pdf_cover_description = os.environ.get(
-    'PDF_COVER_DESCRIPTION',
-    project_config.get('description', '')
-    if pdf_is_chinese
-    else project_config.get('description_en', '') or project_config.get('description', ''),
-)
 pdf_cover_date = datetime.now().strftime('%Y-%m-%d')
-pdf_version_label = '文档版本' if pdf_is_chinese else 'Document version'
-pdf_date_label = '更新时间' if pdf_is_chinese else 'Last updated'
-pdf_contents_title = '目录' if pdf_is_chinese else 'Contents'
 
 pdf_fonts = generation_config.get('pdf_fonts', {}) or {}
 pdf_font_latin = str(pdf_fonts.get('latin', 'TeX Gyre Termes'))
@@ -397,47 +425,9 @@ pdf_font_cjk_emphasis = str(
 )
 pdf_font_code = str(pdf_fonts.get('code', 'Source Code Pro'))
 
-pdf_cover_page = rf'''
-\begin{{titlepage}}
-\newgeometry{{top=2.2cm,bottom=2.0cm,left=2.4cm,right=2.4cm}}
-\thispagestyle{{pdfcover}}
-\begin{{flushleft}}
-\vspace*{{0.6cm}}
-{{\color{{coverblue}}\rule{{2.4cm}}{{4pt}}\par}}
-\vspace{{0.9cm}}
-{{\sffamily\small\bfseries\color{{covermuted}} REALTHREAD \enspace/\enspace TECHNICAL DOCUMENTATION\par}}
-\vspace{{2.0cm}}
-{{\sffamily\bfseries\fontsize{{32}}{{39}}\selectfont\color{{coverink}} {_latex_escape(pdf_cover_title)}\par}}
-\vspace{{0.45cm}}
-{{\sffamily\fontsize{{19}}{{25}}\selectfont\color{{coverblue}} {_latex_escape(pdf_cover_type)}\par}}
-\vspace{{1.35cm}}
-\begin{{minipage}}{{0.84\textwidth}}
-{{\sffamily\large\color{{covermuted}} {_latex_escape(pdf_cover_description)}\par}}
-\end{{minipage}}
-\vfill
-{{\color{{coverline}}\rule{{\textwidth}}{{0.8pt}}\par}}
-\vspace{{0.65cm}}
-{{\sffamily\small\color{{covermuted}} {_latex_escape(pdf_version_label)}\hspace{{1.2em}}{{\color{{coverink}}\bfseries {_latex_escape(release)}}}\par}}
-\vspace{{0.20cm}}
-{{\sffamily\small\color{{covermuted}} {_latex_escape(pdf_date_label)}\hspace{{1.2em}}{{\color{{coverink}} {_latex_escape(pdf_cover_date)}}}\par}}
-\vspace{{1.0cm}}
-{{\sffamily\footnotesize\color{{covermuted}} {_latex_escape(copyright)}\par}}
-\end{{flushleft}}
-\end{{titlepage}}
-% Restore the body geometry after the titlepage environment has finished.
-% Restoring inside titlepage can leave its enlarged text height on the first
-% contents page, pushing the roman page number below the paper edge.
-\restoregeometry
-\clearpage
-'''
-
-latex_documents = [
-    # (source start file, target name, title, author, documentclass [options])
-    # manual 使用独立标题页，并让每篇正文成为清晰的章级结构。
-    (master_doc, 'sdk-docs.tex', _latex_escape(pdf_cover_title), _latex_escape(author), 'manual'),
-]
-
-latex_elements = {
+# 与构建语言无关的 LaTeX 设置；标题页、目录标题和章标签由
+# build_latex_settings() 按语言补齐。
+latex_base_elements = {
     'papersize': 'a4paper',
     'pointsize': '11pt',
     'extraclassoptions': 'oneside,openany',
@@ -447,18 +437,6 @@ latex_elements = {
     # PDF 目录保留三层：分类 README 标题、文档标题、正文章节。
     # 文档标题由 latex_toplevel_sectioning 设为 section 后处于第二层。
     'tocdepth': r'\setcounter{tocdepth}{2}',
-    'maketitle': pdf_cover_page,
-    'tableofcontents': rf'''
-\clearpage
-\renewcommand{{\contentsname}}{{{_latex_escape(pdf_contents_title)}}}
-\pagestyle{{pdfnormal}}
-\thispagestyle{{pdfnormal}}
-\begin{{singlespace}}
-\small
-\sphinxtableofcontents
-\end{{singlespace}}
-\clearpage
-''',
     'hyperref': r'''
 \definecolor{wordlinkblue}{RGB}{5,99,193}
 \usepackage[
@@ -676,9 +654,9 @@ latex_elements = {
 
 # The preamble is a raw LaTeX string; normalize any accidental Python-style
 # comment lines so they cannot be interpreted as TeX macro parameters.
-latex_elements['preamble'] = '\n'.join(
+latex_base_elements['preamble'] = '\n'.join(
     ('%' + line[1:]) if line.startswith('#') else line
-    for line in latex_elements['preamble'].split('\n')
+    for line in latex_base_elements['preamble'].split('\n')
 )
 
 for _placeholder, _font_name in {
@@ -688,7 +666,7 @@ for _placeholder, _font_name in {
     '__PDF_FONT_CJK_HEADING__': _latex_escape(pdf_font_cjk_heading),
     '__PDF_FONT_CJK_EMPHASIS__': _latex_escape(pdf_font_cjk_emphasis),
 }.items():
-    latex_elements['preamble'] = latex_elements['preamble'].replace(
+    latex_base_elements['preamble'] = latex_base_elements['preamble'].replace(
         _placeholder, _font_name
     )
 
@@ -697,28 +675,11 @@ for _placeholder, _font_name in {
 # becomes the second level.
 latex_toplevel_sectioning = 'section'
 
-pdf_chapter_label = (
-    r'第\,\thechapter\,章'
-    if pdf_is_chinese
-    else r'CHAPTER \thechapter'
-)
-latex_elements['preamble'] += rf'''
-% 产品名页眉由配置中的项目名生成，不携带版本号或章节标题。
-\def\pdfheadertitle{{{_latex_escape(pdf_header_title)}}}
-% ---- 章标题：替换 fncychap 的英文固定标签，并保持中英文构建一致 ----
-\titleformat{{\chapter}}[display]
-  {{\sffamily\bfseries\color{{black}}}}
-  {{\filleft\Large {pdf_chapter_label}}}
-  {{0.8em}}
-  {{\titlerule\vspace{{0.8em}}\filleft\Huge}}
-\titlespacing*{{\chapter}}{{0pt}}{{-0.6cm}}{{1.2cm}}
-'''
-
+# 中国研究生论文常用版式：小四（12pt）正文、1.5 倍行距、首行缩进，
+# 段落之间不额外留空；左侧预留装订边，目录使用同等基线网格。
 if pdf_thesis_style:
-    # 中国研究生论文常用版式：小四（12pt）正文、1.5 倍行距、首行缩进，
-    # 段落之间不额外留空；左侧预留装订边，目录使用同等基线网格。
-    latex_elements['pointsize'] = '12pt'
-    latex_elements['preamble'] += r'''
+    latex_base_elements['pointsize'] = '12pt'
+pdf_thesis_preamble = r'''
 % ---- 中国研究生论文预览样式（由 PDF_STYLE=thesis 启用）----
 \geometry{a4paper, top=2.54cm, bottom=2.54cm, left=3.00cm, right=2.50cm,
           headheight=14pt, footskip=24pt, includehead=true, includefoot=true}
@@ -763,9 +724,95 @@ if pdf_thesis_style:
 \setlist[itemize]{itemsep=0.25em,parsep=0pt,topsep=0.5em}
 \setlist[enumerate]{itemsep=0.25em,parsep=0pt,topsep=0.5em}
 '''
-    latex_elements['tableofcontents'] = rf'''
+
+
+def build_latex_settings(language_code, root_document):
+    """按构建语言返回 (latex_documents, latex_elements)。
+
+    模块加载时按环境变量计算一次；Sphinx 应用 confoverrides 之后，
+    config-inited 回调会以最终的 language / root_doc 重新计算。
+    """
+    is_chinese = str(language_code).lower().startswith('zh')
+    cover_type = os.environ.get(
+        'PDF_COVER_TYPE',
+        '开发文档' if is_chinese else 'Technical Documentation',
+    )
+    cover_description = os.environ.get(
+        'PDF_COVER_DESCRIPTION',
+        project_config.get('description', '')
+        if is_chinese
+        else project_config.get('description_en', '') or project_config.get('description', ''),
+    )
+    version_label = '文档版本' if is_chinese else 'Document version'
+    date_label = '更新时间' if is_chinese else 'Last updated'
+    contents_title = '目录' if is_chinese else 'Contents'
+    chapter_label = (
+        r'第\,\thechapter\,章'
+        if is_chinese
+        else r'CHAPTER \thechapter'
+    )
+
+    elements = dict(latex_base_elements)
+    elements['maketitle'] = rf'''
+\begin{{titlepage}}
+\newgeometry{{top=2.2cm,bottom=2.0cm,left=2.4cm,right=2.4cm}}
+\thispagestyle{{pdfcover}}
+\begin{{flushleft}}
+\vspace*{{0.6cm}}
+{{\color{{coverblue}}\rule{{2.4cm}}{{4pt}}\par}}
+\vspace{{0.9cm}}
+{{\sffamily\small\bfseries\color{{covermuted}} REALTHREAD \enspace/\enspace TECHNICAL DOCUMENTATION\par}}
+\vspace{{2.0cm}}
+{{\sffamily\bfseries\fontsize{{32}}{{39}}\selectfont\color{{coverink}} {_latex_escape(pdf_cover_title)}\par}}
+\vspace{{0.45cm}}
+{{\sffamily\fontsize{{19}}{{25}}\selectfont\color{{coverblue}} {_latex_escape(cover_type)}\par}}
+\vspace{{1.35cm}}
+\begin{{minipage}}{{0.84\textwidth}}
+{{\sffamily\large\color{{covermuted}} {_latex_escape(cover_description)}\par}}
+\end{{minipage}}
+\vfill
+{{\color{{coverline}}\rule{{\textwidth}}{{0.8pt}}\par}}
+\vspace{{0.65cm}}
+{{\sffamily\small\color{{covermuted}} {_latex_escape(version_label)}\hspace{{1.2em}}{{\color{{coverink}}\bfseries {_latex_escape(release)}}}\par}}
+\vspace{{0.20cm}}
+{{\sffamily\small\color{{covermuted}} {_latex_escape(date_label)}\hspace{{1.2em}}{{\color{{coverink}} {_latex_escape(pdf_cover_date)}}}\par}}
+\vspace{{1.0cm}}
+{{\sffamily\footnotesize\color{{covermuted}} {_latex_escape(copyright)}\par}}
+\end{{flushleft}}
+\end{{titlepage}}
+% Restore the body geometry after the titlepage environment has finished.
+% Restoring inside titlepage can leave its enlarged text height on the first
+% contents page, pushing the roman page number below the paper edge.
+\restoregeometry
+\clearpage
+'''
+    elements['tableofcontents'] = rf'''
+\clearpage
+\renewcommand{{\contentsname}}{{{_latex_escape(contents_title)}}}
+\pagestyle{{pdfnormal}}
+\thispagestyle{{pdfnormal}}
+\begin{{singlespace}}
+\small
+\sphinxtableofcontents
+\end{{singlespace}}
 \clearpage
-\renewcommand{{\contentsname}}{{{_latex_escape(pdf_contents_title)}}}
+'''
+    elements['preamble'] += rf'''
+% 产品名页眉由配置中的项目名生成，不携带版本号或章节标题。
+\def\pdfheadertitle{{{_latex_escape(pdf_header_title)}}}
+% ---- 章标题：替换 fncychap 的英文固定标签，并保持中英文构建一致 ----
+\titleformat{{\chapter}}[display]
+  {{\sffamily\bfseries\color{{black}}}}
+  {{\filleft\Large {chapter_label}}}
+  {{0.8em}}
+  {{\titlerule\vspace{{0.8em}}\filleft\Huge}}
+\titlespacing*{{\chapter}}{{0pt}}{{-0.6cm}}{{1.2cm}}
+'''
+    if pdf_thesis_style:
+        elements['preamble'] += pdf_thesis_preamble
+        elements['tableofcontents'] = rf'''
+\clearpage
+\renewcommand{{\contentsname}}{{{_latex_escape(contents_title)}}}
 \pagestyle{{pdfnormal}}
 \thispagestyle{{pdfnormal}}
 \begingroup
@@ -776,4 +823,14 @@ if pdf_thesis_style:
 \clearpage
 '''
 
+    documents = [
+        # (source start file, target name, title, author, documentclass [options])
+        # manual 使用独立标题页，并让每篇正文成为清晰的章级结构。
+        (root_document, 'sdk-docs.tex', _latex_escape(pdf_cover_title), _latex_escape(author), 'manual'),
+    ]
+    return documents, elements
+
+
+latex_documents, latex_elements = build_latex_settings(language, master_doc)
+
 # --- 国际 Word 排版补丁 (end) ---
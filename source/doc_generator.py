@@ -41,18 +41,27 @@ class DocGenerator:
     def run(self) -> bool:
         print("开始同步项目文档...")
         try:
-            self.file_processor.cleanup_dest_dir()
-            self.copied_files = self.file_processor.sync_document_tree()
-            self.root_doc = self.index_generator.generate_all_indexes(
-                self.categories, {}, self.project_info
-            )
-            self.file_processor.finalize_manifest()
+            self.file_processor.load_manifest()
+            # 同步与导航生成只在内存中暂存，结束时仅写入内容变化的文件。
+            with self.file_processor.deferred_writes():
+                self.copied_files = self.file_processor.sync_document_tree()
+                self.root_doc = self.index_generator.generate_all_indexes(
+                    self.categories, {}, self.project_info
+                )
+            stats = self.file_processor.finalize_manifest()
             print(f"文档同步完成，共处理 {len(self.copied_files)} 个文件")
+            print(
+                "增量同步: "
+                f"写入 {stats['written']}，"
+                f"未变 {stats['unchanged']}，"
+                f"删除 {stats['removed']}"
+            )
             print(f"默认页面: {self.root_doc}")
             return True
         except Exception as exc:
             if self.file_processor.generated_paths:
-                self.file_processor.finalize_manifest()
+                # 保留上次清单中的文件记录，避免失败后遗留无法清理的文件。
+                self.file_processor.finalize_manifest(remove_stale=False)
             print(f"文档同步失败: {exc}")
             return False
 
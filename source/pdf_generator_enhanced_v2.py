@@ -17,6 +17,7 @@ import time
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import argparse
+from dataclasses import dataclass
 from datetime import datetime
 from bs4 import BeautifulSoup
 import markdown
@@ -26,6 +27,85 @@ from utils.pdf_builder import (
     is_valid_pdf as validate_pdf_file,
     pdf_filename as build_pdf_filename,
 )
+from utils.build_report import stage
+from utils.latex_format import (
+    FORMAT_CACHE_DIRECTORY_NAME,
+    discard_preamble_format,
+    preamble_format_enabled,
+    prepare_preamble_format,
+)
+from utils.latex_fragments import (
+    FRAGMENT_CACHE_DIRECTORY_NAME,
+    FragmentCache,
+    PdfWriter,
+    fragment_key,
+    incremental_pdf_enabled,
+    merge_fragments,
+    read_fragment_state,
+    split_manual,
+    whole_document_requirements,
+)
+from utils.latex_passes import (
+    AUX_CACHE_DIRECTORY_NAME,
+    auxiliary_digest,
+    discard_auxiliary_files,
+    max_runs_from_config,
+    restore_auxiliary_files,
+    store_auxiliary_files,
+)
+from utils.pdf_images import (
+    CACHE_DIRECTORY_NAME as IMAGE_CACHE_DIRECTORY_NAME,
+    Image as PILImage,
+    ImageSettings,
+    prepare_latex_images,
+    rewrite_image_references,
+)
+from utils.language_support import LANGUAGE_ORDER
+from utils.pdf_environment import font_probe_context
+from utils.sphinx_runner import run_sphinx
+
+
+@dataclass(frozen=True)
+class PDFBackend:
+    """PDF 渲染后端，声明其需要的流水线输入"""
+
+    name: str
+    needs_merged_html: bool
+    description: str
+
+
+PDF_BACKENDS = {
+    # LaTeX 路线直接从同步后的 Sphinx 源文档生成，不读取合并 HTML。
+    "latex": PDFBackend("latex", False, "Sphinx LaTeX -> XeLaTeX"),
+    # 合并 HTML 打印路线仅在显式指定时启用。
+    "html": PDFBackend("html", True, "合并 HTML -> Chrome/Edge 无头打印"),
+}
+DEFAULT_PDF_BACKEND = "latex"
+
+
+def pdf_temporary_exclude_patterns(language: str) -> List[str]:
+    """Exclude other languages' temporary PDF sources from one LaTeX build.
+
+    Each language writes its ``_pdf_*_<language>`` master and wrapper
+    documents into the shared source tree; concurrent builds must not read
+    the files another language is still creating or removing.
+    """
+    patterns = []
+    for other in LANGUAGE_ORDER:
+        if other != language:
+            patterns.extend([f"_pdf_*_{other}.*", f"**/_pdf_*_{other}.*"])
+    return patterns
+
+
+def resolve_pdf_backend(name: Optional[str] = None) -> PDFBackend:
+    """Return a registered PDF backend, defaulting to the LaTeX route."""
+    backend_name = str(name or DEFAULT_PDF_BACKEND).strip().lower()
+    if backend_name not in PDF_BACKENDS:
+        raise ValueError(
+            f"未知的 PDF 后端: {name}（可选: {', '.join(PDF_BACKENDS)}）"
+        )
+    return PDF_BACKENDS[backend_name]
+
 
 class HTMLParser:
     """HTML文件解析器"""
@@ -458,12 +538,30 @@ class PDFGeneratorV2:
         browser_path: Optional[str] = None,
         projects_root: Optional[Path] = None,
         config_path: Optional[Path] = None,
+        backend: Optional[str] = None,
+        latex_dir: Optional[Path] = None,
+        image_cache_dir: Optional[Path] = None,
+        format_cache_dir: Optional[Path] = None,
+        image_jobs: Optional[int] = None,
     ):
         self.html_dir = html_dir
         self.output_dir = output_dir
+        # LaTeX 工作目录；默认与 HTML 输出目录同级
+        self.latex_dir = Path(latex_dir) if latex_dir is not None else None
+        # 图片预处理缓存跨语言、跨构建复用；默认位于 LaTeX 工作目录旁
+        self.image_cache_dir = (
+            Path(image_cache_dir) if image_cache_dir is not None else None
+        )
+        # 预编译导言区格式文件按导言区哈希缓存，同样跨语言、跨构建复用
+        self.format_cache_dir = (
+            Path(format_cache_dir) if format_cache_dir is not None else None
+        )
+        # 图片预处理的进程数；None 为每个 CPU 一个，并行构建时由调用方限制
+        self.image_jobs = image_jobs
         self.temp_dir = Path(tempfile.mkdtemp())
         self.keep_temp = keep_temp
         self.browser_path = browser_path
+        self.backend = resolve_pdf_backend(backend)
         self.config_path = config_path or (Path(__file__).parent / 'config.yaml')
         resolved_projects_root = projects_root or self._derive_projects_root()
         self.scanner = DocumentScanner(
@@ -472,7 +570,6 @@ class PDFGeneratorV2:
         self.md_processor = MarkdownProcessor()
         self.toc_entries = []  # [{'level':1,'title':'1. Title','anchor':'id'}]
         self.assets_dir: Optional[Path] = None
-        self._pdf_wrapper_paths: List[Path] = []
     def __del__(self):
         """清理临时文件"""
         try:
@@ -492,7 +589,6 @@ class PDFGeneratorV2:
             self.temp_dir = Path(_tempfile.mkdtemp())
             # 重置目录收集，避免多语言生成时相互污染
             self.toc_entries = []
-            self._pdf_wrapper_paths = []
             # 0. 加载项目信息（版本、版权等）
             self.project_meta = self._load_project_meta()
             # 1. 扫描文档结构
@@ -508,10 +604,6 @@ class PDFGeneratorV2:
             total_docs = sum(len(docs) for docs in documents.values())
             print(f"[OK] 找到 {total_docs} 个文档文件")
             
-            # 准备资源输出目录（用于相对路径拷贝）
-            self.assets_dir = self.temp_dir / 'assets'
-            self.assets_dir.mkdir(exist_ok=True)
-
             # 记录章节结构来源（动态/硬编码）
             order = getattr(self.scanner, 'category_order', None)
             if order:
@@ -520,18 +612,28 @@ class PDFGeneratorV2:
             else:
                 print("[OK] 章节结构: 硬编码回退 (未在 config.yaml 中找到 output_structure)")
 
-            # 2. 生成正文内容（先生成正文以便收集目录项）
-            print("2. 生成正文内容...")
-            content_html = self._generate_content(documents, language)
+            backend = self.backend
+            full_html = None
+            if backend.needs_merged_html:
+                # 准备资源输出目录（用于相对路径拷贝）
+                self.assets_dir = self.temp_dir / 'assets'
+                self.assets_dir.mkdir(exist_ok=True)
+
+                # 2. 生成正文内容（先生成正文以便收集目录项）
+                print("2. 生成正文内容...")
+                content_html = self._generate_content(documents, language)
+
+                # 3. 生成目录（依赖已收集的 toc_entries）
+                print("3. 生成目录结构...")
+                toc_html = self._generate_toc(documents, language)
+
+                # 4. 创建完整的HTML文件
+                print("4. 创建完整HTML文件...")
+                full_html = self._create_full_html(title, toc_html, content_html, language)
+            else:
+                # LaTeX 后端直接读取 Sphinx 源文档，Markdown 渲染与 HTML 合并不会被使用。
+                print(f"2-4. 跳过 HTML 合并阶段（{backend.name} 后端: {backend.description}）")
 
-            # 3. 生成目录（依赖已收集的 toc_entries）
-            print("3. 生成目录结构...")
-            toc_html = self._generate_toc(documents, language)
-            
-            # 4. 创建完整的HTML文件
-            print("4. 创建完整HTML文件...")
-            full_html = self._create_full_html(title, toc_html, content_html, language)
-            
             # 5. 生成PDF
             print("5. 生成PDF文件...")
             success = self._generate_pdf_from_html(full_html, title, language)
@@ -1501,8 +1603,8 @@ class PDFGeneratorV2:
             pass
         return meta
     
-    def _generate_pdf_from_html(self, html_file: Path, title: str, language: str) -> bool:
-        """从HTML文件生成PDF"""
+    def _generate_pdf_from_html(self, html_file: Optional[Path], title: str, language: str) -> bool:
+        """按所选后端生成PDF；LaTeX 后端不读取 html_file"""
         try:
             # 确保输出目录存在
             self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -1520,7 +1622,17 @@ class PDFGeneratorV2:
                         raise
                     time.sleep(0.2)
             
-            # 仅使用 LaTeX 路线（专业排版 + 自动书签 + 真实页码）
+            backend = self.backend
+            if backend.needs_merged_html:
+                # 显式选择的 HTML 后端：打印合并页面，找不到浏览器时给出手动指引。
+                if not html_file:
+                    print("[ERROR] HTML 后端需要合并 HTML，但未生成合并页面")
+                    return False
+                if self._try_chrome_pdf(Path(html_file), output_pdf):
+                    return True
+                return self._generate_pdf_manual(Path(html_file), output_pdf)
+
+            # 默认 LaTeX 路线（专业排版 + 自动书签 + 真实页码）
             # 失败时不回退，确保产出质量一致
             if not self._try_latex_pdf(output_pdf, language):
                 print("[ERROR] PDF 生成失败：LaTeX 路线未产出有效文件。请检查 xelatex 是否安装、源文档是否完整。")
@@ -1631,8 +1743,16 @@ class PDFGeneratorV2:
             ]
         )
 
-    def _create_pdf_master_doc(self, language: str) -> Tuple[str, Path]:
-        """Create a PDF root that keeps directory titles but omits index bodies."""
+    def _create_pdf_master_doc(
+        self, language: str, wrapper_paths: Optional[List[Path]] = None
+    ) -> Tuple[str, Path]:
+        """Create a PDF root that keeps directory titles but omits index bodies.
+
+        Temporary wrapper documents are appended to *wrapper_paths* so the
+        caller can remove them after the build.
+        """
+        if wrapper_paths is None:
+            wrapper_paths = []
         docs_source = self.config_path.parent
         filename = f"_pdf_index_{language}.rst"
         master_path = docs_source / filename
@@ -1690,12 +1810,12 @@ class PDFGeneratorV2:
             for directory in ordered_directories:
                 if directory == category_dir:
                     entries = [
-                        self._pdf_document_docname(doc, language)
+                        self._pdf_document_docname(doc, language, wrapper_paths)
                         for doc in grouped_docs[directory]
                     ]
                 else:
                     wrapper = self._create_pdf_directory_wrapper(
-                        directory, grouped_docs[directory], language
+                        directory, grouped_docs[directory], language, wrapper_paths
                     )
                     entries = [
                         wrapper.relative_to(self.config_path.parent)
@@ -1729,7 +1849,7 @@ class PDFGeneratorV2:
         return master_path.with_suffix("").name, master_path
 
     def _create_pdf_standalone_index_body(
-        self, document: Dict, language: str
+        self, document: Dict, language: str, wrapper_paths: List[Path]
     ) -> Path:
         """Create a temporary body-only copy for a README-only directory."""
         source_file = Path(document["file"])
@@ -1771,14 +1891,16 @@ class PDFGeneratorV2:
 
         wrapper.parent.mkdir(parents=True, exist_ok=True)
         wrapper.write_text("\n".join(output_lines).lstrip("\n") + "\n", encoding="utf-8")
-        self._pdf_wrapper_paths.append(wrapper)
+        wrapper_paths.append(wrapper)
         return wrapper
 
-    def _pdf_document_docname(self, document: Dict, language: str) -> str:
+    def _pdf_document_docname(
+        self, document: Dict, language: str, wrapper_paths: List[Path]
+    ) -> str:
         """Return the Sphinx docname for a regular or body-only document."""
         if document.get("standalone_directory_index"):
             source_path = self._create_pdf_standalone_index_body(
-                document, language
+                document, language, wrapper_paths
             )
             relative_path = source_path.relative_to(self.config_path.parent)
         else:
@@ -1788,7 +1910,8 @@ class PDFGeneratorV2:
         return relative_path.with_suffix("").as_posix()
 
     def _create_pdf_directory_wrapper(
-        self, directory: Path, documents: List[Dict], language: str
+        self, directory: Path, documents: List[Dict], language: str,
+        wrapper_paths: List[Path],
     ) -> Path:
         """Create a temporary README-title wrapper for a nested directory."""
         relative_directory = directory.relative_to(self.scanner.projects_root).as_posix()
@@ -1799,12 +1922,213 @@ class PDFGeneratorV2:
         for index, document in enumerate(documents):
             if index > 0:
                 lines.extend([".. raw:: latex", "", "   \\clearpage", ""])
-            docname = self._pdf_document_docname(document, language)
+            docname = self._pdf_document_docname(document, language, wrapper_paths)
             lines.extend([".. toctree::", "   :maxdepth: 2", "", f"   {docname}", ""])
         wrapper.write_text("\n".join(lines), encoding="utf-8")
-        self._pdf_wrapper_paths.append(wrapper)
+        wrapper_paths.append(wrapper)
         return wrapper
 
+    def _run_xelatex_passes(
+        self,
+        xelatex: str,
+        latex_dir: Path,
+        tex_file: Path,
+        *,
+        language: str,
+        max_runs: int,
+        aux_cache_dir: Optional[Path],
+        format_name: Optional[str],
+        format_cache_dir: Path,
+    ) -> Tuple[bool, Optional[str]]:
+        """运行 xelatex 直到交叉引用收敛。
+
+        返回是否生成了有效 PDF，以及之后仍可使用的格式文件名（运行失败
+        时格式文件会被丢弃）。aux_cache_dir 为 None 时不恢复也不保存辅助文件。
+        """
+        # 交叉引用、目录与书签写入 .aux/.toc/.out，下一次运行才读取；
+        # 这些文件不再变化即已收敛。先恢复上次构建的辅助文件，
+        # 引用未变化时一次运行即可完成。
+        previous_digest = None
+        if aux_cache_dir is not None:
+            previous_digest = restore_auxiliary_files(aux_cache_dir, latex_dir, tex_file.stem)
+            if previous_digest is not None:
+                print("[INFO] 已恢复上次构建的 .aux/.toc/.out")
+        run_num = 0
+        converged = False
+        while run_num < max_runs:
+            run_num += 1
+            print(f"[INFO] xelatex 第 {run_num} 次运行（最多 {max_runs} 次）...")
+            # 注意：不用 -output-directory（会导致 xdvipdfmx 找不到图片）
+            # 而是用 cwd 让 xelatex 在 latex_dir 内运行
+            cmd = [
+                xelatex,
+                "-interaction=nonstopmode",
+                *([f"-fmt={format_name}"] if format_name else []),
+                tex_file.name,
+            ]
+            with stage("xelatex", language=language, run=run_num):
+                result = subprocess.run(
+                    cmd, cwd=str(latex_dir),
+                    capture_output=True, text=False, timeout=600,
+                )
+            pdf_candidate = latex_dir / (tex_file.stem + ".pdf")
+            if not validate_pdf_file(pdf_candidate):
+                if run_num == 1 and (previous_digest is not None or format_name):
+                    # 缓存的辅助文件或格式文件可能与新的导言区不兼容，丢弃后从头运行
+                    print("[WARN] 使用缓存的辅助文件或格式文件运行失败，丢弃缓存后重新运行")
+                    if aux_cache_dir is not None:
+                        discard_auxiliary_files(latex_dir, tex_file.stem)
+                        discard_auxiliary_files(aux_cache_dir, tex_file.stem)
+                    if format_name:
+                        discard_preamble_format(format_cache_dir, format_name)
+                    previous_digest = None
+                    format_name = None
+                    run_num = 0
+                    continue
+                stderr = (result.stderr or b"").decode(errors="ignore")
+                stdout = (result.stdout or b"").decode(errors="ignore")
+                print(f"[ERROR] xelatex 第 {run_num} 次未生成有效 PDF")
+                for line in (stdout + stderr).splitlines()[-20:]:
+                    print(f"  | {line}")
+                return False, format_name
+            if result.returncode != 0:
+                # 非致命：PDF 仍生成但可能有警告
+                stderr = (result.stderr or b"").decode(errors="ignore")
+                err_lines = [l for l in stderr.splitlines() if "Error" in l]
+                if err_lines:
+                    print(f"[WARN] xelatex 第 {run_num} 次返回码 {result.returncode}（含 {len(err_lines)} 个 Error）")
+                    for line in err_lines[:5]:
+                        print(f"  | {line}")
+            current_digest = auxiliary_digest(latex_dir, tex_file.stem)
+            if current_digest == previous_digest:
+                converged = True
+                break
+            previous_digest = current_digest
+        if converged:
+            print(f"[OK] 交叉引用已收敛，共运行 xelatex {run_num} 次")
+        elif max_runs > 1:
+            print(f"[WARN] 运行 xelatex {max_runs} 次后交叉引用仍有变化，目录或页码可能不准确")
+        if aux_cache_dir is not None:
+            store_auxiliary_files(latex_dir, aux_cache_dir, tex_file.stem)
+        return True, format_name
+
+    def _try_fragment_pdf(
+        self,
+        xelatex: str,
+        latex_dir: Path,
+        tex_file: Path,
+        *,
+        language: str,
+        max_runs: int,
+        aux_cache_dir: Path,
+        format_name: Optional[str],
+        format_cache_dir: Path,
+        fragment_cache_dir: Path,
+    ) -> Tuple[Optional[Path], Optional[str]]:
+        """按分类分片编译 .tex 并合并为一个 PDF。
+
+        输入（源码、图片、起始页码与计数器、XeLaTeX 环境）未变化的分片直接
+        复用缓存；标题页与目录由各分片的 .toc 汇总后单独编译。需要整本编译时
+        返回 (None, format_name)。
+        """
+        if PdfWriter is None:
+            print("[INFO] 未安装 pypdf，无法合并 PDF 分片，按整本编译")
+            return None, format_name
+        split = split_manual(tex_file.read_text(encoding="utf-8"), tex_file.stem)
+        if split is None:
+            print("[INFO] 文档少于两个分类或结构无法识别，按整本编译")
+            return None, format_name
+        reasons = whole_document_requirements(split)
+        if reasons:
+            print(f"[INFO] 存在跨分类引用或索引（{reasons[0]} 等 {len(reasons)} 处），按整本编译")
+            return None, format_name
+
+        engine = font_probe_context(xelatex)
+        cache = FragmentCache(fragment_cache_dir)
+        passes = dict(
+            language=language,
+            max_runs=max_runs,
+            aux_cache_dir=aux_cache_dir,
+            format_cache_dir=format_cache_dir,
+        )
+        state: Dict[str, int] = {}
+        chapter_pdfs: List[Path] = []
+        tocs: List[str] = []
+        compiled = 0
+        for fragment in split.chapters:
+            source = split.chapter_source(fragment, state)
+            key = fragment_key(source, latex_dir, engine)
+            cached = cache.lookup(fragment.stem, key)
+            if cached is not None:
+                chapter_pdfs.append(cached["pdf"])
+                tocs.append(cached["toc"])
+                state = cached["state"]
+                continue
+            print(f"[INFO] 编译 PDF 分片 {fragment.stem}（{fragment.anchor}）")
+            fragment_tex = latex_dir / f"{fragment.stem}.tex"
+            fragment_tex.write_text(source, encoding="utf-8")
+            with stage("xelatex.fragment", language=language, fragment=fragment.stem):
+                succeeded, format_name = self._run_xelatex_passes(
+                    xelatex, latex_dir, fragment_tex, format_name=format_name, **passes
+                )
+            end_state = read_fragment_state(latex_dir / f"{fragment.stem}.log")
+            if not succeeded or end_state is None:
+                print(f"[WARN] PDF 分片 {fragment.stem} 编译失败，改为整本编译")
+                return None, format_name
+            toc_file = latex_dir / f"{fragment.stem}.toc"
+            toc = toc_file.read_text(encoding="utf-8") if toc_file.is_file() else ""
+            fragment_pdf = latex_dir / f"{fragment.stem}.pdf"
+            cache.store(fragment.stem, key, fragment_pdf, toc, end_state)
+            chapter_pdfs.append(fragment_pdf)
+            tocs.append(toc)
+            state = end_state
+            compiled += 1
+
+        # 标题页与目录读取由各分片 .toc 拼接的目录；\nofiles 使其单次运行即可完成。
+        front = split.front
+        front_source = split.front_source()
+        toc_text = "".join(tocs)
+        front_key = fragment_key(f"{front_source}\0{toc_text}", latex_dir, engine)
+        cached = cache.lookup(front.stem, front_key)
+        if cached is not None:
+            front_pdf = cached["pdf"]
+        else:
+            print(f"[INFO] 编译标题页与目录分片 {front.stem}")
+            front_tex = latex_dir / f"{front.stem}.tex"
+            front_tex.write_text(front_source, encoding="utf-8")
+            (latex_dir / f"{front.stem}.toc").write_text(toc_text, encoding="utf-8")
+            with stage("xelatex.fragment", language=language, fragment=front.stem):
+                succeeded, format_name = self._run_xelatex_passes(
+                    xelatex,
+                    latex_dir,
+                    front_tex,
+                    language=language,
+                    max_runs=1,
+                    aux_cache_dir=None,
+                    format_name=format_name,
+                    format_cache_dir=format_cache_dir,
+                )
+            if not succeeded:
+                print("[WARN] 标题页与目录分片编译失败，改为整本编译")
+                return None, format_name
+            front_pdf = latex_dir / f"{front.stem}.pdf"
+            cache.store(front.stem, front_key, front_pdf, "", {})
+            compiled += 1
+
+        merged_pdf = latex_dir / f"{tex_file.stem}.pdf"
+        try:
+            with stage("pdf.merge", language=language):
+                pages = merge_fragments(front_pdf, chapter_pdfs, merged_pdf)
+        except Exception as e:
+            print(f"[WARN] PDF 分片合并失败: {e}，改为整本编译")
+            return None, format_name
+        cache.prune([front.stem, *(fragment.stem for fragment in split.chapters)])
+        print(
+            f"[OK] PDF 分片合并完成: {len(split.chapters) + 1} 个分片"
+            f"（重新编译 {compiled} 个），共 {pages} 页"
+        )
+        return merged_pdf, format_name
+
     def _try_latex_pdf(self, output_pdf: Path, language: str) -> bool:
         """Build PDF via Sphinx LaTeX -> xelatex (sole generation path)."""
         xelatex = self._find_xelatex()
@@ -1818,10 +2142,13 @@ class PDFGeneratorV2:
             return False
 
         pdf_master_path: Optional[Path] = None
+        wrapper_paths: List[Path] = []
         latex_dir: Optional[Path] = None
         try:
             docs_source = self.config_path.parent
-            latex_dir = self.html_dir.parent / "latex"
+            # 每种语言使用独立的 LaTeX 工作目录，多种语言可同时构建
+            latex_root = self.latex_dir or self.html_dir.parent / "latex"
+            latex_dir = latex_root / language
 
             if latex_dir.exists():
                 shutil.rmtree(latex_dir, ignore_errors=True)
@@ -1831,33 +2158,29 @@ class PDFGeneratorV2:
 
             # PDF 使用独立主文档：目录索引的标题进入纸面目录，索引正文不参与生成。
             # 普通 Markdown 文档仍由 toctree 完整纳入正文、目录和书签。
-            master_doc, pdf_master_path = self._create_pdf_master_doc(language)
+            master_doc, pdf_master_path = self._create_pdf_master_doc(
+                language, wrapper_paths
+            )
             if not master_doc:
                 print(f"[ERROR] 无法为 language={language} 解析出有效的 master_doc")
                 return False
 
-            cmd = [
-                sys.executable, "-m", "sphinx.cmd.build",
-                "-b", "latex",
-                "-q",
-                str(docs_source),
-                str(latex_dir),
-            ]
-            env = os.environ.copy()
-            env["SPHINX_LANGUAGE"] = sphinx_lang
-            if master_doc:
-                env["SPHINX_MASTER_DOC"] = master_doc
-
             print(f"[INFO] Sphinx LaTeX 构建 (master_doc={master_doc}, language={sphinx_lang})...")
-            result = subprocess.run(
-                cmd, cwd=str(docs_source), env=env,
-                capture_output=True, text=False, timeout=180,
-            )
-            if result.returncode != 0:
-                stderr = (result.stderr or b"").decode(errors="ignore")
-                stdout = (result.stdout or b"").decode(errors="ignore")
-                print(f"[ERROR] sphinx-build -b latex 失败 (returncode={result.returncode})")
-                for line in (stdout + stderr).splitlines()[-15:]:
+            try:
+                with stage("sphinx.latex", language=language):
+                    run_sphinx(
+                        docs_source,
+                        latex_dir,
+                        "latex",
+                        language=sphinx_lang,
+                        master_doc=master_doc,
+                        exclude_patterns=pdf_temporary_exclude_patterns(language),
+                        capture_output=True,
+                        quiet=True,
+                    )
+            except subprocess.CalledProcessError as e:
+                print(f"[ERROR] sphinx-build -b latex 失败 (returncode={e.returncode})")
+                for line in (e.output or "").splitlines()[-15:]:
                     print(f"  | {line}")
                 return False
 
@@ -1865,32 +2188,40 @@ class PDFGeneratorV2:
             tex_candidates_for_patch = list(latex_dir.glob("*.tex"))
             patch_target = tex_candidates_for_patch[0] if tex_candidates_for_patch else None
 
-            # ---- 预处理：WebP 图像转 JPG（xelatex xdvipdfmx 不支持 WebP）----
-            try:
-                from PIL import Image
-                for webp_file in latex_dir.glob("*.webp"):
-                    jpg_file = webp_file.with_suffix(".jpg")
-                    if not jpg_file.exists() or jpg_file.stat().st_mtime < webp_file.stat().st_mtime:
-                        img = Image.open(webp_file).convert("RGB")
-                        img.thumbnail((1600, 2000), Image.LANCZOS)
-                        img.save(jpg_file, "JPEG", quality=90, optimize=True)
-                        print(f"[INFO] WebP -> JPG: {webp_file.name} -> {jpg_file.name}")
-            except ImportError:
-                print("[WARN] PIL 未安装，跳过 WebP 转 JPG（若有 .webp 图片会失败）")
-            except Exception as e:
-                print(f"[WARN] WebP 转换失败: {e}")
-
-            # ---- 预处理：.tex 中 \sphinxincludegraphics{{xxx}.webp} 改写为 .jpg ----
-            if patch_target:
-                txt = patch_target.read_text(encoding="utf-8")
-                new_txt = re.sub(
-                    r"\\sphinxincludegraphics\{\{([^}]+)\}\.webp\}",
-                    r"\\sphinxincludegraphics{{\1}.jpg}",
-                    txt,
-                )
-                if new_txt != txt:
-                    patch_target.write_text(new_txt, encoding="utf-8")
-                    print("[INFO] .tex 中 .webp 引用已改写为 .jpg")
+            # ---- 预处理：WebP 转换、按打印分辨率缩放并重新压缩图片 ----
+            # xdvipdfmx 不支持 WebP；全分辨率截图会拖慢 xdvipdfmx 并撑大 PDF。
+            if PILImage is None:
+                print("[WARN] PIL 未安装，跳过图片预处理（若有 .webp 图片会失败）")
+            else:
+                try:
+                    image_cache_dir = (
+                        self.image_cache_dir
+                        or latex_root.parent / IMAGE_CACHE_DIRECTORY_NAME
+                    )
+                    with stage("pdf.images", language=language):
+                        image_stats = prepare_latex_images(
+                            latex_dir,
+                            image_cache_dir,
+                            ImageSettings.from_config(getattr(self.scanner, 'config', {})),
+                            jobs=self.image_jobs,
+                        )
+                    if image_stats["images"]:
+                        print(
+                            f"[OK] PDF 图片预处理: {image_stats['images']} 张 "
+                            f"(缓存命中 {image_stats['cached']}，"
+                            f"处理 {image_stats['processed']}，"
+                            f"节省 {image_stats['bytes_saved']} 字节)"
+                        )
+                    # .tex 中 \sphinxincludegraphics{{xxx}.webp} 改写为转换后的文件名
+                    if patch_target and image_stats["renamed"]:
+                        txt = patch_target.read_text(encoding="utf-8")
+                        patch_target.write_text(
+                            rewrite_image_references(txt, image_stats["renamed"]),
+                            encoding="utf-8",
+                        )
+                        print("[INFO] .tex 中 .webp 引用已改写为转换后的图片")
+                except Exception as e:
+                    print(f"[WARN] 图片预处理失败: {e}")
 
             # ---- 预处理：把 tabulary 替换为 tabularx（规避 xeCJK 的列宽测量递归）----
             # Sphinx 默认用 tabulary 排中等宽度表格；在 xeCJK + CJK 字体下，
@@ -1943,37 +2274,62 @@ class PDFGeneratorV2:
                     print("[ERROR] LaTeX 构建未生成 .tex 文件")
                     return False
 
-            for run_num in (1, 2):
-                print(f"[INFO] xelatex 第 {run_num}/2 次运行...")
-                # 注意：不用 -output-directory（会导致 xdvipdfmx 找不到图片）
-                # 而是用 cwd 让 xelatex 在 latex_dir 内运行
-                cmd = [
+            # 导言区（文档类、sphinx.sty、hyperref、xeCJK 等宏包）预编译为格式文件，
+            # 按导言区哈希缓存；导言区未变化时各次运行直接加载，省去宏包加载时间。
+            config = getattr(self.scanner, 'config', {})
+            format_name = None
+            format_cache_dir = (
+                self.format_cache_dir
+                or latex_root.parent / FORMAT_CACHE_DIRECTORY_NAME
+            )
+            if preamble_format_enabled(config):
+                try:
+                    with stage("xelatex.format", language=language):
+                        format_name = prepare_preamble_format(
+                            xelatex, latex_dir, tex_file, format_cache_dir
+                        )
+                except (OSError, subprocess.SubprocessError) as e:
+                    print(f"[WARN] 导言区格式文件生成失败: {e}")
+                if format_name:
+                    print(f"[OK] 使用预编译导言区格式: {format_name}")
+                else:
+                    print("[INFO] 导言区无法预编译，按完整导言区运行 xelatex")
+
+            max_runs = max_runs_from_config(config)
+            aux_cache_dir = latex_root.parent / AUX_CACHE_DIRECTORY_NAME / language
+            final_pdf = None
+            # 增量模式：每个分类单独编译为 PDF 分片，仅重新编译输入变化的分片后合并；
+            # 存在跨分类引用等情况时返回 None，按整本编译。
+            if incremental_pdf_enabled(config):
+                with stage("xelatex.fragments", language=language):
+                    final_pdf, format_name = self._try_fragment_pdf(
+                        xelatex,
+                        latex_dir,
+                        tex_file,
+                        language=language,
+                        max_runs=max_runs,
+                        aux_cache_dir=aux_cache_dir,
+                        format_name=format_name,
+                        format_cache_dir=format_cache_dir,
+                        fragment_cache_dir=(
+                            latex_root.parent / FRAGMENT_CACHE_DIRECTORY_NAME / language
+                        ),
+                    )
+            if final_pdf is None:
+                succeeded, format_name = self._run_xelatex_passes(
                     xelatex,
-                    "-interaction=nonstopmode",
-                    tex_file.name,
-                ]
-                result = subprocess.run(
-                    cmd, cwd=str(latex_dir),
-                    capture_output=True, text=False, timeout=600,
+                    latex_dir,
+                    tex_file,
+                    language=language,
+                    max_runs=max_runs,
+                    aux_cache_dir=aux_cache_dir,
+                    format_name=format_name,
+                    format_cache_dir=format_cache_dir,
                 )
-                pdf_candidate = latex_dir / (tex_file.stem + ".pdf")
-                if not validate_pdf_file(pdf_candidate):
-                    stderr = (result.stderr or b"").decode(errors="ignore")
-                    stdout = (result.stdout or b"").decode(errors="ignore")
-                    print(f"[ERROR] xelatex 第 {run_num} 次未生成有效 PDF")
-                    for line in (stdout + stderr).splitlines()[-20:]:
-                        print(f"  | {line}")
+                if not succeeded:
                     return False
-                if result.returncode != 0:
-                    # 非致命：PDF 仍生成但可能有警告
-                    stderr = (result.stderr or b"").decode(errors="ignore")
-                    err_lines = [l for l in stderr.splitlines() if "Error" in l]
-                    if err_lines:
-                        print(f"[WARN] xelatex 第 {run_num} 次返回码 {result.returncode}（含 {len(err_lines)} 个 Error）")
-                        for line in err_lines[:5]:
-                            print(f"  | {line}")
-
-            final_pdf = latex_dir / (tex_file.stem + ".pdf")
+                final_pdf = latex_dir / (tex_file.stem + ".pdf")
+
             if not validate_pdf_file(final_pdf):
                 print("[ERROR] XeLaTeX 最终输出不是完整 PDF，拒绝复制到发布目录")
                 return False
@@ -1996,9 +2352,8 @@ class PDFGeneratorV2:
         finally:
             if pdf_master_path is not None:
                 pdf_master_path.unlink(missing_ok=True)
-            for wrapper_path in getattr(self, "_pdf_wrapper_paths", []):
+            for wrapper_path in wrapper_paths:
                 wrapper_path.unlink(missing_ok=True)
-            self._pdf_wrapper_paths = []
             if (
                 latex_dir is not None
                 and latex_dir.exists()
@@ -2121,8 +2476,11 @@ def main():
                        help='文档语言 (默认: zh)')
     parser.add_argument('--both', action='store_true',
                        help='同时生成中英文版本')
+    parser.add_argument('--backend', type=str, default=DEFAULT_PDF_BACKEND,
+                       choices=sorted(PDF_BACKENDS),
+                       help='PDF 渲染后端 (默认: latex；html 为显式启用的合并 HTML 打印路线)')
     parser.add_argument('--keep-temp', action='store_true',
-                       help='保留临时目录以便调试（输出merged_*.html路径）')
+                       help='保留临时目录以便调试（html 后端输出merged_*.html路径）')
     parser.add_argument('--browser', type=str, default='',
                        help='指定 Chrome/Edge 浏览器可执行文件路径')
     
@@ -2137,7 +2495,13 @@ def main():
         sys.exit(1)
     
     # 创建PDF生成器
-    generator = PDFGeneratorV2(html_dir, output_dir, keep_temp=args.keep_temp, browser_path=(args.browser or None))
+    generator = PDFGeneratorV2(
+        html_dir,
+        output_dir,
+        keep_temp=args.keep_temp,
+        browser_path=(args.browser or None),
+        backend=args.backend,
+    )
     
     if args.both:
         # 生成中英文两个版本
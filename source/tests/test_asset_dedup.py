@@ -0,0 +1,109 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.asset_dedup import ASSETS_DIRECTORY_NAME, deduplicate_assets
+
+
+THEME_CSS = "@font-face { src: url(../fonts/lato.woff2?v=1) format('woff2'); }\n"
+LOCATING_JS = "var s = document.currentScript.src;\n"
+PAGE = (
+    '<link rel="stylesheet" href="{prefix}_static{lang}/css/theme.css?v=1" />'
+    '<script src="{prefix}_static{lang}/jquery.js?v=2"></script>'
+    '<script src="{prefix}_static{lang}/version_menu.js"></script>'
+    '<a href="{prefix}other.html">other</a>\n'
+)
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+class AssetDedupTests(unittest.TestCase):
+    def _site(self, root: Path) -> Path:
+        for version in ("latest", "v1.0"):
+            for lang in ("", "_en"):
+                static = root / version / f"_static{lang}"
+                _write(static / "css" / "theme.css", THEME_CSS)
+                _write(static / "fonts" / "lato.woff2", "font")
+                _write(static / "jquery.js", "jQuery();\n")
+                _write(static / "version_menu.js", LOCATING_JS)
+                _write(static / "documentation_options.js", f"VERSION='{version}'\n")
+                _write(
+                    root / version / "guide" / f"page{lang}.html",
+                    PAGE.format(prefix="../", lang=lang),
+                )
+        return root
+
+    def test_moves_shared_scripts_and_styles_and_links_the_rest(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._site(Path(temp_dir))
+
+            stats = deduplicate_assets(root)
+
+            assets = root / ASSETS_DIRECTORY_NAME
+            page = (root / "latest" / "guide" / "page_en.html").read_text(encoding="utf-8")
+            shared_css = next(assets.glob("theme.*.css"))
+            shared_font = next(assets.glob("lato.*.woff2"))
+            shared_jquery = next(assets.glob("jquery.*.js"))
+            self.assertIn(f'href="../../_assets/{shared_css.name}"', page)
+            self.assertIn(f'src="../../_assets/{shared_jquery.name}"', page)
+            self.assertIn('src="../_static_en/version_menu.js"', page)
+            self.assertIn('href="../other.html"', page)
+            self.assertIn(f"url({shared_font.name}?v=1)", shared_css.read_text(encoding="utf-8"))
+
+            self.assertFalse((root / "v1.0" / "_static" / "jquery.js").exists())
+            self.assertFalse((root / "v1.0" / "_static" / "css" / "theme.css").exists())
+            # Self-locating scripts and fonts stay in place, sharing one inode.
+            for version in ("latest", "v1.0"):
+                for lang in ("", "_en"):
+                    static = root / version / f"_static{lang}"
+                    self.assertTrue(os.path.samefile(static / "fonts" / "lato.woff2", shared_font))
+                    self.assertEqual(
+                        (static / "version_menu.js").read_text(encoding="utf-8"), LOCATING_JS
+                    )
+                    # Not loaded by any page, so it is only linked.
+                    self.assertTrue((static / "documentation_options.js").is_file())
+            self.assertEqual(stats["relocated"], 8)
+            self.assertEqual(stats["pages"], 4)
+            self.assertGreater(stats["bytes_saved"], 0)
+
+    def test_rerun_keeps_the_shared_copies_the_pages_use(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._site(Path(temp_dir))
+            deduplicate_assets(root)
+            shared = sorted(path.name for path in (root / ASSETS_DIRECTORY_NAME).iterdir())
+
+            stats = deduplicate_assets(root)
+
+            self.assertEqual(
+                sorted(path.name for path in (root / ASSETS_DIRECTORY_NAME).iterdir()),
+                shared,
+            )
+            self.assertEqual(stats["pages"], 0)
+
+    def test_stylesheet_with_differing_url_targets_is_linked_in_place(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._site(Path(temp_dir))
+            _write(root / "v1.0" / "_static" / "fonts" / "lato.woff2", "other font")
+
+            deduplicate_assets(root)
+
+            page = (root / "v1.0" / "guide" / "page.html").read_text(encoding="utf-8")
+            self.assertIn('href="../_static/css/theme.css?v=1"', page)
+            self.assertEqual(
+                (root / "v1.0" / "_static" / "css" / "theme.css").read_text(encoding="utf-8"),
+                THEME_CSS,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
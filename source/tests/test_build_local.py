@@ -12,6 +12,7 @@ if str(SOURCE_DIR) not in sys.path:
 from build_local import (
     cleanup_generated_source_files,
     cleanup_temporary_build_files,
+    restore_sync_manifest,
     write_local_version_config,
 )
 
@@ -47,10 +48,9 @@ class BuildLocalCleanupTests(unittest.TestCase):
             build_dir = root / "build"
             static_dir = build_dir / "_static"
             static_dir.mkdir(parents=True)
-            (static_dir / "version_menu.js").write_text(
-                "function getEmbeddedVersionConfig() { return null; }",
-                encoding="utf-8",
-            )
+            (build_dir / "_static_en").mkdir()
+            bundle = "(function(){function getEmbeddedVersionConfig(){return window.DOCS_VERSION_CONFIG||null;}})();"
+            (static_dir / "docs.0123456789abcdef.js").write_text(bundle, encoding="utf-8")
 
             write_local_version_config(build_dir, root)
 
@@ -62,10 +62,17 @@ class BuildLocalCleanupTests(unittest.TestCase):
                 ),
                 versions,
             )
-            self.assertIn(
-                '"default_version": "stable"',
-                (static_dir / "version_menu.js").read_text(encoding="utf-8"),
+            # Hashed bundles keep their content; the config lives next to them.
+            self.assertEqual(
+                (static_dir / "docs.0123456789abcdef.js").read_text(encoding="utf-8"),
+                bundle,
             )
+            for directory in (static_dir, build_dir / "_static_en"):
+                script = (directory / "version_config.js").read_text(encoding="utf-8")
+                self.assertTrue(script.startswith("window.DOCS_VERSION_CONFIG = "))
+                self.assertEqual(
+                    json.loads(script.split("=", 1)[1].strip().rstrip(";")), versions
+                )
 
     def test_cleanup_removes_generated_source_files_only(self):
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -101,6 +108,29 @@ class BuildLocalCleanupTests(unittest.TestCase):
             )
             self.assertEqual(len(removed), 3)
 
+    def test_cleanup_keeps_manifest_for_the_next_sync(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_root = Path(temp_dir) / "source"
+            (source_root / "guide").mkdir(parents=True)
+            (source_root / "guide" / "README.md").write_text(
+                "# Guide\n", encoding="utf-8"
+            )
+            manifest_text = '{"files": ["guide/README.md"]}'
+            manifest = source_root / ".doc_generator_manifest.json"
+            manifest.write_text(manifest_text, encoding="utf-8")
+            backup = Path(temp_dir) / "_build" / "manifest.json"
+
+            removed = cleanup_generated_source_files(source_root, backup)
+
+            self.assertIn(manifest, removed)
+            self.assertFalse(manifest.exists())
+            self.assertEqual(backup.read_text(encoding="utf-8"), manifest_text)
+
+            self.assertTrue(restore_sync_manifest(source_root, backup))
+            self.assertEqual(manifest.read_text(encoding="utf-8"), manifest_text)
+            self.assertFalse(backup.exists())
+            self.assertFalse(restore_sync_manifest(source_root, backup))
+
     def test_cleanup_preserves_final_html_and_pdf(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             build_root = Path(temp_dir) / "_build"
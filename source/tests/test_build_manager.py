@@ -1,14 +1,28 @@
+import io
+import subprocess
 import sys
 import tempfile
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
+from unittest.mock import patch
 
 
 SOURCE_DIR = Path(__file__).resolve().parents[1]
 if str(SOURCE_DIR) not in sys.path:
     sys.path.insert(0, str(SOURCE_DIR))
 
-from build_manager import BuildManager
+from build_manager import BuildManager, VersionConfig
+
+
+def _fake_build(manager, version_config, worktree_path, cache_key=None):
+    print(f"building {version_config.name} in {worktree_path.name}")
+    print(f"inner jobs {manager.inner_jobs}")
+    subprocess.run(
+        [sys.executable, "-c", f"print('child output {version_config.name}')"],
+        check=True,
+    )
+    return version_config.name != "broken"
 
 
 class BuildManagerLanguageRewriteTests(unittest.TestCase):
@@ -52,5 +66,48 @@ class BuildManagerLanguageRewriteTests(unittest.TestCase):
         self.assertIn('href="guide/index_zh.html"', rewritten)
 
 
+class BuildManagerParallelTests(unittest.TestCase):
+    def test_parallel_versions_report_isolated_logs_to_the_parent(self):
+        versions = [
+            VersionConfig({
+                "name": name,
+                "display_name": name,
+                "branch": branch,
+                "url_path": name,
+            })
+            for name, branch in (
+                ("latest", "main"),
+                ("lts", "main"),
+                ("v1", "release/v1"),
+                ("broken", "release/v0"),
+                ("frozen", "release/old"),
+            )
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = BuildManager.__new__(BuildManager)
+            manager.build_root = Path(temp_dir)
+
+            def prepare(version_config, use_cache=True):
+                if version_config.name == "frozen":
+                    return "cached", None, "key"
+                return "build", Path(temp_dir) / version_config.branch, None
+
+            output = io.StringIO()
+            with patch.object(BuildManager, "_prepare_version", side_effect=prepare), \
+                    patch.object(BuildManager, "_build_prepared_version", _fake_build), \
+                    redirect_stdout(output):
+                succeeded = manager._build_versions_parallel(versions, True, 3)
+
+            log = output.getvalue()
+            self.assertEqual(succeeded, 4)
+            self.assertIn("[latest] building latest in main", log)
+            self.assertIn("[lts] child output lts", log)
+            self.assertIn("[v1] child output v1", log)
+            self.assertIn("[v1] inner jobs 1", log)
+            self.assertIn("[broken] building broken in v0", log)
+            self.assertLess(log.index("[latest]"), log.index("[lts]"))
+            self.assertTrue((Path(temp_dir) / "scratch" / "v1" / "build.log").is_file())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,110 @@
+import json
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.build_report import (
+    adopt_spans,
+    reset_build_report,
+    stage,
+    traced_call,
+    write_build_report,
+)
+
+
+def _worker_stage(language):
+    with stage("html.rewrite", language=language):
+        return language.upper()
+
+
+class BuildReportTests(unittest.TestCase):
+    def setUp(self):
+        reset_build_report()
+        self.addCleanup(reset_build_report)
+
+    def test_nested_and_worker_stages_are_reported(self):
+        with stage("html", languages="zh,en"):
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                futures = [
+                    executor.submit(
+                        traced_call,
+                        "sphinx.html",
+                        {"language": language},
+                        _worker_stage,
+                        language,
+                    )
+                    for language in ("zh", "en")
+                ]
+                for future in futures:
+                    result, spans = future.result()
+                    adopt_spans(spans)
+        with self.assertRaises(RuntimeError):
+            with stage("pdf", language="zh"):
+                raise RuntimeError("xelatex failed")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report_path, trace_path = write_build_report(
+                Path(temp_dir), mode="local"
+            )
+            report = json.loads(report_path.read_text(encoding="utf-8"))
+            trace = json.loads(trace_path.read_text(encoding="utf-8"))
+
+        self.assertEqual(result, "EN")
+        self.assertEqual(report["mode"], "local")
+        self.assertEqual(
+            [item["name"] for item in report["stages"]], ["html", "pdf"]
+        )
+        html = report["stages"][0]
+        self.assertEqual(
+            sorted(item["attributes"]["language"] for item in html["stages"]),
+            ["en", "zh"],
+        )
+        self.assertEqual(html["stages"][0]["stages"][0]["name"], "html.rewrite")
+        self.assertTrue(report["stages"][1]["failed"])
+        self.assertEqual(report["summary"]["sphinx.html"]["count"], 2)
+        self.assertGreaterEqual(report["wall_seconds"], html["wall_seconds"])
+
+        durations = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual(len(durations), 6)
+        self.assertGreaterEqual(
+            len({event["pid"] for event in durations}), 2
+        )
+        self.assertTrue(all(event["ts"] >= 0 for event in durations))
+
+    def test_summary_cpu_time_is_not_counted_twice(self):
+        with stage("html"):
+            with stage("sphinx.html"):
+                deadline = time.process_time() + 0.2
+                while time.process_time() < deadline:
+                    pass
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report_path, _ = write_build_report(Path(temp_dir))
+            report = json.loads(report_path.read_text(encoding="utf-8"))
+
+        summary = report["summary"]
+        self.assertGreaterEqual(summary["sphinx.html"]["self_cpu_seconds"], 0.2)
+        self.assertLess(summary["html"]["self_cpu_seconds"], 0.1)
+        self.assertAlmostEqual(
+            sum(item["self_cpu_seconds"] for item in summary.values()),
+            report["cpu_seconds"],
+            places=3,
+        )
+        self.assertLess(report["cpu_seconds"], report["stages"][0]["cpu_seconds"] + 0.01)
+
+    def test_nothing_recorded_writes_no_report(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertIsNone(write_build_report(Path(temp_dir)))
+            self.assertEqual(list(Path(temp_dir).iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
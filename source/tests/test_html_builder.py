@@ -12,6 +12,7 @@ if str(SOURCE_DIR) not in sys.path:
 from utils.html_builder import (
     _prepare_english_reserved_index,
     build_html_site,
+    language_doctree_dir,
     language_exclude_patterns,
     write_site_entry,
 )
@@ -79,11 +80,8 @@ class HtmlBuilderTests(unittest.TestCase):
             )
             self.assertTrue((output / "_static_en").is_dir())
             self.assertTrue((output / "search_en.html").is_file())
-            self.assertTrue((output / "searchindex_en.js").is_file())
-            self.assertIn(
-                'Search.loadIndex("searchindex_en.js")',
-                (output / "search_en.html").read_text(encoding="utf-8"),
-            )
+            self.assertFalse((output / "searchindex.js").exists())
+            self.assertFalse((output / "searchindex_en.js").exists())
 
     def test_site_entry_redirects_to_the_configured_default_home(self):
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -112,7 +110,7 @@ class HtmlBuilderTests(unittest.TestCase):
                 '{"pdfFileName":"SDK_Docs_EN.pdf"}', encoding="utf-8"
             )
 
-            def fake_build(_source, language_output, *_args):
+            def fake_build(_source, language_output, *_args, **_kwargs):
                 (language_output / "_static").mkdir(parents=True)
                 (language_output / "_static" / "basic.css").write_text(
                     "body {}", encoding="utf-8"
@@ -132,6 +130,215 @@ class HtmlBuilderTests(unittest.TestCase):
             self.assertTrue((output / "_static" / "basic.css").is_file())
             self.assertFalse((root / ".html_preserved").exists())
 
+    def test_publish_links_preserved_pdfs_and_moves_temporary_trees(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            output = root / "html"
+            source.mkdir()
+            static = output / "_static"
+            static.mkdir(parents=True)
+            (static / "SDK_Docs_ZH.pdf").write_bytes(b"%PDF-1.7\nzh")
+            (output / "stale.html").write_text("old", encoding="utf-8")
+            pdf_inode = (static / "SDK_Docs_ZH.pdf").stat().st_ino
+
+            def fake_build(_source, language_output, *_args, **_kwargs):
+                (language_output / "_static").mkdir(parents=True)
+                (language_output / "index.html").write_text(
+                    f"<h1>{language_output.name}</h1>", encoding="utf-8"
+                )
+
+            with patch("utils.html_builder._build_one_language", fake_build):
+                build_html_site(
+                    source, output, {"generation": {}}, ("zh", "en"), "zh"
+                )
+
+            published_pdf = output / "_static" / "SDK_Docs_ZH.pdf"
+            self.assertEqual(published_pdf.stat().st_ino, pdf_inode)
+            self.assertFalse((output / "stale.html").exists())
+            self.assertIn("_zh", (output / "index.html").read_text(encoding="utf-8"))
+            self.assertTrue((output / "index_en.html").is_file())
+            self.assertEqual(
+                sorted(path.name for path in root.iterdir()), ["html", "source"]
+            )
+
+    def test_post_build_writes_into_staging_before_publish(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            output = root / "html"
+            source.mkdir()
+            output.mkdir()
+            (output / "index.html").write_text("old", encoding="utf-8")
+            seen = {}
+
+            def fake_build(_source, language_output, *_args, **_kwargs):
+                (language_output / "_static").mkdir(parents=True)
+                (language_output / "index.html").write_text("new", encoding="utf-8")
+
+            def post_build(staging_dir, language_roots):
+                seen["roots"] = language_roots
+                seen["staged"] = (staging_dir / "index.html").read_text(encoding="utf-8")
+                seen["live"] = (output / "index.html").read_text(encoding="utf-8")
+                (staging_dir / "_static" / "version_config.js").write_text(
+                    "config", encoding="utf-8"
+                )
+
+            with patch("utils.html_builder._build_one_language", fake_build):
+                roots = build_html_site(
+                    source, output, {"generation": {}}, ("en",), "en",
+                    post_build=post_build,
+                )
+
+            self.assertEqual(seen, {"roots": roots, "staged": "new", "live": "old"})
+            self.assertTrue((output / "_static" / "version_config.js").is_file())
+
+    def test_doctree_cache_is_per_language_and_invalidated_by_config(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            output = root / "_build" / "html"
+            cache = root / "_build" / "doctrees"
+            source.mkdir()
+            (source / "config.yaml").write_text("project: {}\n", encoding="utf-8")
+            (source / "conf.py").write_text("project = 'docs'\n", encoding="utf-8")
+            used = {}
+
+            def fake_build(_source, language_output, _generation, language,
+                           *_args, doctree_dir=None, **_kwargs):
+                used[language] = doctree_dir
+                doctree_dir.mkdir(parents=True, exist_ok=True)
+                (doctree_dir / "environment.pickle").write_bytes(b"env")
+                (language_output / "_static").mkdir(parents=True)
+                (language_output / "index.html").write_text("ok", encoding="utf-8")
+
+            with patch("utils.html_builder._build_one_language", fake_build):
+                build_html_site(
+                    source, output, {"generation": {}}, ("zh", "en"), "zh",
+                    doctree_dir=cache,
+                )
+                first = dict(used)
+                build_html_site(
+                    source, output, {"generation": {}}, ("zh", "en"), "zh",
+                    doctree_dir=cache,
+                )
+
+            self.assertEqual(used, first)
+            self.assertNotEqual(first["zh"], first["en"])
+            self.assertTrue(first["zh"].name.startswith("zh-"))
+            self.assertTrue((first["zh"] / "environment.pickle").is_file())
+            self.assertNotIn(output, first["zh"].parents)
+
+            (source / "conf.py").write_text("project = 'changed'\n", encoding="utf-8")
+            refreshed = language_doctree_dir(cache, source, "zh")
+            self.assertNotEqual(refreshed, first["zh"])
+            self.assertFalse(first["zh"].exists())
+            self.assertTrue(first["en"].exists())
+
+    def test_incremental_rebuild_reuses_persistent_language_output(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            output = root / "_build" / "html"
+            language_root = root / "_build" / "languages"
+            source.mkdir()
+            built = []
+
+            def fake_build(_source, language_output, _generation, language,
+                           *_args, **_kwargs):
+                built.append(language)
+                (language_output / "_static").mkdir(parents=True, exist_ok=True)
+                (language_output / "_static" / "page.js").write_text(
+                    f"// {language} {len(built)}", encoding="utf-8"
+                )
+                (language_output / "index.html").write_text(
+                    f'<script src="_static/page.js"></script>{len(built)}',
+                    encoding="utf-8",
+                )
+
+            with patch("utils.html_builder._build_one_language", fake_build):
+                build_html_site(
+                    source, output, {"generation": {}}, ("zh", "en"), "zh",
+                    language_output_root=language_root,
+                )
+                built.clear()
+                build_html_site(
+                    source, output, {"generation": {}}, ("zh", "en"), "zh",
+                    language_output_root=language_root,
+                    rebuild_languages={"en"},
+                )
+
+            self.assertEqual(built, ["en"])
+            (english_output,) = language_root.glob("en-*")
+            self.assertEqual(
+                (english_output / "index.html").read_text(encoding="utf-8"),
+                '<script src="_static/page.js"></script>1',
+            )
+            self.assertIn(
+                "_static_en/page.js",
+                (output / "index_en.html").read_text(encoding="utf-8"),
+            )
+            self.assertIn(
+                "zh 1", (output / "_static" / "page.js").read_text(encoding="utf-8")
+            )
+            self.assertEqual(
+                sorted(path.name for path in output.parent.iterdir()),
+                ["html", "languages"],
+            )
+
+            # A conf.py change starts the language's output over.
+            (source / "conf.py").write_text("project = 'changed'\n", encoding="utf-8")
+            built.clear()
+            with patch("utils.html_builder._build_one_language", fake_build):
+                build_html_site(
+                    source, output, {"generation": {}}, ("zh", "en"), "zh",
+                    language_output_root=language_root,
+                    rebuild_languages={"en"},
+                )
+            self.assertEqual(sorted(built), ["en", "zh"])
+            self.assertFalse(english_output.exists())
+
+    def test_unchanged_pages_are_linked_from_the_published_site(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            output = root / "_build" / "html"
+            language_root = root / "_build" / "languages"
+            source.mkdir()
+            rewrites = ["index.html", "guide.html"]
+
+            def fake_build(_source, language_output, *_args, **_kwargs):
+                # Like Sphinx, only write the pages that are out of date.
+                (language_output / "_static").mkdir(parents=True, exist_ok=True)
+                for name in rewrites:
+                    (language_output / name).write_text(
+                        f"{name} {len(rewrites)}", encoding="utf-8"
+                    )
+
+            def build():
+                with patch("utils.html_builder._build_one_language", fake_build):
+                    build_html_site(
+                        source, output, {"generation": {}}, ("en",), "en",
+                        language_output_root=language_root,
+                    )
+
+            build()
+            previous_index = (output / "index.html").stat().st_ino
+            previous_guide = (output / "guide.html").stat().st_ino
+            rewrites[:] = ["guide.html"]
+            build()
+
+            self.assertEqual((output / "index.html").stat().st_ino, previous_index)
+            self.assertNotEqual((output / "guide.html").stat().st_ino, previous_guide)
+            self.assertEqual(
+                (output / "guide.html").read_text(encoding="utf-8"), "guide.html 1"
+            )
+            # The published site never shares an inode with Sphinx's output.
+            (raw_output,) = language_root.glob("en-*")
+            self.assertNotEqual(
+                (raw_output / "index.html").stat().st_ino, previous_index
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
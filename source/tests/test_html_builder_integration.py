@@ -3,6 +3,7 @@ import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 import yaml
 
@@ -16,6 +17,12 @@ from utils.html_builder import build_html_site, write_site_entry
 
 class HtmlBuilderIntegrationTests(unittest.TestCase):
     def test_real_sphinx_build_keeps_language_navigation_and_assets_isolated(self):
+        self._assert_isolated_bilingual_build()
+
+    def test_parallel_language_builds_match_sequential_output(self):
+        self._assert_isolated_bilingual_build(jobs=2)
+
+    def _assert_isolated_bilingual_build(self, jobs=None):
         with tempfile.TemporaryDirectory() as temp_dir:
             root = Path(temp_dir)
             source = root / "source"
@@ -94,9 +101,15 @@ guide/README
                 "# English Guide\n\nEnglish body.\n", encoding="utf-8"
             )
 
-            roots = build_html_site(
-                source, output, config, ("zh", "en"), "zh"
-            )
+            # conf.py's builder writes the isolated names itself, so the
+            # HTML rewrite fallback must not run for this tree.
+            with patch(
+                "utils.html_builder._rewrite_nondefault_html",
+                side_effect=AssertionError("HTML was post-processed"),
+            ):
+                roots = build_html_site(
+                    source, output, config, ("zh", "en"), "zh", jobs=jobs
+                )
             write_site_entry(output, roots["zh"], "Bilingual Test", "zh")
 
             chinese_page = (output / "guide" / "README_zh.html").read_text(
@@ -112,11 +125,23 @@ guide/README
             self.assertIn("English Guide", english_page)
             self.assertNotIn("中文指南</a>", english_page)
             self.assertIn("../_static_en/", english_page)
+            self.assertIn('href="../_static_en/pygments.css', english_page)
+            self.assertIn('src="../_static_en/doctools.js', english_page)
+            self.assertNotIn('"../_static/pygments.css', english_page)
             self.assertIn('targetUrl = "README_zh.html"', english_page)
             self.assertIn('targetUrl = "README.html"', chinese_page)
             self.assertTrue((output / "_static_en").is_dir())
             self.assertTrue((output / "search_en.html").is_file())
-            self.assertTrue((output / "searchindex_en.js").is_file())
+            self.assertEqual(list(output.glob("searchindex*.js")), [])
+            self.assertTrue((output / "_static_en" / "jquery.js").is_file())
+            self.assertIn(
+                'data-index="_search/en/manifest.json"',
+                (output / "search_en.html").read_text(encoding="utf-8"),
+            )
+            self.assertTrue((output / "_search" / "en" / "manifest.json").is_file())
+            self.assertTrue((output / "_search" / "zh" / "manifest.json").is_file())
+            self.assertTrue((output / "_static_en" / "docs_search_worker.js").is_file())
+            self.assertIn('href="../search_en.html"', english_page)
             language_switch = (output / "_static" / "language_switch.js").read_text(
                 encoding="utf-8"
             )
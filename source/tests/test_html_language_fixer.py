@@ -0,0 +1,80 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from benchmarks.bench_html_language_fixer import (
+    generate_site,
+    legacy_fix_html_language,
+    sample_page,
+    trees_match,
+)
+from utils.html_language_fixer import fix_html_language, fix_html_tree
+
+
+EDGE_CASES = (
+    '<html lang="zh-CN"><a href="a_zh.html">x</a><a href="a.html">y</a>',
+    '<html lang="en"><a href="guide/index.html">x</a><a href="b_zh.html#top">y</a>',
+    '<a href="x/index_zh_zh.html">a</a><a href="a_zh.html#b_zh.html#c">b</a>',
+    '<a href="a_zh.html#x_zh.html">a</a><a href="p.html?q=1.html">b</a>',
+    '<a href="_zh.html">a</a><a href=".html">b</a><a href="">c</a>',
+    '<a href="https://example.com/page.html">a</a><img src="a_zh.html">',
+    '<input placeholder="搜索文档" aria-label="页脚">'
+    '<input placeholder="Search documentation" aria-label="Footer">',
+    '<a href="guide/start_zh.html">Chinese</a><!-- docs-cross-language-link -->'
+    '<a href="guide/start.html">English</a><!-- docs-cross-language-link -->',
+    '<p>unterminated <a href="tail_zh.html#end',
+    '<p>unterminated <a href="tail.html',
+)
+
+
+class HtmlLanguageFixerTests(unittest.TestCase):
+    def test_single_scan_matches_the_per_rule_implementation(self):
+        samples = list(EDGE_CASES) + [
+            sample_page(index, language)
+            for index in range(3)
+            for language in ("zh", "en")
+        ]
+        for sample in samples:
+            for language in ("zh", "en"):
+                with self.subTest(sample=sample[:60], language=language):
+                    self.assertEqual(
+                        fix_html_language(sample, language),
+                        legacy_fix_html_language(sample, language),
+                    )
+
+    def test_tree_renames_chinese_pages_and_skips_hidden_directories(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "zh"
+            generate_site(source, "zh", 3)
+            (source / "index_zh.html").write_text("<p></p>", encoding="utf-8")
+
+            count = fix_html_tree(source, root / "out", "zh", jobs=1)
+
+            self.assertEqual(count, 4)
+            self.assertTrue((root / "out" / "section_0" / "page_0_zh.html").is_file())
+            self.assertTrue((root / "out" / "index_zh.html").is_file())
+            self.assertTrue((root / "out" / "_static" / "theme.css").is_file())
+            self.assertFalse((root / "out" / ".doctrees").exists())
+
+    def test_parallel_tree_rewrite_matches_serial_output(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            generate_site(root / "en", "en", 12)
+
+            fix_html_tree(root / "en", root / "serial", "en", jobs=1)
+            with patch("utils.html_language_fixer.PARALLEL_MIN_FILES", 1):
+                fix_html_tree(root / "en", root / "parallel", "en", jobs=2)
+
+            self.assertTrue(trees_match(root / "serial", root / "parallel"))
+
+
+if __name__ == "__main__":
+    unittest.main()
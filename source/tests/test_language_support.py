@@ -1,3 +1,4 @@
+import json
 import sys
 import tempfile
 import unittest
@@ -344,6 +345,105 @@ class LanguageSupportTests(unittest.TestCase):
                 "![Home](figures/home.png)\n",
             )
 
+    def test_resync_keeps_unchanged_files_and_removes_stale_ones(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            projects = root / "projects"
+            output = root / "source"
+            guide = projects / "guide"
+            guide.mkdir(parents=True)
+            (projects / "README_zh.md").write_text("# 首页\n", encoding="utf-8")
+            (projects / "README.md").write_text("# Home\n", encoding="utf-8")
+            (guide / "start_zh.md").write_text(
+                "# 开始\n\n[English](start.md)\n", encoding="utf-8"
+            )
+            (guide / "start.md").write_text("# Start\n", encoding="utf-8")
+            (guide / "old_zh.md").write_text("# 旧文档\n", encoding="utf-8")
+
+            def synchronize():
+                processor = FileProcessor(
+                    str(projects), str(output), dict(GENERATION_CONFIG)
+                )
+                processor.load_manifest()
+                with processor.deferred_writes():
+                    processor.sync_document_tree()
+                    IndexGenerator(str(output), processor).generate_all_indexes(
+                        {}, {}, {"title": "测试文档"}
+                    )
+                return processor.finalize_manifest()
+
+            synchronize()
+            generated = sorted(
+                path for path in output.rglob("*") if path.is_file()
+            )
+            snapshot = {
+                path: (path.read_bytes(), path.stat().st_mtime_ns)
+                for path in generated
+            }
+            manifest = json.loads(
+                (output / FileProcessor.MANIFEST_NAME).read_text(encoding="utf-8")
+            )
+            self.assertEqual(
+                set(manifest["entries"]["guide/start.md"]),
+                {"size", "mtime_ns", "sha256", "source"},
+            )
+            self.assertEqual(
+                set(manifest["entries"]["guide/start_zh.md"]),
+                {"size", "mtime_ns", "sha256"},
+            )
+            self.assertIn("guide/start_zh.md", manifest["files"])
+
+            stats = synchronize()
+            self.assertEqual(stats["written"], 0)
+            for path, (content, mtime_ns) in snapshot.items():
+                self.assertEqual(path.read_bytes(), content, path)
+                self.assertEqual(path.stat().st_mtime_ns, mtime_ns, path)
+
+            (guide / "old_zh.md").unlink()
+            (guide / "start.md").write_text("# Start again\n", encoding="utf-8")
+            stats = synchronize()
+
+            self.assertFalse((output / "guide" / "old_zh.md").exists())
+            self.assertEqual(stats["removed"], 1)
+            self.assertEqual(
+                (output / "guide" / "start.md").read_text(encoding="utf-8"),
+                "# Start again\n",
+            )
+            rewritten_page = output / "guide" / "start_zh.md"
+            self.assertEqual(
+                rewritten_page.stat().st_mtime_ns, snapshot[rewritten_page][1]
+            )
+
+    def test_hardlink_mode_links_assets_and_copies_documents(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            projects = root / "projects"
+            output = root / "source"
+            projects.mkdir()
+            (projects / "README_zh.md").write_text(
+                "# 首页\n\n![图](diagram.png)\n", encoding="utf-8"
+            )
+            (projects / "diagram.png").write_bytes(b"image")
+            config = dict(
+                GENERATION_CONFIG,
+                sync_extensions=[".md", ".png"],
+                sync_link_mode="hardlink",
+            )
+
+            processor = FileProcessor(str(projects), str(output), config)
+            processor.sync_document_tree()
+
+            self.assertTrue(
+                (output / "diagram.png").samefile(projects / "diagram.png")
+            )
+            self.assertFalse(
+                (output / "README_zh.md").samefile(projects / "README_zh.md")
+            )
+            with self.assertRaisesRegex(ValueError, "sync_link_mode"):
+                FileProcessor(
+                    str(projects), str(output), dict(config, sync_link_mode="symlink")
+                )
+
     def test_repository_readme_missing_image_fails(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             repository = Path(temp_dir)
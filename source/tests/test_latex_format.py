@@ -0,0 +1,173 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+import pdf_generator_enhanced_v2
+from pdf_generator_enhanced_v2 import PDFGeneratorV2
+from utils.latex_format import (
+    DUMP_MARKER,
+    FORMAT_CACHE_DIRECTORY_NAME,
+    insert_dump_marker,
+    prepare_preamble_format,
+)
+
+
+TEX = r"""%% Generated by Sphinx.
+\def\sphinxdocclass{report}
+\documentclass[a4paper,11pt]{sphinxmanual}
+\usepackage{sphinx}
+\usepackage{xeCJK}
+%s
+\title{SDK Docs}
+\date{Oct 17, 2026}
+\begin{document}
+body
+\end{document}
+"""
+
+# Records every call; -ini dumps a format, -fmt runs fail when the
+# environment says the format is incompatible.
+FAKE_XELATEX = """#!{python}
+import os
+import sys
+from pathlib import Path
+
+with open({calls!r}, "a") as calls:
+    calls.write(" ".join(sys.argv[1:]) + "\\n")
+if "--version" in sys.argv:
+    print("XeTeX 3.14 (fake)")
+    sys.exit(0)
+if "-ini" in sys.argv:
+    job = next(arg for arg in sys.argv if arg.startswith("-jobname="))[9:]
+    Path(job + ".fmt").write_text(Path(sys.argv[-1]).read_text())
+    sys.exit(0)
+if any(arg.startswith("-fmt=") for arg in sys.argv) and os.environ.get("FAKE_FORMAT_BROKEN"):
+    sys.exit(1)
+tex = Path(sys.argv[-1])
+tex.with_suffix(".aux").write_text("refs")
+tex.with_suffix(".pdf").write_bytes(
+    b"%PDF-1.5\\n" + b"0" * 2048 + b"\\nstartxref\\n0\\n%%EOF\\n"
+)
+"""
+
+
+def _fake_xelatex(root: Path) -> Path:
+    xelatex = root / "xelatex"
+    xelatex.write_text(
+        FAKE_XELATEX.format(python=sys.executable, calls=str(root / "calls.txt")),
+        encoding="utf-8",
+    )
+    xelatex.chmod(0o755)
+    return xelatex
+
+
+def _calls(root: Path):
+    calls = root / "calls.txt"
+    return calls.read_text(encoding="utf-8").splitlines() if calls.exists() else []
+
+
+class DumpMarkerTests(unittest.TestCase):
+    def test_dump_stops_before_fonts_and_title(self):
+        marked = insert_dump_marker(TEX % r"\setmainfont{TeX Gyre Termes}")
+        self.assertLess(marked.index(r"\usepackage{xeCJK}"), marked.index(DUMP_MARKER))
+        self.assertEqual(
+            marked.index(DUMP_MARKER) + len(DUMP_MARKER) + 1,
+            marked.index(r"\setmainfont"),
+        )
+        self.assertEqual(insert_dump_marker(marked), marked)
+
+        marked = insert_dump_marker(TEX % "")
+        self.assertLess(marked.index(DUMP_MARKER), marked.index(r"\title"))
+
+    def test_document_without_preamble_is_left_alone(self):
+        self.assertIsNone(insert_dump_marker("plain text"))
+
+
+@unittest.skipIf(os.name == "nt", "the fake xelatex is a shebang script")
+class PreambleFormatTests(unittest.TestCase):
+    def _latex_dir(self, root: Path, name: str, fonts: str) -> Path:
+        latex_dir = root / name
+        latex_dir.mkdir()
+        (latex_dir / "sdk-docs.tex").write_text(TEX % fonts, encoding="utf-8")
+        (latex_dir / "sphinx.sty").write_text("% sphinx", encoding="utf-8")
+        return latex_dir
+
+    def test_formats_are_cached_by_preamble(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            xelatex = str(_fake_xelatex(root))
+            cache_dir = root / "cache"
+
+            first_dir = self._latex_dir(root, "first", r"\setmainfont{A}")
+            name = prepare_preamble_format(
+                xelatex, first_dir, first_dir / "sdk-docs.tex", cache_dir
+            )
+            self.assertTrue((first_dir / f"{name}.fmt").is_file())
+            self.assertIn(DUMP_MARKER, (first_dir / "sdk-docs.tex").read_text(encoding="utf-8"))
+
+            # Fonts and title are outside the dump, so the format is reused.
+            second_dir = self._latex_dir(root, "second", r"\setmainfont{B}")
+            self.assertEqual(
+                prepare_preamble_format(
+                    xelatex, second_dir, second_dir / "sdk-docs.tex", cache_dir
+                ),
+                name,
+            )
+            self.assertEqual(sum("-ini" in call for call in _calls(root)), 1)
+
+            third_dir = self._latex_dir(root, "third", r"\setmainfont{A}")
+            (third_dir / "sphinx.sty").write_text("% sphinx 2", encoding="utf-8")
+            self.assertNotEqual(
+                prepare_preamble_format(
+                    xelatex, third_dir, third_dir / "sdk-docs.tex", cache_dir
+                ),
+                name,
+            )
+
+    def test_generator_falls_back_when_the_format_fails(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            projects = root / "projects"
+            (projects / "guide").mkdir(parents=True)
+            (projects / "guide" / "01_start_zh.md").write_text(
+                "# 开始\n\n正文。\n", encoding="utf-8"
+            )
+            config_path = root / "docs" / "config.yaml"
+            config_path.parent.mkdir()
+            config_path.write_text(
+                "categories:\n  guide:\n    name: \"指南\"\n", encoding="utf-8"
+            )
+            generator = PDFGeneratorV2(
+                root / "html", root / "output", projects_root=projects, config_path=config_path
+            )
+            xelatex = _fake_xelatex(root)
+
+            def fake_sphinx(source, latex_dir, builder, **kwargs):
+                (Path(latex_dir) / "sdk-docs.tex").write_text(
+                    TEX % r"\setmainfont{A}", encoding="utf-8"
+                )
+
+            with patch.object(PDFGeneratorV2, "_find_xelatex", return_value=str(xelatex)), \
+                    patch.object(pdf_generator_enhanced_v2, "run_sphinx", side_effect=fake_sphinx), \
+                    patch.dict(os.environ, {"FAKE_FORMAT_BROKEN": "1"}), \
+                    patch("builtins.print"):
+                self.assertTrue(generator.generate_pdf("Demo", "zh"))
+
+            runs = [
+                call for call in _calls(root) if call.endswith("sdk-docs.tex") and "-ini" not in call
+            ]
+            self.assertIn("-fmt=", runs[0])
+            self.assertTrue(all("-fmt=" not in call for call in runs[1:]))
+            self.assertEqual(list((root / FORMAT_CACHE_DIRECTORY_NAME).glob("*.fmt")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
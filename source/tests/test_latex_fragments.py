@@ -0,0 +1,307 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+import pdf_generator_enhanced_v2
+from pdf_generator_enhanced_v2 import PDFGeneratorV2
+from utils.latex_fragments import (
+    FRAGMENT_CACHE_DIRECTORY_NAME,
+    PdfWriter,
+    merge_fragments,
+    split_manual,
+    whole_document_requirements,
+)
+
+if PdfWriter is not None:
+    from pypdf import PdfReader
+    from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, TextStringObject
+
+
+CATEGORY = r"""
+\addtocontents{{toc}}{{\protect\pdfcategorytoc{{{title}}}{{pdf-category-{index}}}}}
+
+\clearpage
+
+\pdfcategoryanchor{{pdf-category-{index}}}{{{title}}}
+
+{body}
+"""
+
+TEX = r"""\documentclass[a4paper]{{sphinxmanual}}
+\usepackage{{sphinx}}
+\title{{Demo}}
+\begin{{document}}
+
+\ifdefined\shorthandoff
+\fi
+
+\pagestyle{{empty}}
+\sphinxmaketitle
+\pagestyle{{plain}}
+\sphinxtableofcontents
+\pagestyle{{normal}}
+\phantomsection\label{{\detokenize{{_pdf_index_zh::doc}}}}
+{categories}
+\renewcommand{{\indexname}}{{Index}}
+\printindex
+\end{{document}}
+"""
+
+
+def _manual(*bodies: str) -> str:
+    return TEX.format(
+        categories="".join(
+            CATEGORY.format(index=index, title=f"Part {index}", body=body)
+            for index, body in enumerate(bodies, start=1)
+        )
+    )
+
+
+def _section(title: str, label: str, text: str = "text") -> str:
+    return f"\\section{{{title}}}\n\\label{{\\detokenize{{{label}}}}}\n{text}\n"
+
+
+# One page per \section; each fragment reports the page counter it ends
+# with and writes a .toc line per section, like hyperref and titlesec do.
+FAKE_XELATEX = """#!{python}
+import re
+import sys
+from pathlib import Path
+from pypdf import PdfWriter
+
+if "--version" in sys.argv:
+    print("XeTeX 3.14 (fake)")
+    sys.exit(0)
+tex = Path(sys.argv[-1])
+with open({calls!r}, "a") as calls:
+    calls.write(tex.stem + "\\n")
+text = tex.read_text(encoding="utf-8")
+start = re.search(r"\\\\pdffragmentset\\\\c@page\\{{(\\d+)\\}}", text)
+start = int(start.group(1)) if start else 1
+sections = re.findall(r"\\\\section\\{{([^}}]*)\\}}", text)
+writer = PdfWriter()
+for _ in range(max(1, len(sections))):
+    writer.add_blank_page(595, 842)
+for anchor in re.findall(r"\\\\pdfcategoryanchor\\{{([^}}]*)\\}}", text):
+    writer.add_named_destination(anchor, 0)
+    writer.add_outline_item(anchor, 0)
+writer.add_metadata({{"/Subject": "x" * 2048}})
+with open(tex.with_suffix(".pdf"), "wb") as stream:
+    writer.write(stream)
+if "\\\\nofiles" not in text:
+    toc = "".join(
+        "\\\\contentsline{{section}}{{%s}}{{%d}}\\n" % (title, start + index)
+        for index, title in enumerate(sections)
+    )
+    tex.with_suffix(".toc").write_text(toc, encoding="utf-8")
+if "pdf-fragment-state:" in text:
+    tex.with_suffix(".log").write_text(
+        "pdf-fragment-state:c@page=%d\\n" % (start + max(1, len(sections))),
+        encoding="utf-8",
+    )
+"""
+
+
+class SplitManualTests(unittest.TestCase):
+    def test_splits_at_category_anchors(self):
+        split = split_manual(
+            _manual(_section("A", "one/a:doc"), _section("B", "two/b:doc")), "sdk-docs"
+        )
+
+        self.assertEqual(
+            [fragment.stem for fragment in split.chapters],
+            ["sdk-docs-part01", "sdk-docs-part02"],
+        )
+        self.assertEqual(split.front.stem, "sdk-docs-front")
+        self.assertIn(r"\sphinxtableofcontents", split.front.body)
+        self.assertNotIn(r"\section", split.front.body)
+        self.assertIn(r"\nofiles", split.front_source())
+        self.assertTrue(split.chapters[1].body.lstrip().startswith(r"\addtocontents"))
+        self.assertIn(r"\printindex", split.chapters[1].body)
+
+        source = split.chapter_source(split.chapters[1], {"c@page": 7})
+        self.assertIn(r"\pdffragmentset\c@page{7}", source)
+        self.assertIn(r"\shorthandoff", source)
+        self.assertNotIn(r"\sphinxmaketitle", source)
+        self.assertLess(source.index(r"\begin{document}"), source.index(r"\pdffragmentset\c@page"))
+
+    def test_single_category_is_not_split(self):
+        self.assertIsNone(split_manual(_manual(_section("A", "one/a:doc")), "sdk-docs"))
+
+    def test_cross_category_references_need_the_whole_document(self):
+        local = _section("A", "one/a:doc", r"\hyperref[\detokenize{one/a:doc}]{A}")
+        undefined = _section("B", "two/b:doc", r"\hyperref[\detokenize{missing:doc}]{M}")
+        self.assertEqual(
+            whole_document_requirements(split_manual(_manual(local, undefined), "doc")), []
+        )
+
+        crossing = _section("B", "two/b:doc", r"\hyperref[\detokenize{one/a:doc}]{A}")
+        self.assertEqual(
+            whole_document_requirements(split_manual(_manual(local, crossing), "doc")),
+            ["doc-part02 -> one/a:doc"],
+        )
+        indexed = _section("B", "two/b:doc", r"\index{term}")
+        self.assertEqual(
+            whole_document_requirements(split_manual(_manual(local, indexed), "doc")),
+            [r"doc-part02: \index"],
+        )
+
+
+@unittest.skipIf(PdfWriter is None, "pypdf is not installed")
+class MergeFragmentsTests(unittest.TestCase):
+    def _pdf(self, path: Path, pages: int, anchor=None, link_to=None) -> Path:
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(595, 842)
+        if anchor:
+            writer.add_named_destination(anchor, 0)
+            parent = writer.add_outline_item(anchor, 0)
+            writer.add_outline_item(f"{anchor} section", pages - 1, parent=parent)
+        if link_to:
+            writer.add_annotation(
+                pages - 1,
+                DictionaryObject(
+                    {
+                        NameObject("/Type"): NameObject("/Annot"),
+                        NameObject("/Subtype"): NameObject("/Link"),
+                        NameObject("/Rect"): ArrayObject([FloatObject(v) for v in (0, 0, 100, 20)]),
+                        NameObject("/A"): DictionaryObject(
+                            {
+                                NameObject("/S"): NameObject("/GoTo"),
+                                NameObject("/D"): TextStringObject(link_to),
+                            }
+                        ),
+                    }
+                ),
+            )
+        with open(path, "wb") as stream:
+            writer.write(stream)
+        return path
+
+    def test_merge_keeps_bookmarks_labels_and_contents_links(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            front = self._pdf(root / "front.pdf", 2, link_to="pdf-category-2")
+            chapters = [
+                self._pdf(root / "one.pdf", 2, anchor="pdf-category-1"),
+                self._pdf(root / "two.pdf", 3, anchor="pdf-category-2"),
+            ]
+
+            pages = merge_fragments(front, chapters, root / "merged.pdf")
+
+            merged = PdfReader(str(root / "merged.pdf"))
+            self.assertEqual(pages, 7)
+            self.assertEqual(
+                merged.page_labels, ["i", "ii", "1", "2", "3", "4", "5"]
+            )
+            outline = merged.outline
+            self.assertEqual(
+                [item.title for item in outline if not isinstance(item, list)],
+                ["pdf-category-1", "pdf-category-2"],
+            )
+            self.assertEqual(merged.get_destination_page_number(outline[2]), 4)
+            self.assertEqual(
+                merged.get_destination_page_number(
+                    merged.named_destinations["pdf-category-2"]
+                ),
+                4,
+            )
+            link = merged.pages[1]["/Annots"][0].get_object()
+            self.assertEqual(link["/A"]["/D"], "pdf-category-2")
+
+
+@unittest.skipIf(os.name == "nt", "the fake xelatex is a shebang script")
+@unittest.skipIf(PdfWriter is None, "pypdf is not installed")
+class IncrementalBuildTests(unittest.TestCase):
+    def _generator(self, root: Path) -> PDFGeneratorV2:
+        projects = root / "projects"
+        (projects / "guide").mkdir(parents=True)
+        (projects / "guide" / "01_start_zh.md").write_text("# 开始\n", encoding="utf-8")
+        config_path = root / "docs" / "config.yaml"
+        config_path.parent.mkdir()
+        config_path.write_text(
+            "categories:\n  guide:\n    name: \"指南\"\n"
+            "generation:\n  pdf_latex:\n    incremental: true\n    preamble_format: false\n",
+            encoding="utf-8",
+        )
+        return PDFGeneratorV2(
+            root / "html", root / "output", projects_root=projects, config_path=config_path
+        )
+
+    def _build(self, root: Path, generator: PDFGeneratorV2, tex: str):
+        calls = root / "calls.txt"
+        calls.write_text("", encoding="utf-8")
+        xelatex = root / "xelatex"
+        xelatex.write_text(
+            FAKE_XELATEX.format(python=sys.executable, calls=str(calls)), encoding="utf-8"
+        )
+        xelatex.chmod(0o755)
+
+        def fake_sphinx(source, latex_dir, builder, **kwargs):
+            (Path(latex_dir) / "sdk-docs.tex").write_text(tex, encoding="utf-8")
+
+        with patch.object(PDFGeneratorV2, "_find_xelatex", return_value=str(xelatex)), \
+                patch.object(pdf_generator_enhanced_v2, "run_sphinx", side_effect=fake_sphinx), \
+                patch("builtins.print"):
+            self.assertTrue(generator.generate_pdf("Demo", "zh"))
+        compiled = sorted(set(calls.read_text(encoding="utf-8").split()))
+        return compiled, PdfReader(str(root / "output" / "Demo.pdf"))
+
+    def test_only_changed_fragments_are_recompiled(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            generator = self._generator(root)
+            one = _section("A", "one/a:doc")
+            two = _section("B", "two/b:doc")
+            three = _section("C", "three/c:doc")
+
+            compiled, merged = self._build(root, generator, _manual(one, two, three))
+            self.assertEqual(
+                compiled,
+                ["sdk-docs-front", "sdk-docs-part01", "sdk-docs-part02", "sdk-docs-part03"],
+            )
+            self.assertEqual(len(merged.pages), 4)
+            self.assertEqual(merged.page_labels, ["i", "1", "2", "3"])
+            self.assertTrue(
+                (root / FRAGMENT_CACHE_DIRECTORY_NAME / "zh" / "sdk-docs-part02").is_dir()
+            )
+
+            compiled, _ = self._build(root, generator, _manual(one, two, three))
+            self.assertEqual(compiled, [])
+
+            # Same pages and headings: the following fragment keeps its start page.
+            edited = _section("B", "two/b:doc", "changed text")
+            compiled, _ = self._build(root, generator, _manual(one, edited, three))
+            self.assertEqual(compiled, ["sdk-docs-part02"])
+
+            # An extra page moves every later fragment and the contents.
+            longer = one + _section("A2", "one/a2:doc")
+            compiled, merged = self._build(root, generator, _manual(longer, edited, three))
+            self.assertEqual(
+                compiled,
+                ["sdk-docs-front", "sdk-docs-part01", "sdk-docs-part02", "sdk-docs-part03"],
+            )
+            self.assertEqual(len(merged.pages), 5)
+
+    def test_cross_category_reference_builds_whole_document(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            generator = self._generator(root)
+            one = _section("A", "one/a:doc")
+            two = _section("B", "two/b:doc", r"\hyperref[\detokenize{one/a:doc}]{A}")
+
+            compiled, _ = self._build(root, generator, _manual(one, two))
+
+            self.assertEqual(compiled, ["sdk-docs"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+import pdf_generator_enhanced_v2
+from pdf_generator_enhanced_v2 import PDFGeneratorV2
+from utils.latex_passes import (
+    AUX_CACHE_DIRECTORY_NAME,
+    DEFAULT_MAX_RUNS,
+    auxiliary_digest,
+    max_runs_from_config,
+    restore_auxiliary_files,
+    store_auxiliary_files,
+)
+
+
+# Each run moves the reference state in the .aux one step towards the
+# target written in the .tex, like page numbers settling after the contents.
+FAKE_XELATEX = """#!{python}
+import sys
+from pathlib import Path
+
+tex = Path(sys.argv[-1])
+target = int(tex.read_text())
+aux = tex.with_suffix(".aux")
+state = int(aux.read_text()) if aux.exists() else 0
+aux.write_text(str(min(state + 1, target)))
+tex.with_suffix(".toc").write_text("contents")
+with open({runs!r}, "a") as runs:
+    runs.write("run\\n")
+tex.with_suffix(".pdf").write_bytes(
+    b"%PDF-1.5\\n" + b"0" * 2048 + b"\\nstartxref\\n0\\n%%EOF\\n"
+)
+"""
+
+
+class AuxiliaryFilesTests(unittest.TestCase):
+    def test_digest_covers_contents_and_missing_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            empty = auxiliary_digest(root, "doc")
+            (root / "doc.toc").write_text("", encoding="utf-8")
+            self.assertNotEqual(auxiliary_digest(root, "doc"), empty)
+            (root / "doc.aux").write_text("\\relax", encoding="utf-8")
+            first = auxiliary_digest(root, "doc")
+            (root / "doc.aux").write_text("\\relax ", encoding="utf-8")
+            self.assertNotEqual(auxiliary_digest(root, "doc"), first)
+
+    def test_restore_returns_digest_of_cached_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            latex_dir = root / "latex"
+            latex_dir.mkdir()
+            cache_dir = root / "cache"
+            self.assertIsNone(restore_auxiliary_files(cache_dir, latex_dir, "doc"))
+
+            (latex_dir / "doc.aux").write_text("refs", encoding="utf-8")
+            store_auxiliary_files(latex_dir, cache_dir, "doc")
+            built = auxiliary_digest(latex_dir, "doc")
+            (latex_dir / "doc.aux").unlink()
+            (latex_dir / "doc.out").write_text("stale", encoding="utf-8")
+
+            self.assertEqual(restore_auxiliary_files(cache_dir, latex_dir, "doc"), built)
+            self.assertFalse((latex_dir / "doc.out").exists())
+
+    def test_max_runs_come_from_generation_config(self):
+        self.assertEqual(max_runs_from_config({}), DEFAULT_MAX_RUNS)
+        self.assertEqual(
+            max_runs_from_config({"generation": {"pdf_latex": {"max_runs": 5}}}), 5
+        )
+        self.assertEqual(
+            max_runs_from_config({"generation": {"pdf_latex": {"max_runs": 0}}}), 1
+        )
+
+
+@unittest.skipIf(os.name == "nt", "the fake xelatex is a shebang script")
+class XelatexConvergenceTests(unittest.TestCase):
+    def _generator(self, root: Path, max_runs: int) -> PDFGeneratorV2:
+        projects = root / "projects"
+        (projects / "guide").mkdir(parents=True)
+        (projects / "guide" / "01_start_zh.md").write_text(
+            "# 开始\n\n正文。\n", encoding="utf-8"
+        )
+        config_path = root / "docs" / "config.yaml"
+        config_path.parent.mkdir()
+        config_path.write_text(
+            "categories:\n  guide:\n    name: \"指南\"\n"
+            f"generation:\n  pdf_latex:\n    max_runs: {max_runs}\n",
+            encoding="utf-8",
+        )
+        return PDFGeneratorV2(
+            root / "html", root / "output", projects_root=projects, config_path=config_path
+        )
+
+    def _build(self, root: Path, generator: PDFGeneratorV2, target: int) -> int:
+        runs = root / "runs.txt"
+        runs.write_text("", encoding="utf-8")
+        xelatex = root / "xelatex"
+        xelatex.write_text(
+            FAKE_XELATEX.format(python=sys.executable, runs=str(runs)), encoding="utf-8"
+        )
+        xelatex.chmod(0o755)
+
+        def fake_sphinx(source, latex_dir, builder, **kwargs):
+            (Path(latex_dir) / "sdk-docs.tex").write_text(str(target), encoding="utf-8")
+
+        with patch.object(PDFGeneratorV2, "_find_xelatex", return_value=str(xelatex)), \
+                patch.object(pdf_generator_enhanced_v2, "run_sphinx", side_effect=fake_sphinx), \
+                patch("builtins.print"):
+            self.assertTrue(generator.generate_pdf("Demo", "zh"))
+        return len(runs.read_text(encoding="utf-8").splitlines())
+
+    def test_runs_until_auxiliary_files_stop_changing(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            generator = self._generator(root, max_runs=4)
+
+            self.assertEqual(self._build(root, generator, target=1), 2)
+            self.assertTrue((root / AUX_CACHE_DIRECTORY_NAME / "zh" / "sdk-docs.aux").is_file())
+            # 引用未变化：恢复的 .aux 在第一次运行后即已收敛
+            self.assertEqual(self._build(root, generator, target=1), 1)
+            self.assertEqual(self._build(root, generator, target=3), 3)
+
+    def test_stops_at_the_configured_cap(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            generator = self._generator(root, max_runs=2)
+
+            self.assertEqual(self._build(root, generator, target=10), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,24 @@
+import multiprocessing
+import os
 import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 
 SOURCE_DIR = Path(__file__).resolve().parents[1]
 if str(SOURCE_DIR) not in sys.path:
     sys.path.insert(0, str(SOURCE_DIR))
 
-from pdf_generator_enhanced_v2 import DocumentScanner, PDFGeneratorV2
-from utils.pdf_builder import is_valid_pdf, pdf_filename
+from pdf_generator_enhanced_v2 import (
+    DocumentScanner,
+    PDFGeneratorV2,
+    pdf_temporary_exclude_patterns,
+    resolve_pdf_backend,
+)
+from sphinx.util.matching import Matcher
+from utils.pdf_builder import build_detected_pdfs, is_valid_pdf, pdf_filename
 from utils.pdf_formatting import strip_manual_heading_number
 
 
@@ -355,6 +364,7 @@ generation:
             generated = []
             generator = object.__new__(PDFGeneratorV2)
             generator.output_dir = output
+            generator.backend = resolve_pdf_backend(None)
             generator._try_latex_pdf = (
                 lambda output_pdf, language: generated.append(
                     (output_pdf, language)
@@ -370,6 +380,142 @@ generation:
                 [(output / "Titan-Board_SDK_EN.pdf", "en")],
             )
 
+    def _backend_generator(self, root: Path, backend=None) -> PDFGeneratorV2:
+        projects = root / "projects"
+        guide = projects / "guide"
+        guide.mkdir(parents=True)
+        (guide / "01_start_zh.md").write_text("# 开始\n\n正文。\n", encoding="utf-8")
+        config_path = root / "config.yaml"
+        config_path.write_text(
+            "categories:\n  guide:\n    name: \"指南\"\n", encoding="utf-8"
+        )
+        return PDFGeneratorV2(
+            root / "html",
+            root / "output",
+            projects_root=projects,
+            config_path=config_path,
+            backend=backend,
+        )
+
+    def test_latex_backend_skips_html_merge_stages(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            generator = self._backend_generator(Path(temp_dir))
+            rendered = []
+            with patch.object(
+                PDFGeneratorV2, "_generate_content", side_effect=AssertionError
+            ), patch.object(
+                PDFGeneratorV2, "_create_full_html", side_effect=AssertionError
+            ), patch.object(
+                PDFGeneratorV2,
+                "_try_latex_pdf",
+                side_effect=lambda output_pdf, language: rendered.append(language) or True,
+            ), patch("builtins.print"):
+                self.assertTrue(generator.generate_pdf("Demo", "zh"))
+
+            self.assertEqual(generator.backend.name, "latex")
+            self.assertEqual(rendered, ["zh"])
+
+    def test_html_backend_is_explicit_and_prints_merged_html(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            generator = self._backend_generator(Path(temp_dir), backend="html")
+            printed = []
+            with patch.object(
+                PDFGeneratorV2, "_try_latex_pdf", side_effect=AssertionError
+            ), patch.object(
+                PDFGeneratorV2,
+                "_try_chrome_pdf",
+                side_effect=lambda html_file, output_pdf: printed.append(
+                    html_file.read_text(encoding="utf-8")
+                ) or True,
+            ), patch("builtins.print"):
+                self.assertTrue(generator.generate_pdf("Demo", "zh"))
+
+            self.assertEqual(len(printed), 1)
+            self.assertIn("1.1. 开始", printed[0])
+            with self.assertRaises(ValueError):
+                resolve_pdf_backend("chrome")
+
+    def test_latex_build_ignores_other_languages_temporary_sources(self):
+        excluded = Matcher(pdf_temporary_exclude_patterns("zh"))
+        self.assertTrue(excluded("_pdf_index_en.rst"))
+        self.assertTrue(excluded("_pdf_directory_guide_nested_en.rst"))
+        self.assertTrue(excluded("guide/_pdf_README_body_en.md"))
+        self.assertFalse(excluded("_pdf_index_zh.rst"))
+        self.assertFalse(excluded("guide/_pdf_README_zh_body_zh.md"))
+        self.assertFalse(excluded("guide/01_start.md"))
+
+    @unittest.skipUnless(
+        multiprocessing.get_start_method() == "fork",
+        "workers must inherit the patched generator",
+    )
+    def test_languages_are_generated_in_parallel_workers(self):
+        def fake_generate(generator, title, language="zh"):
+            sys.stdout.write(f"pid {os.getpid()}\n")
+            (generator.output_dir / pdf_filename(title, language)).write_bytes(
+                b"%PDF-1.4\n" + b"0" * 2048 + b"\nstartxref\n123\n%%EOF\n"
+            )
+            return True
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._backend_generator(root)
+            config = {
+                "project": {"name": "Demo Docs"},
+                "repository": {"projects_dir": "projects"},
+                "generation": {"pdf_latex": {"max_parallel": 2}},
+            }
+            printed = []
+
+            def record(*args):
+                printed.append(" ".join(map(str, args)))
+
+            with patch.object(PDFGeneratorV2, "generate_pdf", fake_generate), \
+                    patch("builtins.print", side_effect=record):
+                success, paths = build_detected_pdfs(
+                    root / "html", root, config, languages=("zh", "en"), backend="html"
+                )
+
+            self.assertTrue(success)
+            self.assertEqual(
+                [path.name for path in paths], ["Demo Docs.pdf", "Demo_Docs_EN.pdf"]
+            )
+            worker_pids = {
+                line.rsplit(" ", 1)[1] for line in printed if line.startswith("  [")
+            }
+            self.assertEqual(len(worker_pids), 2)
+            self.assertNotIn(str(os.getpid()), worker_pids)
+            self.assertIn('"en": "Demo_Docs_EN.pdf"', (
+                root / "html" / "_static" / "project_info.json"
+            ).read_text(encoding="utf-8"))
+
+    def test_jobs_caps_language_workers_and_image_pools(self):
+        seen = []
+
+        def fake_generate(generator, title, language="zh"):
+            seen.append((os.getpid(), generator.image_jobs))
+            (generator.output_dir / pdf_filename(title, language)).write_bytes(
+                b"%PDF-1.4\n" + b"0" * 2048 + b"\nstartxref\n123\n%%EOF\n"
+            )
+            return True
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._backend_generator(root)
+            config = {
+                "project": {"name": "Demo Docs"},
+                "repository": {"projects_dir": "projects"},
+                "generation": {"pdf_latex": {"max_parallel": 2}},
+            }
+            with patch.object(PDFGeneratorV2, "generate_pdf", fake_generate), \
+                    patch("builtins.print"):
+                success, _paths = build_detected_pdfs(
+                    root / "html", root, config, languages=("zh", "en"),
+                    backend="html", jobs=1,
+                )
+
+        self.assertTrue(success)
+        self.assertEqual(seen, [(os.getpid(), 1), (os.getpid(), 1)])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,5 @@
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import patch
@@ -8,7 +9,11 @@ SOURCE_DIR = Path(__file__).resolve().parents[1]
 if str(SOURCE_DIR) not in sys.path:
     sys.path.insert(0, str(SOURCE_DIR))
 
-from utils.pdf_environment import configured_pdf_fonts, ensure_pdf_environment
+from utils.pdf_environment import (
+    DEFAULT_PDF_FONTS,
+    configured_pdf_fonts,
+    ensure_pdf_environment,
+)
 
 
 class PdfEnvironmentTests(unittest.TestCase):
@@ -36,6 +41,66 @@ class PdfEnvironmentTests(unittest.TestCase):
     ):
         self.assertFalse(ensure_pdf_environment(auto_install=False))
 
+    @patch("utils.pdf_environment.font_probe_context", return_value="context-a")
+    @patch("utils.pdf_environment.find_xelatex", return_value="xelatex")
+    @patch("builtins.print")
+    def test_successful_probes_are_cached_per_context(
+        self, _print, _find_xelatex, font_probe_context
+    ):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = Path(temp_dir) / "probes.json"
+            probed = []
+
+            def probe(xelatex, family):
+                probed.append(family)
+                return True
+
+            with patch("utils.pdf_environment._probe_font", side_effect=probe):
+                self.assertTrue(ensure_pdf_environment(auto_install=False, cache_path=cache_path))
+                self.assertEqual(sorted(probed), sorted(DEFAULT_PDF_FONTS.values()))
+
+                probed.clear()
+                self.assertTrue(ensure_pdf_environment(auto_install=False, cache_path=cache_path))
+                self.assertEqual(probed, [])
+
+                self.assertTrue(ensure_pdf_environment(
+                    auto_install=False, cache_path=cache_path, refresh=True
+                ))
+                self.assertEqual(len(probed), len(DEFAULT_PDF_FONTS))
+
+                # A new XeLaTeX or fontconfig state invalidates every result.
+                probed.clear()
+                font_probe_context.return_value = "context-b"
+                self.assertTrue(ensure_pdf_environment(auto_install=False, cache_path=cache_path))
+                self.assertEqual(len(probed), len(DEFAULT_PDF_FONTS))
+
+    @patch("utils.pdf_environment.font_probe_context", return_value="context")
+    @patch("utils.pdf_environment.install_pdf_system_dependencies", return_value=True)
+    @patch("utils.pdf_environment.find_xelatex", return_value="xelatex")
+    @patch("builtins.print")
+    def test_only_missing_fonts_are_probed_after_installation(
+        self, _print, _find_xelatex, _install, _context
+    ):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = Path(temp_dir) / "probes.json"
+            probed = []
+            installed = set(DEFAULT_PDF_FONTS.values()) - {"Source Code Pro"}
+
+            def probe(xelatex, family):
+                probed.append(family)
+                return family in installed
+
+            with patch("utils.pdf_environment._probe_font", side_effect=probe):
+                self.assertFalse(ensure_pdf_environment(cache_path=cache_path))
+                self.assertEqual(probed.count("Source Code Pro"), 2)
+                self.assertEqual(len(probed), len(DEFAULT_PDF_FONTS) + 1)
+
+                probed.clear()
+                self.assertFalse(ensure_pdf_environment(
+                    auto_install=False, cache_path=cache_path
+                ))
+                self.assertEqual(probed, ["Source Code Pro"])
+
 
 if __name__ == "__main__":
     unittest.main()
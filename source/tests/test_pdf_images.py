@@ -0,0 +1,140 @@
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils import pdf_images
+from utils.pdf_images import (
+    ImageSettings,
+    prepare_latex_images,
+    rewrite_image_references,
+)
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+
+def _image_bytes(size, mode="RGB", image_format="PNG", **options) -> bytes:
+    color = (200, 40, 40, 128) if "A" in mode else (200, 40, 40)
+    image = Image.new(mode, size, color[: len(mode)])
+    for x in range(0, size[0], 7):
+        image.putpixel((x, x % size[1]), color[: len(mode)][::-1])
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class PdfImagesTests(unittest.TestCase):
+    def _latex_dir(self, root: Path) -> Path:
+        latex_dir = root / "latex"
+        latex_dir.mkdir()
+        (latex_dir / "screenshot.png").write_bytes(_image_bytes((4000, 600)))
+        (latex_dir / "icon.jpg").write_bytes(_image_bytes((64, 64), image_format="JPEG"))
+        (latex_dir / "photo.webp").write_bytes(_image_bytes((300, 200), image_format="WEBP"))
+        (latex_dir / "logo.webp").write_bytes(
+            _image_bytes((300, 200), mode="RGBA", image_format="WEBP")
+        )
+        (latex_dir / "sdk-docs.tex").write_text("", encoding="utf-8")
+        return latex_dir
+
+    def test_downsamples_converts_and_keeps_printed_size(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            latex_dir = self._latex_dir(root)
+            icon = (latex_dir / "icon.jpg").read_bytes()
+            screenshot_size = (latex_dir / "screenshot.png").stat().st_size
+
+            stats = prepare_latex_images(latex_dir, root / "cache", ImageSettings(), jobs=1)
+
+            self.assertEqual((stats["images"], stats["processed"], stats["cached"]), (4, 4, 0))
+            self.assertEqual(
+                stats["renamed"], {"photo.webp": "photo.jpg", "logo.webp": "logo.png"}
+            )
+            self.assertLess((latex_dir / "screenshot.png").stat().st_size, screenshot_size)
+            self.assertFalse((latex_dir / "photo.webp").exists())
+            self.assertEqual((latex_dir / "icon.jpg").read_bytes(), icon)
+            with Image.open(latex_dir / "screenshot.png") as screenshot:
+                # 16 cm at 200 dpi; the lower dpi keeps the printed width.
+                self.assertEqual(screenshot.size, (1260, 189))
+                self.assertAlmostEqual(
+                    1260 / screenshot.info["dpi"][0], 4000 / 72, places=1
+                )
+            with Image.open(latex_dir / "logo.png") as logo:
+                self.assertEqual(logo.mode, "RGBA")
+
+    def test_later_builds_reuse_the_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            prepare_latex_images(self._latex_dir(root), root / "cache", jobs=1)
+            first = (root / "latex" / "screenshot.png").read_bytes()
+            for path in (root / "latex").iterdir():
+                path.unlink()
+            (root / "latex").rmdir()
+
+            stats = prepare_latex_images(self._latex_dir(root), root / "cache", jobs=1)
+
+            self.assertEqual((stats["processed"], stats["cached"]), (0, 4))
+            self.assertEqual((root / "latex" / "screenshot.png").read_bytes(), first)
+
+            for path in (root / "latex").iterdir():
+                path.unlink()
+            (root / "latex").rmdir()
+            stats = prepare_latex_images(
+                self._latex_dir(root), root / "cache", ImageSettings(dpi=100), jobs=1
+            )
+            self.assertEqual((stats["processed"], stats["cached"]), (4, 0))
+
+    def test_parallel_processing_matches_serial_output(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            serial_dir = self._latex_dir(root)
+            prepare_latex_images(serial_dir, root / "serial-cache", jobs=1)
+            serial = {path.name: path.read_bytes() for path in serial_dir.iterdir()}
+            for path in serial_dir.iterdir():
+                path.unlink()
+            serial_dir.rmdir()
+
+            parallel_dir = self._latex_dir(root)
+            with mock.patch.object(pdf_images, "PARALLEL_MIN_FILES", 1):
+                stats = prepare_latex_images(parallel_dir, root / "parallel-cache", jobs=2)
+
+            self.assertEqual(stats["processed"], 4)
+            self.assertEqual(
+                {path.name: path.read_bytes() for path in parallel_dir.iterdir()}, serial
+            )
+
+    def test_rewrites_converted_image_references(self):
+        tex = (
+            r"\sphinxincludegraphics{{photo}.webp}"
+            r"\sphinxincludegraphics[width=50\sphinxscale]{{logo}.webp}"
+            r"\sphinxincludegraphics{{photo2}.webp}"
+        )
+        self.assertEqual(
+            rewrite_image_references(
+                tex, {"photo.webp": "photo.jpg", "logo.webp": "logo.png"}
+            ),
+            r"\sphinxincludegraphics{{photo}.jpg}"
+            r"\sphinxincludegraphics[width=50\sphinxscale]{{logo}.png}"
+            r"\sphinxincludegraphics{{photo2}.webp}",
+        )
+
+    def test_settings_come_from_generation_config(self):
+        settings = ImageSettings.from_config(
+            {"generation": {"pdf_images": {"dpi": 150, "page_width_cm": 15}}}
+        )
+        self.assertEqual(settings, ImageSettings(dpi=150, page_width_cm=15.0))
+        self.assertEqual(ImageSettings.from_config(None), ImageSettings())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from pdf_generator_enhanced_v2 import DocumentScanner, PDFGeneratorV2
+from utils import pdf_builder
+from utils.pdf_builder import build_detected_pdfs, pdf_filename
+from utils.pdf_result_cache import PdfResultCache, pdf_input_digest
+
+
+CONFIG_YAML = """project:
+  name: "Demo Docs"
+repository:
+  projects_dir: "projects"
+categories:
+  guide:
+    name: "指南"
+    name_en: "Guide"
+generation:
+  pdf_latex:
+    max_parallel: 1
+"""
+
+CONFIG = {
+    "project": {"name": "Demo Docs"},
+    "repository": {"projects_dir": "projects"},
+    "categories": {"guide": {"name": "指南", "name_en": "Guide"}},
+    "generation": {"pdf_latex": {"max_parallel": 1}},
+}
+
+
+def _docs(root: Path) -> Path:
+    guide = root / "projects" / "guide"
+    guide.mkdir(parents=True)
+    (guide / "README_zh.md").write_text("# 指南\n", encoding="utf-8")
+    (guide / "README.md").write_text("# Guide\n", encoding="utf-8")
+    (guide / "01_start_zh.md").write_text("# 开始\n\n![图](images/a.png)\n", encoding="utf-8")
+    (guide / "01_start.md").write_text("# Start\n", encoding="utf-8")
+    (guide / "images").mkdir()
+    (guide / "images" / "a.png").write_bytes(b"png-1")
+    (root / "config.yaml").write_text(CONFIG_YAML, encoding="utf-8")
+    (root / "conf.py").write_text("latex_elements = {}\n", encoding="utf-8")
+    return guide
+
+
+class PdfInputDigestTests(unittest.TestCase):
+    def _digest(self, root: Path, language: str = "zh", config=None) -> str:
+        scanner = DocumentScanner(root / "html", root / "projects", root / "config.yaml")
+        return pdf_input_digest(
+            scanner, language, "Demo Docs", config or CONFIG, root, "engine"
+        )
+
+    def test_digest_covers_documents_assets_and_settings(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            guide = _docs(root)
+            first = self._digest(root)
+            self.assertEqual(self._digest(root), first)
+
+            # Other languages' documents and unrelated sections do not matter.
+            (guide / "01_start.md").write_text("# Start again\n", encoding="utf-8")
+            self.assertEqual(
+                self._digest(root, config={**CONFIG, "giscus": {"enabled": True}}), first
+            )
+
+            changes = [
+                lambda: (guide / "images" / "a.png").write_bytes(b"png-2"),
+                lambda: (guide / "README_zh.md").write_text("# 新指南\n", encoding="utf-8"),
+                lambda: (root / "conf.py").write_text("latex_elements = {'x': 1}\n", encoding="utf-8"),
+                lambda: (guide / "01_start_zh.md").write_text("# 开始\n\n改动\n", encoding="utf-8"),
+            ]
+            digests = {first}
+            for change in changes:
+                change()
+                digests.add(self._digest(root))
+            self.assertEqual(len(digests), len(changes) + 1)
+
+            fonts = {**CONFIG, "generation": {"pdf_fonts": {"latin": "Other"}}}
+            self.assertNotIn(self._digest(root, config=fonts), digests)
+
+    def test_cache_prunes_least_recently_used_entries(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            cache = PdfResultCache(root / "cache", limit=2)
+            pdf = root / "doc.pdf"
+            for key in ("a", "b", "c"):
+                pdf.write_bytes(key.encode("ascii"))
+                cache.store(key, pdf)
+
+            self.assertEqual(
+                sorted(path.stem for path in (root / "cache").glob("*.pdf")), ["b", "c"]
+            )
+            self.assertTrue(cache.restore("c", root / "restored.pdf"))
+            self.assertEqual((root / "restored.pdf").read_bytes(), b"c")
+            self.assertFalse(cache.restore("a", root / "restored.pdf"))
+
+
+class BuildReuseTests(unittest.TestCase):
+    def _build(self, root: Path, engine="engine"):
+        generated = []
+
+        def fake_generate(generator, title, language="zh"):
+            generated.append(language)
+            (generator.output_dir / pdf_filename(title, language)).write_bytes(
+                b"%PDF-1.4\n" + b"0" * 2048 + b"\nstartxref\n123\n%%EOF\n"
+            )
+            return True
+
+        with patch.object(pdf_builder, "ensure_pdf_environment", return_value=True), \
+                patch.object(pdf_builder, "xelatex_identity", return_value=engine), \
+                patch.object(PDFGeneratorV2, "generate_pdf", fake_generate), \
+                patch("builtins.print"):
+            success, paths = build_detected_pdfs(
+                root / "html",
+                root,
+                CONFIG,
+                languages=("zh", "en"),
+                result_cache_dir=root / "pdf_result_cache",
+            )
+        self.assertTrue(success)
+        self.assertEqual([path.name for path in paths], ["Demo Docs.pdf", "Demo_Docs_EN.pdf"])
+        return generated
+
+    def test_unchanged_languages_reuse_cached_pdfs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            guide = _docs(root)
+
+            self.assertEqual(self._build(root), ["zh", "en"])
+            (root / "html" / "_static" / "Demo Docs.pdf").unlink()
+            (root / "html" / "_static" / "project_info.json").unlink()
+
+            self.assertEqual(self._build(root), [])
+            self.assertTrue((root / "html" / "_static" / "Demo Docs.pdf").is_file())
+            self.assertIn(
+                '"zh": "Demo Docs.pdf"',
+                (root / "html" / "_static" / "project_info.json").read_text(encoding="utf-8"),
+            )
+
+            (guide / "01_start.md").write_text("# Start\n\nMore.\n", encoding="utf-8")
+            self.assertEqual(self._build(root), ["en"])
+
+    def test_cache_is_not_used_without_xelatex(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            _docs(root)
+            self.assertEqual(self._build(root, engine=None), ["zh", "en"])
+            self.assertEqual(self._build(root, engine=None), ["zh", "en"])
+            self.assertFalse((root / "pdf_result_cache").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils import precompress
+from utils.precompress import precompress_tree
+
+
+PAGE = "<html><body>" + "<p>Paragraph with repeated text.</p>\n" * 100 + "</body></html>"
+
+
+class PrecompressTests(unittest.TestCase):
+    def _site(self, root: Path) -> Path:
+        site = root / "html"
+        (site / "guide").mkdir(parents=True)
+        (site / ".doctrees").mkdir()
+        (site / "guide" / "page.html").write_text(PAGE, encoding="utf-8")
+        (site / "searchindex.js").write_text("Search.setIndex(" + "{}" * 900 + ")", encoding="utf-8")
+        (site / "small.css").write_text("a{}", encoding="utf-8")
+        (site / "image.png").write_bytes(b"\x89PNG" * 1000)
+        (site / ".doctrees" / "index.html").write_text(PAGE, encoding="utf-8")
+        return site
+
+    def test_writes_gzip_sidecars_for_large_compressible_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            site = self._site(Path(temp_dir))
+
+            stats = precompress_tree(site, jobs=1)
+
+            sidecar = site / "guide" / "page.html.gz"
+            self.assertEqual(gzip.decompress(sidecar.read_bytes()).decode("utf-8"), PAGE)
+            self.assertTrue((site / "searchindex.js.gz").is_file())
+            self.assertFalse((site / "small.css.gz").exists())
+            self.assertFalse((site / "image.png.gz").exists())
+            self.assertFalse((site / ".doctrees" / "index.html.gz").exists())
+            self.assertEqual(stats["files"], 2)
+            self.assertEqual(stats["written"], 2)
+
+    def test_skips_fresh_sidecars_and_replaces_stale_ones(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            site = self._site(Path(temp_dir))
+            precompress_tree(site, jobs=1)
+
+            self.assertEqual(precompress_tree(site, jobs=1)["up_to_date"], 2)
+
+            page = site / "guide" / "page.html"
+            page.write_text(PAGE.replace("repeated", "changed"), encoding="utf-8")
+            sidecar = Path(f"{page}.gz")
+            os.utime(page, ns=(sidecar.stat().st_mtime_ns + 10**9,) * 2)
+            (site / "searchindex.js").unlink()
+            stats = precompress_tree(site, jobs=1)
+
+            self.assertIn(b"changed", gzip.decompress(sidecar.read_bytes()))
+            self.assertFalse((site / "searchindex.js.gz").exists())
+            self.assertEqual((stats["written"], stats["removed"]), (1, 1))
+
+    def test_fresh_output_tree_reuses_cached_results(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            site = self._site(root)
+            precompress_tree(site, jobs=1)
+            os.rename(site, root / "previous")
+            site = self._site(root)
+
+            stats = precompress_tree(site, jobs=1)
+
+            self.assertEqual((stats["written"], stats["linked"]), (0, 2))
+            self.assertTrue((site / "guide" / "page.html.gz").is_file())
+
+    def test_parallel_run_matches_serial_run(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            serial = self._site(root / "serial")
+            parallel = self._site(root / "parallel")
+            precompress_tree(serial, jobs=1)
+            with mock.patch.object(precompress, "PARALLEL_MIN_FILES", 1):
+                precompress_tree(parallel, jobs=2)
+
+            for name in ("guide/page.html.gz", "searchindex.js.gz"):
+                self.assertEqual(
+                    (serial / name).read_bytes(), (parallel / name).read_bytes()
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
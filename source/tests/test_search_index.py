@@ -0,0 +1,140 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils import search_index
+from utils.search_index import (
+    MANIFEST_NAME,
+    SEARCH_DIRECTORY_NAME,
+    build_search_indexes,
+    language_key,
+    read_page,
+    tokenize,
+)
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="{lang}"><head><title>{title} &mdash; SDK</title>
+<script>var ignored = "script";</script></head>
+<body><div role="main"><ul class="breadcrumbs"><li>breadcrumb</li></ul>
+<div itemprop="articleBody"><section id="top">
+<h1>{title}<a class="headerlink" href="#top">¶</a></h1>
+<p>{text}</p><div class="highlight"><pre>make docs</pre></div>
+<section id="more"><h2>{heading}<a class="headerlink" href="#more">¶</a></h2></section>
+</section></div></div></body></html>
+"""
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+class TokenizeTests(unittest.TestCase):
+    def test_splits_cjk_into_bigrams_and_latin_into_words(self):
+        self.assertEqual(
+            tokenize("构建文档 with Sphinx，库 the API_v2 x"),
+            ["构建", "建文", "文档", "sphinx", "库", "api_v2"],
+        )
+
+    def test_normalizes_full_width_text(self):
+        self.assertEqual(tokenize("ＰＤＦ　输出"), ["pdf", "输出"])
+
+    def test_language_key_uses_the_primary_subtag(self):
+        self.assertEqual(language_key("zh_CN"), "zh")
+        self.assertEqual(language_key("zh-CN"), "zh")
+        self.assertEqual(language_key(""), "en")
+
+
+class SearchIndexTests(unittest.TestCase):
+    def test_reads_article_text_title_and_headings(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            page = Path(temp_dir) / "page.html"
+            _write(page, PAGE.format(
+                lang="zh-CN", title="版本发布", text="多版本部署", heading="工作流"
+            ))
+
+            language, title, scores = read_page(page)
+
+        self.assertEqual((language, title), ("zh", "版本发布"))
+        self.assertEqual(scores["版本"], 1 + 1 + search_index.TITLE_WEIGHT)
+        self.assertEqual(scores["工作"], 1 + search_index.HEADING_WEIGHT)
+        self.assertEqual(scores["make"], 1)
+        for skipped in ("breadcrumb", "script", "ignored", "¶"):
+            self.assertNotIn(skipped, scores)
+
+    def test_writes_sharded_index_per_language(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            for number in range(6):
+                _write(root / "guide" / f"page{number}_zh.html", PAGE.format(
+                    lang="zh-CN", title=f"指南 {number}", text="构建输出" * 20,
+                    heading=f"第{number}节",
+                ))
+                _write(root / "guide" / f"page{number}.html", PAGE.format(
+                    lang="en", title=f"Guide {number}", text="building outputs",
+                    heading=f"section{number}",
+                ))
+            _write(root / "search.html", PAGE.format(
+                lang="en", title="Search", text="skipped", heading="skipped"
+            ))
+            _write(root / "_static" / "page.html", PAGE.format(
+                lang="en", title="Static", text="skipped", heading="skipped"
+            ))
+            _write(root / "index.html", '<html lang="zh-CN"><body>redirect</body></html>')
+            _write(root / SEARCH_DIRECTORY_NAME / "fr" / MANIFEST_NAME, "{}")
+
+            with mock.patch.object(search_index, "SHARD_TARGET_BYTES", 200):
+                stats = build_search_indexes(root, jobs=1)
+
+            self.assertEqual(sorted(stats), ["en", "zh"])
+            self.assertFalse((root / SEARCH_DIRECTORY_NAME / "fr").exists())
+            self.assertEqual(stats["zh"]["documents"], 6)
+            self.assertGreater(stats["zh"]["shards"], 1)
+
+            index_dir = root / SEARCH_DIRECTORY_NAME / "en"
+            manifest = json.loads((index_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+            self.assertEqual(manifest["root"], "../../")
+            documents = json.loads(
+                (index_dir / manifest["documents"]).read_text(encoding="utf-8")
+            )
+            self.assertEqual(documents[0], ["guide/page0.html", "Guide 0"])
+            self.assertNotIn("skipped", json.dumps(documents))
+
+            first_terms = [first for first, _ in manifest["shards"]]
+            self.assertEqual(first_terms[0], "")
+            self.assertEqual(first_terms, sorted(first_terms))
+            postings = {}
+            for _, name in manifest["shards"]:
+                postings.update(json.loads((index_dir / name).read_text(encoding="utf-8")))
+            self.assertEqual(postings["building"], [0, 1, 1, 1, 2, 1, 3, 1, 4, 1, 5, 1])
+            self.assertNotIn("skipped", postings)
+
+    def test_rebuild_removes_superseded_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            page = root / "page.html"
+            _write(page, PAGE.format(lang="en", title="One", text="alpha", heading="beta"))
+            build_search_indexes(root, jobs=1)
+            _write(page, PAGE.format(lang="en", title="Two", text="gamma", heading="delta"))
+
+            build_search_indexes(root, jobs=1)
+
+            index_dir = root / SEARCH_DIRECTORY_NAME / "en"
+            manifest = json.loads((index_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+            self.assertEqual(
+                sorted(path.name for path in index_dir.iterdir()),
+                sorted([MANIFEST_NAME, manifest["documents"], manifest["shards"][0][1]]),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.site_watcher import languages_for_sync, plan_rebuild
+
+
+class SiteWatcherTests(unittest.TestCase):
+    def test_changes_map_to_the_smallest_rebuild(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            projects = root / "projects"
+
+            markdown = plan_rebuild(
+                [projects / "guide" / "start_zh.md"], source, projects
+            )
+            self.assertTrue(markdown.sync)
+            self.assertFalse(markdown.full or markdown.theme)
+
+            theme = plan_rebuild(
+                [source / "_static" / "custom.css"], source, projects
+            )
+            self.assertTrue(theme.theme)
+            self.assertFalse(theme.full or theme.sync)
+
+            config = plan_rebuild(
+                [source / "config.yaml", projects / "guide" / "start.md"],
+                source,
+                projects,
+            )
+            self.assertTrue(config.full)
+
+            ignored = plan_rebuild(
+                [source / "_build" / "html" / "index.html", source / "guide.md"],
+                source,
+                projects,
+            )
+            self.assertTrue(ignored.empty)
+
+    def test_synchronized_documents_select_their_language(self):
+        languages = ("zh", "en")
+        self.assertEqual(
+            languages_for_sync(["guide/start_zh.md"], [], languages), {"zh"}
+        )
+        self.assertEqual(
+            languages_for_sync([], ["guide/start.md"], languages), {"en"}
+        )
+        self.assertEqual(
+            languages_for_sync(["guide/images/board.png"], [], languages),
+            {"zh", "en"},
+        )
+        self.assertEqual(
+            languages_for_sync(["guide/start_zh.md"], [], ("zh",)), {"zh"}
+        )
+        self.assertEqual(languages_for_sync([], [], languages), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import yaml
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.sphinx_runner import (
+    SphinxBuildError,
+    run_sphinx,
+    shares_helper_modules,
+)
+
+
+class SphinxRunnerTests(unittest.TestCase):
+    def test_helper_modules_must_match_to_build_in_process(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = Path(temp_dir)
+            self.assertTrue(shares_helper_modules(SOURCE_DIR))
+            self.assertFalse(shares_helper_modules(source))
+
+            shutil.copytree(SOURCE_DIR / "utils", source / "utils")
+            self.assertTrue(shares_helper_modules(source))
+
+            with (source / "utils" / "language_support.py").open(
+                "a", encoding="utf-8"
+            ) as helper:
+                helper.write("\n# older worktree\n")
+            self.assertFalse(shares_helper_modules(source))
+
+    def test_in_process_overrides_rebuild_language_specific_latex(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            source = root / "source"
+            source.mkdir()
+            shutil.copy2(SOURCE_DIR / "conf.py", source / "conf.py")
+            shutil.copytree(SOURCE_DIR / "utils", source / "utils")
+            (source / "config.yaml").write_text(
+                yaml.safe_dump(
+                    {
+                        "project": {"name": "Runner_Test"},
+                        "generation": {
+                            "language_detection": {
+                                "zh": "README_zh.md",
+                                "en": "README.md",
+                            },
+                            "default_language": "zh",
+                        },
+                        "sphinx": {"extensions": ["myst_parser"]},
+                    },
+                    allow_unicode=True,
+                ),
+                encoding="utf-8",
+            )
+            (source / "README_zh.md").write_text(
+                "# 中文首页\n", encoding="utf-8"
+            )
+            (source / "README.md").write_text(
+                "# English Home\n", encoding="utf-8"
+            )
+
+            for language, master_doc, excluded in (
+                ("zh_CN", "README_zh", "README.md"),
+                ("en", "README", "README_zh.md"),
+            ):
+                run_sphinx(
+                    source,
+                    root / language,
+                    "latex",
+                    language=language,
+                    master_doc=master_doc,
+                    exclude_patterns=[excluded],
+                    available_languages=["zh", "en"],
+                    capture_output=True,
+                    quiet=True,
+                )
+
+            zh_tex = (root / "zh_CN" / "sdk-docs.tex").read_text(encoding="utf-8")
+            en_tex = (root / "en" / "sdk-docs.tex").read_text(encoding="utf-8")
+            self.assertIn("开发文档", zh_tex)
+            self.assertIn(r"\renewcommand{\contentsname}{目录}", zh_tex)
+            self.assertIn(r"\detokenize{README_zh::doc}", zh_tex)
+            self.assertIn("Technical Documentation", en_tex)
+            self.assertIn(r"CHAPTER \thechapter", en_tex)
+            self.assertIn(r"\detokenize{README::doc}", en_tex)
+            self.assertNotIn("开发文档", en_tex)
+
+    def test_in_process_failure_is_a_called_process_error(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = Path(temp_dir) / "source"
+            source.mkdir()
+            (source / "conf.py").write_text(
+                "extensions = ['missing_docs_extension']\n", encoding="utf-8"
+            )
+            (source / "index.rst").write_text("Title\n=====\n", encoding="utf-8")
+
+            with self.assertRaises(subprocess.CalledProcessError) as raised:
+                run_sphinx(
+                    source,
+                    Path(temp_dir) / "html",
+                    capture_output=True,
+                    in_process=True,
+                )
+
+        error = pickle.loads(pickle.dumps(raised.exception))
+        self.assertIsInstance(error, SphinxBuildError)
+        self.assertIn("missing_docs_extension", error.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
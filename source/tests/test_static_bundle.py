@@ -0,0 +1,142 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils import static_bundle
+from utils.static_bundle import (
+    BUNDLE_DIRECTORY_NAME,
+    STATIC_URL_PROLOGUE,
+    build_static_bundles,
+    bundle_static_files,
+    minify_css,
+    minify_js,
+)
+
+
+class MinifyTests(unittest.TestCase):
+    JS = (
+        "// header\n"
+        "var url = 'http://x//y';  /* note */\n"
+        "var re = /a\\/b[/]/g, half = total / 2;\n"
+        "var html = `<a href=\"${ items.map(i => `${i}` ).join(' ') }\">  x  </a>`;\n"
+        "var a = b\n"
+        "(c || d)\n"
+    )
+    CSS = (
+        "/* theme */\n"
+        "@media (max-width: 600px) {\n"
+        "  a :hover , b > c { margin : 0 calc(1px + 2px) ; }\n"
+        "}\n"
+        "d::after { content: \"a  /* ; */  b\"; }\n"
+    )
+
+    @unittest.skipIf(static_bundle.rjsmin is None, "rjsmin is not installed")
+    def test_js_keeps_literals_and_statement_breaks(self):
+        minified = minify_js(self.JS)
+
+        self.assertNotIn("header", minified)
+        self.assertNotIn("note", minified)
+        self.assertIn("'http://x//y'", minified)
+        self.assertIn("/a\\/b[/]/g", minified)
+        self.assertIn("total/2", minified)
+        self.assertIn("`${i}`", minified)
+        self.assertIn("\">  x  </a>`", minified)
+        self.assertIn("var a=b\n(c||d)", minified)
+
+    def test_js_is_left_alone_without_rjsmin(self):
+        with patch.object(static_bundle, "rjsmin", None):
+            self.assertEqual(minify_js(self.JS), self.JS)
+
+    @unittest.skipIf(static_bundle.rcssmin is None, "rcssmin is not installed")
+    def test_css_drops_comments_and_keeps_significant_spaces(self):
+        self.assertEqual(
+            minify_css(self.CSS),
+            "@media (max-width:600px){a :hover,b>c{margin:0 calc(1px + 2px)}}"
+            "d::after{content:\"a  /* ; */  b\"}\n",
+        )
+
+    def test_css_fallback_only_strips_comments_and_indentation(self):
+        with patch.object(static_bundle, "rcssmin", None):
+            self.assertEqual(
+                minify_css(self.CSS),
+                "@media (max-width: 600px) {\n"
+                "a :hover , b > c { margin : 0 calc(1px + 2px) ; }\n"
+                "}\n"
+                "d::after { content: \"a  /* ; */  b\"; }\n",
+            )
+
+
+class StaticBundleTests(unittest.TestCase):
+    def _static(self, root: Path) -> Path:
+        static_dir = root / "_static"
+        static_dir.mkdir()
+        (static_dir / "menu.js").write_text("(function () { menu(); })()\n", encoding="utf-8")
+        (static_dir / "switch.js").write_text("(function () { lang(); })()\n", encoding="utf-8")
+        (static_dir / "menu.css").write_text(".menu { color: red; }\n", encoding="utf-8")
+        return static_dir
+
+    def test_bundles_are_named_by_content_and_replace_older_ones(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            static_dir = self._static(root)
+            output_dir = root / "bundles"
+
+            first = build_static_bundles(
+                static_dir, ["menu.css"], ["menu.js", "switch.js"], output_dir
+            )
+            again = build_static_bundles(
+                static_dir, ["menu.css"], ["menu.js", "switch.js"], output_dir
+            )
+            (static_dir / "switch.js").write_text("lang();\n", encoding="utf-8")
+            changed = build_static_bundles(
+                static_dir, ["menu.css"], ["menu.js", "switch.js"], output_dir
+            )
+
+            self.assertEqual(first, again)
+            self.assertEqual(first["css"], changed["css"])
+            self.assertNotEqual(first["js"], changed["js"])
+            self.assertEqual(
+                sorted(path.name for path in output_dir.iterdir()),
+                sorted(changed.values()),
+            )
+            self.assertEqual(
+                (output_dir / changed["js"]).read_text(encoding="utf-8"),
+                STATIC_URL_PROLOGUE
+                + minify_js("(function () { menu(); })()\n").rstrip()
+                + ";\nlang();;\n",
+            )
+
+    def test_config_keeps_files_missing_from_the_source_tree(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._static(root)
+            app = SimpleNamespace(confdir=str(root), doctreedir=str(root / "doctrees"))
+            config = SimpleNamespace(
+                html_static_path=["_static"],
+                html_css_files=["menu.css", "https://cdn.example.com/x.css"],
+                html_js_files=["menu.js", "version_info.js", "switch.js"],
+                html_context={"giscus": {}},
+            )
+
+            bundle_static_files(app, config)
+
+            bundle_dir = root / "doctrees" / BUNDLE_DIRECTORY_NAME
+            self.assertEqual(config.html_static_path, ["_static", str(bundle_dir)])
+            self.assertEqual(config.html_css_files, ["https://cdn.example.com/x.css"])
+            self.assertEqual(config.html_js_files, ["version_info.js"])
+            bundles = config.html_context["docs_bundle"]
+            self.assertIn("giscus", config.html_context)
+            self.assertTrue((bundle_dir / Path(bundles["js"]).name).is_file())
+            self.assertTrue(bundles["css"].startswith("_static/docs."))
+
+
+if __name__ == "__main__":
+    unittest.main()
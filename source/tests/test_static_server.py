@@ -0,0 +1,109 @@
+import gzip
+import io
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.static_server import create_server, is_fingerprinted
+
+
+PAGE = "<html>" + "文档" * 400 + "</html>\n"
+
+
+class StaticServerTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp_dir.name)
+        (self.root / "guide").mkdir()
+        (self.root / "guide" / "index.html").write_text(PAGE, encoding="utf-8")
+        (self.root / "guide" / "index.html.gz").write_bytes(
+            gzip.compress(PAGE.encode("utf-8"))
+        )
+        (self.root / "manual.pdf").write_bytes(bytes(range(256)) * 4)
+        (self.root / "docs.0123456789abcdef.js").write_text("run();\n", encoding="utf-8")
+        self.log = io.StringIO()
+        self.server = create_server(self.root, 0, bind="127.0.0.1", cache_max_age=600)
+        self.server.access_log = self.log
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._temp_dir.cleanup()
+
+    def _get(self, path, **headers):
+        request = urllib.request.Request(self.base + path, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers, error.read()
+
+    def test_serves_gzip_sidecar_and_revalidates_with_etag(self):
+        status, headers, body = self._get("/guide/", **{"Accept-Encoding": "gzip, br;q=0"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(headers["Content-Type"], "text/html; charset=utf-8")
+        self.assertEqual(headers["Cache-Control"], "no-cache")
+        self.assertEqual(gzip.decompress(body).decode("utf-8"), PAGE)
+
+        status, _, body = self._get(
+            "/guide/", **{"Accept-Encoding": "gzip", "If-None-Match": headers["ETag"]}
+        )
+        self.assertEqual((status, body), (304, b""))
+
+        status, plain, body = self._get("/guide/index.html")
+        self.assertIsNone(plain["Content-Encoding"])
+        self.assertNotEqual(plain["ETag"], headers["ETag"])
+        self.assertEqual(body.decode("utf-8"), PAGE)
+
+    def test_answers_byte_ranges(self):
+        status, headers, body = self._get("/manual.pdf", Range="bytes=10-19")
+        self.assertEqual(status, 206)
+        self.assertEqual(headers["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(headers["Content-Type"], "application/pdf")
+        self.assertEqual(body, bytes(range(10, 20)))
+
+        status, _, body = self._get("/manual.pdf", Range="bytes=-4")
+        self.assertEqual((status, body), (206, bytes(range(252, 256))))
+
+        status, headers, _ = self._get("/manual.pdf", Range="bytes=2048-")
+        self.assertEqual(status, 416)
+        self.assertEqual(headers["Content-Range"], "bytes */1024")
+
+        status, _, body = self._get("/manual.pdf", Range="bytes=0-1", **{"If-Range": '"stale"'})
+        self.assertEqual((status, len(body)), (200, 1024))
+
+    def test_fingerprinted_assets_are_immutable_and_requests_are_logged(self):
+        status, headers, _ = self._get("/docs.0123456789abcdef.js")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Cache-Control"], "public, max-age=600, immutable")
+        self.assertEqual(headers["Content-Type"], "text/javascript; charset=utf-8")
+        self.assertEqual(self._get("/missing.html")[0], 404)
+
+        self.server.shutdown()
+        lines = self.log.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertRegex(lines[0], r'"GET /docs\.0123456789abcdef\.js HTTP/1\.1" 200 7 \d+\.\dms$')
+        self.assertIn('"GET /missing.html HTTP/1.1" 404', lines[1])
+
+    def test_recognises_fingerprinted_urls(self):
+        self.assertTrue(is_fingerprinted("/_assets/theme.0123456789abcdef.css"))
+        self.assertTrue(is_fingerprinted("/_static/pygments.css", "v=d111a655"))
+        self.assertFalse(is_fingerprinted("/_static/version_menu.js"))
+        self.assertFalse(is_fingerprinted("/_static/jquery.js", "v=5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.version_cache import (
+    HASHED_TREES,
+    VersionBuildCache,
+    version_cache_key,
+    working_tree_matches_head,
+)
+
+
+def _git(root, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=Docs", "-c", "user.email=docs@example.com", *args],
+        cwd=str(root),
+        check=True,
+        capture_output=True,
+    )
+
+
+class VersionCacheTests(unittest.TestCase):
+    def _repository(self, root: Path) -> Path:
+        (root / "source").mkdir()
+        (root / "projects").mkdir()
+        (root / "source" / "config.yaml").write_text("project: {}\n", encoding="utf-8")
+        (root / "projects" / "README.md").write_text("# Docs\n", encoding="utf-8")
+        (root / "notes.txt").write_text("outside\n", encoding="utf-8")
+        _git(root, "init", "-q", "-b", "main")
+        _git(root, "add", ".")
+        _git(root, "commit", "-q", "-m", "docs")
+        return root
+
+    def _key(self, root, revision="main", versions=b"{}", builder="builder"):
+        return version_cache_key(
+            root, revision, {"name": "lts", "url_path": "lts"}, versions, builder
+        )
+
+    def test_key_follows_documentation_trees_builder_and_versions(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._repository(Path(temp_dir))
+            key = self._key(root)
+            self.assertIsNotNone(key)
+
+            (root / "notes.txt").write_text("changed\n", encoding="utf-8")
+            _git(root, "commit", "-q", "-am", "outside docs")
+            self.assertEqual(self._key(root), key)
+
+            self.assertNotEqual(self._key(root, builder="newer"), key)
+            self.assertNotEqual(self._key(root, versions=b'{"versions": []}'), key)
+
+            (root / "projects" / "README.md").write_text("# Changed\n", encoding="utf-8")
+            self.assertFalse(working_tree_matches_head(root, HASHED_TREES))
+            _git(root, "commit", "-q", "-am", "content")
+            self.assertTrue(working_tree_matches_head(root, HASHED_TREES))
+            self.assertNotEqual(self._key(root), key)
+
+            (root / "projects" / "new.md").write_text("# New\n", encoding="utf-8")
+            self.assertFalse(working_tree_matches_head(root, HASHED_TREES))
+            self.assertIsNone(self._key(root, revision="missing-branch"))
+
+    def test_restore_replaces_output_only_for_matching_key(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            built = root / "html" / "lts"
+            built.mkdir(parents=True)
+            (built / "index.html").write_text("cached", encoding="utf-8")
+            cache = VersionBuildCache(root / "version_cache")
+            cache.store("lts", "key-1", built)
+
+            (built / "index.html").write_text("stale", encoding="utf-8")
+            (built / "extra.html").write_text("stale", encoding="utf-8")
+            self.assertFalse(cache.restore("lts", "key-2", built))
+            self.assertTrue(cache.restore("lts", "key-1", built))
+
+            self.assertEqual((built / "index.html").read_text(encoding="utf-8"), "cached")
+            self.assertFalse((built / "extra.html").exists())
+            self.assertEqual(
+                sorted(path.name for path in (root / "html").iterdir()), ["lts"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from utils.worktree_pool import WorktreePool, resolve_revision
+
+
+def _git(root, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=Docs", "-c", "user.email=docs@example.com", *args],
+        cwd=str(root),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+class WorktreePoolTests(unittest.TestCase):
+    def test_worktrees_are_reused_in_place_and_pruned(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir) / "repo"
+            for relative, content in (
+                ("source/conf.py", "project = 'one'\n"),
+                ("projects/README.md", "# Docs\n"),
+                ("figures/large.bin", "binary\n"),
+            ):
+                (root / relative).parent.mkdir(parents=True, exist_ok=True)
+                (root / relative).write_text(content, encoding="utf-8")
+            _git(root.parent, "init", "-q", "-b", "main", str(root))
+            _git(root, "add", ".")
+            _git(root, "commit", "-q", "-m", "one")
+            _git(root, "branch", "release")
+            first = resolve_revision(root, "release")
+
+            pool = WorktreePool(
+                root, root / "source" / "source_build" / "worktrees",
+                sparse_paths=["source", "projects"],
+            )
+            worktree = pool.checkout("release", first)
+            self.assertEqual(
+                (worktree / "source" / "conf.py").read_text(encoding="utf-8"),
+                "project = 'one'\n",
+            )
+            self.assertFalse((worktree / "figures").exists())
+            (worktree / "source" / "_build").mkdir()
+            marker = worktree / "projects" / "README.md"
+            inode = marker.stat().st_ino
+
+            (root / "source" / "conf.py").write_text("project = 'two'\n", encoding="utf-8")
+            _git(root, "commit", "-q", "-am", "two")
+            second = resolve_revision(root, "main")
+            self.assertEqual(pool.checkout("release", second), worktree)
+            self.assertEqual(
+                (worktree / "source" / "conf.py").read_text(encoding="utf-8"),
+                "project = 'two'\n",
+            )
+            self.assertFalse((worktree / "source" / "_build").exists())
+            self.assertEqual(marker.stat().st_ino, inode)
+
+            pool.sparse_paths = None
+            pool.checkout("release", second)
+            self.assertTrue((worktree / "figures" / "large.bin").is_file())
+
+            self.assertFalse(pool.remove(root / "source"))
+            self.assertEqual(pool.prune(), [worktree])
+            self.assertFalse(worktree.exists())
+            self.assertNotIn(
+                str(worktree), _git(root, "worktree", "list", "--porcelain")
+            )
+            self.assertIsNone(resolve_revision(root, "missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
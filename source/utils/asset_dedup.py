@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Share identical static files across every language and version of a site.
+
+Each language build writes its own ``_static`` (``_static_en`` and so on)
+and every version repeats the same theme CSS/JS and fonts.  The files of
+all static directories under the site root are grouped by content; every
+duplicated content is stored once as ``_assets/<stem>.<hash><suffix>``.
+
+Stylesheets and scripts that every copy's pages load through ``href`` or
+``src`` attributes are served from ``_assets`` directly: the attributes are
+rewritten to the fingerprinted name and the per-directory copies removed.  A stylesheet
+may be moved when every relative ``url()`` in it resolves to the same
+content from each copy; those URLs are rewritten to the shared copies of
+their targets.  Scripts that locate themselves from their own ``<script>``
+tag, files referenced by other static files, and every other duplicate are
+left in place as hardlinks to the shared copy.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+
+ASSETS_DIRECTORY_NAME = "_assets"
+FINGERPRINT_LENGTH = 16
+RELOCATABLE_SUFFIXES = (".css", ".js")
+
+_STATIC_DIRECTORY_PATTERN = re.compile(r"_static(?:_[A-Za-z0-9-]+)?")
+_REFERENCE_PATTERN = re.compile(r'\b(href|src)="([^"]+)"')
+_CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_CSS_IMPORT_PATTERN = re.compile(r"@import\b")
+_SELF_LOCATING_SCRIPT_PATTERN = re.compile(
+    r"document\.currentScript|document\.scripts"
+    r"|getElementsByTagName\(\s*['\"]script['\"]\s*\)|import\.meta"
+)
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_external(url: str) -> bool:
+    return (
+        not url
+        or url.startswith(("/", "#", "data:", "mailto:", "javascript:"))
+        or "://" in url
+    )
+
+
+def _split_url(url: str):
+    for separator in ("?", "#"):
+        url = url.split(separator, 1)[0]
+    return url
+
+
+def _resolve(base_dir: str, url: str) -> str:
+    return posixpath.normpath(posixpath.join(base_dir, _split_url(url)))
+
+
+def _relative_url(target: str, base_dir: str) -> str:
+    return posixpath.relpath(target, base_dir or ".")
+
+
+def _fingerprinted_name(relative_path: str, digest: str) -> str:
+    name = posixpath.basename(relative_path)
+    stem, suffix = posixpath.splitext(name)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{suffix}"
+
+
+def _replace_text(path: Path, text: str) -> None:
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_text(text, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+class _Content:
+    """One file content found at one or more site paths."""
+
+    def __init__(self, digest: str, size: int):
+        self.digest = digest
+        self.size = size
+        self.paths: List[str] = []
+        # Shared file name under _assets, and the bytes stored for it.
+        self.shared_name: Optional[str] = None
+        self.relocated = False
+        self.text: Optional[str] = None
+
+
+def _static_files(site_root: Path) -> List[str]:
+    """Return site-relative POSIX paths of files inside static directories."""
+    files = []
+    for root, dirs, names in os.walk(site_root):
+        current = Path(root)
+        relative = current.relative_to(site_root).as_posix()
+        if relative == ".":
+            relative = ""
+            dirs[:] = [name for name in dirs if name != ASSETS_DIRECTORY_NAME]
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        parts = relative.split("/") if relative else []
+        if not any(_STATIC_DIRECTORY_PATTERN.fullmatch(part) for part in parts):
+            continue
+        files.extend(
+            posixpath.join(relative, name)
+            for name in sorted(names)
+            if not name.startswith(".")
+        )
+    return files
+
+
+def _group_by_content(site_root: Path, paths: List[str]) -> Dict[str, _Content]:
+    sizes: Dict[int, List[str]] = {}
+    for path in paths:
+        full_path = site_root / path
+        if full_path.is_symlink():
+            continue
+        sizes.setdefault(full_path.stat().st_size, []).append(path)
+    contents: Dict[str, _Content] = {}
+    for size, candidates in sizes.items():
+        if len(candidates) < 2:
+            continue
+        for path in candidates:
+            digest = _file_digest(site_root / path)
+            contents.setdefault(digest, _Content(digest, size)).paths.append(path)
+    return {
+        digest: content
+        for digest, content in contents.items()
+        if len(content.paths) > 1
+    }
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        return path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _relocated_stylesheet(
+    site_root: Path,
+    content: _Content,
+    digests: Dict[str, Optional[str]],
+    shared: Dict[str, _Content],
+) -> Optional[str]:
+    """Return the stylesheet text with URLs pointing into ``_assets``.
+
+    Returns None when a relative URL resolves to different contents from
+    different copies, or to a file that is missing.
+    """
+    text = _read_text(site_root / content.paths[0])
+    if text is None or _CSS_IMPORT_PATTERN.search(text):
+        return None
+    targets = {}
+    for match in _CSS_URL_PATTERN.finditer(text):
+        url = match.group(2).strip()
+        if _is_external(url) or url in targets:
+            continue
+        resolved_digests = set()
+        for path in content.paths:
+            target = _resolve(posixpath.dirname(path), url)
+            if target not in digests:
+                full_target = site_root / target
+                digests[target] = (
+                    _file_digest(full_target) if full_target.is_file() else None
+                )
+            resolved_digests.add(digests[target])
+        if len(resolved_digests) != 1 or None in resolved_digests:
+            return None
+        target = _resolve(posixpath.dirname(content.paths[0]), url)
+        digest = resolved_digests.pop()
+        target_content = shared.get(digest)
+        if target_content is None:
+            target_content = _Content(digest, (site_root / target).stat().st_size)
+            target_content.paths.append(target)
+            shared[digest] = target_content
+        target_content.shared_name = target_content.shared_name or _fingerprinted_name(
+            target_content.paths[0], digest
+        )
+        suffix = url[len(_split_url(url)):]
+        targets[url] = f"{target_content.shared_name}{suffix}"
+
+    def relocate(match) -> str:
+        url = match.group(2).strip()
+        if url not in targets:
+            return match.group(0)
+        quote = match.group(1)
+        return f"url({quote}{targets[url]}{quote})"
+
+    return _CSS_URL_PATTERN.sub(relocate, text)
+
+
+def _is_relocatable_script(site_root: Path, content: _Content) -> bool:
+    text = _read_text(site_root / content.paths[0])
+    return text is not None and not _SELF_LOCATING_SCRIPT_PATTERN.search(text)
+
+
+def _referenced_by_static_files(
+    site_root: Path, static_paths: List[str], candidates: Dict[str, _Content]
+) -> Set[str]:
+    """Return digests of candidates whose file name appears in other static files."""
+    names: Dict[str, Set[str]] = {}
+    for content in candidates.values():
+        for path in content.paths:
+            names.setdefault(posixpath.basename(path), set()).add(content.digest)
+    if not names:
+        return set()
+    pattern = re.compile("|".join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+    referenced = set()
+    for path in static_paths:
+        if not path.endswith((".css", ".js", ".json", ".html")):
+            continue
+        text = _read_text(site_root / path)
+        if text is None:
+            continue
+        own_name = posixpath.basename(path)
+        for match in pattern.finditer(text):
+            if match.group(0) != own_name:
+                referenced.update(names[match.group(0)])
+    return referenced
+
+
+def _store_shared_copy(site_root: Path, content: _Content, text: Optional[str]) -> Path:
+    """Write the shared copy of *content* unless an intact one exists."""
+    assets_dir = site_root / ASSETS_DIRECTORY_NAME
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    shared_path = assets_dir / content.shared_name
+    if text is not None:
+        if _read_text(shared_path) != text:
+            _replace_text(shared_path, text)
+        return shared_path
+    # Hardlinked copies written through by an in-place build no longer
+    # match their fingerprint and are replaced.
+    if shared_path.is_file() and _file_digest(shared_path) == content.digest:
+        return shared_path
+    temporary = shared_path.with_name(f".{shared_path.name}.tmp")
+    shutil.copy2(site_root / content.paths[0], temporary)
+    os.replace(temporary, shared_path)
+    return shared_path
+
+
+def _link_to_shared_copy(shared_path: Path, path: Path) -> None:
+    try:
+        if os.path.samefile(shared_path, path):
+            return
+    except OSError:
+        pass
+    temporary = path.with_name(f".{path.name}.tmp")
+    try:
+        os.link(shared_path, temporary)
+    except OSError:
+        shutil.copy2(shared_path, temporary)
+    os.replace(temporary, path)
+
+
+def _pages(site_root: Path):
+    """Yield ``(page, base_dir, text)`` for pages that may load static files."""
+    for root, dirs, names in os.walk(site_root):
+        current = Path(root)
+        relative = current.relative_to(site_root).as_posix()
+        base_dir = "" if relative == "." else relative
+        if not base_dir:
+            dirs[:] = [name for name in dirs if name != ASSETS_DIRECTORY_NAME]
+        for name in names:
+            if not name.endswith(".html"):
+                continue
+            page = current / name
+            text = _read_text(page)
+            if text is not None and ("_static" in text or ASSETS_DIRECTORY_NAME in text):
+                yield page, base_dir, text
+
+
+def _page_references(site_root: Path) -> Set[str]:
+    """Return the site-relative paths loaded by ``href``/``src`` attributes."""
+    return {
+        _resolve(base_dir, match.group(2))
+        for _, base_dir, text in _pages(site_root)
+        for match in _REFERENCE_PATTERN.finditer(text)
+        if not _is_external(match.group(2))
+    }
+
+
+def _rewrite_pages(site_root: Path, relocated: Dict[str, str], used_names: Set[str]) -> int:
+    """Point page references at the shared copies; return pages rewritten.
+
+    Names of shared copies the pages refer to are added to *used_names*.
+    """
+    assets_dir = ASSETS_DIRECTORY_NAME
+    rewritten = 0
+    for page, base_dir, text in _pages(site_root):
+
+        def relocate(match) -> str:
+            url = match.group(2)
+            if _is_external(url):
+                return match.group(0)
+            resolved = _resolve(base_dir, url)
+            if posixpath.dirname(resolved) == assets_dir:
+                used_names.add(posixpath.basename(resolved))
+                return match.group(0)
+            shared_name = relocated.get(resolved)
+            if shared_name is None:
+                return match.group(0)
+            used_names.add(shared_name)
+            target = _relative_url(posixpath.join(assets_dir, shared_name), base_dir)
+            return f'{match.group(1)}="{target}"'
+
+        updated = _REFERENCE_PATTERN.sub(relocate, text)
+        if updated != text:
+            _replace_text(page, updated)
+            rewritten += 1
+    return rewritten
+
+
+def deduplicate_assets(site_root: Path) -> Dict[str, int]:
+    """Store duplicated static files of *site_root* once under ``_assets``.
+
+    Returns counts of the ``files`` examined, ``shared`` contents,
+    ``relocated`` and ``linked`` copies, ``pages`` rewritten and the
+    ``bytes_saved`` compared to keeping every copy.
+    """
+    site_root = Path(site_root)
+    stats = {
+        "files": 0, "shared": 0, "relocated": 0, "linked": 0,
+        "pages": 0, "bytes_saved": 0,
+    }
+    if not site_root.is_dir():
+        return stats
+    static_paths = _static_files(site_root)
+    stats["files"] = len(static_paths)
+    shared = _group_by_content(site_root, static_paths)
+    # Copies nothing links to may be loaded some other way and stay put.
+    page_references = _page_references(site_root)
+    candidates = {
+        digest: content
+        for digest, content in shared.items()
+        if content.paths[0].endswith(RELOCATABLE_SUFFIXES)
+        and all(path in page_references for path in content.paths)
+    }
+    referenced = _referenced_by_static_files(site_root, static_paths, candidates)
+
+    digests = {path: content.digest for content in shared.values() for path in content.paths}
+    relocated: Dict[str, str] = {}
+    for digest, content in list(candidates.items()):
+        if digest in referenced:
+            continue
+        content.shared_name = _fingerprinted_name(content.paths[0], digest)
+        if content.paths[0].endswith(".css"):
+            content.text = _relocated_stylesheet(site_root, content, digests, shared)
+            if content.text is None:
+                continue
+        elif not _is_relocatable_script(site_root, content):
+            continue
+        content.relocated = True
+        relocated.update((path, content.shared_name) for path in content.paths)
+
+    used_names = set()
+    for content in list(shared.values()):
+        content.shared_name = content.shared_name or _fingerprinted_name(
+            content.paths[0], content.digest
+        )
+        shared_path = _store_shared_copy(site_root, content, content.text)
+        used_names.add(content.shared_name)
+        stored_size = shared_path.stat().st_size
+        if content.relocated:
+            stats["relocated"] += len(content.paths)
+            stats["bytes_saved"] += content.size * len(content.paths) - stored_size
+            continue
+        for path in content.paths:
+            _link_to_shared_copy(shared_path, site_root / path)
+        stats["linked"] += len(content.paths)
+        stats["bytes_saved"] += content.size * (len(content.paths) - 1)
+    stats["shared"] = len(used_names)
+
+    stats["pages"] = _rewrite_pages(site_root, relocated, used_names)
+    for path in relocated:
+        (site_root / path).unlink(missing_ok=True)
+
+    assets_dir = site_root / ASSETS_DIRECTORY_NAME
+    if assets_dir.is_dir():
+        # Shared stylesheets kept for the pages keep their fonts and images.
+        for name in [name for name in used_names if name.endswith(".css")]:
+            text = _read_text(assets_dir / name) or ""
+            used_names.update(
+                posixpath.basename(_split_url(match.group(2).strip()))
+                for match in _CSS_URL_PATTERN.finditer(text)
+                if not _is_external(match.group(2).strip())
+            )
+        for entry in assets_dir.iterdir():
+            if entry.name not in used_names:
+                entry.unlink()
+        if not any(assets_dir.iterdir()):
+            assets_dir.rmdir()
+    return stats
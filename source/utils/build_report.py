@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Record nested build stages and write JSON and Chrome trace reports."""
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+REPORT_FILENAME = "build_report.json"
+TRACE_FILENAME = "build_trace.json"
+REPORT_VERSION = 1
+
+_spans: List["StageSpan"] = []
+_spans_lock = threading.Lock()
+_span_ids = itertools.count(1)
+_current_span: ContextVar[Optional[str]] = ContextVar(
+    "build_report_current_span", default=None
+)
+
+
+@dataclass
+class StageSpan:
+    """One timed build stage; times are seconds, memory is MiB."""
+
+    id: str
+    name: str
+    parent: Optional[str]
+    start: float
+    wall_seconds: float
+    cpu_seconds: float
+    child_cpu_seconds: float
+    peak_rss_mb: Optional[float]
+    child_peak_rss_mb: Optional[float]
+    pid: int
+    thread: int
+    attributes: Dict[str, object] = field(default_factory=dict)
+    failed: bool = False
+
+
+def _rusage(who) -> Tuple[float, Optional[float]]:
+    """Return (CPU seconds, peak RSS in MiB) for *who*, or zeros without resource."""
+    if resource is None:
+        return 0.0, None
+    usage = resource.getrusage(who)
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss / scale
+
+
+def _child_rusage() -> Tuple[float, Optional[float]]:
+    return _rusage(resource.RUSAGE_CHILDREN if resource else None)
+
+
+def _self_rusage() -> Tuple[float, Optional[float]]:
+    return _rusage(resource.RUSAGE_SELF if resource else None)
+
+
+@contextmanager
+def stage(name: str, **attributes) -> Iterator[None]:
+    """Time the enclosed block as a stage nested in the current one.
+
+    CPU time covers this process and, separately, every child process
+    (sphinx-build, xelatex) reaped during the stage; peak RSS is the
+    high-water mark observed when the stage ends.
+    """
+    span_id = f"{os.getpid()}-{next(_span_ids)}"
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.time()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    child_cpu_started, _ = _child_rusage()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current_span.reset(token)
+        child_cpu, child_peak = _child_rusage()
+        _, peak = _self_rusage()
+        span = StageSpan(
+            id=span_id,
+            name=name,
+            parent=parent,
+            start=start,
+            wall_seconds=time.perf_counter() - started,
+            cpu_seconds=time.process_time() - cpu_started,
+            child_cpu_seconds=child_cpu - child_cpu_started,
+            peak_rss_mb=peak,
+            child_peak_rss_mb=child_peak,
+            pid=os.getpid(),
+            thread=threading.get_ident(),
+            attributes=dict(attributes),
+            failed=failed,
+        )
+        with _spans_lock:
+            _spans.append(span)
+
+
+def reset_build_report() -> None:
+    """Forget every recorded stage (call at the start of a build)."""
+    with _spans_lock:
+        _spans.clear()
+
+
+def recorded_spans() -> List[StageSpan]:
+    with _spans_lock:
+        return list(_spans)
+
+
+def adopt_spans(spans: Iterable[StageSpan]) -> None:
+    """Merge stages recorded in a worker process under the current stage."""
+    parent = _current_span.get()
+    adopted = [
+        StageSpan(**{**asdict(span), "parent": span.parent or parent})
+        for span in spans
+    ]
+    with _spans_lock:
+        _spans.extend(adopted)
+
+
+def traced_call(name: str, attributes: Dict[str, object], function, *args, **kwargs):
+    """Run *function* as one stage in a worker; return (result, stages).
+
+    Pool workers are reused, so their recorder is reset before each call and
+    the stages travel back with the result for :func:`adopt_spans`.
+    """
+    reset_build_report()
+    with stage(name, **attributes):
+        result = function(*args, **kwargs)
+    return result, recorded_spans()
+
+
+def _stage_tree(spans: List[StageSpan]) -> List[Dict[str, object]]:
+    children: Dict[Optional[str], List[StageSpan]] = {}
+    known = {span.id for span in spans}
+    for span in sorted(spans, key=lambda item: item.start):
+        parent = span.parent if span.parent in known else None
+        children.setdefault(parent, []).append(span)
+
+    def node(span: StageSpan) -> Dict[str, object]:
+        entry = {
+            key: value
+            for key, value in asdict(span).items()
+            if key not in {"id", "parent", "thread"}
+        }
+        entry["wall_seconds"] = round(span.wall_seconds, 4)
+        entry["cpu_seconds"] = round(span.cpu_seconds, 4)
+        entry["child_cpu_seconds"] = round(span.child_cpu_seconds, 4)
+        entry["stages"] = [node(child) for child in children.get(span.id, [])]
+        return entry
+
+    return [node(span) for span in children.get(None, [])]
+
+
+def _self_cpu_seconds(spans: List[StageSpan]) -> Dict[str, float]:
+    """Return each span's CPU time minus the time already counted by its children.
+
+    A span's in-process CPU includes its same-process children's; its
+    child-process CPU includes the workers and tools reaped while it ran,
+    which is where adopted worker stages are counted.  Each part is clamped
+    at zero since a worker that outlives its stage is never reaped into it.
+    """
+    children: Dict[str, List[StageSpan]] = {}
+    for span in spans:
+        if span.parent is not None:
+            children.setdefault(span.parent, []).append(span)
+    result = {}
+    for span in spans:
+        own = span.cpu_seconds
+        reaped = span.child_cpu_seconds
+        for child in children.get(span.id, []):
+            if child.pid == span.pid:
+                own -= child.cpu_seconds
+                reaped -= child.child_cpu_seconds
+            else:
+                reaped -= child.cpu_seconds + child.child_cpu_seconds
+        result[span.id] = max(own, 0.0) + max(reaped, 0.0)
+    return result
+
+
+def _stage_summary(spans: List[StageSpan]) -> Dict[str, Dict[str, float]]:
+    self_cpu = _self_cpu_seconds(spans)
+    summary: Dict[str, Dict[str, float]] = {}
+    for span in spans:
+        totals = summary.setdefault(
+            span.name, {"count": 0, "wall_seconds": 0.0, "self_cpu_seconds": 0.0}
+        )
+        totals["count"] += 1
+        totals["wall_seconds"] = round(totals["wall_seconds"] + span.wall_seconds, 4)
+        totals["self_cpu_seconds"] = round(
+            totals["self_cpu_seconds"] + self_cpu[span.id], 4
+        )
+    return dict(
+        sorted(summary.items(), key=lambda item: -item[1]["wall_seconds"])
+    )
+
+
+def _trace_events(spans: List[StageSpan]) -> List[Dict[str, object]]:
+    origin = min(span.start for span in spans)
+    thread_ids: Dict[Tuple[int, int], int] = {}
+    events = []
+    for span in sorted(spans, key=lambda item: item.start):
+        tid = thread_ids.setdefault(
+            (span.pid, span.thread),
+            sum(1 for pid, _ in thread_ids if pid == span.pid),
+        )
+        events.append(
+            {
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((span.start - origin) * 1_000_000),
+                "dur": round(span.wall_seconds * 1_000_000),
+                "pid": span.pid,
+                "tid": tid,
+                "args": {
+                    **{key: str(value) for key, value in span.attributes.items()},
+                    "cpu_seconds": round(span.cpu_seconds, 4),
+                    "child_cpu_seconds": round(span.child_cpu_seconds, 4),
+                    "peak_rss_mb": span.peak_rss_mb,
+                    "failed": span.failed,
+                },
+            }
+        )
+    for pid in sorted({span.pid for span in spans}):
+        label = "build" if pid == os.getpid() else f"worker {pid}"
+        events.append(
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": label}}
+        )
+    return events
+
+
+def write_build_report(
+    output_dir: Path, **metadata
+) -> Optional[Tuple[Path, Path]]:
+    """Write the stage tree and a Chrome trace into *output_dir*.
+
+    ``build_report.json`` holds nested stages and per-name totals, whose
+    CPU time is self time so nested stages are not counted twice;
+    ``build_trace.json`` opens in chrome://tracing or Perfetto, where each
+    worker process gets its own track.  Returns None when nothing was timed.
+    """
+    spans = recorded_spans()
+    if not spans:
+        return None
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = min(span.start for span in spans)
+    end = max(span.start + span.wall_seconds for span in spans)
+    peaks = [
+        value
+        for span in spans
+        for value in (span.peak_rss_mb, span.child_peak_rss_mb)
+        if value is not None
+    ]
+    report = {
+        "version": REPORT_VERSION,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(start)),
+        "wall_seconds": round(end - start, 4),
+        "cpu_seconds": round(sum(_self_cpu_seconds(spans).values()), 4),
+        "peak_rss_mb": max(peaks) if peaks else None,
+        **metadata,
+        "summary": _stage_summary(spans),
+        "stages": _stage_tree(spans),
+    }
+    report_path = output_dir / REPORT_FILENAME
+    trace_path = output_dir / TRACE_FILENAME
+    report_path.write_text(
+        json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    trace_path.write_text(
+        json.dumps(
+            {"traceEvents": _trace_events(spans), "displayTimeUnit": "ms"},
+            ensure_ascii=False,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    return report_path, trace_path
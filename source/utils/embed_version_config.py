@@ -49,6 +49,11 @@ def embed_config_to_js(versions_config):
     """
     return embedded_config_js
 
+def version_config_script(versions_config):
+    """生成独立的 version_config.js 内容，由 version_menu.js 读取 window.DOCS_VERSION_CONFIG"""
+    config_js = json.dumps(versions_config, ensure_ascii=False, indent=2)
+    return f"window.DOCS_VERSION_CONFIG = {config_js};\n"
+
 def backup_js(js_file):
     bak_file = js_file.with_suffix('.js.bak')
     if js_file.exists():
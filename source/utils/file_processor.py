@@ -2,15 +2,23 @@
 # -*- coding: utf-8 -*-
 """Synchronize the documentation tree into the Sphinx source directory."""
 
+import hashlib
 import json
+import os
 import posixpath
 import re
 import shutil
+from contextlib import contextmanager
 from html import escape
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional, Union
 from urllib.parse import unquote, urlsplit
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
 from .document_catalog import markdown_image_targets
 
 from .language_support import (
@@ -24,11 +32,18 @@ from .language_support import (
 )
 
 
+# Linux FICLONE ioctl: share extents copy-on-write (btrfs, XFS, ...).
+FICLONE = 0x40049409
+DOCUMENT_SUFFIXES = {".md", ".rst"}
+
+
 class FileProcessor:
     MANIFEST_NAME = ".doc_generator_manifest.json"
+    MANIFEST_VERSION = 2
     DEFAULT_EXTENSIONS = [
         ".md", ".rst", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp"
     ]
+    LINK_MODES = ("copy", "hardlink", "reflink")
 
     def __init__(
         self, source_dir: str, dest_dir: str, config: Dict, catalog=None
@@ -44,8 +59,21 @@ class FileProcessor:
             extension.lower() if extension.startswith(".") else f".{extension.lower()}"
             for extension in configured_extensions
         }
+        self.link_mode = str(config.get("sync_link_mode", "copy") or "copy").lower()
+        if self.link_mode not in self.LINK_MODES:
+            raise ValueError(
+                f"generation.sync_link_mode 无效: {self.link_mode}"
+                "（可选 copy、hardlink、reflink）"
+            )
         self.manifest_path = self.dest_dir / self.MANIFEST_NAME
         self.generated_paths = set()
+        self.previous_entries: Dict[str, Dict] = {}
+        self.entries: Dict[str, Dict] = {}
+        self.staged: Dict[str, Union[Path, str]] = {}
+        self.sync_stats = {"written": 0, "unchanged": 0, "removed": 0}
+        self.written_paths = set()
+        self.removed_paths = set()
+        self._defer_depth = 0
 
     @staticmethod
     def _is_relative_to(path: Path, parent: Path) -> bool:
@@ -61,23 +89,36 @@ class FileProcessor:
             raise ValueError(f"输出路径越界: {relative_path}")
         return target
 
-    def cleanup_dest_dir(self):
-        """Remove only files recorded by the previous synchronization."""
-        self.dest_dir.mkdir(parents=True, exist_ok=True)
+    def _read_manifest(self) -> Dict[str, Dict]:
+        """Return the previous manifest entries keyed by relative path."""
         if not self.manifest_path.exists():
-            return
-
+            return {}
         try:
             manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
         except (OSError, json.JSONDecodeError) as exc:
             raise ValueError(f"无法读取生成文件清单 {self.manifest_path}: {exc}") from exc
 
-        generated_files = manifest.get("files", [])
+        # Version 1 manifests only list paths; their files are re-hashed once.
+        recorded = manifest.get("entries", {}) or {}
+        return {
+            relative_name: dict(recorded.get(relative_name, {}) or {})
+            for relative_name in manifest.get("files", [])
+        }
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        """Load the previous synchronization so unchanged files are kept."""
+        self.dest_dir.mkdir(parents=True, exist_ok=True)
+        self.previous_entries = self._read_manifest()
+        return self.previous_entries
+
+    def _remove_generated_files(self, relative_names: Iterable[str]) -> int:
+        removed = 0
         parent_dirs = set()
-        for relative_name in generated_files:
+        for relative_name in relative_names:
             target = self._safe_dest_path(Path(relative_name))
             if target.is_file() or target.is_symlink():
                 target.unlink()
+                removed += 1
             parent_dirs.update(target.parents)
 
         for directory in sorted(parent_dirs, key=lambda item: len(item.parts), reverse=True):
@@ -87,7 +128,15 @@ class FileProcessor:
                 directory.rmdir()
             except OSError:
                 pass
+        return removed
+
+    def cleanup_dest_dir(self):
+        """Remove only files recorded by the previous synchronization."""
+        self.dest_dir.mkdir(parents=True, exist_ok=True)
+        if not self.manifest_path.exists():
+            return
 
+        self._remove_generated_files(self._read_manifest())
         self.manifest_path.unlink(missing_ok=True)
 
     def sync_document_tree(self) -> List[Path]:
@@ -109,15 +158,14 @@ class FileProcessor:
                 for entry in self.catalog.entries
             )
 
-        for source_file, relative_path in selected_files:
-            target = self._safe_dest_path(relative_path)
-            target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(source_file, target)
-            self.track_generated_file(target)
-            copied_files.append(relative_path)
+        # Stage the whole tree first so link rewrites land in a single write.
+        with self.deferred_writes():
+            for source_file, relative_path in selected_files:
+                self.stage_copy(source_file, relative_path)
+                copied_files.append(relative_path)
 
-        copied_files.extend(self._sync_repository_readme_fallbacks())
-        self._rewrite_cross_language_links(copied_files)
+            copied_files.extend(self._sync_repository_readme_fallbacks())
+            self._rewrite_cross_language_links(copied_files)
         return copied_files
 
     def _rewrite_cross_language_links(self, copied_files: Iterable[Path]) -> None:
@@ -139,10 +187,9 @@ class FileProcessor:
         )
 
         for relative_path in sorted(markdown_paths):
-            page = self._safe_dest_path(relative_path)
-            if not page.is_file():
+            if not self.is_generated(relative_path):
                 continue
-            content = page.read_text(encoding="utf-8")
+            original = content = self.read_generated_text(relative_path)
             source_language = document_language(relative_path)
             raw_targets = {
                 match.group("target").strip("<>")
@@ -181,7 +228,8 @@ class FileProcessor:
                 content = self._replace_markdown_link_target(
                     content, parsed.path, target_url
                 )
-            page.write_text(content, encoding="utf-8")
+            if content != original:
+                self.write_generated_text(relative_path, content)
 
     def _sync_repository_readme_fallbacks(self) -> List[Path]:
         """Copy repository README files and their referenced local images."""
@@ -209,11 +257,12 @@ class FileProcessor:
                     f"{configured_target}"
                 )
             target = self._safe_dest_path(relative_target)
-            if target.exists():
+            if self.is_generated(relative_target) or (
+                target.exists()
+                and relative_target.as_posix() not in self.previous_entries
+            ):
                 continue
-            target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(source_file, target)
-            content = target.read_text(encoding="utf-8")
+            content = source_file.read_text(encoding="utf-8")
             for target_language, target_source in fallback_pages.items():
                 if target_language == language:
                     continue
@@ -237,8 +286,7 @@ class FileProcessor:
                 content = self._replace_markdown_link_target(
                     content, source_reference, target_url
                 )
-            target.write_text(content, encoding="utf-8")
-            self.track_generated_file(target)
+            self.write_generated_text(relative_target, content)
             copied_files.append(relative_target)
             copied_files.extend(
                 self._sync_repository_readme_assets(
@@ -288,9 +336,7 @@ class FileProcessor:
             target_key = target.resolve()
             if target_key in copied_asset_targets:
                 continue
-            target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(source_asset, target)
-            self.track_generated_file(target)
+            self.stage_copy(source_asset, output_relative)
             copied_asset_targets.add(target_key)
             copied_files.append(output_relative)
         return copied_files
@@ -337,21 +383,207 @@ class FileProcessor:
             raise ValueError(f"生成文件不在文档输出目录内: {file_path}")
         self.generated_paths.add(resolved.relative_to(self.dest_dir).as_posix())
 
+    def _stage(self, relative_path: Path, payload: Union[Path, str]) -> None:
+        target = self._safe_dest_path(relative_path)
+        relative_name = target.relative_to(self.dest_dir).as_posix()
+        self.staged[relative_name] = payload
+        self.generated_paths.add(relative_name)
+        if not self._defer_depth:
+            self.flush_generated_files()
+
+    def stage_copy(self, source_file: Path, relative_path: Path) -> None:
+        """Schedule a copy of *source_file*; unchanged targets are kept."""
+        self._stage(relative_path, Path(source_file))
+
     def write_generated_text(self, relative_path: Path, content: str):
+        """Schedule generated text; the file is only rewritten when it changes."""
+        self._stage(relative_path, content)
+
+    def is_generated(self, relative_path: Path) -> bool:
+        return self._safe_dest_path(relative_path).relative_to(
+            self.dest_dir
+        ).as_posix() in self.generated_paths
+
+    def read_generated_text(self, relative_path: Path) -> str:
+        """Return the current content of a generated file, staged or written."""
         target = self._safe_dest_path(relative_path)
+        payload = self.staged.get(target.relative_to(self.dest_dir).as_posix())
+        if isinstance(payload, str):
+            return payload
+        return (payload or target).read_text(encoding="utf-8")
+
+    @contextmanager
+    def deferred_writes(self):
+        """Stage generated files in memory and write the changed ones on exit.
+
+        Nested blocks flush once, when the outermost block exits, so a file
+        that is copied and then rewritten is only written in its final form.
+        """
+        self._defer_depth += 1
+        try:
+            yield self
+        finally:
+            self._defer_depth -= 1
+            if not self._defer_depth:
+                self.flush_generated_files()
+
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with path.open("rb") as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _matches_entry(path: Path, entry: Dict) -> bool:
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return (
+            entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        )
+
+    def _file_entry(self, path: Path, digest: Optional[str] = None) -> Dict:
+        stat = path.stat()
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest or self._hash_file(path),
+        }
+
+    @staticmethod
+    def _reflink(source_file: Path, target: Path) -> None:
+        if fcntl is None:
+            raise OSError("reflink is not supported on this platform")
+        with source_file.open("rb") as source, target.open("wb") as destination:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        shutil.copystat(source_file, target)
+
+    def _place_file(self, payload: Union[Path, bytes], target: Path) -> None:
+        """Replace *target* atomically with a copy, link or new content.
+
+        Writing through a temporary name never modifies a hard-linked source
+        asset in place.
+        """
         target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding="utf-8")
-        self.track_generated_file(target)
+        temporary = target.with_name(f".{target.name}.sync-tmp")
+        temporary.unlink(missing_ok=True)
+        try:
+            if isinstance(payload, bytes):
+                temporary.write_bytes(payload)
+            else:
+                mode = (
+                    self.link_mode
+                    if target.suffix.lower() not in DOCUMENT_SUFFIXES
+                    else "copy"
+                )
+                try:
+                    if mode == "hardlink":
+                        os.link(payload, temporary)
+                    elif mode == "reflink":
+                        self._reflink(payload, temporary)
+                    else:
+                        shutil.copy2(payload, temporary)
+                except OSError:
+                    # Cross-device links or filesystems without reflink support.
+                    temporary.unlink(missing_ok=True)
+                    shutil.copy2(payload, temporary)
+            os.replace(temporary, target)
+        finally:
+            temporary.unlink(missing_ok=True)
+
+    def _commit_staged(self, relative_name: str, payload: Union[Path, str]) -> Dict:
+        target = self._safe_dest_path(Path(relative_name))
+        previous = self.previous_entries.get(relative_name) or {}
+        data = None
+        source_key = None
+        if isinstance(payload, Path):
+            source_stat = payload.stat()
+            source_key = [source_stat.st_size, source_stat.st_mtime_ns]
+            if previous.get("source") == source_key and self._matches_entry(
+                target, previous
+            ):
+                self.sync_stats["unchanged"] += 1
+                return previous
+            size = source_stat.st_size
+            digest = self._hash_file(payload)
+        else:
+            data = payload.encode("utf-8")
+            size = len(data)
+            digest = hashlib.sha256(data).hexdigest()
+            if previous.get("sha256") == digest and self._matches_entry(
+                target, previous
+            ):
+                self.sync_stats["unchanged"] += 1
+                return previous
+
+        if (
+            target.is_file()
+            and target.stat().st_size == size
+            and self._hash_file(target) == digest
+        ):
+            self.sync_stats["unchanged"] += 1
+        else:
+            self._place_file(payload if data is None else data, target)
+            if data is not None and previous.get("sha256") == digest:
+                # Same content as last time (for example after the synced
+                # files were cleaned up): restore the recorded mtime so Sphinx
+                # does not treat the document as outdated.
+                os.utime(target, ns=(previous["mtime_ns"], previous["mtime_ns"]))
+            self.sync_stats["written"] += 1
+            self.written_paths.add(relative_name)
+
+        entry = self._file_entry(target, digest)
+        if source_key is not None:
+            entry["source"] = source_key
+        return entry
+
+    def flush_generated_files(self) -> None:
+        """Write every staged file whose bytes differ from the output tree."""
+        staged, self.staged = self.staged, {}
+        for relative_name, payload in sorted(staged.items()):
+            self.entries[relative_name] = self._commit_staged(relative_name, payload)
+
+    def finalize_manifest(self, remove_stale: bool = True) -> Dict[str, int]:
+        """Record size, mtime and content hash of every generated file.
+
+        Files generated by the previous run but not by this one are deleted
+        when *remove_stale* is true; otherwise they stay listed so a later
+        run can still clean them up.
+        """
+        self.flush_generated_files()
+        entries = dict(self.entries)
+        for relative_name in sorted(self.generated_paths - entries.keys()):
+            target = self._safe_dest_path(Path(relative_name))
+            if target.is_file():
+                entries[relative_name] = self._file_entry(target)
+
+        stale_files = sorted(self.previous_entries.keys() - entries.keys())
+        if remove_stale:
+            self.sync_stats["removed"] += self._remove_generated_files(stale_files)
+            self.removed_paths.update(stale_files)
+        else:
+            for relative_name in stale_files:
+                entries[relative_name] = self.previous_entries[relative_name]
 
-    def finalize_manifest(self):
         manifest = {
+            "version": self.MANIFEST_VERSION,
             "source": str(self.source_dir),
-            "files": sorted(self.generated_paths),
+            "files": sorted(entries),
+            "entries": {name: entries[name] for name in sorted(entries)},
         }
-        self.manifest_path.write_text(
-            json.dumps(manifest, ensure_ascii=False, indent=2) + "\n",
-            encoding="utf-8",
-        )
+        manifest_text = json.dumps(manifest, ensure_ascii=False, indent=2) + "\n"
+        if (
+            not self.manifest_path.is_file()
+            or self.manifest_path.read_text(encoding="utf-8") != manifest_text
+        ):
+            self.manifest_path.write_text(manifest_text, encoding="utf-8")
+        self.previous_entries = entries
+        self.entries = {}
+        return dict(self.sync_stats)
 
     def iter_markdown_files(self, relative_dir: Path = Path(".")) -> Iterable[Path]:
         source_dir = (self.source_dir / relative_dir).resolve()
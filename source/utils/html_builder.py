@@ -2,20 +2,27 @@
 # -*- coding: utf-8 -*-
 """Build isolated language-specific Sphinx HTML trees and merge them."""
 
+import ctypes
+import ctypes.util
+import hashlib
 import os
 import re
 import shutil
-import subprocess
+import stat
 import sys
+from concurrent.futures import ProcessPoolExecutor, wait
 from html import escape
 from pathlib import Path
-from typing import Dict, Iterable, List, Mapping
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
 
 from .language_support import (
     document_language,
     language_output_docname,
     language_root_docname,
 )
+from .build_report import adopt_spans, stage, traced_call
+from .search_index import build_search_indexes
+from .sphinx_runner import run_sphinx
 
 
 SOURCE_SUFFIXES = {".md", ".rst"}
@@ -25,10 +32,24 @@ IGNORED_SOURCE_DIRECTORIES = {
     "__pycache__",
 }
 PRESERVED_STATIC_FILENAMES = {"project_info.json", "project_info.js"}
+DOCTREE_CONFIG_FILES = ("config.yaml", "conf.py")
+
+
+def _link_or_copy(source: Path, destination: Path) -> None:
+    """Hardlink *source* to *destination*, copying across filesystems."""
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
 
 
 def _copy_preserved_static_outputs(source_root: Path, destination_root: Path) -> None:
-    """Copy final PDF metadata that must survive an HTML-only rebuild."""
+    """Link final PDF metadata that must survive an HTML-only rebuild.
+
+    Hardlinks keep large PDFs out of the merge cost; the PDF builder replaces
+    these files with new ones instead of writing through the shared inode.
+    """
     source_static = Path(source_root) / "_static"
     if not source_static.is_dir():
         return
@@ -40,7 +61,7 @@ def _copy_preserved_static_outputs(source_root: Path, destination_root: Path) ->
         ):
             continue
         destination_static.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(source_file, destination_static / source_file.name)
+        _link_or_copy(source_file, destination_static / source_file.name)
 
 
 def _source_documents(source_dir: Path) -> List[Path]:
@@ -68,45 +89,154 @@ def language_exclude_patterns(source_dir: Path, language: str) -> List[str]:
     ]
 
 
+def doctree_config_hash(source_dir: Path) -> str:
+    """Fingerprint the configuration files that invalidate cached doctrees."""
+    digest = hashlib.sha256()
+    for name in DOCTREE_CONFIG_FILES:
+        path = Path(source_dir) / name
+        digest.update(name.encode("utf-8") + b"\0")
+        if path.is_file():
+            digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def language_doctree_dir(
+    doctree_root: Path, source_dir: Path, language: str
+) -> Path:
+    """Return the persistent doctree cache for one language and config.
+
+    Caches are named ``<language>-<config hash>``; entries for the same
+    language with an older hash are removed so a config.yaml or conf.py
+    change always starts from a clean Sphinx environment.
+    """
+    doctree_root = Path(doctree_root)
+    cache_dir = doctree_root / f"{language}-{doctree_config_hash(source_dir)}"
+    if doctree_root.is_dir():
+        for stale_dir in doctree_root.glob(f"{language}-*"):
+            if stale_dir != cache_dir and stale_dir.is_dir():
+                shutil.rmtree(stale_dir, ignore_errors=True)
+    return cache_dir
+
+
 def _build_one_language(
     source_dir: Path,
     output_dir: Path,
     generation: Mapping,
     language: str,
     available_languages: Iterable[str] = (),
+    capture_output: bool = False,
+    doctree_dir: Optional[Path] = None,
+    asset_language: Optional[str] = None,
+) -> str:
+    """Run one isolated Sphinx HTML build; return its log when captured.
+
+    *asset_language* makes conf.py's builder write the language-suffixed
+    asset directories and special pages of a non-default language.
+    """
+    # Concurrent builds capture their logs so each language reports separately.
+    return run_sphinx(
+        source_dir,
+        output_dir,
+        "html",
+        language="zh_CN" if language == "zh" else "en",
+        master_doc=language_root_docname(source_dir, generation, language),
+        exclude_patterns=language_exclude_patterns(source_dir, language),
+        available_languages=available_languages,
+        asset_language=asset_language,
+        doctree_dir=doctree_dir,
+        capture_output=capture_output,
+    )
+
+
+def _print_language_log(language: str, log: str) -> None:
+    for line in str(log or "").splitlines():
+        print(f"  [{language}] {line}")
+
+
+def _build_languages(
+    source_dir: Path,
+    temporary_dirs: Mapping[str, Path],
+    generation: Mapping,
+    selected_languages: Iterable[str],
+    jobs: Optional[int] = None,
+    doctree_dirs: Optional[Mapping[str, Path]] = None,
+    default_language: Optional[str] = None,
 ) -> None:
-    sphinx_language = "zh_CN" if language == "zh" else "en"
-    master_doc = language_root_docname(source_dir, generation, language)
-    build_env = os.environ.copy()
-    build_env.update(
-        {
-            "PYTHONUTF8": "1",
-            "SPHINX_LANGUAGE": sphinx_language,
-            "SPHINX_MASTER_DOC": master_doc,
-            "SPHINX_MASTER_DOC_OVERRIDE": master_doc,
-            "SPHINX_EXCLUDE_PATTERNS": ",".join(
-                language_exclude_patterns(source_dir, language)
-            ),
-            "DOCS_AVAILABLE_LANGUAGES": ",".join(available_languages),
+    """Build every language tree, concurrently when *jobs* allows it.
+
+    Parallel builds run in a bounded process pool.  Each language keeps its
+    own captured log, reported under a ``[language]`` prefix once all builds
+    have finished, so the merge always waits for the complete set.
+    """
+    selected_languages = tuple(selected_languages)
+    doctree_dirs = doctree_dirs or {}
+    asset_languages = {
+        language: None if default_language in (None, language) else language
+        for language in temporary_dirs
+    }
+    workers = min(max(1, int(jobs or 1)), len(temporary_dirs))
+    if workers <= 1:
+        for language, temporary_dir in temporary_dirs.items():
+            print(f"  构建 {language} HTML: {temporary_dir}")
+            with stage("sphinx.html", language=language):
+                _build_one_language(
+                    source_dir,
+                    temporary_dir,
+                    generation,
+                    language,
+                    selected_languages,
+                    doctree_dir=doctree_dirs.get(language),
+                    asset_language=asset_languages[language],
+                )
+        return
+
+    print(f"  并行构建 {len(temporary_dirs)} 种语言 HTML（进程数: {workers}）")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            language: executor.submit(
+                traced_call,
+                "sphinx.html",
+                {"language": language},
+                _build_one_language,
+                source_dir,
+                temporary_dir,
+                generation,
+                language,
+                selected_languages,
+                capture_output=True,
+                doctree_dir=doctree_dirs.get(language),
+                asset_language=asset_languages[language],
+            )
+            for language, temporary_dir in temporary_dirs.items()
         }
-    )
-    subprocess.run(
-        [
-            sys.executable,
-            "-m",
-            "sphinx.cmd.build",
-            "-b",
-            "html",
-            "-D",
-            f"language={sphinx_language}",
-            "-D",
-            f"master_doc={master_doc}",
-            str(source_dir),
-            str(output_dir),
-        ],
-        cwd=str(source_dir),
-        check=True,
-        env=build_env,
+        wait(futures.values())
+
+    failures = {}
+    for language, future in futures.items():
+        print(f"  构建 {language} HTML: {temporary_dirs[language]}")
+        error = future.exception()
+        if error is None:
+            log, spans = future.result()
+            adopt_spans(spans)
+            _print_language_log(language, log)
+            continue
+        _print_language_log(language, getattr(error, "output", "") or "")
+        print(f"  [{language}] [ERROR] {error}")
+        failures[language] = error
+
+    if failures:
+        # Re-raise the first failure so callers see the same exception type
+        # as a sequential build; every language has already been reported.
+        print(f"  [ERROR] 语言 HTML 构建失败: {', '.join(failures)}")
+        raise next(iter(failures.values()))
+
+
+def _has_language_assets(language_dir: Path, language: str) -> bool:
+    """Return whether Sphinx already wrote *language*'s isolated resources."""
+    return (
+        (language_dir / f"_static_{language}").is_dir()
+        and not (language_dir / "_static").exists()
     )
 
 
@@ -139,11 +269,6 @@ def _rewrite_nondefault_html(
                 ),
                 rewritten,
             )
-        if html_file.name == "search.html":
-            rewritten = rewritten.replace(
-                'Search.loadIndex("searchindex.js")',
-                f'Search.loadIndex("searchindex_{language}.js")',
-            )
         if rewritten != content:
             html_file.write_text(rewritten, encoding="utf-8")
 
@@ -151,7 +276,12 @@ def _rewrite_nondefault_html(
 def _prepare_nondefault_language_output(
     language_dir: Path, language: str, default_language: str
 ) -> None:
-    """Keep non-default search/static resources independent after merging."""
+    """Keep non-default search/static resources independent after merging.
+
+    Only used for trees whose conf.py does not install the language asset
+    builder from :mod:`utils.language_assets`, which writes these names
+    directly.
+    """
     reserve_english_index = language == "en" and default_language != "en"
     _rewrite_nondefault_html(
         language_dir, language, reserve_english_index
@@ -163,10 +293,11 @@ def _prepare_nondefault_language_output(
         "_downloads": f"_downloads_{language}",
         "search.html": f"search_{language}.html",
         "genindex.html": f"genindex_{language}.html",
-        "searchindex.js": f"searchindex_{language}.js",
     }
     if reserve_english_index:
         renames["index.html"] = "index_en.html"
+    # Search reads _search/<lang>/; Sphinx's own index is not shipped.
+    (language_dir / "searchindex.js").unlink(missing_ok=True)
     for source_name, target_name in renames.items():
         source_path = language_dir / source_name
         if source_path.exists():
@@ -183,14 +314,135 @@ def _prepare_english_reserved_index(
         )
 
 
+def _merge_tree(
+    source_dir: Path,
+    destination_dir: Path,
+    move: bool,
+    published_dir: Optional[Path] = None,
+) -> None:
+    """Merge *source_dir* into *destination_dir*, overriding existing files.
+
+    With *move* the source is consumed: directories missing from the
+    destination are renamed into place whole and files are renamed over
+    their counterparts, so no page is copied.  Otherwise files are copied,
+    because Sphinx rewrites its persistent output in place and a hardlink
+    would leak the next incremental build into the published site.  A file
+    whose size and mtime match the copy in *published_dir* is hardlinked
+    from there instead: ``copy2`` kept the mtime when it was published and
+    published files are only ever replaced, never written in place.
+    """
+    source_dir = Path(source_dir)
+    destination_dir = Path(destination_dir)
+    for root, dirs, files in os.walk(source_dir):
+        current = Path(root)
+        target = destination_dir / current.relative_to(source_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        if move:
+            for name in list(dirs):
+                if not (target / name).exists():
+                    os.replace(current / name, target / name)
+                    dirs.remove(name)
+        for name in files:
+            if move:
+                os.replace(current / name, target / name)
+                continue
+            if published_dir is not None:
+                published_file = (
+                    published_dir / current.relative_to(source_dir) / name
+                )
+                if _same_file_stat(current / name, published_file):
+                    _link_or_copy(published_file, target / name)
+                    continue
+            # An earlier language may have linked this path from the
+            # published site; never copy through that shared inode.
+            (target / name).unlink(missing_ok=True)
+            shutil.copy2(current / name, target / name)
+
+
+def _same_file_stat(first: Path, second: Path) -> bool:
+    try:
+        first_stat = first.stat()
+        second_stat = second.stat()
+    except OSError:
+        return False
+    return (
+        stat.S_ISREG(second_stat.st_mode)
+        and first_stat.st_size == second_stat.st_size
+        and first_stat.st_mtime_ns == second_stat.st_mtime_ns
+    )
+
+
+_RENAME_EXCHANGE = 2
+_AT_FDCWD = -100
+
+
+def _exchange_directories(first: Path, second: Path) -> bool:
+    """Atomically swap two paths with ``renameat2``; False if unsupported."""
+    if not sys.platform.startswith("linux"):
+        return False
+    library = ctypes.util.find_library("c")
+    if library is None:
+        return False
+    libc = ctypes.CDLL(library, use_errno=True)
+    renameat2 = getattr(libc, "renameat2", None)
+    if renameat2 is None:
+        return False
+    result = renameat2(
+        _AT_FDCWD, os.fsencode(first), _AT_FDCWD, os.fsencode(second),
+        _RENAME_EXCHANGE,
+    )
+    return result == 0
+
+
+def _publish_site(staging_dir: Path, output_dir: Path) -> None:
+    """Swap a completely merged site into place.
+
+    On Linux both directories are exchanged in one atomic ``renameat2``
+    call, so a server reading *output_dir* sees either the old or the new
+    site; elsewhere two renames leave only a brief window without it.
+    """
+    previous_dir = output_dir.parent / f".{output_dir.name}_previous"
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    if output_dir.is_dir() and _exchange_directories(staging_dir, output_dir):
+        staging_dir.replace(previous_dir)
+    else:
+        if output_dir.exists():
+            output_dir.replace(previous_dir)
+        staging_dir.replace(output_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+
+
 def build_html_site(
     source_dir: Path,
     output_dir: Path,
     config: Mapping,
     languages: Iterable[str],
     default_language: str,
+    jobs: Optional[int] = None,
+    doctree_dir: Optional[Path] = None,
+    language_output_root: Optional[Path] = None,
+    rebuild_languages: Optional[Iterable[str]] = None,
+    post_build: Optional[Callable[[Path, Dict[str, str]], None]] = None,
 ) -> Dict[str, str]:
-    """Build one isolated tree per language and merge into one static site."""
+    """Build one isolated tree per language and merge into one static site.
+
+    ``jobs`` bounds how many language builds run at the same time; the
+    default keeps the sequential behaviour.  ``doctree_dir`` keeps Sphinx
+    environments between builds (outside the merged output) so unchanged
+    documents are not read and parsed again.
+
+    ``language_output_root`` keeps each language's raw Sphinx output between
+    calls, so Sphinx only rewrites changed pages.  Like the doctrees, each
+    language's output is keyed by the config hash and starts over when
+    config.yaml or conf.py changes.  Only ``rebuild_languages``
+    (default: all) are rebuilt; the others are merged from their previous
+    output.  The merged site is assembled next to ``output_dir`` and swapped
+    in at the end, so a running server keeps the previous site until then.
+    ``post_build`` is called with the merged staging directory and the
+    language root docnames just before that swap; files it writes there
+    (version config, entry page, PDFs, compressed sidecars) are published
+    together with the pages.
+    """
     source_dir = Path(source_dir).resolve()
     output_dir = Path(output_dir).resolve()
     selected_languages = tuple(dict.fromkeys(languages))
@@ -202,53 +454,107 @@ def build_html_site(
         language: output_dir.parent / f".{output_dir.name}_{language}"
         for language in selected_languages
     }
-    preserved_output_dir = output_dir.parent / f".{output_dir.name}_preserved"
-    shutil.rmtree(preserved_output_dir, ignore_errors=True)
-    _copy_preserved_static_outputs(output_dir, preserved_output_dir)
+    if language_output_root is None:
+        build_dirs = temporary_dirs
+        languages_to_build = selected_languages
+    else:
+        language_output_root = Path(language_output_root).resolve()
+        build_dirs = {
+            language: language_doctree_dir(
+                language_output_root, source_dir, language
+            )
+            for language in selected_languages
+        }
+        requested = set(
+            selected_languages if rebuild_languages is None else rebuild_languages
+        )
+        languages_to_build = tuple(
+            language
+            for language in selected_languages
+            if language in requested or not build_dirs[language].is_dir()
+        )
+    doctree_dirs = (
+        {
+            language: language_doctree_dir(doctree_dir, source_dir, language)
+            for language in selected_languages
+        }
+        if doctree_dir is not None
+        else {}
+    )
+    language_roots = {
+        language: language_output_docname(
+            language_root_docname(source_dir, generation, language),
+            language,
+            default_language,
+        )
+        for language in selected_languages
+    }
+    staging_dir = output_dir.parent / f".{output_dir.name}_staging"
     try:
-        for language, temporary_dir in temporary_dirs.items():
+        for temporary_dir in temporary_dirs.values():
             shutil.rmtree(temporary_dir, ignore_errors=True)
-            print(f"  构建 {language} HTML: {temporary_dir}")
-            _build_one_language(
-                source_dir,
-                temporary_dir,
-                generation,
-                language,
-                selected_languages,
-            )
+        if languages_to_build:
+            with stage(
+                "html.build",
+                languages=",".join(languages_to_build),
+                jobs=jobs or 1,
+            ):
+                _build_languages(
+                    source_dir,
+                    {
+                        language: build_dirs[language]
+                        for language in languages_to_build
+                    },
+                    generation,
+                    selected_languages,
+                    jobs=jobs,
+                    doctree_dirs=doctree_dirs,
+                    default_language=default_language,
+                )
 
-        for language, temporary_dir in temporary_dirs.items():
-            if language == default_language:
-                continue
-            _prepare_nondefault_language_output(
-                temporary_dir, language, default_language
-            )
-
-        shutil.rmtree(output_dir, ignore_errors=True)
-        output_dir.mkdir(parents=True, exist_ok=True)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
         merge_order = [
             language
             for language in selected_languages
             if language != default_language
         ] + [default_language]
-        for language in merge_order:
-            shutil.copytree(
-                temporary_dirs[language], output_dir, dirs_exist_ok=True
-            )
+        with stage("html.merge", languages=",".join(merge_order)):
+            for language in merge_order:
+                merged_dir = build_dirs[language]
+                if language != default_language and not _has_language_assets(
+                    merged_dir, language
+                ):
+                    # Trees whose conf.py predates the language asset builder
+                    # are rewritten here.  Persistent raw output must stay
+                    # untouched for the next incremental Sphinx run, so
+                    # rename assets in a copy.
+                    if merged_dir != temporary_dirs[language]:
+                        shutil.copytree(merged_dir, temporary_dirs[language])
+                        merged_dir = temporary_dirs[language]
+                    with stage("html.rewrite", language=language):
+                        _prepare_nondefault_language_output(
+                            merged_dir, language, default_language
+                        )
+                _merge_tree(
+                    merged_dir,
+                    staging_dir,
+                    move=merged_dir == temporary_dirs[language],
+                    published_dir=output_dir,
+                )
+            _copy_preserved_static_outputs(output_dir, staging_dir)
+        with stage("html.search"):
+            build_search_indexes(staging_dir, jobs=jobs)
+        if post_build is not None:
+            post_build(staging_dir, language_roots)
+        with stage("html.publish"):
+            _publish_site(staging_dir, output_dir)
     finally:
-        _copy_preserved_static_outputs(preserved_output_dir, output_dir)
-        shutil.rmtree(preserved_output_dir, ignore_errors=True)
+        shutil.rmtree(staging_dir, ignore_errors=True)
         for temporary_dir in temporary_dirs.values():
             shutil.rmtree(temporary_dir, ignore_errors=True)
 
-    return {
-        language: language_output_docname(
-            language_root_docname(source_dir, generation, language),
-            language,
-            default_language,
-        )
-        for language in selected_languages
-    }
+    return language_roots
 
 
 def write_site_entry(
@@ -293,5 +599,8 @@ def write_site_entry(
 </html>"""
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    (output_dir / "index.html").write_text(entry_html, encoding="utf-8")
+    entry_file = output_dir / "index.html"
+    # The merged page may be hardlinked from the published site.
+    entry_file.unlink(missing_ok=True)
+    entry_file.write_text(entry_html, encoding="utf-8")
     return True
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Rewrite legacy zh/en HTML trees for the merged, suffix-based layout.
+
+The legacy merge keeps English pages under their own names and renames
+Chinese pages with a ``_zh`` suffix, so every page needs its ``lang``
+attribute, search and navigation labels, and internal ``.html`` links
+adjusted for its language.  All rules of one language are compiled into a
+single alternation, and each page is rewritten in one scan.  Attribute
+labels come from a lookup table; ``href`` values are rewritten by the
+language's link rules applied to the matched value only, with the same
+results as the original one-``re.sub``-per-rule implementation.
+"""
+
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+
+CROSS_LANGUAGE_LINK_MARKER = "<!-- docs-cross-language-link -->"
+# Below this many pages the process start-up costs more than it saves.
+PARALLEL_MIN_FILES = 64
+
+_MARKED_LINK_PATTERN = re.compile(
+    r'(?P<prefix><a\s+[^>]*?href=")(?P<url>[^"]+)"'
+    r'(?P<suffix>[^>]*>.*?</a>)\s*'
+    + re.escape(CROSS_LANGUAGE_LINK_MARKER),
+    re.IGNORECASE,
+)
+
+_ATTRIBUTE_REPLACEMENTS = {
+    "en": {
+        'lang="zh-CN"': 'lang="en"',
+        'placeholder="搜索文档"': 'placeholder="Search documentation"',
+        'aria-label="搜索文档"': 'aria-label="Search documentation"',
+        'aria-label="导航菜单"': 'aria-label="Navigation menu"',
+        'aria-label="移动版导航菜单"': 'aria-label="Mobile navigation menu"',
+        'aria-label="页面导航"': 'aria-label="Page navigation"',
+        'aria-label="页脚"': 'aria-label="Footer"',
+    },
+    "zh": {
+        'lang="en"': 'lang="zh-CN"',
+        'placeholder="Search documentation"': 'placeholder="搜索文档"',
+        'aria-label="Search documentation"': 'aria-label="搜索文档"',
+        'aria-label="Navigation menu"': 'aria-label="导航菜单"',
+        'aria-label="Mobile navigation menu"': 'aria-label="移动版导航菜单"',
+        'aria-label="Page navigation"': 'aria-label="页面导航"',
+        'aria-label="Footer"': 'aria-label="页脚"',
+    },
+}
+
+
+def _english_href(value: str, terminated: bool) -> str:
+    # Same order as the original rules: ``X_zh.html"`` -> ``X.html"``, then
+    # ``X/index_zh.html"`` -> ``X/index.html"``, then the last
+    # ``_zh.html#`` -> ``.html#``.
+    if terminated:
+        if value.endswith("_zh.html"):
+            value = value[:-len("_zh.html")] + ".html"
+        if value.endswith("/index_zh.html"):
+            value = value[:-len("/index_zh.html")] + "/index.html"
+    anchor = value.rfind("_zh.html#")
+    if anchor != -1:
+        value = value[:anchor] + value[anchor + len("_zh"):]
+    return f'href="{value}"' if terminated else f'href="{value}'
+
+
+def _chinese_href(value: str, terminated: bool) -> str:
+    # The pattern only matches ``X.html"`` without a ``_zh`` suffix, which
+    # also covers the original ``X/index.html"`` rule.
+    return f'href="{value[:-len(".html")]}_zh.html"'
+
+
+# Each href alternative only matches values its language's rules change,
+# so untouched links never reach Python.  A value may run to the end of an
+# unterminated attribute, like in the original rules.
+_HREF_PATTERNS = {
+    "en": r'href="([^"]*_zh\.html[^"]*)("?)',
+    "zh": r'href="([^"]*(?<!_zh)\.html)(")',
+}
+_HREF_REWRITERS = {"en": _english_href, "zh": _chinese_href}
+
+_SCAN_PATTERNS = {
+    language: re.compile(
+        "|".join(
+            [_HREF_PATTERNS[language]]
+            + [re.escape(text) for text in replacements]
+        )
+    )
+    for language, replacements in _ATTRIBUTE_REPLACEMENTS.items()
+}
+
+
+def _token_rewriter(language: str):
+    replacements = _ATTRIBUTE_REPLACEMENTS[language]
+    rewrite_href = _HREF_REWRITERS[language]
+
+    def rewrite(match) -> str:
+        value, end = match.group(1, 2)
+        if value is None:
+            return replacements[match.group(0)]
+        return rewrite_href(value, bool(end))
+
+    return rewrite
+
+
+_TOKEN_REWRITERS = {
+    language: _token_rewriter(language) for language in _ATTRIBUTE_REPLACEMENTS
+}
+
+
+def fix_html_language(content: str, language: str) -> str:
+    """Return *content* rewritten for the legacy *language* layout.
+
+    Links followed by the cross-language marker emitted by the file
+    processor keep their original target; the marker itself is dropped.
+    """
+    protected_links = {}
+    if CROSS_LANGUAGE_LINK_MARKER in content:
+        def protect_link(match):
+            token = f"__DOCS_MARKED_LINK_{len(protected_links)}__"
+            protected_links[token] = match.group("url")
+            return f'{match.group("prefix")}{token}"{match.group("suffix")}'
+
+        content = _MARKED_LINK_PATTERN.sub(protect_link, content)
+
+    content = _SCAN_PATTERNS[language].sub(_TOKEN_REWRITERS[language], content)
+
+    for token, url in protected_links.items():
+        content = content.replace(f'href="{token}"', f'href="{url}"')
+    return content.replace(CROSS_LANGUAGE_LINK_MARKER, "")
+
+
+def fix_html_file(source_file: Path, target_file: Path, language: str) -> None:
+    """Rewrite one page; unreadable pages are copied unchanged."""
+    try:
+        content = Path(source_file).read_text(encoding="utf-8")
+        Path(target_file).write_text(
+            fix_html_language(content, language), encoding="utf-8"
+        )
+    except Exception as e:
+        print(f"[WARN]  修复HTML文件语言配置失败: {e}")
+        shutil.copy2(source_file, target_file)
+
+
+def _fix_html_batch(tasks: List[Tuple[Path, Path, str]]) -> None:
+    for source_file, target_file, language in tasks:
+        fix_html_file(source_file, target_file, language)
+
+
+def _target_html_name(name: str, language: str) -> str:
+    if language == "zh" and not Path(name).stem.endswith("_zh"):
+        return f"{Path(name).stem}_zh.html"
+    return name
+
+
+def _batches(tasks: List, count: int) -> Iterable[List]:
+    return (tasks[index::count] for index in range(count))
+
+
+def fix_html_tree(
+    source_dir: Path,
+    target_dir: Path,
+    language: str,
+    jobs: Optional[int] = 1,
+) -> int:
+    """Copy *source_dir* into *target_dir*, rewriting pages for *language*.
+
+    Chinese pages gain a ``_zh`` suffix, other files are copied unchanged
+    and hidden directories such as ``.doctrees`` are skipped.  Pages are
+    rewritten by up to *jobs* worker processes; the default rewrites them in
+    this process, which is what a caller that is itself a pool worker wants,
+    and ``None`` uses one process per CPU.
+    Returns the number of rewritten pages.
+    """
+    source_dir = Path(source_dir)
+    target_dir = Path(target_dir)
+    tasks = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        current = Path(root)
+        destination = target_dir / current.relative_to(source_dir)
+        destination.mkdir(parents=True, exist_ok=True)
+        for name in sorted(files):
+            if name.endswith(".html"):
+                tasks.append((
+                    current / name,
+                    destination / _target_html_name(name, language),
+                    language,
+                ))
+            else:
+                shutil.copy2(current / name, destination / name)
+
+    workers = min(max(1, int(jobs or os.cpu_count() or 1)), len(tasks))
+    if workers <= 1 or len(tasks) < PARALLEL_MIN_FILES:
+        _fix_html_batch(tasks)
+        return len(tasks)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in [
+            executor.submit(_fix_html_batch, batch)
+            for batch in _batches(tasks, workers)
+        ]:
+            future.result()
+    return len(tasks)
@@ -97,8 +97,7 @@ class IndexGenerator:
         if not docnames:
             return
 
-        target = self.output_dir / relative_page
-        content = target.read_text(encoding="utf-8").rstrip()
+        content = self.file_processor.read_generated_text(relative_page).rstrip()
         if relative_page.suffix.lower() == ".rst":
             toc_lines = [
                 "",
@@ -125,8 +124,9 @@ class IndexGenerator:
                 "```",
                 "",
             ]
-        target.write_text(content + "\n".join(toc_lines), encoding="utf-8")
-        self.file_processor.track_generated_file(target)
+        self.file_processor.write_generated_text(
+            relative_page, content + "\n".join(toc_lines)
+        )
 
     def _ordered_root_directories(self, directories: Iterable[Path]) -> List[Path]:
         by_name = {directory.as_posix(): directory for directory in directories}
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Sphinx HTML builder that writes a language's assets under suffixed names.
+
+Non-default languages are merged into the same site directory as the
+default language, so their shared resources must not collide:
+``_static``, ``_images`` and ``_downloads`` become ``_static_<lang>`` and
+so on, the search and general index pages become ``search_<lang>.html`` and
+``genindex_<lang>.html``.  Sphinx's ``searchindex.js`` is not written at
+all: the site's search reads the index :mod:`utils.search_index` builds.
+An English build that is not the site default also reserves ``index.html``
+for the default language by writing its root page as ``index_en.html``.
+
+Every URL is produced with the final names while Sphinx renders the pages,
+so the merged output needs no post-processing pass over the HTML files.
+The builder behaves exactly like the stock ``html`` builder while
+``docs_asset_language`` is empty.  It relies on the asset lists Sphinx 8
+keeps on the builder (``css_files``/``script_files`` are deprecated there),
+so it requires Sphinx 8; requirements.txt pins the tested release.
+"""
+
+import os
+import posixpath
+import shutil
+from pathlib import Path
+from urllib.parse import quote
+
+from sphinx.builders.html import StandaloneHTMLBuilder
+
+
+ASSET_DIRECTORIES = ("_static", "_images", "_downloads")
+
+
+def language_special_pages(language: str) -> dict:
+    """Return the page renames applied to one non-default language build."""
+    pages = {
+        "search": f"search_{language}",
+        "genindex": f"genindex_{language}",
+    }
+    if language == "en":
+        pages["index"] = "index_en"
+    return pages
+
+
+class LanguageAssetsHTMLBuilder(StandaloneHTMLBuilder):
+    """``html`` builder honouring the ``docs_asset_language`` setting."""
+
+    _imgpath = ""
+    _dlpath = ""
+    _special_pages: dict = {}
+
+    @property
+    def asset_language(self) -> str:
+        return str(getattr(self.config, "docs_asset_language", "") or "")
+
+    def init(self) -> None:
+        super().init()
+        language = self.asset_language
+        if language:
+            self.imagedir = f"_images_{language}"
+            self._special_pages = language_special_pages(language)
+
+    def asset_path(self, path: str) -> str:
+        """Map a site-relative resource path to this language's copy."""
+        language = self.asset_language
+        if not language or "://" in path:
+            return path
+        for directory in ASSET_DIRECTORIES:
+            if path == directory or path.startswith(f"{directory}/"):
+                return f"{directory}_{language}{path[len(directory):]}"
+        return path
+
+    # Sphinx computes these per page from the hard-coded directory names.
+    @property
+    def imgpath(self) -> str:
+        return self._imgpath
+
+    @imgpath.setter
+    def imgpath(self, value: str) -> None:
+        self._imgpath = self._suffixed_relative_dir(value, "_images")
+
+    @property
+    def dlpath(self) -> str:
+        return self._dlpath
+
+    @dlpath.setter
+    def dlpath(self, value: str) -> None:
+        self._dlpath = self._suffixed_relative_dir(value, "_downloads")
+
+    def _suffixed_relative_dir(self, value: str, directory: str) -> str:
+        if self.asset_language and value.endswith(directory):
+            return f"{value}_{self.asset_language}"
+        return value
+
+    def add_css_file(self, filename: str, **kwargs) -> None:
+        count = len(self._css_files)
+        super().add_css_file(filename, **kwargs)
+        self._relocate_added_asset(self._css_files, count)
+
+    def add_js_file(self, filename: str, **kwargs) -> None:
+        count = len(self._js_files)
+        super().add_js_file(filename, **kwargs)
+        self._relocate_added_asset(self._js_files, count)
+
+    def _relocate_added_asset(self, assets: list, count: int) -> None:
+        """Point the asset Sphinx just appended at this language's copy.
+
+        Asset objects are immutable, so the entry is replaced by one of the
+        same class built from its public ``filename``, ``priority`` and
+        ``attributes``; the private asset classes are never imported.
+        """
+        if not self.asset_language or len(assets) == count:
+            return
+        asset = assets[-1]
+        filename = os.fspath(asset.filename)
+        relocated = self.asset_path(filename)
+        if relocated == filename:
+            return
+        replacement = type(asset)(
+            relocated, priority=asset.priority, **asset.attributes
+        )
+        if replacement in assets:
+            del assets[-1]
+        else:
+            assets[-1] = replacement
+
+    # The site's search index is built from the finished HTML, so Sphinx's
+    # index is neither loaded, fed nor written.
+    def load_indexer(self, docnames) -> None:
+        pass
+
+    def index_page(self, pagename: str, doctree, title: str) -> None:
+        pass
+
+    def dump_search_index(self) -> None:
+        pass
+
+    def get_target_uri(self, docname: str, typ=None) -> str:
+        docname = self._special_pages.get(docname, docname)
+        return quote(docname) + self.link_suffix
+
+    def get_outfilename(self, pagename: str) -> str:
+        pagename = self._special_pages.get(pagename, pagename)
+        return super().get_outfilename(pagename)
+
+    def copy_assets(self) -> None:
+        """Copy static and download files, then move them under this language.
+
+        Both are copied in full on every build that writes pages, before any
+        page is written, so the suffixed directories are complete when page
+        checksums are computed.
+        """
+        super().copy_assets()
+        self.relocate_asset_directories(replace=True)
+
+    def relocate_asset_directories(self, replace: bool) -> None:
+        """Move ``_static`` and ``_downloads`` to their language names.
+
+        With *replace* the previous language directories are swapped out
+        whole; otherwise stray files are folded into them, such as the jQuery
+        copy the theme writes while loading even when no page is outdated.
+        """
+        language = self.asset_language
+        if not language:
+            return
+        for directory in ("_static", "_downloads"):
+            source = Path(self.outdir) / directory
+            if not source.is_dir():
+                continue
+            target = Path(self.outdir) / f"{directory}_{language}"
+            if replace or not target.is_dir():
+                shutil.rmtree(target, ignore_errors=True)
+                os.replace(source, target)
+            else:
+                shutil.copytree(source, target, dirs_exist_ok=True)
+                shutil.rmtree(source)
+
+
+def relocate_resource_urls(app, pagename, templatename, context, doctree) -> None:
+    """Route template ``pathto(..., resource=True)`` calls to language assets."""
+    del pagename, templatename, doctree
+    builder = app.builder
+    if not isinstance(builder, LanguageAssetsHTMLBuilder) or not builder.asset_language:
+        return
+    pathto = context["pathto"]
+
+    def language_pathto(otheruri, resource=False, *args, **kwargs):
+        if resource:
+            otheruri = builder.asset_path(otheruri)
+        return pathto(otheruri, resource, *args, **kwargs)
+
+    context["pathto"] = language_pathto
+
+
+def relocate_stray_assets(app, exception) -> None:
+    """Finish the relocation for builds that skipped ``copy_assets``."""
+    builder = app.builder
+    if exception is None and isinstance(builder, LanguageAssetsHTMLBuilder):
+        builder.relocate_asset_directories(replace=False)
+
+
+def register_language_assets(app, default_language: str = "") -> None:
+    """Install the builder, its config value and the template URL hook."""
+    app.require_sphinx((8, 0))
+    app.add_config_value("docs_asset_language", default_language, "html")
+    app.add_builder(LanguageAssetsHTMLBuilder, override=True)
+    # Runs before Sphinx resolves logo_url and favicon_url with pathto.
+    app.connect("html-page-context", relocate_resource_urls, priority=400)
+    app.connect("build-finished", relocate_stray_assets)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Precompile the stable part of a Sphinx LaTeX preamble into a format.
+
+Every xelatex pass reloads the document class, ``sphinx.sty``, hyperref,
+xeCJK and the ``conf.py`` packages.  ``mylatexformat`` dumps that state
+into a ``.fmt`` file which later passes load in a fraction of the time.
+
+XeTeX cannot dump native fonts, so the dump stops before the first font
+declaration (or ``\\title``) by inserting ``\\csname endofdump\\endcsname``
+into the ``.tex``; the marker is ``\\relax`` for a run without the format,
+so the file still compiles normally.  Formats are cached by a hash of the
+dumped preamble, the local class and package files and the XeLaTeX
+installation, and reused whenever those are unchanged.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Mapping, Optional
+
+from .pdf_environment import xelatex_version
+
+
+FORMAT_CACHE_DIRECTORY_NAME = "pdf_format_cache"
+FORMAT_CACHE_LIMIT = 8
+FORMAT_PREFIX = "sdk-preamble-"
+DUMP_MARKER = r"\csname endofdump\endcsname"
+DUMP_TIMEOUT = 600
+
+_DOCUMENT_CLASS = re.compile(r"^\s*\\documentclass\b", re.M)
+_BEGIN_DOCUMENT = re.compile(r"^\s*\\begin\{document\}", re.M)
+# Font declarations load native fonts; \title starts the per-build metadata.
+_DUMP_END = re.compile(
+    r"^\s*\\(?:setmainfont|setsansfont|setmonofont|setromanfont|setmathfont"
+    r"|newfontfamily|newfontface|fontspec|setCJK\w*font|title)\b",
+    re.M,
+)
+
+
+def preamble_format_enabled(config: Optional[Mapping]) -> bool:
+    """Return ``generation.pdf_latex.preamble_format`` (default: enabled)."""
+    generation = (config or {}).get("generation", {}) or {}
+    options = generation.get("pdf_latex", {}) or {}
+    return bool(options.get("preamble_format", True))
+
+
+def dump_boundary(tex_text: str) -> Optional[int]:
+    """Return where the dumpable preamble ends, or None when there is none."""
+    document_class = _DOCUMENT_CLASS.search(tex_text)
+    begin_document = _BEGIN_DOCUMENT.search(tex_text)
+    if document_class is None or begin_document is None:
+        return None
+    end = _DUMP_END.search(tex_text, document_class.end(), begin_document.start())
+    return end.start() if end is not None else begin_document.start()
+
+
+def insert_dump_marker(tex_text: str) -> Optional[str]:
+    """Return *tex_text* with the end-of-dump marker, or None if it has no preamble."""
+    if DUMP_MARKER in tex_text:
+        return tex_text
+    boundary = dump_boundary(tex_text)
+    if boundary is None:
+        return None
+    return f"{tex_text[:boundary]}{DUMP_MARKER}\n{tex_text[boundary:]}"
+
+
+def _base_format_stamp(xelatex: str) -> str:
+    # A TeX Live update rebuilds xelatex.fmt without changing the engine version.
+    kpsewhich = shutil.which("kpsewhich", path=str(Path(xelatex).parent)) or shutil.which("kpsewhich")
+    if not kpsewhich:
+        return ""
+    try:
+        result = subprocess.run(
+            [kpsewhich, "-engine=xetex", "xelatex.fmt"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=False,
+            timeout=30,
+        )
+        base_format = Path(result.stdout.strip())
+        stat = base_format.stat()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return f"{base_format}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def format_name(xelatex: str, latex_dir: Path, tex_text: str) -> Optional[str]:
+    """Return the cache name of the format for *tex_text*'s preamble."""
+    if DUMP_MARKER not in tex_text:
+        return None
+    digest = hashlib.sha256()
+    digest.update(tex_text.split(DUMP_MARKER, 1)[0].encode("utf-8"))
+    # sphinx.sty, sphinxmessages.sty and friends are read from the LaTeX directory.
+    for path in sorted(Path(latex_dir).glob("*.sty")) + sorted(Path(latex_dir).glob("*.cls")):
+        digest.update(f"\0{path.name}\0".encode("utf-8"))
+        digest.update(path.read_bytes())
+    digest.update(f"\0{xelatex_version(xelatex)}\0{_base_format_stamp(xelatex)}".encode("utf-8"))
+    return f"{FORMAT_PREFIX}{digest.hexdigest()[:20]}"
+
+
+def _prune_formats(cache_dir: Path, keep: int = FORMAT_CACHE_LIMIT) -> None:
+    formats = sorted(
+        Path(cache_dir).glob(f"{FORMAT_PREFIX}*.fmt"),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in formats[keep:]:
+        stale.unlink(missing_ok=True)
+
+
+def _link_into(source: Path, destination: Path) -> None:
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def prepare_preamble_format(
+    xelatex: str, latex_dir: Path, tex_file: Path, cache_dir: Path
+) -> Optional[str]:
+    """Make a format for *tex_file*'s preamble available in *latex_dir*.
+
+    Inserts the end-of-dump marker into *tex_file*, dumps the format when
+    the cache has none for this preamble and links it into *latex_dir*.
+    Returns the name to pass as ``-fmt``, or None when the preamble cannot
+    be precompiled; the ``.tex`` then still compiles without a format.
+    """
+    latex_dir = Path(latex_dir)
+    cache_dir = Path(cache_dir)
+    tex_file = Path(tex_file)
+    marked = insert_dump_marker(tex_file.read_text(encoding="utf-8"))
+    if marked is None:
+        return None
+    tex_file.write_text(marked, encoding="utf-8")
+    name = format_name(xelatex, latex_dir, marked)
+    cached = cache_dir / f"{name}.fmt"
+    if not cached.is_file():
+        result = subprocess.run(
+            [
+                xelatex,
+                "-ini",
+                "-interaction=nonstopmode",
+                "-halt-on-error",
+                f"-jobname={name}",
+                "&xelatex",
+                "mylatexformat.ltx",
+                tex_file.name,
+            ],
+            cwd=str(latex_dir),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            check=False,
+            timeout=DUMP_TIMEOUT,
+        )
+        dumped = latex_dir / f"{name}.fmt"
+        if result.returncode != 0 or not dumped.is_file():
+            dumped.unlink(missing_ok=True)
+            return None
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temporary = cache_dir / f".{name}.{os.getpid()}.tmp"
+        shutil.move(str(dumped), temporary)
+        os.replace(temporary, cached)
+        _prune_formats(cache_dir)
+    else:
+        # Touching marks the format as recently used for pruning.
+        os.utime(cached)
+    _link_into(cached, latex_dir / f"{name}.fmt")
+    return name
+
+
+def discard_preamble_format(cache_dir: Path, name: str) -> None:
+    """Drop a cached format that failed to compile the document."""
+    (Path(cache_dir) / f"{name}.fmt").unlink(missing_ok=True)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compile a Sphinx LaTeX manual one category at a time and merge the PDFs.
+
+The PDF master document opens every top-level category with
+``\\pdfcategorytoc`` / ``\\pdfcategoryanchor``, and section numbers and
+hyperref destinations already restart per category.  The generated
+``.tex`` is therefore split at those anchors into one fragment per
+category plus the title page and table of contents.
+
+Each chapter fragment starts from the page number and the hyperref
+counters the previous fragment ended with, so the merged PDF numbers its
+pages and names its destinations like the single-document build.  A
+fragment is recompiled only when its source, its images, its starting
+state or the XeLaTeX installation changed; the title and contents
+fragment is rebuilt from the chapters' ``.toc`` files.
+
+Fragments cannot resolve references into other fragments.  Documents
+with such references, or with an index, are built as a whole.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject
+except ImportError:  # optional dependency
+    PdfReader = PdfWriter = None
+
+
+FRAGMENT_CACHE_DIRECTORY_NAME = "pdf_fragment_cache"
+FRAGMENT_CACHE_FORMAT = 1
+FRONT_SUFFIX = "-front"
+STATE_MARKER = "pdf-fragment-state:"
+# Counters that run across categories: the page number, and the counters
+# hyperref derives destination names from (footnotes, floats, list items,
+# unnumbered headings).  Section numbers restart at every category anchor.
+CARRIED_COUNTERS = (
+    "c@page",
+    "c@footnote",
+    "c@Hfootnote",
+    "c@figure",
+    "c@table",
+    "c@equation",
+    "c@literalblock",
+    "c@sphinxscope",
+    "c@Item",
+    "Hy@linkcounter",
+)
+
+_BEGIN_DOCUMENT = re.compile(r"^\\begin\{document\}[ \t]*\n?", re.M)
+_END_DOCUMENT = re.compile(r"^\\end\{document\}", re.M)
+_TITLE_PAGE_STYLE = re.compile(r"^\\pagestyle\{empty\}", re.M)
+_CATEGORY_START = re.compile(
+    r"^\\addtocontents\{toc\}\{\\protect\\pdfcategorytoc\{.*\}\{(pdf-category-\d+)\}\}[ \t]*$",
+    re.M,
+)
+_LABEL = re.compile(r"\\label\{\\detokenize\{([^}]*)\}\}")
+_REFERENCE = re.compile(
+    r"\\(?:hyperref\[|(?:ref|pageref|nameref|autoref|autopageref\*?)\{)\\detokenize\{([^}]*)\}"
+)
+# Entries of an index or bibliography are collected over the whole document.
+_WHOLE_DOCUMENT_COMMANDS = re.compile(r"\\(?:index|cite|bibitem|glossary)\b")
+_GRAPHICS = re.compile(
+    r"\\(?:sphinx)?includegraphics(?:\[[^\]]*\])?\{\{?([^{}]+?)\}?(\.[A-Za-z0-9]+)?\}"
+)
+_STATE_LINE = re.compile(rf"^{re.escape(STATE_MARKER)}([A-Za-z@]+)=(-?\d+)$", re.M)
+
+
+def incremental_pdf_enabled(config: Optional[Mapping]) -> bool:
+    """Return ``generation.pdf_latex.incremental`` (default: disabled)."""
+    generation = (config or {}).get("generation", {}) or {}
+    options = generation.get("pdf_latex", {}) or {}
+    return bool(options.get("incremental", False))
+
+
+@dataclass(frozen=True)
+class Fragment:
+    """One separately compiled part of the manual."""
+
+    stem: str
+    body: str
+    anchor: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ManualSplit:
+    """A Sphinx manual split into title/contents and per-category fragments."""
+
+    preamble: str
+    setup: str
+    front: Fragment
+    chapters: List[Fragment]
+
+    def front_source(self) -> str:
+        # \nofiles keeps the .toc assembled from the chapters from being
+        # truncated when \tableofcontents reopens it for writing.
+        return (
+            f"{self.preamble}\\nofiles\n\\begin{{document}}\n"
+            f"{self.front.body}\n\\end{{document}}\n"
+        )
+
+    def chapter_source(self, fragment: Fragment, state: Mapping[str, int]) -> str:
+        restore = "".join(
+            f"\\pdffragmentset\\{name}{{{int(value)}}}\n"
+            for name, value in sorted(state.items())
+        )
+        report = "".join(
+            f"\\typeout{{{STATE_MARKER}{name}=\\pdffragmentshow\\{name}}}\n"
+            for name in CARRIED_COUNTERS
+        )
+        return (
+            f"{self.preamble}"
+            "\\makeatletter\n"
+            "\\def\\pdffragmentset#1#2{\\ifdefined#1\\global#1=#2\\relax\\fi}\n"
+            "\\def\\pdffragmentshow#1{\\ifdefined#1\\the#1\\else0\\fi}\n"
+            "\\makeatother\n"
+            f"\\begin{{document}}\n{self.setup}\\pagestyle{{normal}}\n"
+            f"\\makeatletter\n{restore}\\makeatother\n"
+            f"{fragment.body}\n"
+            # The page counter is read after the last page has been shipped.
+            f"\\clearpage\n\\makeatletter\n{report}\\makeatother\n\\end{{document}}\n"
+        )
+
+
+def split_manual(tex_text: str, stem: str) -> Optional[ManualSplit]:
+    """Split *tex_text* at its category anchors, or return None if it has fewer than two."""
+    begin = _BEGIN_DOCUMENT.search(tex_text)
+    if begin is None:
+        return None
+    end = _END_DOCUMENT.search(tex_text, begin.end())
+    title_page = _TITLE_PAGE_STYLE.search(tex_text, begin.end())
+    if end is None or title_page is None:
+        return None
+    starts = list(_CATEGORY_START.finditer(tex_text, begin.end(), end.start()))
+    if len(starts) < 2:
+        return None
+
+    chapters = []
+    for index, start in enumerate(starts):
+        stop = starts[index + 1].start() if index + 1 < len(starts) else end.start()
+        chapters.append(
+            Fragment(
+                stem=f"{stem}-part{index + 1:02d}",
+                body=tex_text[start.start():stop],
+                anchor=start.group(1),
+            )
+        )
+    return ManualSplit(
+        preamble=tex_text[:begin.start()],
+        setup=tex_text[begin.end():title_page.start()],
+        front=Fragment(
+            stem=f"{stem}{FRONT_SUFFIX}",
+            body=tex_text[begin.end():starts[0].start()],
+        ),
+        chapters=chapters,
+    )
+
+
+def whole_document_requirements(split: ManualSplit) -> List[str]:
+    """Return why *split* has to be compiled as one document, if at all.
+
+    Lists the labels referenced from a fragment other than the one that
+    defines them, and index or citation commands.
+    """
+    fragments = [split.front, *split.chapters]
+    defined_in: Dict[str, str] = {}
+    for fragment in fragments:
+        for label in _LABEL.findall(fragment.body):
+            defined_in.setdefault(label, fragment.stem)
+
+    reasons = []
+    for fragment in fragments:
+        for label in _REFERENCE.findall(fragment.body):
+            owner = defined_in.get(label)
+            if owner is not None and owner != fragment.stem:
+                reasons.append(f"{fragment.stem} -> {label}")
+        command = _WHOLE_DOCUMENT_COMMANDS.search(fragment.body)
+        if command is not None:
+            reasons.append(f"{fragment.stem}: {command.group(0)}")
+    return list(dict.fromkeys(reasons))
+
+
+def fragment_key(source: str, latex_dir: Path, engine: str) -> str:
+    """Hash a fragment's source, the images it includes and the local LaTeX files."""
+    latex_dir = Path(latex_dir)
+    digest = hashlib.sha256()
+    digest.update(f"{FRAGMENT_CACHE_FORMAT}\0{engine}\0".encode("utf-8"))
+    digest.update(source.encode("utf-8"))
+    images = {
+        name + (suffix or "")
+        for name, suffix in _GRAPHICS.findall(source)
+    }
+    for name in sorted(images):
+        path = latex_dir / name
+        digest.update(f"\0{name}\0".encode("utf-8"))
+        if path.is_file():
+            digest.update(path.read_bytes())
+    for path in sorted(latex_dir.glob("*.sty")) + sorted(latex_dir.glob("*.cls")):
+        digest.update(f"\0{path.name}\0".encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def read_fragment_state(log_file: Path) -> Optional[Dict[str, int]]:
+    """Return the counters a chapter fragment reported at its end."""
+    try:
+        log_text = Path(log_file).read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+    state = {name: int(value) for name, value in _STATE_LINE.findall(log_text)}
+    return state if "c@page" in state else None
+
+
+class FragmentCache:
+    """Keep the last compiled PDF, ``.toc`` and end state of every fragment."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    def _entry(self, stem: str) -> Path:
+        return self.cache_dir / stem
+
+    def lookup(self, stem: str, key: str) -> Optional[Dict[str, object]]:
+        entry = self._entry(stem)
+        try:
+            manifest = json.loads((entry / "manifest.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        pdf = entry / f"{stem}.pdf"
+        if manifest.get("key") != key or not pdf.is_file():
+            return None
+        return {
+            "pdf": pdf,
+            "toc": manifest.get("toc", ""),
+            "state": manifest.get("state") or {},
+        }
+
+    def store(
+        self, stem: str, key: str, pdf: Path, toc: str, state: Mapping[str, int]
+    ) -> None:
+        entry = self._entry(stem)
+        entry.mkdir(parents=True, exist_ok=True)
+        temporary = entry / f".{stem}.{os.getpid()}.tmp"
+        shutil.copyfile(pdf, temporary)
+        os.replace(temporary, entry / f"{stem}.pdf")
+        manifest = entry / f".manifest.{os.getpid()}.tmp"
+        manifest.write_text(
+            json.dumps({"key": key, "toc": toc, "state": dict(state)}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(manifest, entry / "manifest.json")
+
+    def prune(self, stems: Sequence[str]) -> None:
+        """Drop entries of fragments the document no longer has."""
+        if not self.cache_dir.is_dir():
+            return
+        for entry in self.cache_dir.iterdir():
+            if entry.is_dir() and entry.name not in stems:
+                shutil.rmtree(entry, ignore_errors=True)
+
+
+def _page_label_entries(reader, limit: int) -> List[object]:
+    labels = reader.root_object.get("/PageLabels")
+    if labels is None:
+        return []
+    numbers = labels.get_object().get("/Nums", [])
+    entries = []
+    for index in range(0, len(numbers) - 1, 2):
+        page_index = int(numbers[index])
+        if page_index < limit:
+            entries.extend([NumberObject(page_index), numbers[index + 1].get_object()])
+    return entries
+
+
+def merge_fragments(
+    front_pdf: Path, chapter_pdfs: Sequence[Path], output_pdf: Path, first_page: int = 1
+) -> int:
+    """Merge the fragments into *output_pdf* and return its page count.
+
+    Bookmarks and named destinations of the chapters are kept; the title
+    and contents pages are inserted last so that their links into the
+    chapters find those destinations.  Page labels follow the contents'
+    own labels, then count the chapters from *first_page*.
+    """
+    if PdfWriter is None:
+        raise RuntimeError("pypdf is required to merge PDF fragments")
+    writer = PdfWriter()
+    for chapter_pdf in chapter_pdfs:
+        writer.append(str(chapter_pdf))
+    front = PdfReader(str(front_pdf))
+    front_pages = len(front.pages)
+    writer.merge(0, front, import_outline=False)
+
+    numbers = _page_label_entries(front, front_pages)
+    if not numbers:
+        numbers = [NumberObject(0), DictionaryObject({NameObject("/S"): NameObject("/r")})]
+    numbers.extend(
+        [
+            NumberObject(front_pages),
+            DictionaryObject(
+                {
+                    NameObject("/S"): NameObject("/D"),
+                    NameObject("/St"): NumberObject(first_page),
+                }
+            ),
+        ]
+    )
+    writer.root_object[NameObject("/PageLabels")] = DictionaryObject(
+        {NameObject("/Nums"): ArrayObject(numbers)}
+    )
+    page_mode = front.root_object.get("/PageMode")
+    if page_mode is not None:
+        writer.root_object[NameObject("/PageMode")] = page_mode
+    if front.metadata:
+        writer.add_metadata(front.metadata)
+
+    output_pdf = Path(output_pdf)
+    temporary = output_pdf.with_name(f".{output_pdf.name}.tmp")
+    with open(temporary, "wb") as stream:
+        writer.write(stream)
+    os.replace(temporary, output_pdf)
+    return len(writer.pages)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Decide how many xelatex passes a LaTeX build needs.
+
+Cross-references, the table of contents and PDF bookmarks are written to
+the ``.aux``, ``.toc`` and ``.out`` files during one pass and read back in
+the next, so a document is final once a pass leaves them unchanged.  The
+files of the last build are kept in a cache and restored before the first
+pass: when the document's references did not move, that pass already
+reproduces them and no second pass is needed.
+"""
+
+import hashlib
+import shutil
+from pathlib import Path
+from typing import Mapping, Optional
+
+
+AUXILIARY_SUFFIXES = (".aux", ".toc", ".out")
+AUX_CACHE_DIRECTORY_NAME = "pdf_aux_cache"
+DEFAULT_MAX_RUNS = 3
+
+
+def max_runs_from_config(config: Optional[Mapping]) -> int:
+    """Return ``generation.pdf_latex.max_runs``, at least one pass."""
+    generation = (config or {}).get("generation", {}) or {}
+    options = generation.get("pdf_latex", {}) or {}
+    return max(1, int(options.get("max_runs", DEFAULT_MAX_RUNS)))
+
+
+def auxiliary_digest(directory: Path, stem: str) -> str:
+    """Hash the auxiliary files of *stem* in *directory*, missing ones included."""
+    digest = hashlib.sha256()
+    for suffix in AUXILIARY_SUFFIXES:
+        path = Path(directory) / f"{stem}{suffix}"
+        digest.update(suffix.encode("ascii"))
+        if path.is_file():
+            data = path.read_bytes()
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        else:
+            digest.update(b"-")
+    return digest.hexdigest()
+
+
+def _copy_auxiliary_files(source_dir: Path, target_dir: Path, stem: str) -> int:
+    copied = 0
+    for suffix in AUXILIARY_SUFFIXES:
+        source = Path(source_dir) / f"{stem}{suffix}"
+        target = Path(target_dir) / f"{stem}{suffix}"
+        if source.is_file():
+            shutil.copyfile(source, target)
+            copied += 1
+        else:
+            target.unlink(missing_ok=True)
+    return copied
+
+
+def restore_auxiliary_files(cache_dir: Path, latex_dir: Path, stem: str) -> Optional[str]:
+    """Copy the cached auxiliary files into *latex_dir*.
+
+    Returns their digest, or None when nothing is cached for *stem*.
+    """
+    if not any((Path(cache_dir) / f"{stem}{suffix}").is_file() for suffix in AUXILIARY_SUFFIXES):
+        return None
+    _copy_auxiliary_files(cache_dir, latex_dir, stem)
+    return auxiliary_digest(latex_dir, stem)
+
+
+def store_auxiliary_files(latex_dir: Path, cache_dir: Path, stem: str) -> None:
+    """Keep the auxiliary files of a finished build for the next one."""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    _copy_auxiliary_files(latex_dir, cache_dir, stem)
+
+
+def discard_auxiliary_files(directory: Path, stem: str) -> None:
+    for suffix in AUXILIARY_SUFFIXES:
+        (Path(directory) / f"{stem}{suffix}").unlink(missing_ok=True)
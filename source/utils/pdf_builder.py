@@ -2,13 +2,19 @@
 # -*- coding: utf-8 -*-
 """Build and validate downloadable PDFs for the detected documentation languages."""
 
+import io
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
 from pathlib import Path
 from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 
+from .build_report import adopt_spans, stage, traced_call
 from .language_support import detect_languages
 from .pdf_environment import ensure_pdf_environment
+from .pdf_result_cache import PdfResultCache, pdf_input_digest, xelatex_identity
 
 
 def is_valid_pdf(path: Path) -> bool:
@@ -49,6 +55,14 @@ def _resolve_projects_root(docs_source: Path, config: Mapping) -> Path:
     return path.resolve()
 
 
+def _replace_text(path: Path, text: str) -> None:
+    # The published files may be hardlinked from the previous site, so a new
+    # inode is swapped in rather than truncating the shared one.
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_text(text, encoding="utf-8")
+    os.replace(temporary, path)
+
+
 def _write_project_info(
     static_dir: Path, project_name: str, generated_files: Dict[str, str]
 ) -> None:
@@ -59,12 +73,41 @@ def _write_project_info(
         "pdfFiles": generated_files,
     }
     serialized = json.dumps(project_info, ensure_ascii=False)
-    (static_dir / "project_info.json").write_text(serialized, encoding="utf-8")
-    (static_dir / "project_info.js").write_text(
-        f"window.projectInfo = {serialized};\n", encoding="utf-8"
+    _replace_text(static_dir / "project_info.json", serialized)
+    _replace_text(
+        static_dir / "project_info.js", f"window.projectInfo = {serialized};\n"
     )
 
 
+DEFAULT_MAX_PARALLEL = 2
+
+
+def max_parallel_pdfs(config: Mapping) -> int:
+    """Return ``generation.pdf_latex.max_parallel``: languages compiled at once."""
+    generation = config.get("generation", {}) or {}
+    options = generation.get("pdf_latex", {}) or {}
+    return max(1, int(options.get("max_parallel", DEFAULT_MAX_PARALLEL)))
+
+
+def _generate_language_pdf(
+    generator_options: Mapping, title: str, language: str
+) -> Tuple[bool, str]:
+    """Generate one language's PDF in a worker process; return (success, log)."""
+    from pdf_generator_enhanced_v2 import PDFGeneratorV2
+
+    log = io.StringIO()
+    with redirect_stdout(log):
+        success = PDFGeneratorV2(**generator_options).generate_pdf(
+            title, language=language
+        )
+    return success, log.getvalue()
+
+
+def _print_language_log(language: str, log: str) -> None:
+    for line in str(log or "").splitlines():
+        print(f"  [{language}] {line}")
+
+
 def build_detected_pdfs(
     html_dir: Path,
     docs_source: Path,
@@ -72,12 +115,47 @@ def build_detected_pdfs(
     languages: Optional[Iterable[str]] = None,
     browser_path: Optional[str] = None,
     auto_install: bool = True,
+    backend: Optional[str] = None,
+    scratch_dir: Optional[Path] = None,
+    image_cache_dir: Optional[Path] = None,
+    format_cache_dir: Optional[Path] = None,
+    result_cache_dir: Optional[Path] = None,
+    jobs: Optional[int] = None,
 ) -> Tuple[bool, List[Path]]:
-    """Generate one valid PDF per detected README language."""
-    from pdf_generator_enhanced_v2 import PDFGeneratorV2
+    """Generate one valid PDF per detected README language.
 
-    if not ensure_pdf_environment(config, auto_install=auto_install):
-        return False, []
+    *backend* defaults to the LaTeX route; ``"html"`` opts into the merged
+    HTML printing path, which is the only backend that needs those stages.
+    *scratch_dir* keeps the LaTeX working files private to one build
+    (default: a ``latex`` directory next to *html_dir*).  *image_cache_dir*
+    holds the print-ready images shared by languages and later builds
+    (default: ``pdf_image_cache`` next to the LaTeX directory), and
+    *format_cache_dir* the precompiled preamble formats (default:
+    ``pdf_format_cache`` next to it).  With *result_cache_dir*, a language
+    whose PDF inputs match a cached build reuses that PDF without running
+    Sphinx or XeLaTeX (LaTeX backend only).
+
+    Languages compile concurrently in worker processes, at most
+    ``generation.pdf_latex.max_parallel`` at a time, each in its own LaTeX
+    directory; their logs are printed under a ``[language]`` prefix.
+    *jobs* caps the processes of the whole call: no more than *jobs*
+    languages compile at once and their image pools share the remainder
+    (default: no cap, one image worker per CPU in each language).
+    """
+    from pdf_generator_enhanced_v2 import (
+        DocumentScanner,
+        PDFGeneratorV2,
+        resolve_pdf_backend,
+    )
+
+    pdf_backend = resolve_pdf_backend(backend)
+    if not pdf_backend.needs_merged_html:
+        with stage("pdf.environment"):
+            environment_ready = ensure_pdf_environment(
+                config, auto_install=auto_install
+            )
+        if not environment_ready:
+            return False, []
 
     html_dir = Path(html_dir).resolve()
     docs_source = Path(docs_source).resolve()
@@ -98,26 +176,128 @@ def build_detected_pdfs(
     static_dir = html_dir / "_static"
     static_dir.mkdir(parents=True, exist_ok=True)
     config_path = docs_source / "config.yaml"
-    generator = PDFGeneratorV2(
-        html_dir,
-        static_dir,
-        browser_path=browser_path,
-        projects_root=_resolve_projects_root(docs_source, config),
-        config_path=config_path,
-    )
+    generator_options = {
+        "html_dir": html_dir,
+        "output_dir": static_dir,
+        "browser_path": browser_path,
+        "projects_root": _resolve_projects_root(docs_source, config),
+        "config_path": config_path,
+        "backend": pdf_backend.name,
+        "latex_dir": Path(scratch_dir) / "latex" if scratch_dir is not None else None,
+        "image_cache_dir": image_cache_dir,
+        "format_cache_dir": format_cache_dir,
+        "image_jobs": None,
+    }
+    expected_paths = {
+        language: static_dir / pdf_filename(safe_title, language)
+        for language in selected_languages
+    }
+    for expected_path in expected_paths.values():
+        expected_path.unlink(missing_ok=True)
+
+    # 输入摘要（文档、图片、配置、conf.py、XeLaTeX）命中缓存的语言直接复用已生成的 PDF
+    input_keys: Dict[str, str] = {}
+    result_cache = None
+    engine = None
+    if result_cache_dir is not None and not pdf_backend.needs_merged_html:
+        engine = xelatex_identity()
+    if engine is not None:
+        result_cache = PdfResultCache(result_cache_dir)
+        try:
+            with stage("pdf.inputs"):
+                scanner = DocumentScanner(
+                    html_dir, generator_options["projects_root"], config_path
+                )
+                for language in selected_languages:
+                    key = pdf_input_digest(
+                        scanner, language, safe_title, config, docs_source, engine
+                    )
+                    if key is not None:
+                        input_keys[language] = key
+        except (OSError, ValueError) as exc:
+            print(f"[WARN] 无法计算 PDF 输入摘要，本次不使用 PDF 缓存: {exc}")
+            input_keys = {}
+    reused = {
+        language
+        for language in selected_languages
+        if language in input_keys
+        and result_cache.restore(input_keys[language], expected_paths[language])
+    }
+    pending_languages = [
+        language for language in selected_languages if language not in reused
+    ]
 
     generated_paths = []
     generated_files = {}
-    for language in selected_languages:
-        expected_path = static_dir / pdf_filename(safe_title, language)
-        expected_path.unlink(missing_ok=True)
-        print(f"生成 {language} PDF: {expected_path.name}")
-        success = generator.generate_pdf(safe_title, language=language)
+
+    def accept(language: str, success: bool) -> bool:
+        expected_path = expected_paths[language]
         if not success or not is_valid_pdf(expected_path):
             print(f"[ERROR] PDF 未生成或文件无效: {expected_path}")
-            return False, generated_paths
+            return False
         generated_paths.append(expected_path)
         generated_files[language] = expected_path.name
+        if language in input_keys and language not in reused:
+            result_cache.store(input_keys[language], expected_path)
+        return True
+
+    def accept_reused(language: str) -> bool:
+        print(f"[OK] {language} PDF 输入未变化，复用缓存: {expected_paths[language].name}")
+        return accept(language, True)
+
+    workers = min(max_parallel_pdfs(config), len(pending_languages))
+    if jobs is not None:
+        jobs = max(1, int(jobs))
+        workers = min(workers, jobs)
+        generator_options["image_jobs"] = max(1, jobs // max(1, workers))
+    if workers <= 1:
+        generator = PDFGeneratorV2(**generator_options) if pending_languages else None
+        for language in selected_languages:
+            if language in reused:
+                if not accept_reused(language):
+                    return False, generated_paths
+                continue
+            print(f"生成 {language} PDF: {expected_paths[language].name}")
+            with stage("pdf", language=language, backend=pdf_backend.name):
+                success = generator.generate_pdf(safe_title, language=language)
+            if not accept(language, success):
+                return False, generated_paths
+    else:
+        print(f"并行生成 {len(pending_languages)} 种语言 PDF（进程数: {workers}）")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                language: executor.submit(
+                    traced_call,
+                    "pdf",
+                    {"language": language, "backend": pdf_backend.name},
+                    _generate_language_pdf,
+                    generator_options,
+                    safe_title,
+                    language,
+                )
+                for language in pending_languages
+            }
+            wait(futures.values())
+
+        # 所有语言结束后按检测顺序输出日志，任一语言失败则整体失败
+        failed = False
+        for language in selected_languages:
+            if language in reused:
+                failed = not accept_reused(language) or failed
+                continue
+            future = futures[language]
+            print(f"生成 {language} PDF: {expected_paths[language].name}")
+            error = future.exception()
+            if error is None:
+                (success, log), spans = future.result()
+                adopt_spans(spans)
+                _print_language_log(language, log)
+            else:
+                print(f"  [{language}] [ERROR] {error}")
+                success = False
+            failed = not accept(language, success) or failed
+        if failed:
+            return False, generated_paths
 
     _write_project_info(static_dir, project_name, generated_files)
     return True, generated_paths
@@ -5,14 +5,19 @@
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
+import json
 import os
 import platform
 import shutil
 import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.request import Request, urlopen
 from pathlib import Path
-from typing import Mapping, Optional
+from typing import Iterable, Mapping, Optional
 
 import yaml
 
@@ -38,6 +43,26 @@ SOURCE_CODE_PRO_FILES = (
 )
 
 
+FONT_PROBE_CACHE_FORMAT = 1
+FONT_PROBE_TIMEOUT = 45
+
+
+def default_font_probe_cache() -> Path:
+    """Return the per-user file that remembers fonts XeLaTeX has loaded.
+
+    ``PDF_FONT_PROBE_CACHE`` overrides the location, for example to keep it
+    inside a directory a CI job caches between runs.
+    """
+    configured = os.environ.get("PDF_FONT_PROBE_CACHE")
+    if configured:
+        return Path(configured)
+    if platform.system().lower() == "windows":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "sdk-docs" / "pdf_font_probes.json"
+
+
 def configured_pdf_fonts(config: Optional[Mapping] = None) -> dict[str, str]:
     """Return the exact font families configured for PDF generation."""
     generation = (config or {}).get("generation", {}) or {}
@@ -50,8 +75,13 @@ def configured_pdf_fonts(config: Optional[Mapping] = None) -> dict[str, str]:
     return fonts
 
 
+@functools.lru_cache(maxsize=None)
 def find_xelatex() -> Optional[str]:
-    """Locate XeLaTeX on PATH or in common TeX Live/MiKTeX locations."""
+    """Locate XeLaTeX on PATH or in common TeX Live/MiKTeX locations.
+
+    The result is remembered; call ``find_xelatex.cache_clear()`` after
+    installing TeX packages.
+    """
     found = shutil.which("xelatex")
     if found:
         return found
@@ -117,11 +147,108 @@ def _probe_font(xelatex: str, font_name: str) -> bool:
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             check=False,
-            timeout=45,
+            timeout=FONT_PROBE_TIMEOUT,
         )
         return result.returncode == 0
 
 
+def xelatex_version(xelatex: str) -> str:
+    """Return the first line of ``xelatex --version``, or "" when it cannot run."""
+    try:
+        result = subprocess.run(
+            [xelatex, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            check=False,
+            timeout=FONT_PROBE_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    lines = (result.stdout or "").splitlines()
+    return lines[0].strip() if lines else ""
+
+
+def _fontconfig_cache_dirs(xelatex: str) -> list[Path]:
+    home = Path.home()
+    directories = [
+        Path("/var/cache/fontconfig"),
+        Path("/usr/local/var/cache/fontconfig"),
+        Path(os.environ.get("XDG_CACHE_HOME") or home / ".cache") / "fontconfig",
+        home / ".fontconfig",
+    ]
+    # TeX Live keeps XeTeX's own fontconfig cache in <root>/texmf-var.
+    binary = Path(xelatex).resolve()
+    if len(binary.parents) > 2:
+        directories.append(binary.parents[2] / "texmf-var" / "fonts" / "cache")
+    return directories
+
+
+def fontconfig_fingerprint(xelatex: str) -> str:
+    """Fingerprint the fontconfig caches; ``fc-cache`` rewrites them on font changes."""
+    digest = hashlib.sha256()
+    for directory in _fontconfig_cache_dirs(xelatex):
+        try:
+            entries = sorted(directory.iterdir())
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            digest.update(f"{entry}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def font_probe_context(xelatex: str) -> str:
+    """Key cached probe results by the XeLaTeX binary, its version and fontconfig state."""
+    identity = [
+        FONT_PROBE_CACHE_FORMAT,
+        str(Path(xelatex).resolve()),
+        xelatex_version(xelatex),
+        fontconfig_fingerprint(xelatex),
+    ]
+    return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
+
+
+def _load_verified_fonts(cache_path: Path, context: str) -> dict[str, float]:
+    try:
+        cached = json.loads(Path(cache_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cached, dict) or cached.get("context") != context:
+        return {}
+    verified = cached.get("verified")
+    return dict(verified) if isinstance(verified, dict) else {}
+
+
+def _store_verified_fonts(
+    cache_path: Path, context: str, verified: Mapping[str, float]
+) -> None:
+    cache_path = Path(cache_path)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+        temporary.write_text(
+            json.dumps({"context": context, "verified": dict(verified)}, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(temporary, cache_path)
+    except OSError as exc:
+        print(f"[WARN] Unable to write the font probe cache {cache_path}: {exc}")
+
+
+def _probe_fonts(xelatex: str, families: Iterable[str]) -> dict[str, bool]:
+    """Probe each distinct family once, concurrently."""
+    unique = list(dict.fromkeys(families))
+    if len(unique) <= 1:
+        return {family: _probe_font(xelatex, family) for family in unique}
+    with ThreadPoolExecutor(max_workers=min(len(unique), os.cpu_count() or 1)) as executor:
+        return dict(zip(unique, executor.map(functools.partial(_probe_font, xelatex), unique)))
+
+
 def install_pdf_system_dependencies() -> bool:
     """Best-effort installation of the same open font/tool packages used in CI."""
     system = platform.system().lower()
@@ -195,42 +322,68 @@ def ensure_pdf_environment(
     config: Optional[Mapping] = None,
     *,
     auto_install: bool = True,
+    refresh: bool = False,
+    cache_path: Optional[Path] = None,
 ) -> bool:
-    """Require XeLaTeX and every configured font; never use a fallback font."""
+    """Require XeLaTeX and every configured font; never use a fallback font.
+
+    Fonts XeLaTeX loaded before are remembered in *cache_path* (default:
+    :func:`default_font_probe_cache`) for the same XeLaTeX binary, version
+    and fontconfig state; *refresh* probes every font again.  Only
+    successful probes are cached, so a missing font is always rechecked.
+    """
     xelatex = find_xelatex()
     fonts = configured_pdf_fonts(config)
     if not xelatex and auto_install:
         print("[INFO] XeLaTeX or PDF fonts are missing; installing system packages...")
         install_pdf_system_dependencies()
+        find_xelatex.cache_clear()
         xelatex = find_xelatex()
 
     if not xelatex:
         print("[ERROR] XeLaTeX is required for PDF generation but was not found.")
         return False
 
-    missing = [
-        f"{role}={family}"
-        for role, family in fonts.items()
-        if not _probe_font(xelatex, family)
-    ]
+    cache_path = Path(cache_path) if cache_path is not None else default_font_probe_cache()
+    context = font_probe_context(xelatex)
+    verified = {} if refresh else _load_verified_fonts(cache_path, context)
+    cached_count = sum(1 for family in set(fonts.values()) if family in verified)
+
+    def missing_fonts() -> list[str]:
+        results = _probe_fonts(
+            xelatex, [family for family in fonts.values() if family not in verified]
+        )
+        for family, available in results.items():
+            if available:
+                verified[family] = time.time()
+        return [
+            f"{role}={family}"
+            for role, family in fonts.items()
+            if family not in verified
+        ]
+
+    missing = missing_fonts()
     if missing and auto_install:
         print(
             "[INFO] Required PDF fonts are missing; "
             "retrying TeX/font package installation..."
         )
         install_pdf_system_dependencies()
-        missing = [
-            f"{role}={family}"
-            for role, family in fonts.items()
-            if not _probe_font(xelatex, family)
-        ]
+        find_xelatex.cache_clear()
+        xelatex = find_xelatex() or xelatex
+        # Installing fonts refreshes the fontconfig caches and so the key.
+        context = font_probe_context(xelatex)
+        missing = missing_fonts()
+    if verified or refresh:
+        _store_verified_fonts(cache_path, context, verified)
     if missing:
         print("[ERROR] Required PDF fonts are unavailable; refusing to use fallbacks:")
         for item in missing:
             print(f"        - {item}")
         return False
 
-    print(f"[OK] XeLaTeX PDF environment verified ({xelatex})")
+    cached_note = f"; {cached_count} cached font probe(s)" if cached_count else ""
+    print(f"[OK] XeLaTeX PDF environment verified ({xelatex}{cached_note})")
     for role, family in fonts.items():
         print(f"      {role}: {family}")
     return True
@@ -249,6 +402,11 @@ def main() -> int:
         action="store_true",
         help="Only validate; do not attempt system package installation",
     )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached font probe results and probe every font again",
+    )
     args = parser.parse_args()
     try:
         config = yaml.safe_load(args.config.read_text(encoding="utf-8")) or {}
@@ -258,7 +416,7 @@ def main() -> int:
     return (
         0
         if ensure_pdf_environment(
-            config, auto_install=not args.no_auto_install
+            config, auto_install=not args.no_auto_install, refresh=args.refresh
         )
         else 1
     )
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Prepare the images of a Sphinx LaTeX build for xelatex.
+
+Sphinx copies every image into the LaTeX directory at its original size, so
+large screenshots reach xdvipdfmx at full resolution and WebP files, which
+it cannot read, break the build.  Before xelatex runs, each image is:
+
+* converted from WebP to JPEG, or to PNG when it has transparency;
+* downsampled to the configured print resolution for the width it is
+  printed at, at most the text width of the page, keeping its printed size;
+* recompressed when that makes the file smaller.
+
+Results are stored in a cache keyed by the image content and the settings,
+shared by all languages and later builds, and hardlinked into the LaTeX
+directory.  Images not yet cached are processed in worker processes.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+
+CACHE_DIRECTORY_NAME = "pdf_image_cache"
+CACHE_FORMAT = 1
+CACHE_MAX_AGE_DAYS = 30
+PARALLEL_MIN_FILES = 4
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+# Images without resolution metadata are printed at 72 dpi by xdvipdfmx.
+DEFAULT_SOURCE_DPI = 72.0
+
+
+@dataclass(frozen=True)
+class ImageSettings:
+    """Print resolution and encoding settings from ``generation.pdf_images``."""
+
+    dpi: int = 200
+    page_width_cm: float = 16.0
+    jpeg_quality: int = 85
+
+    @classmethod
+    def from_config(cls, config: Optional[Mapping]) -> "ImageSettings":
+        generation = (config or {}).get("generation", {}) or {}
+        options = generation.get("pdf_images", {}) or {}
+        defaults = cls()
+        return cls(
+            dpi=int(options.get("dpi", defaults.dpi)),
+            page_width_cm=float(options.get("page_width_cm", defaults.page_width_cm)),
+            jpeg_quality=int(options.get("jpeg_quality", defaults.jpeg_quality)),
+        )
+
+    @property
+    def cache_tag(self) -> str:
+        return f"{CACHE_FORMAT}:{self.dpi}:{self.page_width_cm}:{self.jpeg_quality}"
+
+
+def _target_width(image, settings: ImageSettings) -> int:
+    """Return the pixel width needed to print *image* at ``settings.dpi``."""
+    source_dpi = float((image.info.get("dpi") or (0,))[0] or DEFAULT_SOURCE_DPI)
+    printed_inches = min(image.width / source_dpi, settings.page_width_cm / 2.54)
+    return min(image.width, max(1, round(printed_inches * settings.dpi)))
+
+
+def _encode(image, suffix: str, settings: ImageSettings, dpi: Optional[float]) -> bytes:
+    buffer = io.BytesIO()
+    options = {"dpi": (dpi, dpi)} if dpi else {}
+    if suffix == ".png":
+        image.save(buffer, "PNG", optimize=True, **options)
+    else:
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=settings.jpeg_quality, optimize=True, **options
+        )
+    return buffer.getvalue()
+
+
+def _has_alpha(image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def process_image(data: bytes, suffix: str, settings: ImageSettings) -> Tuple[bytes, str]:
+    """Return the printable bytes of one image and their file suffix."""
+    suffix = suffix.lower()
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        converted = suffix == ".webp"
+        if converted:
+            suffix = ".png" if _has_alpha(image) else ".jpg"
+        width = _target_width(image, settings)
+        if width >= image.width and not converted:
+            if suffix != ".png":
+                return data, suffix
+            encoded = _encode(image, suffix, settings, None)
+            return (encoded, suffix) if len(encoded) < len(data) else (data, suffix)
+        dpi = None
+        if width < image.width:
+            source_dpi = float((image.info.get("dpi") or (0,))[0] or DEFAULT_SOURCE_DPI)
+            # The new resolution keeps the printed size unchanged.
+            dpi = source_dpi * width / image.width
+            height = max(1, round(image.height * width / image.width))
+            if _has_alpha(image) and image.mode != "RGBA":
+                image = image.convert("RGBA")
+            elif image.mode not in ("RGB", "RGBA", "L"):
+                image = image.convert("RGB")
+            image = image.resize((width, height), Image.LANCZOS)
+        return _encode(image, suffix, settings, dpi), suffix
+
+
+def _cache_key(data: bytes, suffix: str, settings: ImageSettings) -> str:
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{suffix.lower()}\0{settings.cache_tag}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cached_output(cache_dir: Path, key: str) -> Optional[Path]:
+    for suffix in (".png", ".jpg", ".jpeg"):
+        candidate = cache_dir / f"{key}{suffix}"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _process_into_cache(
+    source: str, suffix: str, key: str, cache_dir: str, settings: ImageSettings
+) -> str:
+    data = Path(source).read_bytes()
+    output, output_suffix = process_image(data, suffix, settings)
+    cached = Path(cache_dir) / f"{key}{output_suffix}"
+    temporary = cached.with_name(f".{cached.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(output)
+    os.replace(temporary, cached)
+    return str(cached)
+
+
+def _link_into(cached: Path, destination: Path) -> None:
+    temporary = destination.with_name(f".{destination.name}.tmp")
+    temporary.unlink(missing_ok=True)
+    try:
+        os.link(cached, temporary)
+    except OSError:
+        shutil.copy2(cached, temporary)
+    os.replace(temporary, destination)
+
+
+def prune_image_cache(cache_dir: Path, max_age_days: float = CACHE_MAX_AGE_DAYS) -> int:
+    """Remove cache entries no build has used for *max_age_days*."""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in Path(cache_dir).iterdir():
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                entry.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def prepare_latex_images(
+    latex_dir: Path,
+    cache_dir: Path,
+    settings: Optional[ImageSettings] = None,
+    jobs: Optional[int] = None,
+) -> Dict[str, object]:
+    """Replace the images in *latex_dir* with their printable versions.
+
+    Returns the counts of ``images``, ``cached`` hits, ``processed`` images
+    and ``bytes_saved``, plus ``renamed``: the original file names whose
+    printable version has another suffix, mapped to the new names, for the
+    ``.tex`` references to be rewritten.
+    """
+    latex_dir = Path(latex_dir)
+    cache_dir = Path(cache_dir)
+    settings = settings or ImageSettings()
+    stats: Dict[str, object] = {
+        "images": 0, "cached": 0, "processed": 0, "bytes_saved": 0, "renamed": {},
+    }
+    images = sorted(
+        path for path in latex_dir.iterdir()
+        if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not images or Image is None:
+        return stats
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    outputs: Dict[Path, Path] = {}
+    pending: Dict[str, List[Path]] = {}
+    for image in images:
+        key = _cache_key(image.read_bytes(), image.suffix, settings)
+        cached = _cached_output(cache_dir, key)
+        if cached is not None:
+            outputs[image] = cached
+            stats["cached"] += 1
+        else:
+            pending.setdefault(key, []).append(image)
+    stats["images"] = len(images)
+
+    tasks = [
+        (str(paths[0]), paths[0].suffix, key, str(cache_dir), settings)
+        for key, paths in pending.items()
+    ]
+    workers = min(max(1, int(jobs or os.cpu_count() or 1)), len(tasks) or 1)
+    if workers <= 1 or len(tasks) < PARALLEL_MIN_FILES:
+        results = [_process_into_cache(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_process_into_cache, *zip(*tasks)))
+    for (key, paths), cached in zip(pending.items(), results):
+        stats["processed"] += len(paths)
+        for path in paths:
+            outputs[path] = Path(cached)
+
+    renamed: Dict[str, str] = {}
+    for image, cached in outputs.items():
+        original_size = image.stat().st_size
+        # Touching marks the entry as used for prune_image_cache.
+        os.utime(cached)
+        destination = image
+        if image.suffix.lower() == ".webp":
+            destination = image.with_suffix(cached.suffix)
+            renamed[image.name] = destination.name
+        _link_into(cached, destination)
+        if destination != image:
+            image.unlink()
+        stats["bytes_saved"] += original_size - cached.stat().st_size
+    stats["renamed"] = renamed
+    prune_image_cache(cache_dir)
+    return stats
+
+
+def rewrite_image_references(tex_text: str, renamed: Mapping[str, str]) -> str:
+    """Point Sphinx ``\\sphinxincludegraphics{{stem}.ext}`` references at *renamed*."""
+    for old_name, new_name in renamed.items():
+        old = Path(old_name)
+        new = Path(new_name)
+        tex_text = tex_text.replace(
+            f"{{{{{old.stem}}}{old.suffix}}}", f"{{{{{new.stem}}}{new.suffix}}}"
+        )
+    return tex_text
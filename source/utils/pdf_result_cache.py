@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Reuse finished PDFs whose inputs did not change.
+
+A language's PDF is fully determined by the documents ``DocumentScanner``
+selects for it, the directory README titles and images those documents
+use, the ``config.yaml`` sections the PDF reads, ``conf.py`` and the
+modules that turn Sphinx LaTeX into a PDF, and the XeLaTeX installation.
+Their digest addresses a finished PDF in the cache; a build whose digest
+is cached copies that PDF instead of running Sphinx and XeLaTeX.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from importlib import metadata
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+from urllib.parse import unquote, urlsplit
+
+from .document_catalog import markdown_image_targets
+from .pdf_environment import find_xelatex, font_probe_context
+
+
+RESULT_CACHE_DIRECTORY_NAME = "pdf_result_cache"
+RESULT_CACHE_FORMAT = 1
+RESULT_CACHE_LIMIT = 12
+PDF_CONFIG_SECTIONS = ("project", "repository", "categories", "generation", "sphinx")
+# conf.py reads these when it builds the LaTeX title page and styles.
+PDF_ENVIRONMENT_VARIABLES = (
+    "PDF_STYLE",
+    "PDF_COVER_TITLE",
+    "PDF_COVER_TYPE",
+    "PDF_COVER_DESCRIPTION",
+)
+RENDERER_PACKAGES = ("sphinx", "myst-parser", "Pillow", "pypdf")
+SOURCE_DIR = Path(__file__).resolve().parents[1]
+# Code between the Markdown sources and the finished PDF, besides conf.py.
+RENDERER_FILES = (
+    "pdf_generator_enhanced_v2.py",
+    "utils/latex_format.py",
+    "utils/latex_fragments.py",
+    "utils/latex_passes.py",
+    "utils/pdf_formatting.py",
+    "utils/pdf_images.py",
+    "utils/sphinx_runner.py",
+)
+
+
+def _package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def _local_asset(document: Path, target: str, projects_root: Path) -> Optional[Path]:
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        return projects_root / path.lstrip("/")
+    return document.parent / path
+
+
+def _relative_name(path: Path, root: Path) -> str:
+    try:
+        return Path(path).resolve().relative_to(root).as_posix()
+    except ValueError:
+        return Path(path).resolve().as_posix()
+
+
+def _update_file(digest, label: str, path: Path) -> None:
+    digest.update(f"\0{label}\0".encode("utf-8"))
+    try:
+        digest.update(Path(path).read_bytes())
+    except OSError:
+        digest.update(b"-")
+
+
+def pdf_input_digest(
+    scanner,
+    language: str,
+    title: str,
+    config: Mapping,
+    docs_source: Path,
+    engine: str,
+) -> Optional[str]:
+    """Return the digest of everything *language*'s PDF is built from.
+
+    *scanner* is the ``DocumentScanner`` of the build and *engine* an
+    identity of the XeLaTeX installation.  Returns None when the scanner
+    selects no documents.
+    """
+    documents = scanner.scan_documents(language)
+    if not documents:
+        return None
+    projects_root = Path(scanner.projects_root).resolve()
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            [
+                RESULT_CACHE_FORMAT,
+                language,
+                title,
+                engine,
+                {section: config.get(section) for section in PDF_CONFIG_SECTIONS},
+                {name: os.environ.get(name) for name in PDF_ENVIRONMENT_VARIABLES},
+                {name: _package_version(name) for name in RENDERER_PACKAGES},
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")
+    )
+    _update_file(digest, "conf.py", Path(docs_source) / "conf.py")
+    for name in RENDERER_FILES:
+        _update_file(digest, name, SOURCE_DIR / name)
+
+    indexes = set()
+    for category, entries in documents.items():
+        for entry in entries:
+            source = Path(entry["file"]).resolve()
+            relative = _relative_name(source, projects_root)
+            digest.update(
+                json.dumps(
+                    [
+                        category,
+                        relative,
+                        entry.get("title"),
+                        entry.get("category_name"),
+                        entry.get("category_name_en"),
+                        bool(entry.get("standalone_directory_index")),
+                    ],
+                    ensure_ascii=False,
+                ).encode("utf-8")
+            )
+            _update_file(digest, relative, source)
+            content = source.read_text(encoding="utf-8", errors="replace")
+            for target in sorted(set(markdown_image_targets(content))):
+                asset = _local_asset(source, target, projects_root)
+                if asset is not None:
+                    _update_file(digest, f"{relative}:{target}", asset)
+            # Directory README titles become the PDF's category headings.
+            directory = source.parent
+            while directory == projects_root or projects_root in directory.parents:
+                index_path = scanner.directory_index_path(directory, language)
+                if index_path is not None:
+                    indexes.add(index_path)
+                if directory == projects_root:
+                    break
+                directory = directory.parent
+    for index_path in sorted(indexes):
+        _update_file(digest, f"index:{_relative_name(index_path, projects_root)}", index_path)
+    return digest.hexdigest()
+
+
+def xelatex_identity() -> Optional[str]:
+    """Identify the XeLaTeX installation, or None when it is not installed."""
+    xelatex = find_xelatex()
+    return font_probe_context(xelatex) if xelatex else None
+
+
+class PdfResultCache:
+    """Finished PDFs addressed by their input digest."""
+
+    def __init__(self, cache_dir: Path, limit: int = RESULT_CACHE_LIMIT):
+        self.cache_dir = Path(cache_dir)
+        self.limit = limit
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def restore(self, key: str, destination: Path) -> bool:
+        """Copy the PDF cached for *key* to *destination*; return whether it was cached."""
+        cached = self._path(key)
+        if not cached.is_file():
+            return False
+        destination = Path(destination)
+        temporary = destination.with_name(f".{destination.name}.tmp")
+        shutil.copyfile(cached, temporary)
+        os.replace(temporary, destination)
+        # Touching marks the entry as recently used for pruning.
+        os.utime(cached)
+        return True
+
+    def store(self, key: str, pdf: Path) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temporary = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        shutil.copyfile(pdf, temporary)
+        os.replace(temporary, self._path(key))
+        self.prune(keep=[key])
+
+    def prune(self, keep: Iterable[str] = ()) -> None:
+        """Keep the most recently used entries, at most ``limit`` of them."""
+        keep = {self._path(key) for key in keep}
+        entries = sorted(
+            self.cache_dir.glob("*.pdf"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in entries[self.limit:]:
+            if stale not in keep:
+                stale.unlink(missing_ok=True)
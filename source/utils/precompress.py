@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Write precompressed ``.gz`` and ``.br`` sidecars next to built site files.
+
+Every compressible file of at least ``MIN_SIZE`` bytes gets a gzip sidecar,
+and a brotli one when the ``brotli`` module is importable, so a static
+server can send the smaller encoding without compressing per request.  A
+sidecar counts as up to date when it is not older than its source.
+
+Compressed results are kept in a content-addressed cache and hardlinked as
+sidecars, because every build publishes a fresh output tree: unchanged
+pages and the identical assets of other languages and versions are then
+linked instead of compressed again.  Cache entries no sidecar links to any
+more are removed at the end of a run.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+MIN_SIZE = 1024
+PARALLEL_MIN_FILES = 64
+CACHE_DIRECTORY_NAME = "compress_cache"
+SIDECAR_SUFFIXES = (".gz", ".br")
+COMPRESSIBLE_SUFFIXES = frozenset({
+    ".html", ".htm", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".xml",
+    ".txt", ".md", ".ttf", ".otf", ".eot", ".ico",
+})
+
+
+def _gzip(data: bytes) -> bytes:
+    buffer = io.BytesIO()
+    # A fixed header keeps identical content byte-identical across builds.
+    with gzip.GzipFile(
+        filename="", mode="wb", compresslevel=9, fileobj=buffer, mtime=0
+    ) as handle:
+        handle.write(data)
+    return buffer.getvalue()
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Return the sidecar suffixes this interpreter can write."""
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+
+_ENCODERS = {".gz": _gzip, ".br": _brotli}
+
+
+def is_compressible(path: Path) -> bool:
+    return Path(path).suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+def sidecar_is_fresh(source: Path, sidecar: Path) -> bool:
+    """Return whether *sidecar* exists and is not older than *source*."""
+    try:
+        return os.stat(sidecar).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _link_sidecar(cached: Path, sidecar: Path) -> None:
+    temporary = sidecar.with_name(f".{sidecar.name}.tmp")
+    temporary.unlink(missing_ok=True)
+    try:
+        os.link(cached, temporary)
+    except OSError:
+        shutil.copy2(cached, temporary)
+    os.replace(temporary, sidecar)
+    # Touching the shared inode only moves it forward, so sidecars linked
+    # earlier stay fresh as well.
+    os.utime(sidecar)
+
+
+def _compress_group(
+    paths: List[str], suffixes: List[str], cache_dir: str
+) -> Dict[str, int]:
+    """Write *suffixes* sidecars for *paths*, which share one content."""
+    counts = {"written": 0, "linked": 0}
+    data = Path(paths[0]).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    for suffix in suffixes:
+        cached = Path(cache_dir) / f"{digest}{suffix}"
+        if cached.is_file():
+            counts["linked"] += len(paths)
+        else:
+            compressed = _ENCODERS[suffix](data)
+            if len(compressed) >= len(data):
+                for path in paths:
+                    Path(path + suffix).unlink(missing_ok=True)
+                continue
+            temporary = cached.with_name(f".{cached.name}.{os.getpid()}.tmp")
+            temporary.write_bytes(compressed)
+            os.replace(temporary, cached)
+            counts["written"] += 1
+            counts["linked"] += len(paths) - 1
+        for path in paths:
+            _link_sidecar(cached, Path(path + suffix))
+    return counts
+
+
+def _compress_batch(tasks: List[Tuple[List[str], List[str], str]]) -> Dict[str, int]:
+    counts = {"written": 0, "linked": 0}
+    for paths, suffixes, cache_dir in tasks:
+        for key, value in _compress_group(paths, suffixes, cache_dir).items():
+            counts[key] += value
+    return counts
+
+
+def _batches(tasks: List, count: int) -> Iterable[List]:
+    return (tasks[index::count] for index in range(count))
+
+
+def _prune_cache(cache_dir: Path) -> None:
+    for entry in cache_dir.iterdir():
+        try:
+            if entry.is_file() and entry.stat().st_nlink <= 1:
+                entry.unlink()
+        except OSError:
+            continue
+
+
+def precompress_tree(
+    root: Path,
+    jobs: Optional[int] = None,
+    min_size: int = MIN_SIZE,
+    cache_dir: Optional[Path] = None,
+) -> Dict[str, int]:
+    """Bring the compressed sidecars of every file under *root* up to date.
+
+    Hidden directories are skipped.  Sidecars of deleted or now too small
+    files are removed.  Compression runs in up to *jobs* worker processes
+    (default: one per CPU); *cache_dir* defaults to ``compress_cache`` next
+    to *root*.  Returns counts of eligible ``files``, sidecars already
+    ``up_to_date``, contents compressed (``written``), sidecars ``linked``
+    from earlier results and stale sidecars ``removed``.
+    """
+    root = Path(root)
+    cache_dir = Path(cache_dir) if cache_dir else root.parent / CACHE_DIRECTORY_NAME
+    stats = {"files": 0, "up_to_date": 0, "written": 0, "linked": 0, "removed": 0}
+    if not root.is_dir():
+        return stats
+    encodings = available_encodings()
+    groups: Dict[Tuple[int, int, Tuple[str, ...]], List[str]] = {}
+    wanted = set()
+    sidecars = []
+    for current, dirs, names in os.walk(root):
+        dirs[:] = [
+            name for name in dirs
+            if not name.startswith(".") and Path(current, name) != cache_dir
+        ]
+        for name in names:
+            path = os.path.join(current, name)
+            if name.endswith(SIDECAR_SUFFIXES):
+                if is_compressible(Path(name[:-3])):
+                    sidecars.append(path)
+                continue
+            if name.startswith(".") or not is_compressible(Path(name)):
+                continue
+            status = os.stat(path)
+            if status.st_size < min_size:
+                continue
+            stats["files"] += 1
+            missing = tuple(
+                suffix for suffix in encodings
+                if not sidecar_is_fresh(path, path + suffix)
+            )
+            wanted.add(path)
+            if not missing:
+                stats["up_to_date"] += 1
+                continue
+            # Hardlinked copies are read and compressed once.
+            groups.setdefault((status.st_dev, status.st_ino, missing), []).append(path)
+
+    for sidecar in sidecars:
+        source, suffix = sidecar[:-3], sidecar[-3:]
+        # Fresh brotli sidecars from a run that could write them are kept.
+        if source not in wanted or (
+            suffix not in encodings and not sidecar_is_fresh(source, sidecar)
+        ):
+            os.unlink(sidecar)
+            stats["removed"] += 1
+
+    tasks = [
+        (paths, list(missing), str(cache_dir))
+        for (_, _, missing), paths in groups.items()
+    ]
+    if tasks:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    workers = min(max(1, int(jobs or os.cpu_count() or 1)), len(tasks))
+    if workers <= 1 or len(tasks) < PARALLEL_MIN_FILES:
+        results = [_compress_batch(tasks)] if tasks else []
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = [
+                future.result()
+                for future in [
+                    executor.submit(_compress_batch, batch)
+                    for batch in _batches(tasks, workers)
+                ]
+            ]
+    for counts in results:
+        for key, value in counts.items():
+            stats[key] += value
+
+    if cache_dir.is_dir():
+        _prune_cache(cache_dir)
+    return stats
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Build a sharded, CJK-aware search index from a built HTML site.
+
+Sphinx writes one ``searchindex.js`` per language that the search page has
+to download and parse in full before the first result appears.  This
+indexer reads the article text of every built page instead and writes, per
+page language, a directory ``_search/<lang>/`` holding:
+
+* ``manifest.json``: the tokenizer stop words, the documents file and the
+  first term of every shard;
+* ``documents.<hash>.json``: ``[url, title]`` of every page, URLs relative
+  to the site root;
+* ``shard-<n>.<hash>.json``: ``{term: [doc, score, doc, score, ...]}`` for
+  one contiguous range of the sorted terms.
+
+Latin text is split into lower-case words and CJK text into overlapping
+character bigrams, so Chinese needs no dictionary.  Because shards cover
+prefix ranges, the search page's worker fetches only the shards a query's
+terms, or their prefixes, can fall into.  The tokenizer must stay in step
+with ``_static/docs_search_worker.js``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+SEARCH_DIRECTORY_NAME = "_search"
+MANIFEST_NAME = "manifest.json"
+INDEX_FORMAT = 1
+FINGERPRINT_LENGTH = 16
+SHARD_TARGET_BYTES = 64 * 1024
+PARALLEL_MIN_FILES = 64
+MIN_WORD_LENGTH = 2
+MAX_TERM_LENGTH = 32
+MAX_SCORE = 999
+TITLE_WEIGHT = 10
+HEADING_WEIGHT = 5
+STOP_WORDS = (
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if",
+    "in", "into", "is", "it", "of", "on", "or", "that", "the", "this", "to",
+    "was", "will", "with",
+)
+
+# Kana, CJK ideographs and Hangul form bigrams; other letters form words.
+_CJK_CHARACTERS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_PATTERN = re.compile(f"([{_CJK_CHARACTERS}]+)|([0-9a-z_\u00c0-\u024f]+)")
+_SKIPPED_PAGE_PATTERN = re.compile(r"^(search|genindex|py-modindex)(_[a-z]+)?\.html$")
+_SKIPPED_DIRECTORY_PATTERN = re.compile(
+    r"^(_static|_images|_downloads|_sources|_assets)(_[a-z]+)?$"
+)
+_HEADINGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+_SKIPPED_ELEMENTS = frozenset({"script", "style", "template"})
+
+
+def language_key(language: str) -> str:
+    """Return the index directory name for a Sphinx or HTML language tag."""
+    return re.split(r"[-_]", str(language or "en"))[0].lower() or "en"
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the index terms of *text*, repeated as often as they occur."""
+    terms = []
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    for cjk, word in _TOKEN_PATTERN.findall(normalized):
+        if cjk:
+            if len(cjk) == 1:
+                terms.append(cjk)
+            else:
+                terms.extend(cjk[index:index + 2] for index in range(len(cjk) - 1))
+        elif len(word) >= MIN_WORD_LENGTH and word not in STOP_WORDS:
+            terms.append(word[:MAX_TERM_LENGTH])
+    return terms
+
+
+class _PageParser(HTMLParser):
+    """Collect the language, title, headings and article text of one page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.language = ""
+        self.page_title: List[str] = []
+        self.headings: List[str] = []
+        self.text: List[str] = []
+        self.found_article = False
+        self._in_title = False
+        self._article_depth = 0
+        self._skip_tag = ""
+        self._skip_depth = 0
+        self._heading: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "html":
+            self.language = attributes.get("lang") or ""
+        elif tag == "title":
+            self._in_title = True
+        if not self._article_depth:
+            if tag == "div" and attributes.get("itemprop") == "articleBody":
+                self._article_depth = 1
+                self.found_article = True
+            return
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag == "div":
+            self._article_depth += 1
+        if tag in _SKIPPED_ELEMENTS or "headerlink" in (
+            attributes.get("class") or ""
+        ).split():
+            self._skip_tag = tag
+            self._skip_depth = 1
+        elif tag in _HEADINGS:
+            self._heading = []
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if not self._article_depth:
+            return
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+            return
+        if tag in _HEADINGS and self._heading is not None:
+            self.headings.append(" ".join("".join(self._heading).split()))
+            self._heading = None
+        elif tag == "div":
+            self._article_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.page_title.append(data)
+        if not self._article_depth or self._skip_depth:
+            return
+        self.text.append(data)
+        if self._heading is not None:
+            self._heading.append(data)
+
+
+def read_page(path: Path) -> Optional[Tuple[str, str, Dict[str, int]]]:
+    """Return ``(language, title, term scores)`` of a page, or None.
+
+    Pages without an article body, such as redirect entries, are skipped.
+    Title terms count ``TITLE_WEIGHT`` and heading terms ``HEADING_WEIGHT``
+    times on top of their occurrences in the text.
+    """
+    parser = _PageParser()
+    parser.feed(Path(path).read_text(encoding="utf-8", errors="replace"))
+    parser.close()
+    if not parser.found_article:
+        return None
+    title = parser.headings[0] if parser.headings else ""
+    if not title:
+        title = " ".join("".join(parser.page_title).split()).split(" — ")[0]
+    scores: Dict[str, int] = {}
+    for term in tokenize(" ".join(parser.text)):
+        scores[term] = scores.get(term, 0) + 1
+    for weight, texts in ((TITLE_WEIGHT, [title]), (HEADING_WEIGHT, parser.headings[1:])):
+        for text in texts:
+            for term in tokenize(text):
+                scores[term] = scores.get(term, 0) + weight
+    return (
+        language_key(parser.language),
+        title,
+        {term: min(score, MAX_SCORE) for term, score in scores.items()},
+    )
+
+
+def _read_pages(paths: List[str]) -> List[Optional[Tuple[str, str, Dict[str, int]]]]:
+    return [read_page(Path(path)) for path in paths]
+
+
+def site_pages(site_root: Path) -> List[Path]:
+    """Return the content pages of *site_root* in a stable order."""
+    site_root = Path(site_root)
+    pages = []
+    for current, dirs, names in os.walk(site_root):
+        dirs[:] = sorted(
+            name for name in dirs
+            if not name.startswith(".")
+            and name != SEARCH_DIRECTORY_NAME
+            and not _SKIPPED_DIRECTORY_PATTERN.match(name)
+        )
+        at_root = Path(current) == site_root
+        for name in sorted(names):
+            if not name.endswith(".html") or (
+                at_root and _SKIPPED_PAGE_PATTERN.match(name)
+            ):
+                continue
+            pages.append(Path(current, name))
+    return pages
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _fingerprinted(stem: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:FINGERPRINT_LENGTH]
+    return f"{stem}.{digest}.json"
+
+
+def _shards(postings: Dict[str, List[int]]) -> Iterable[Tuple[str, str]]:
+    """Yield ``(first term, JSON text)`` of each shard in term order."""
+    shard: Dict[str, List[int]] = {}
+    size = 0
+    for term in sorted(postings):
+        entry = _dump({term: postings[term]})
+        if shard and size + len(entry.encode("utf-8")) > SHARD_TARGET_BYTES:
+            yield next(iter(shard)), _dump(shard)
+            shard, size = {}, 0
+        shard[term] = postings[term]
+        size += len(entry.encode("utf-8"))
+    if shard:
+        yield next(iter(shard)), _dump(shard)
+
+
+def write_language_index(
+    output_dir: Path, language: str, documents: List[Tuple[str, str, Dict[str, int]]]
+) -> Dict[str, int]:
+    """Write the index files of one language and remove older ones."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    postings: Dict[str, List[int]] = {}
+    for number, (_, _, scores) in enumerate(documents):
+        for term, score in scores.items():
+            postings.setdefault(term, []).extend((number, score))
+
+    files: Dict[str, str] = {}
+    documents_text = _dump([[url, title] for url, title, _ in documents])
+    documents_name = _fingerprinted("documents", documents_text)
+    files[documents_name] = documents_text
+    shards = []
+    for number, (first_term, text) in enumerate(_shards(postings)):
+        name = _fingerprinted(f"shard-{number:03d}", text)
+        files[name] = text
+        # The first shard also holds every term sorting before its first one.
+        shards.append(["" if number == 0 else first_term, name])
+    files[MANIFEST_NAME] = _dump({
+        "format": INDEX_FORMAT,
+        "language": language,
+        "root": "../../",
+        "stopwords": list(STOP_WORDS),
+        "documents": documents_name,
+        "shards": shards,
+    })
+
+    for name, text in files.items():
+        path = output_dir / name
+        if name == MANIFEST_NAME or not path.is_file():
+            temporary = output_dir / f".{name}.tmp"
+            temporary.write_text(text, encoding="utf-8")
+            os.replace(temporary, path)
+    for stale in output_dir.iterdir():
+        if stale.name not in files and stale.is_file():
+            stale.unlink()
+    return {
+        "documents": len(documents),
+        "terms": len(postings),
+        "shards": len(shards),
+        "bytes": sum(len(text.encode("utf-8")) for text in files.values()),
+    }
+
+
+def build_search_indexes(
+    site_root: Path, jobs: Optional[int] = None
+) -> Dict[str, Dict[str, int]]:
+    """Index every content page of *site_root* under ``_search/<lang>/``.
+
+    Pages are parsed in up to *jobs* worker processes (default: one per
+    CPU) once there are enough of them.  Languages no page uses any more
+    are removed.  Returns per-language counts of ``documents``, ``terms``,
+    ``shards`` and written ``bytes``.
+    """
+    site_root = Path(site_root)
+    pages = site_pages(site_root)
+    paths = [str(page) for page in pages]
+    workers = min(max(1, int(jobs or os.cpu_count() or 1)), len(paths) or 1)
+    if workers <= 1 or len(paths) < PARALLEL_MIN_FILES:
+        records = _read_pages(paths)
+    else:
+        batches = [paths[index::workers] for index in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_read_pages, batches))
+        by_path = {
+            path: record
+            for batch, batch_records in zip(batches, results)
+            for path, record in zip(batch, batch_records)
+        }
+        records = [by_path[path] for path in paths]
+
+    languages: Dict[str, List[Tuple[str, str, Dict[str, int]]]] = {}
+    for page, record in zip(pages, records):
+        if record is None:
+            continue
+        language, title, scores = record
+        url = page.relative_to(site_root).as_posix()
+        languages.setdefault(language, []).append((url, title, scores))
+
+    search_root = site_root / SEARCH_DIRECTORY_NAME
+    stats = {
+        language: write_language_index(search_root / language, language, documents)
+        for language, documents in sorted(languages.items())
+    }
+    if search_root.is_dir():
+        for stale in search_root.iterdir():
+            if stale.is_dir() and stale.name not in stats:
+                for path in stale.iterdir():
+                    path.unlink()
+                stale.rmdir()
+    return stats
+
+
+def add_search_page_context(app, pagename, templatename, context, doctree) -> None:
+    """Point the search page template at this language's index manifest."""
+    del templatename, doctree
+    if pagename != "search":
+        return
+    language = language_key(app.config.language)
+    context["docs_search"] = {
+        "language": language,
+        "index": f"{SEARCH_DIRECTORY_NAME}/{language}/{MANIFEST_NAME}",
+    }
+
+
+def register_search_page(app) -> None:
+    """Expose ``docs_search`` to the search page template."""
+    app.connect("html-page-context", add_search_page_context)
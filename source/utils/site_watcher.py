@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Watch documentation sources and map each change to the minimal rebuild."""
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+from .language_support import document_language
+from .static_server import DEFAULT_CACHE_MAX_AGE, StaticSiteServer, create_server
+
+
+WATCH_DEBOUNCE_MS = 400
+SITE_CONFIG_FILES = {"config.yaml", "conf.py"}
+THEME_DIRECTORIES = {"_static", "_templates"}
+DOCUMENT_SUFFIXES = {".md", ".rst"}
+
+
+@dataclass(frozen=True)
+class RebuildPlan:
+    """Stages required by one debounced batch of file changes.
+
+    ``full`` re-syncs and rebuilds every language, ``sync`` re-syncs the
+    projects tree (the rebuilt languages follow from what the sync wrote),
+    and ``theme`` rebuilds every language without syncing.
+    """
+
+    full: bool = False
+    sync: bool = False
+    theme: bool = False
+    changes: Tuple[str, ...] = ()
+
+    @property
+    def empty(self) -> bool:
+        return not (self.full or self.sync or self.theme)
+
+
+def _relative_to(path: Path, root: Path) -> Optional[Path]:
+    try:
+        return path.relative_to(root)
+    except ValueError:
+        return None
+
+
+def classify_change(
+    path: Path, source_dir: Path, projects_dir: Path
+) -> Optional[str]:
+    """Return ``"projects"``, ``"config"``, ``"theme"`` or None for *path*."""
+    path = Path(path).resolve()
+    relative = _relative_to(path, Path(projects_dir).resolve())
+    if relative is not None:
+        return "projects"
+    relative = _relative_to(path, Path(source_dir).resolve())
+    if relative is None or not relative.parts:
+        return None
+    if relative.as_posix() in SITE_CONFIG_FILES:
+        return "config"
+    if relative.parts[0] in THEME_DIRECTORIES:
+        return "theme"
+    return None
+
+
+def plan_rebuild(
+    changed_paths: Iterable[Path], source_dir: Path, projects_dir: Path
+) -> RebuildPlan:
+    """Map changed files to the stages that need to run."""
+    kinds = set()
+    labels = []
+    for path in changed_paths:
+        kind = classify_change(path, source_dir, projects_dir)
+        if kind is None:
+            continue
+        kinds.add(kind)
+        labels.append(Path(path).name)
+    return RebuildPlan(
+        full="config" in kinds,
+        sync="projects" in kinds,
+        theme="theme" in kinds,
+        changes=tuple(sorted(set(labels))),
+    )
+
+
+def languages_for_sync(
+    written_paths: Iterable[str],
+    removed_paths: Iterable[str],
+    available_languages: Sequence[str],
+) -> Set[str]:
+    """Return the languages whose HTML depends on the synchronized files.
+
+    Documents belong to the language of their filename; any other file (an
+    image, for instance) may be shared, so it rebuilds every language.
+    """
+    changed = [Path(name) for name in (*written_paths, *removed_paths)]
+    if not changed:
+        return set()
+    if len(available_languages) < 2 or any(
+        path.suffix.lower() not in DOCUMENT_SUFFIXES for path in changed
+    ):
+        return set(available_languages)
+    return {document_language(path) for path in changed} & set(
+        available_languages
+    )
+
+
+def watch_changes(
+    source_dir: Path,
+    projects_dir: Path,
+    debounce_ms: int = WATCH_DEBOUNCE_MS,
+) -> Iterator[Set[Path]]:
+    """Yield debounced batches of relevant changed paths until interrupted.
+
+    Uses the native (inotify/FSEvents/ReadDirectoryChangesW) watcher from
+    ``watchfiles``, which sphinx-autobuild already installs.
+    """
+    from watchfiles import DefaultFilter, watch
+
+    default_filter = DefaultFilter()
+
+    def relevant(change, path: str) -> bool:
+        return default_filter(change, path) and classify_change(
+            Path(path), source_dir, projects_dir
+        ) is not None
+
+    for changes in watch(
+        projects_dir,
+        source_dir,
+        watch_filter=relevant,
+        debounce=debounce_ms,
+    ):
+        yield {Path(path) for _change, path in changes}
+
+
+def serve_in_background(
+    site_dir: Path, port: int, cache_max_age: int = DEFAULT_CACHE_MAX_AGE
+) -> StaticSiteServer:
+    """Serve *site_dir* by path from a daemon thread."""
+    server = create_server(site_dir, port, cache_max_age=cache_max_age)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Run Sphinx builders in-process with per-build configuration overrides."""
+
+import filecmp
+import io
+import os
+import subprocess
+import sys
+from contextlib import nullcontext, redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional
+
+
+HELPER_PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+class SphinxBuildError(subprocess.CalledProcessError):
+    """An in-process Sphinx build failed.
+
+    Subclasses ``CalledProcessError`` so callers written against the
+    ``sphinx.cmd.build`` subprocess keep handling failures unchanged.
+    """
+
+    def __reduce__(self):
+        # Keep the captured log when the error crosses a process pool.
+        return (type(self), (self.returncode, self.cmd, self.output))
+
+
+def sphinx_overrides(
+    language: Optional[str] = None,
+    master_doc: Optional[str] = None,
+    exclude_patterns: Iterable[str] = (),
+    available_languages: Iterable[str] = (),
+    asset_language: Optional[str] = None,
+) -> Dict[str, object]:
+    """Translate per-build settings into Sphinx ``confoverrides``.
+
+    conf.py merges its base exclude patterns back in and recomputes the
+    language-dependent LaTeX settings from a ``config-inited`` hook.
+    """
+    overrides: Dict[str, object] = {}
+    if language:
+        overrides["language"] = language
+    if master_doc:
+        overrides["master_doc"] = master_doc
+        overrides["root_doc"] = master_doc
+    exclude_patterns = list(exclude_patterns)
+    if exclude_patterns:
+        overrides["exclude_patterns"] = exclude_patterns
+    available_languages = list(available_languages)
+    if available_languages:
+        overrides["docs_available_languages"] = available_languages
+    if asset_language:
+        overrides["docs_asset_language"] = asset_language
+    return overrides
+
+
+def shares_helper_modules(source_dir: Path) -> bool:
+    """Return whether *source_dir*'s conf.py imports these exact helpers.
+
+    conf.py imports ``utils`` from its own tree.  Inside this process that
+    name is already bound to the running helper package, so an in-process
+    build is only safe when the tree ships byte-identical helper modules
+    (for example a worktree of another version may not).
+    """
+    helper_dir = Path(source_dir).resolve() / "utils"
+    if helper_dir == HELPER_PACKAGE_DIR:
+        return True
+    if not helper_dir.is_dir():
+        return False
+    loaded = {path.name: path for path in HELPER_PACKAGE_DIR.glob("*.py")}
+    candidate = {path.name: path for path in helper_dir.glob("*.py")}
+    return loaded.keys() == candidate.keys() and all(
+        filecmp.cmp(loaded[name], candidate[name], shallow=False)
+        for name in loaded
+    )
+
+
+def _build_command(
+    source_dir: Path,
+    output_dir: Path,
+    builder: str,
+    language: Optional[str],
+    master_doc: Optional[str],
+    doctree_dir: Optional[Path],
+    quiet: bool,
+) -> list:
+    return [
+        sys.executable,
+        "-m",
+        "sphinx.cmd.build",
+        "-b",
+        builder,
+        *(("-q",) if quiet else ()),
+        *(("-D", f"language={language}") if language else ()),
+        *(("-D", f"master_doc={master_doc}") if master_doc else ()),
+        *(("-d", str(doctree_dir)) if doctree_dir is not None else ()),
+        str(source_dir),
+        str(output_dir),
+    ]
+
+
+def _run_subprocess(
+    command: list,
+    source_dir: Path,
+    language: Optional[str],
+    master_doc: Optional[str],
+    exclude_patterns: Iterable[str],
+    available_languages: Iterable[str],
+    asset_language: Optional[str],
+    capture_output: bool,
+    env: Optional[Mapping[str, str]],
+) -> str:
+    # Trees with different helpers still read their overrides from the
+    # environment, exactly as sphinx-build always did for them.
+    build_env = dict(os.environ if env is None else env)
+    build_env["PYTHONUTF8"] = "1"
+    if language:
+        build_env["SPHINX_LANGUAGE"] = language
+    if master_doc:
+        build_env["SPHINX_MASTER_DOC"] = master_doc
+        build_env["SPHINX_MASTER_DOC_OVERRIDE"] = master_doc
+    exclude_patterns = list(exclude_patterns)
+    if exclude_patterns:
+        build_env["SPHINX_EXCLUDE_PATTERNS"] = ",".join(exclude_patterns)
+    available_languages = list(available_languages)
+    if available_languages:
+        build_env["DOCS_AVAILABLE_LANGUAGES"] = ",".join(available_languages)
+    if asset_language:
+        build_env["DOCS_ASSET_LANGUAGE"] = asset_language
+    capture_options = (
+        {
+            "stdout": subprocess.PIPE,
+            "stderr": subprocess.STDOUT,
+            "encoding": "utf-8",
+            "errors": "replace",
+        }
+        if capture_output
+        else {}
+    )
+    result = subprocess.run(
+        command,
+        cwd=str(source_dir),
+        check=True,
+        env=build_env,
+        **capture_options,
+    )
+    return result.stdout or ""
+
+
+def _run_in_process(
+    command: list,
+    source_dir: Path,
+    output_dir: Path,
+    builder: str,
+    overrides: Mapping[str, object],
+    doctree_dir: Optional[Path],
+    capture_output: bool,
+    quiet: bool,
+) -> str:
+    from sphinx.application import Sphinx
+    from sphinx.util.docutils import docutils_namespace, patch_docutils
+
+    stream = io.StringIO() if capture_output else sys.stdout
+    capture = redirect_stdout(stream) if capture_output else nullcontext()
+    doctree_dir = doctree_dir or Path(output_dir) / ".doctrees"
+    try:
+        with capture, patch_docutils(source_dir), docutils_namespace():
+            app = Sphinx(
+                str(source_dir),
+                str(source_dir),
+                str(output_dir),
+                str(doctree_dir),
+                builder,
+                confoverrides=dict(overrides),
+                status=None if quiet else stream,
+                warning=stream,
+            )
+            app.build()
+    except Exception as error:
+        log = stream.getvalue() if capture_output else ""
+        raise SphinxBuildError(
+            2, command, output=f"{log}{type(error).__name__}: {error}\n"
+        ) from error
+    log = stream.getvalue() if capture_output else ""
+    if app.statuscode:
+        raise SphinxBuildError(app.statuscode, command, output=log)
+    return log
+
+
+def run_sphinx(
+    source_dir: Path,
+    output_dir: Path,
+    builder: str = "html",
+    *,
+    language: Optional[str] = None,
+    master_doc: Optional[str] = None,
+    exclude_patterns: Iterable[str] = (),
+    available_languages: Iterable[str] = (),
+    asset_language: Optional[str] = None,
+    doctree_dir: Optional[Path] = None,
+    capture_output: bool = False,
+    quiet: bool = False,
+    env: Optional[Mapping[str, str]] = None,
+    in_process: Optional[bool] = None,
+) -> str:
+    """Build *source_dir* with one Sphinx builder; return the captured log.
+
+    Builds run inside the current interpreter whenever the tree shares this
+    process's helper modules, reusing the already imported Sphinx, docutils
+    and theme packages.  Per-build settings travel as ``confoverrides``
+    instead of environment variables.  Other trees fall back to a
+    ``sphinx.cmd.build`` subprocess.  Failures raise ``CalledProcessError``
+    in both modes; *env* only applies to the subprocess.
+    """
+    source_dir = Path(source_dir).resolve()
+    output_dir = Path(output_dir)
+    exclude_patterns = list(exclude_patterns)
+    available_languages = list(available_languages)
+    command = _build_command(
+        source_dir, output_dir, builder, language, master_doc,
+        doctree_dir, quiet,
+    )
+    if in_process is None:
+        in_process = shares_helper_modules(source_dir)
+    if not in_process:
+        return _run_subprocess(
+            command,
+            source_dir,
+            language,
+            master_doc,
+            exclude_patterns,
+            available_languages,
+            asset_language,
+            capture_output,
+            env,
+        )
+    return _run_in_process(
+        command,
+        source_dir,
+        output_dir,
+        builder,
+        sphinx_overrides(
+            language, master_doc, exclude_patterns, available_languages,
+            asset_language,
+        ),
+        doctree_dir,
+        capture_output,
+        quiet,
+    )
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bundle the template's own stylesheets and scripts into two hashed files.
+
+The ``html_css_files`` and ``html_js_files`` found in the source ``_static``
+directory are concatenated in order, minified and written as
+``docs.<hash>.css`` and ``docs.<hash>.js``; the hash covers the bundled
+content, so the names only change when the assets do and browsers may cache
+them indefinitely.  Files that are not in the source tree, such as the
+``version_info.js`` each version writes after its build, stay separate.
+
+Minification uses the ``rjsmin`` and ``rcssmin`` modules when they are
+importable.  Without them scripts are bundled as they are, since telling
+comments from strings, template literals and regular expressions takes a
+real tokenizer, and stylesheets only lose comments and surrounding
+whitespace.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import rcssmin
+except ImportError:  # optional dependency
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # optional dependency
+    rjsmin = None
+
+
+BUNDLE_NAME = "docs"
+BUNDLE_DIRECTORY_NAME = "static_bundles"
+FINGERPRINT_LENGTH = 16
+CONTEXT_NAME = "docs_bundle"
+
+# Bundled scripts no longer have their own <script> tag to locate
+# themselves with, so the bundle records the URL of its directory first.
+STATIC_URL_PROLOGUE = (
+    "window.DOCS_STATIC_URL=document.currentScript"
+    "?new URL('.',document.currentScript.src).href:'';\n"
+)
+
+
+def _skip_string(source: str, index: int, quote: str) -> int:
+    """Return the index just past the string literal starting at *index*."""
+    index += 1
+    while index < len(source):
+        character = source[index]
+        if character == "\\":
+            index += 2
+            continue
+        index += 1
+        if character == quote:
+            break
+    return index
+
+
+def minify_js(source: str) -> str:
+    """Return *source* minified by rjsmin, or unchanged without it."""
+    if rjsmin is not None:
+        source = rjsmin.jsmin(source)
+    return source.strip() + "\n"
+
+
+def _strip_css(source: str) -> str:
+    """Drop comments and the whitespace around each line, keeping strings."""
+    parts: List[str] = []
+    index = 0
+    length = len(source)
+    while index < length:
+        if source.startswith("/*", index):
+            end = source.find("*/", index + 2)
+            index = length if end == -1 else end + 2
+            parts.append(" ")
+            continue
+        character = source[index]
+        if character in "'\"":
+            end = _skip_string(source, index, character)
+            parts.append(source[index:end])
+            index = end
+            continue
+        parts.append(character)
+        index += 1
+    lines = (line.strip() for line in "".join(parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def minify_css(source: str) -> str:
+    """Return *source* minified by rcssmin, or with comments stripped without it."""
+    if rcssmin is not None:
+        return rcssmin.cssmin(source).strip() + "\n"
+    return _strip_css(source).strip() + "\n"
+
+
+def _bundle_text(static_dir: Path, names: Sequence[str], minify, prologue: str = "") -> str:
+    parts = [prologue] if prologue else []
+    for name in names:
+        text = (static_dir / name).read_text(encoding="utf-8")
+        # Each script ends its own statement, like a separate <script> tag.
+        parts.append(minify(text).rstrip() + (";\n" if minify is minify_js else "\n"))
+    return "".join(parts)
+
+
+def _write_bundle(output_dir: Path, text: str, suffix: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:FINGERPRINT_LENGTH]
+    name = f"{BUNDLE_NAME}.{digest}{suffix}"
+    path = output_dir / name
+    if not path.is_file() or path.read_text(encoding="utf-8") != text:
+        temporary = output_dir / f".{name}.tmp"
+        temporary.write_text(text, encoding="utf-8")
+        os.replace(temporary, path)
+    for stale in output_dir.glob(f"{BUNDLE_NAME}.*{suffix}"):
+        if stale.name != name:
+            stale.unlink()
+    return name
+
+
+def _bundled(static_dir: Path, files: Sequence) -> Tuple[List[str], List]:
+    """Split config entries into bundled source files and the rest."""
+    bundled, remaining = [], []
+    for entry in files:
+        if (
+            isinstance(entry, str)
+            and "://" not in entry
+            and (static_dir / entry).is_file()
+        ):
+            bundled.append(entry)
+        else:
+            remaining.append(entry)
+    return bundled, remaining
+
+
+def build_static_bundles(
+    static_dir: Path,
+    css_files: Sequence[str],
+    js_files: Sequence[str],
+    output_dir: Path,
+) -> Dict[str, Optional[str]]:
+    """Write the CSS and JS bundles of *static_dir* files into *output_dir*.
+
+    Returns the bundle file names by kind, None for an empty kind.  Older
+    bundles in *output_dir* are removed.
+    """
+    static_dir = Path(static_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    bundles: Dict[str, Optional[str]] = {"css": None, "js": None}
+    if css_files:
+        bundles["css"] = _write_bundle(
+            output_dir, _bundle_text(static_dir, css_files, minify_css), ".css"
+        )
+    if js_files:
+        bundles["js"] = _write_bundle(
+            output_dir,
+            _bundle_text(static_dir, js_files, minify_js, STATIC_URL_PROLOGUE),
+            ".js",
+        )
+    return bundles
+
+
+def bundle_static_files(app, config) -> None:
+    """Replace the source ``_static`` CSS/JS entries with their bundles.
+
+    The bundle names are exposed to templates as ``docs_bundle.css`` and
+    ``docs_bundle.js``, paths relative to the output root.
+    """
+    static_dir = Path(app.confdir) / "_static"
+    css_files, remaining_css = _bundled(static_dir, config.html_css_files)
+    js_files, remaining_js = _bundled(static_dir, config.html_js_files)
+    if not css_files and not js_files:
+        return
+    output_dir = Path(app.doctreedir) / BUNDLE_DIRECTORY_NAME
+    bundles = build_static_bundles(static_dir, css_files, js_files, output_dir)
+    config.html_static_path = [*config.html_static_path, str(output_dir)]
+    config.html_css_files = remaining_css
+    config.html_js_files = remaining_js
+    config.html_context = {
+        **config.html_context,
+        CONTEXT_NAME: {
+            kind: f"_static/{name}" for kind, name in bundles.items() if name
+        },
+    }
+
+
+def register_static_bundles(app) -> None:
+    """Bundle the static files once the configuration is final."""
+    app.connect("config-inited", bundle_static_files)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Threaded static file server for built documentation sites.
+
+Extends the standard library server with what previews of large sites and
+the internal mirror need:
+
+* ``ETag``/``Last-Modified`` validators and ``304 Not Modified`` replies;
+* ``.br``/``.gz`` sidecars written by :mod:`utils.precompress`, sent with
+  ``Content-Encoding`` when the client accepts them and they are fresh;
+* single ``Range`` requests (``206``) sent with ``sendfile``, for PDFs;
+* a long ``Cache-Control`` lifetime for fingerprinted assets
+  (``name.<hash>.ext`` or ``?v=<hash>`` URLs) and revalidation otherwise;
+* an access log line with the latency of every request.
+
+Run ``python utils/static_server.py <site_dir>`` to serve a tree directly.
+"""
+
+import argparse
+import email.utils
+import mimetypes
+import os
+import posixpath
+import re
+import sys
+import threading
+import time
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.precompress import sidecar_is_fresh
+
+
+DEFAULT_CACHE_MAX_AGE = 365 * 24 * 3600
+# Preferred first; the suffixes match the sidecars written by precompress.
+CONTENT_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+TEXT_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+EXTRA_TYPES = {
+    ".js": "text/javascript",
+    ".mjs": "text/javascript",
+    ".json": "application/json",
+    ".map": "application/json",
+    ".svg": "image/svg+xml",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+    ".ttf": "font/ttf",
+    ".otf": "font/otf",
+    ".eot": "application/vnd.ms-fontobject",
+    ".wasm": "application/wasm",
+    ".pdf": "application/pdf",
+    ".inv": "application/octet-stream",
+}
+
+_FINGERPRINTED_NAME = re.compile(r"\.[0-9a-f]{8,64}\.[A-Za-z0-9]+$")
+_FINGERPRINTED_QUERY = re.compile(r"(?:^|&)v=[0-9A-Za-z]{6,}(?:&|$)")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def is_fingerprinted(url_path: str, query: str = "") -> bool:
+    """Return whether a URL names content that never changes."""
+    return bool(
+        _FINGERPRINTED_NAME.search(posixpath.basename(url_path))
+        or _FINGERPRINTED_QUERY.search(query)
+    )
+
+
+def _etag(status: os.stat_result, encoding: str = "") -> str:
+    tag = f"{status.st_mtime_ns:x}-{status.st_size:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return ``(start, end)`` of a single byte range, or None to ignore it.
+
+    Raises ValueError for a syntactically valid but unsatisfiable range.
+    """
+    match = _RANGE.match(header.replace(" ", ""))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+class StaticSiteHandler(SimpleHTTPRequestHandler):
+    """Request handler serving one site directory."""
+
+    protocol_version = "HTTP/1.1"
+    extensions_map = {**SimpleHTTPRequestHandler.extensions_map, **EXTRA_TYPES}
+
+    def handle_one_request(self):
+        self._started = time.perf_counter()
+        self._logged = None
+        self._body_length = None
+        self._range = None
+        super().handle_one_request()
+        if self._logged is not None:
+            self._write_access_log(*self._logged)
+
+    def parse_request(self):
+        # Keep-alive connections idle until the next request line arrives;
+        # timing starts once it has.
+        self._started = time.perf_counter()
+        return super().parse_request()
+
+    def log_request(self, code="-", size="-"):
+        # Written once the body is sent, so the latency covers the transfer.
+        if isinstance(code, HTTPStatus):
+            code = code.value
+        self._logged = (code, size)
+
+    def _write_access_log(self, code, size) -> None:
+        elapsed = (time.perf_counter() - self._started) * 1000
+        length = size if size != "-" or self._body_length is None else self._body_length
+        line = (
+            f'{self.address_string()} - - [{self.log_date_time_string()}] '
+            f'"{self.requestline}" {code} {length} {elapsed:.1f}ms\n'
+        )
+        self.server.write_access_log(line)
+
+    def guess_type(self, path):
+        content_type = super().guess_type(path)
+        if content_type.startswith(TEXT_TYPES) and "charset" not in content_type:
+            content_type += "; charset=utf-8"
+        return content_type
+
+    def _negotiated_file(self, path: str, use_sidecars: bool) -> Tuple[str, str]:
+        """Return the file to send for *path* and its content encoding."""
+        if not use_sidecars:
+            return path, ""
+        accepted = {
+            token.split(";", 1)[0].strip().lower()
+            for token in self.headers.get("Accept-Encoding", "").split(",")
+            if not token.strip().lower().endswith(("q=0", "q=0.0"))
+        }
+        for encoding, suffix in CONTENT_ENCODINGS:
+            sidecar = path + suffix
+            if encoding in accepted and sidecar_is_fresh(path, sidecar):
+                return sidecar, encoding
+        return path, ""
+
+    def _not_modified(self, status: os.stat_result, etag: str) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return int(status.st_mtime) <= int(since.timestamp())
+        return False
+
+    def _range_applies(self, status: os.stat_result, etag: str) -> bool:
+        if_range = self.headers.get("If-Range")
+        if not if_range:
+            return True
+        if if_range.startswith(("\"", "W/")):
+            return if_range == etag
+        try:
+            since = email.utils.parsedate_to_datetime(if_range)
+        except (TypeError, ValueError):
+            return False
+        return int(status.st_mtime) == int(since.timestamp())
+
+    def send_head(self):
+        url = urlsplit(self.path)
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url.path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                location = url._replace(path=url.path + "/").geturl()
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            for index in ("index.html", "index.htm"):
+                index_path = os.path.join(path, index)
+                if os.path.isfile(index_path):
+                    path = index_path
+                    break
+            else:
+                return self.list_directory(path)
+        if path.endswith("/") or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        range_header = self.headers.get("Range")
+        send_path, encoding = self._negotiated_file(path, use_sidecars=not range_header)
+        try:
+            handle = open(send_path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            status = os.fstat(handle.fileno())
+            etag = _etag(status, encoding)
+            if self._not_modified(status, etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self._send_validators(path, status, etag, url)
+                self.end_headers()
+                handle.close()
+                return None
+
+            size = status.st_size
+            byte_range = None
+            if range_header and self._range_applies(status, etag):
+                try:
+                    byte_range = _parse_range(range_header, size)
+                except ValueError:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    handle.close()
+                    return None
+
+            if byte_range:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self._range = (start, end - start + 1)
+            else:
+                self.send_response(HTTPStatus.OK)
+                self._range = (0, size)
+            self._body_length = self._range[1]
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(self._body_length))
+            self.send_header("Accept-Ranges", "bytes")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self._send_validators(path, status, etag, url)
+            self.end_headers()
+            return handle
+        except Exception:
+            handle.close()
+            raise
+
+    def _send_validators(self, path: str, status, etag: str, url) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(status.st_mtime))
+        if any(os.path.exists(path + suffix) for _, suffix in CONTENT_ENCODINGS):
+            self.send_header("Vary", "Accept-Encoding")
+        max_age = self.server.cache_max_age
+        if max_age and is_fingerprinted(url.path, url.query):
+            self.send_header("Cache-Control", f"public, max-age={max_age}, immutable")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+
+    def copyfile(self, source, outputfile):
+        if self._range is None:
+            super().copyfile(source, outputfile)
+            return
+        offset, count = self._range
+        outputfile.flush()
+        try:
+            self.connection.sendfile(source, offset=offset, count=count)
+        except (AttributeError, OSError, ValueError):
+            source.seek(offset)
+            remaining = count
+            while remaining:
+                chunk = source.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    break
+                outputfile.write(chunk)
+                remaining -= len(chunk)
+
+
+class StaticSiteServer(ThreadingHTTPServer):
+    """Threaded server holding the cache policy and the access log."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        handler,
+        cache_max_age: int = DEFAULT_CACHE_MAX_AGE,
+        access_log: Optional[TextIO] = None,
+    ):
+        super().__init__(address, handler)
+        self.cache_max_age = cache_max_age
+        self.access_log = access_log
+        self._log_lock = threading.Lock()
+
+    def write_access_log(self, line: str) -> None:
+        with self._log_lock:
+            stream = self.access_log or sys.stderr
+            stream.write(line)
+            stream.flush()
+
+
+def create_server(
+    site_dir: Path,
+    port: int,
+    bind: str = "",
+    cache_max_age: int = DEFAULT_CACHE_MAX_AGE,
+    access_log: Optional[str] = None,
+) -> StaticSiteServer:
+    """Return a server for *site_dir*; *access_log* is a file path to append to.
+
+    Requests resolve against the directory path rather than the process
+    working directory, so a site swapped in by rename is picked up at once.
+    """
+    handler = partial(StaticSiteHandler, directory=str(site_dir))
+    stream = open(access_log, "a", encoding="utf-8") if access_log else None
+    return StaticSiteServer((bind, port), handler, cache_max_age, stream)
+
+
+def serve_site(
+    site_dir: Path,
+    port: int,
+    bind: str = "",
+    cache_max_age: int = DEFAULT_CACHE_MAX_AGE,
+    access_log: Optional[str] = None,
+) -> None:
+    """Serve *site_dir* until interrupted; KeyboardInterrupt propagates."""
+    server = create_server(site_dir, port, bind, cache_max_age, access_log)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if server.access_log:
+            server.access_log.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文档站点静态服务器")
+    parser.add_argument("site_dir", type=Path, help="站点目录")
+    parser.add_argument("--port", type=int, default=8000, help="端口 (默认: 8000)")
+    parser.add_argument("--bind", default="", help="监听地址 (默认: 所有地址)")
+    parser.add_argument(
+        "--cache-max-age", type=int, default=DEFAULT_CACHE_MAX_AGE,
+        help="带内容哈希的资源缓存秒数，0 表示总是重新验证",
+    )
+    parser.add_argument("--access-log", help="访问日志文件 (默认: 标准错误输出)")
+    args = parser.parse_args()
+    if not args.site_dir.is_dir():
+        print(f"[ERROR] 站点目录不存在: {args.site_dir}")
+        return 1
+    print(f"[SERVER] http://localhost:{args.port} -> {args.site_dir}")
+    try:
+        serve_site(
+            args.site_dir, args.port, args.bind, args.cache_max_age, args.access_log
+        )
+    except KeyboardInterrupt:
+        print("\n服务器已停止")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
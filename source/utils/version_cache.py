@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Content-addressed cache of complete version builds."""
+
+import hashlib
+import json
+import platform
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+
+CACHE_FORMAT = 1
+CACHE_ENTRY_FILENAME = "cache_entry.json"
+CACHE_DIRECTORY_NAME = "version_cache"
+HASHED_TREES = ("source", "projects")
+BUILDER_ROOT = Path(__file__).resolve().parents[1]
+BUILDER_FILES = ("build_manager.py", "pdf_generator_enhanced_v2.py")
+
+
+def _git(project_root: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", *args],
+        cwd=str(project_root),
+        capture_output=True,
+        text=True,
+    )
+
+
+def git_tree_hash(project_root: Path, revision: str, path: str) -> Optional[str]:
+    """Return the git tree object of *path* at *revision*, or None if absent."""
+    result = _git(project_root, "rev-parse", "--verify", "--quiet", f"{revision}:{path}")
+    tree = result.stdout.strip()
+    return tree if result.returncode == 0 and tree else None
+
+
+def working_tree_matches_head(project_root: Path, paths: Iterable[str]) -> bool:
+    """Return whether tracked *paths* are unmodified and projects has no new files.
+
+    A version built from the current checkout uses the working tree, so its
+    committed tree hash only describes the build when nothing is pending.
+    Untracked files under ``source`` are ignored because the build itself
+    writes synchronized copies and outputs there.
+    """
+    paths = list(paths)
+    if _git(project_root, "diff", "--quiet", "HEAD", "--", *paths).returncode != 0:
+        return False
+    untracked = _git(
+        project_root, "ls-files", "--others", "--exclude-standard", "--",
+        *(path for path in paths if path != "source"),
+    )
+    return untracked.returncode == 0 and not untracked.stdout.strip()
+
+
+def builder_fingerprint(builder_root: Path = BUILDER_ROOT) -> str:
+    """Hash the running builder code and toolchain versions.
+
+    Worktrees are built with this checkout's helpers, so an older branch's
+    output changes whenever these modules, Sphinx or Python change.
+    """
+    import sphinx
+
+    digest = hashlib.sha256()
+    digest.update(
+        f"{CACHE_FORMAT}\0{platform.python_version()}\0{sphinx.__version__}\0".encode()
+    )
+    builder_root = Path(builder_root)
+    paths = [builder_root / name for name in BUILDER_FILES]
+    paths.extend(sorted((builder_root / "utils").glob("*.py")))
+    for path in paths:
+        if path.is_file():
+            digest.update(path.relative_to(builder_root).as_posix().encode() + b"\0")
+            digest.update(path.read_bytes())
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def version_cache_key(
+    project_root: Path,
+    revision: str,
+    version_entry: Mapping,
+    versions_config: bytes,
+    builder: str,
+) -> Optional[str]:
+    """Return the cache key of one version build, or None if it is uncacheable.
+
+    The key covers the git trees of ``source/`` and ``projects/`` at
+    *revision*, the builder fingerprint, the complete versions.json (every
+    version's menu lists all versions) and the version's own entry.
+    Branches without a ``source/`` tree are built from this checkout's
+    sources and are never cached.
+    """
+    trees = {path: git_tree_hash(project_root, revision, path) for path in HASHED_TREES}
+    if trees["source"] is None:
+        return None
+    digest = hashlib.sha256()
+    payload = {
+        "trees": trees,
+        "builder": builder,
+        "versions": hashlib.sha256(versions_config).hexdigest(),
+        "version": dict(version_entry),
+    }
+    digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode())
+    return digest.hexdigest()
+
+
+class VersionBuildCache:
+    """Keep the last successful output of each version under its cache key."""
+
+    def __init__(self, cache_root: Path):
+        self.cache_root = Path(cache_root)
+
+    def _entry_dir(self, url_path: str) -> Path:
+        return self.cache_root / url_path
+
+    def lookup(self, url_path: str, key: str) -> Optional[Path]:
+        """Return the cached output directory when *key* matches."""
+        entry_dir = self._entry_dir(url_path)
+        try:
+            entry = json.loads(
+                (entry_dir / CACHE_ENTRY_FILENAME).read_text(encoding="utf-8")
+            )
+        except (OSError, json.JSONDecodeError):
+            return None
+        output_dir = entry_dir / "output"
+        if entry.get("key") != key or not output_dir.is_dir():
+            return None
+        return output_dir
+
+    def restore(self, url_path: str, key: str, target_dir: Path) -> bool:
+        """Replace *target_dir* with the cached output; return whether it hit."""
+        cached_output = self.lookup(url_path, key)
+        if cached_output is None:
+            return False
+        target_dir = Path(target_dir)
+        staging_dir = target_dir.parent / f".{target_dir.name}_cached"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        target_dir.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copytree(cached_output, staging_dir)
+        shutil.rmtree(target_dir, ignore_errors=True)
+        staging_dir.replace(target_dir)
+        return True
+
+    def store(self, url_path: str, key: str, output_dir: Path) -> Path:
+        """Record *output_dir* as the cached build of *url_path*."""
+        entry_dir = self._entry_dir(url_path)
+        staging_dir = entry_dir.parent / f".{entry_dir.name}_storing"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        shutil.copytree(output_dir, staging_dir / "output")
+        (staging_dir / CACHE_ENTRY_FILENAME).write_text(
+            json.dumps(
+                {"key": key, "url_path": url_path, "stored": time.time()},
+                ensure_ascii=False,
+                indent=2,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        staging_dir.replace(entry_dir)
+        return entry_dir
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Persistent git worktrees that are updated in place between builds."""
+
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+
+def _git(cwd: Path, *args: str, check: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", *args],
+        cwd=str(cwd),
+        capture_output=True,
+        text=True,
+        check=check,
+    )
+
+
+def resolve_revision(project_root: Path, branch: str) -> Optional[str]:
+    """Return the commit of *branch*, falling back to ``origin/<branch>``.
+
+    CI checkouts often only have remote-tracking refs for the other
+    release branches.
+    """
+    for candidate in (branch, f"origin/{branch}"):
+        result = _git(
+            project_root, "rev-parse", "--verify", "--quiet",
+            f"{candidate}^{{commit}}", check=False,
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip()
+    return None
+
+
+class WorktreePool:
+    """Keep one detached worktree per version under *pool_root*.
+
+    Reusing a worktree only rewrites the files that differ between the old
+    and the new revision, instead of deleting and checking out every file
+    (including large figures) for each build.  When *sparse_paths* is given
+    the worktrees only materialize those repository directories.
+    """
+
+    def __init__(
+        self,
+        project_root: Path,
+        pool_root: Path,
+        sparse_paths: Optional[Sequence[str]] = None,
+    ):
+        self.project_root = Path(project_root).resolve()
+        self.pool_root = Path(pool_root)
+        self.sparse_paths = list(sparse_paths) if sparse_paths else None
+
+    def _registered_worktrees(self) -> List[Path]:
+        listed = _git(self.project_root, "worktree", "list", "--porcelain").stdout
+        return [
+            Path(line[len("worktree "):]).resolve()
+            for line in listed.splitlines()
+            if line.startswith("worktree ")
+        ]
+
+    def _apply_sparse_checkout(self, worktree: Path) -> None:
+        if self.sparse_paths:
+            _git(worktree, "sparse-checkout", "set", *self.sparse_paths)
+        else:
+            _git(worktree, "sparse-checkout", "disable", check=False)
+
+    def checkout(self, name: str, revision: str) -> Path:
+        """Return the pooled worktree *name*, detached at *revision*.
+
+        An existing worktree is moved to the revision with a forced
+        checkout and stripped of untracked and ignored files left by the
+        previous build; a missing one is added once.
+        """
+        worktree = (self.pool_root / name).resolve()
+        if worktree in self._registered_worktrees() and worktree.is_dir():
+            print(f"复用 worktree: {worktree} -> {revision[:12]}")
+            self._apply_sparse_checkout(worktree)
+            _git(worktree, "checkout", "--quiet", "--detach", "--force", revision)
+            _git(worktree, "clean", "-ffdxq")
+            return worktree
+
+        # Stale registrations or half-created directories are replaced.
+        _git(self.project_root, "worktree", "prune")
+        shutil.rmtree(worktree, ignore_errors=True)
+        worktree.parent.mkdir(parents=True, exist_ok=True)
+        print(f"创建 worktree: {revision[:12]} -> {worktree}")
+        _git(
+            self.project_root, "worktree", "add", "--quiet", "--no-checkout",
+            "--detach", str(worktree), revision,
+        )
+        self._apply_sparse_checkout(worktree)
+        _git(worktree, "reset", "--quiet", "--hard", revision)
+        return worktree
+
+    def remove(self, worktree: Path) -> bool:
+        """Remove one pooled worktree; paths outside the pool are refused."""
+        worktree = Path(worktree).resolve()
+        try:
+            worktree.relative_to(self.pool_root.resolve())
+        except ValueError:
+            return False
+        if worktree == self.pool_root.resolve() or not worktree.exists():
+            return False
+        if worktree in self._registered_worktrees():
+            result = _git(
+                self.project_root, "worktree", "remove", "--force", str(worktree),
+                check=False,
+            )
+            if result.returncode == 0:
+                return True
+        shutil.rmtree(worktree, ignore_errors=True)
+        return True
+
+    def prune(self, keep: Iterable[str] = ()) -> List[Path]:
+        """Remove every pooled worktree not named in *keep*."""
+        keep = set(keep)
+        removed = []
+        if self.pool_root.is_dir():
+            for worktree in sorted(self.pool_root.iterdir()):
+                if worktree.name in keep or not worktree.is_dir():
+                    continue
+                if self.remove(worktree):
+                    removed.append(worktree)
+        _git(self.project_root, "worktree", "prune")
+        return removed